@@ -13,13 +13,19 @@ from django.utils import timezone
 
 # Import all ViewSets
 from apps.rooms.views import RoomTypeViewSet, RoomViewSet
-from apps.guests.views import GuestViewSet, GuestDocumentViewSet
-from apps.reservations.views import ReservationViewSet, ReservationRoomViewSet
+from apps.guests.views import GuestViewSet, GuestDocumentViewSet, DuplicateCandidateViewSet
+from apps.reservations.views import ReservationViewSet, ReservationRoomViewSet, GroupBlockViewSet
 from apps.employees.views import DepartmentViewSet, EmployeeViewSet, AttendanceViewSet, ShiftViewSet
-from apps.inventory.views import InventoryCategoryViewSet, SupplierViewSet, InventoryItemViewSet, StockMovementViewSet
+from apps.inventory.views import (
+    InventoryCategoryViewSet, SupplierViewSet, InventoryItemViewSet, StockMovementViewSet, StockLocationViewSet,
+    PurchaseOrderViewSet, ItemScanViewSet, MinibarViewSet, StockLotViewSet
+)
 from apps.payments.views import PaymentMethodViewSet, BillViewSet, PaymentViewSet
-from apps.checkin.views import CheckInViewSet, RoomKeyViewSet
+from apps.checkin.views import CheckInViewSet, RoomKeyViewSet, validate_key
 from apps.reports.views import ReportsViewSet
+from apps.realtime.views import event_stream
+from apps.housekeeping.views import HousekeepingTaskViewSet
+from apps.maintenance.views import WorkOrderViewSet
 
 # Create the main API router
 router = DefaultRouter()
@@ -31,10 +37,12 @@ router.register(r'rooms', RoomViewSet, basename='room')
 # Register Guests app endpoints
 router.register(r'guests', GuestViewSet, basename='guest')
 router.register(r'guest-documents', GuestDocumentViewSet, basename='guestdocument')
+router.register(r'guest-duplicates', DuplicateCandidateViewSet, basename='duplicatecandidate')
 
 # Register Reservations app endpoints
 router.register(r'reservations', ReservationViewSet, basename='reservation')
 router.register(r'reservation-rooms', ReservationRoomViewSet, basename='reservationroom')
+router.register(r'group-blocks', GroupBlockViewSet, basename='groupblock')
 
 # Register Employees app endpoints
 router.register(r'departments', DepartmentViewSet, basename='department')
@@ -47,6 +55,11 @@ router.register(r'inventory/categories', InventoryCategoryViewSet, basename='inv
 router.register(r'inventory/suppliers', SupplierViewSet, basename='supplier')
 router.register(r'inventory/items', InventoryItemViewSet, basename='inventoryitem')
 router.register(r'inventory/stock-movements', StockMovementViewSet, basename='stockmovement')
+router.register(r'inventory/locations', StockLocationViewSet, basename='stocklocation')
+router.register(r'inventory/purchase-orders', PurchaseOrderViewSet, basename='purchaseorder')
+router.register(r'inventory/scan', ItemScanViewSet, basename='itemscan')
+router.register(r'inventory/minibar', MinibarViewSet, basename='minibar')
+router.register(r'inventory/lots', StockLotViewSet, basename='stocklot')
 
 # Register Payments app endpoints
 router.register(r'payment-methods', PaymentMethodViewSet, basename='paymentmethod')
@@ -60,6 +73,12 @@ router.register(r'room-keys', RoomKeyViewSet, basename='roomkey')
 # Register Reports app endpoints
 router.register(r'reports', ReportsViewSet, basename='reports')
 
+# Register Housekeeping app endpoints
+router.register(r'housekeeping/tasks', HousekeepingTaskViewSet, basename='housekeepingtask')
+
+# Register Maintenance app endpoints
+router.register(r'maintenance/work-orders', WorkOrderViewSet, basename='workorder')
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -97,6 +116,7 @@ def api_root(request, format=None):
             'guests': {
                 'guests': request.build_absolute_uri(reverse('guest-list')),
                 'guest_documents': request.build_absolute_uri(reverse('guestdocument-list')),
+                'guest_duplicates': request.build_absolute_uri(reverse('duplicatecandidate-list')),
                 'description': 'Guest profiles, documents, loyalty program, VIP management'
             },
             'reservations': {
@@ -116,6 +136,11 @@ def api_root(request, format=None):
                 'suppliers': request.build_absolute_uri(reverse('supplier-list')),
                 'items': request.build_absolute_uri(reverse('item-list')),
                 'stock_movements': request.build_absolute_uri(reverse('stockmovement-list')),
+                'locations': request.build_absolute_uri(reverse('stocklocation-list')),
+                'purchase_orders': request.build_absolute_uri(reverse('purchaseorder-list')),
+                'scan': request.build_absolute_uri(reverse('itemscan-list')),
+                'minibar': request.build_absolute_uri(reverse('minibar-list')),
+                'lots': request.build_absolute_uri(reverse('stocklot-list')),
                 'description': 'Inventory management, stock tracking, supplier management'
             },
             'payments': {
@@ -132,6 +157,18 @@ def api_root(request, format=None):
             'reports': {
                 'reports': request.build_absolute_uri(reverse('reports-list')),
                 'description': 'Comprehensive reporting: occupancy, revenue, analytics, forecasting'
+            },
+            'housekeeping': {
+                'tasks': request.build_absolute_uri(reverse('housekeepingtask-list')),
+                'description': 'Cleaning task queue, attendant assignment, room readiness'
+            },
+            'maintenance': {
+                'work_orders': request.build_absolute_uri(reverse('workorder-list')),
+                'description': 'Maintenance work orders, planned out-of-order room ranges'
+            },
+            'realtime': {
+                'stream': request.build_absolute_uri(reverse('event-stream')),
+                'description': 'Server-Sent Events push of room status, arrivals, check-ins/outs and keys'
             }
         },
         'features': {
@@ -162,9 +199,15 @@ urlpatterns = [
     # API root
     path('', api_root, name='api-root'),
     
+    # Key validation for door-lock and elevator controllers
+    path('locks/validate/', validate_key, name='lock-validate'),
+    
     # Include all router URLs
     path('', include(router.urls)),
     
+    # Real-time push stream (Server-Sent Events, served over ASGI)
+    path('stream/', event_stream, name='event-stream'),
+    
     # API documentation - commented out temporarily due to coreapi import issue
     # path('docs/', include_docs_urls(
     #     title='Hotel Management System API',
@@ -0,0 +1,275 @@
+"""
+Batch check-in and check-out for groups arriving or leaving together.
+
+``CheckIn.save()`` and ``CheckOut.save()`` update the reservation, every
+room and every key one row at a time. These helpers do the same work for a
+whole list of reservations in one transaction with a fixed number of
+queries: bulk inserts for the check-in/check-out records (one per
+reservation, which is the audit trail of who processed it and when) and
+for room keys, and one ``UPDATE`` per target status for reservations,
+rooms and keys.
+
+Bulk writes skip model signals, so the key validation index, the cached
+occupancy board and the real-time events the signals would have updated
+are handled explicitly once the transaction commits.
+
+Checking out also posts the minibar consumption recorded for the rooms to
+stock and to the bills, for the whole batch at once (see
+``apps.inventory.minibar``).
+"""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from apps.inventory.minibar import MinibarError, post_minibar_charges
+from apps.realtime.broker import publish
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import Room
+from .keyindex import key_index
+from .models import CheckIn, CheckOut, RoomKey
+from .occupancy import invalidate_occupancy_board
+
+
+# Room status after check-out for each reported room condition
+ROOM_STATUS_AFTER_CHECKOUT = {
+    'CLEAN': 'AVAILABLE',
+    'NEEDS_CLEANING': 'MAINTENANCE',
+    'MAINTENANCE_REQUIRED': 'MAINTENANCE',
+    'DAMAGED': 'OUT_OF_ORDER',
+}
+
+
+# Sent with ``checkouts`` after a batch check-out commits, since the bulk
+# insert does not send ``post_save`` for each ``CheckOut``
+checkouts_processed = Signal()
+
+
+class BatchError(Exception):
+    """Raised when some reservations of a batch cannot be processed"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'{len(errors)} reservations cannot be processed')
+
+
+def _rooms_by_reservation(reservation_ids):
+    rooms = defaultdict(list)
+    for reservation_id, room_id, number, floor in ReservationRoom.objects.filter(
+        reservation_id__in=reservation_ids
+    ).values_list('reservation_id', 'room_id', 'room__number', 'room__floor'):
+        rooms[reservation_id].append({'id': room_id, 'number': number, 'floor': floor})
+    return rooms
+
+
+def _generate_key_codes(room_numbers):
+    """Generate unique key codes, one per entry of ``room_numbers``"""
+    codes = [f"{number}-{uuid.uuid4().hex[:6].upper()}" for number in room_numbers]
+    while True:
+        taken = set(RoomKey.objects.filter(key_code__in=codes).values_list('key_code', flat=True))
+        seen = set()
+        clashes = []
+        for index, code in enumerate(codes):
+            if code in taken or code in seen:
+                clashes.append(index)
+            seen.add(code)
+        if not clashes:
+            return codes
+        for index in clashes:
+            codes[index] = f"{room_numbers[index]}-{uuid.uuid4().hex[:6].upper()}"
+
+
+def batch_check_in(reservation_ids, number_of_keys=1, key_type='RFID', verified_by=None,
+                   check_in_time=None):
+    """Check in confirmed reservations together.
+
+    All reservations are validated first; if any cannot be checked in,
+    ``BatchError`` is raised with the reason per reservation and nothing is
+    written. Returns the created ``CheckIn`` records.
+    """
+    reservation_ids = list(dict.fromkeys(reservation_ids))
+    check_in_time = check_in_time or timezone.now()
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        reservations = {
+            reservation.id: reservation
+            for reservation in Reservation.objects.select_for_update().filter(id__in=reservation_ids)
+        }
+        checked_in = set(CheckIn.objects.filter(reservation_id__in=reservation_ids).values_list(
+            'reservation_id', flat=True
+        ))
+        rooms = _rooms_by_reservation(reservation_ids)
+
+        errors = {}
+        for reservation_id in reservation_ids:
+            reservation = reservations.get(reservation_id)
+            if reservation is None:
+                errors[reservation_id] = 'Reservation not found'
+            elif reservation.status != 'CONFIRMED' or reservation_id in checked_in:
+                errors[reservation_id] = f'Cannot check in reservation with status: {reservation.get_status_display()}'
+            elif reservation.check_in_date > today:
+                errors[reservation_id] = f'Cannot check in before check-in date: {reservation.check_in_date}'
+            elif not rooms.get(reservation_id):
+                errors[reservation_id] = 'No rooms assigned to reservation'
+        if errors:
+            raise BatchError(errors)
+
+        checkins = CheckIn.objects.bulk_create([
+            CheckIn(
+                reservation=reservations[reservation_id],
+                actual_check_in_time=check_in_time,
+                adults_count=reservations[reservation_id].adults,
+                children_count=reservations[reservation_id].children,
+                number_of_keys=number_of_keys,
+                verified_by=verified_by,
+                notes='Group check-in'
+            )
+            for reservation_id in reservation_ids
+        ])
+
+        now = timezone.now()
+        Reservation.objects.filter(id__in=reservation_ids).update(status='CHECKED_IN', updated_at=now)
+        room_ids = [room['id'] for reservation_id in reservation_ids for room in rooms[reservation_id]]
+        Room.objects.filter(id__in=room_ids).update(status='OCCUPIED', updated_at=now)
+
+        key_rooms = [
+            (checkin, room)
+            for checkin in checkins
+            for room in rooms[checkin.reservation_id]
+            for _ in range(number_of_keys)
+        ]
+        codes = _generate_key_codes([room['number'] for _, room in key_rooms])
+        keys = RoomKey.objects.bulk_create([
+            RoomKey(check_in=checkin, room_id=room['id'], key_code=code, key_type=key_type)
+            for (checkin, room), code in zip(key_rooms, codes)
+        ])
+
+        def after_commit():
+            invalidate_occupancy_board()
+            for key, (_, room) in zip(keys, key_rooms):
+                key_index.add(key.key_code, room['id'], room['number'])
+            for checkin in checkins:
+                reservation_rooms = rooms[checkin.reservation_id]
+                floors = [room['floor'] for room in reservation_rooms]
+                for room in reservation_rooms:
+                    publish('rooms', {
+                        'room': room['id'], 'number': room['number'], 'floor': room['floor'],
+                        'status': 'OCCUPIED', 'created': False
+                    }, floors=[room['floor']])
+                publish('checkins', {
+                    'check_in': checkin.id,
+                    'reservation': checkin.reservation_id,
+                    'time': checkin.actual_check_in_time,
+                    'rooms': reservation_rooms,
+                }, floors=floors)
+            for key, (checkin, room) in zip(keys, key_rooms):
+                publish('keys', {
+                    'key': key.id, 'check_in': checkin.id, 'room': room['id'],
+                    'number': room['number'], 'key_type': key.key_type, 'action': 'issued'
+                }, floors=[room['floor']])
+
+        transaction.on_commit(after_commit)
+    return checkins
+
+
+def batch_check_out(reservation_ids, room_condition='CLEAN', payment_status='PENDING',
+                    processed_by=None, check_out_time=None):
+    """Check out checked-in reservations together.
+
+    Validation works as in ``batch_check_in``. Room status follows the
+    reported room condition, all active keys of the stays are deactivated
+    and the rooms' minibar consumption is charged. Returns the created
+    ``CheckOut`` records.
+    """
+    reservation_ids = list(dict.fromkeys(reservation_ids))
+    check_out_time = check_out_time or timezone.now()
+
+    with transaction.atomic():
+        reservations = {
+            reservation.id: reservation
+            for reservation in Reservation.objects.select_for_update().filter(id__in=reservation_ids)
+        }
+        checkins = {
+            checkin.reservation_id: checkin
+            for checkin in CheckIn.objects.filter(
+                reservation_id__in=reservation_ids, checkout__isnull=True
+            )
+        }
+
+        errors = {}
+        for reservation_id in reservation_ids:
+            reservation = reservations.get(reservation_id)
+            if reservation is None:
+                errors[reservation_id] = 'Reservation not found'
+            elif reservation.status != 'CHECKED_IN' or reservation_id not in checkins:
+                errors[reservation_id] = f'Cannot check out reservation with status: {reservation.get_status_display()}'
+        if errors:
+            raise BatchError(errors)
+
+        try:
+            minibar = post_minibar_charges(reservation_ids, performed_by=processed_by)
+        except MinibarError as e:
+            raise BatchError({e.reservation_id: str(e)})
+
+        checkouts = CheckOut.objects.bulk_create([
+            CheckOut(
+                check_in=checkins[reservation_id],
+                actual_check_out_time=check_out_time,
+                payment_status=payment_status,
+                room_condition=room_condition,
+                minibar_charges=minibar.get(reservation_id, Decimal('0.00')),
+                processed_by=processed_by,
+                notes='Group check-out'
+            )
+            for reservation_id in reservation_ids
+        ])
+
+        now = timezone.now()
+        rooms = _rooms_by_reservation(reservation_ids)
+        room_status = ROOM_STATUS_AFTER_CHECKOUT[room_condition]
+        Reservation.objects.filter(id__in=reservation_ids).update(status='CHECKED_OUT', updated_at=now)
+        Room.objects.filter(
+            id__in=[room['id'] for reservation_id in reservation_ids for room in rooms[reservation_id]]
+        ).update(status=room_status, updated_at=now)
+
+        checkin_ids = [checkin.id for checkin in checkins.values()]
+        keys = list(RoomKey.objects.filter(check_in_id__in=checkin_ids, is_active=True).values_list(
+            'id', 'check_in_id', 'room_id', 'key_type', 'key_code'
+        ))
+        RoomKey.objects.filter(id__in=[key[0] for key in keys]).update(is_active=False, deactivated_at=now)
+
+        def after_commit():
+            invalidate_occupancy_board()
+            for key in keys:
+                key_index.remove(key[4])
+            checkouts_processed.send(sender=CheckOut, checkouts=checkouts)
+            room_details = {room['id']: room for stay in rooms.values() for room in stay}
+            for checkout in checkouts:
+                reservation_id = checkout.check_in.reservation_id
+                reservation_rooms = rooms[reservation_id]
+                for room in reservation_rooms:
+                    publish('rooms', {
+                        'room': room['id'], 'number': room['number'], 'floor': room['floor'],
+                        'status': room_status, 'created': False
+                    }, floors=[room['floor']])
+                publish('checkouts', {
+                    'check_out': checkout.id,
+                    'check_in': checkout.check_in_id,
+                    'reservation': reservation_id,
+                    'time': checkout.actual_check_out_time,
+                    'room_condition': checkout.room_condition,
+                    'rooms': reservation_rooms,
+                }, floors=[room['floor'] for room in reservation_rooms])
+            for key_id, checkin_id, room_id, key_type, _ in keys:
+                room = room_details.get(room_id, {'number': None, 'floor': None})
+                publish('keys', {
+                    'key': key_id, 'check_in': checkin_id, 'room': room_id,
+                    'number': room['number'], 'key_type': key_type, 'action': 'deactivated'
+                }, floors=[room['floor']])
+
+        transaction.on_commit(after_commit)
+    return checkouts
@@ -0,0 +1,93 @@
+"""
+In-memory index of active room keys for door-lock and elevator controllers.
+
+Controllers validate a key on every tap, so lookups are served from a dict
+of ``key_code -> (room_id, room_number)`` without touching the ORM. The
+index is loaded with one query, kept current in this process by
+``RoomKey`` signals and by the batch check-in/check-out helpers, and
+reloaded after ``ROOM_KEY_INDEX_TTL`` seconds so changes made by other
+processes are picked up within a bounded delay. Only one request reloads an
+expired index; the others answer from the old keys meanwhile.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+class RoomKeyIndex:
+    """Active key codes mapped to the room they open"""
+
+    def __init__(self):
+        self._keys = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ROOM_KEY_INDEX_TTL', 30)
+
+    def warm(self):
+        """(Re)load every active key with a single query"""
+        from .models import RoomKey
+
+        with self._lock:
+            self._keys = {
+                key_code: (room_id, number)
+                for key_code, room_id, number in RoomKey.objects.filter(is_active=True).values_list(
+                    'key_code', 'room_id', 'room__number'
+                ).iterator(chunk_size=5000)
+            }
+            self._loaded_at = time.monotonic()
+        return len(self._keys)
+
+    def clear(self):
+        with self._lock:
+            self._keys = None
+
+    def _current(self):
+        keys = self._keys
+        if keys is not None and time.monotonic() - self._loaded_at <= self.ttl:
+            return keys
+        # One caller reloads an expired index while the others keep answering
+        # from the old keys; with nothing loaded yet they wait for it instead
+        if self._reload_lock.acquire(blocking=keys is None):
+            try:
+                if self._keys is keys:
+                    self.warm()
+                keys = self._keys or {}
+            finally:
+                self._reload_lock.release()
+        return keys
+
+    def __len__(self):
+        return len(self._current())
+
+    def lookup(self, key_code):
+        """Get (room_id, room_number) for an active key, or None"""
+        return self._current().get(key_code)
+
+    def validate(self, key_code, room_number=None, room_id=None):
+        """Check an active key opens a room, given by number or by id but not both"""
+        if (room_number is None) == (room_id is None):
+            raise ValueError('Give either room_number or room_id')
+        entry = self._current().get(key_code)
+        if entry is None:
+            return False
+        if room_id is not None:
+            return str(room_id) == str(entry[0])
+        return str(room_number) == entry[1]
+
+    def add(self, key_code, room_id, room_number):
+        with self._lock:
+            if self._keys is not None:
+                self._keys[key_code] = (room_id, room_number)
+
+    def remove(self, key_code):
+        with self._lock:
+            if self._keys is not None:
+                self._keys.pop(key_code, None)
+
+
+key_index = RoomKeyIndex()
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from apps.checkin.keyindex import key_index
+from apps.checkin.models import RoomKey
+from apps.checkin.views import validate_key
+
+
+class Command(BaseCommand):
+    help = 'Measure key validations per second of the lock controller endpoint in this process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        loaded = key_index.warm()
+        keys = list(RoomKey.objects.filter(is_active=True).values_list('key_code', 'room__number')[:1000])
+        if not keys:
+            raise CommandError('No active room keys to validate; check in some guests first')
+
+        token = getattr(settings, 'LOCK_CONTROLLER_TOKEN', None) or 'benchmark'
+        factory = RequestFactory()
+        requests = [
+            factory.get('/api/locks/validate/', {'key_code': code, 'room': number},
+                        HTTP_X_CONTROLLER_TOKEN=token)
+            for code, number in keys
+        ]
+
+        total = options['requests']
+        with override_settings(LOCK_CONTROLLER_TOKEN=token):
+            started = time.perf_counter()
+            for i in range(total):
+                validate_key(requests[i % len(requests)])
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Keys indexed: {loaded}')
+        self.stdout.write(f'Validations: {total} in {elapsed:.2f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total / elapsed:,.0f} validations/s, {elapsed / total * 1e6:.0f} us each'
+        ))
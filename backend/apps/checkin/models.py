@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from datetime import datetime
@@ -105,9 +105,17 @@ class CheckOut(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        if not is_new:
+            return super().save(*args, **kwargs)
         
-        if is_new:
+        from apps.inventory.minibar import post_minibar_charges
+        
+        with transaction.atomic():
+            # Charge what was taken from the rooms' minibars
+            posted = post_minibar_charges([self.check_in.reservation_id], performed_by=self.processed_by)
+            self.minibar_charges += posted.get(self.check_in.reservation_id, Decimal('0.00'))
+            super().save(*args, **kwargs)
+            
             # Update reservation status
             self.check_in.reservation.status = 'CHECKED_OUT'
             self.check_in.reservation.save(update_fields=['status', 'updated_at'])
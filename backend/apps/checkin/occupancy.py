@@ -0,0 +1,137 @@
+"""
+Precomputed occupancy board for the front desk.
+
+The board lists every active room with its current stay, guest, number
+of active keys and any maintenance work order keeping it out of order
+today. It is built from four queries regardless of the number of rooms and
+cached until a room, reservation, check-in, check-out, key or work order
+changes. Filtering by floor, room type or status is done on the cached
+board in memory.
+
+Invalidation is per process with the default local-memory cache; with a
+shared cache backend every process sees it. ``OCCUPANCY_BOARD_CACHE_TTL``
+bounds staleness in either case.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.maintenance.intervals import OutOfOrderIndex
+from apps.reservations.models import ReservationRoom
+from apps.rooms.models import Room
+from .models import RoomKey
+
+
+CACHE_KEY = 'checkin:occupancy-board'
+
+
+def build_occupancy_board():
+    """Build the board from a constant number of queries"""
+    rooms = list(
+        Room.objects.filter(is_active=True).order_by('floor', 'number').values(
+            'id', 'number', 'floor', 'status', 'room_type_id', 'room_type__name'
+        )
+    )
+
+    stays = {}
+    for stay in ReservationRoom.objects.filter(
+        reservation__status='CHECKED_IN',
+        reservation__checkin__isnull=False,
+        reservation__checkin__checkout__isnull=True
+    ).values(
+        'room_id', 'reservation_id', 'reservation__reservation_number',
+        'reservation__check_in_date', 'reservation__check_out_date',
+        'reservation__adults', 'reservation__children',
+        'reservation__checkin__id', 'reservation__checkin__actual_check_in_time',
+        'reservation__guest_id', 'reservation__guest__first_name',
+        'reservation__guest__last_name', 'reservation__guest__is_vip'
+    ):
+        stays[stay['room_id']] = {
+            'checkin_id': stay['reservation__checkin__id'],
+            'reservation_id': stay['reservation_id'],
+            'reservation_number': stay['reservation__reservation_number'],
+            'check_in_time': stay['reservation__checkin__actual_check_in_time'],
+            'expected_checkout': stay['reservation__check_out_date'],
+            'nights': (stay['reservation__check_out_date'] - stay['reservation__check_in_date']).days,
+            'adults': stay['reservation__adults'],
+            'children': stay['reservation__children'],
+            'guest': {
+                'id': stay['reservation__guest_id'],
+                'name': f"{stay['reservation__guest__first_name']} {stay['reservation__guest__last_name']}",
+                'is_vip': stay['reservation__guest__is_vip'],
+            },
+        }
+
+    key_counts = dict(
+        RoomKey.objects.filter(is_active=True).values('room_id').annotate(
+            active=Count('id')
+        ).values_list('room_id', 'active')
+    )
+
+    today = timezone.now().date()
+    out_of_order = OutOfOrderIndex.load(today, today + timedelta(days=1))
+
+    board = []
+    for room in rooms:
+        ranges = out_of_order.ranges(room['id'])
+        board.append({
+            'room_id': room['id'],
+            'room_number': room['number'],
+            'floor': room['floor'],
+            'room_type_id': room['room_type_id'],
+            'room_type': room['room_type__name'],
+            'status': room['status'],
+            'occupied': room['id'] in stays,
+            'out_of_order': bool(ranges),
+            'back_in_service': ranges[-1][1] if ranges else None,
+            'active_keys': key_counts.get(room['id'], 0),
+            'stay': stays.get(room['id']),
+        })
+    return {'generated_at': timezone.now(), 'rooms': board}
+
+
+def get_occupancy_board():
+    """Get the cached board, building it on a miss"""
+    board = cache.get(CACHE_KEY)
+    if board is None:
+        board = build_occupancy_board()
+        cache.set(CACHE_KEY, board, getattr(settings, 'OCCUPANCY_BOARD_CACHE_TTL', 60))
+    return board
+
+
+def invalidate_occupancy_board():
+    cache.delete(CACHE_KEY)
+
+
+def filter_board(rooms, floor=None, room_type=None, status=None):
+    """Filter board rooms by floor, room type id or name, and room status"""
+    if floor is not None:
+        rooms = [room for room in rooms if room['floor'] == floor]
+    if room_type:
+        room_type = str(room_type)
+        rooms = [
+            room for room in rooms
+            if str(room['room_type_id']) == room_type or room['room_type'].lower() == room_type.lower()
+        ]
+    if status:
+        rooms = [room for room in rooms if room['status'] == status.upper()]
+    return rooms
+
+
+def summarize(rooms):
+    total_rooms = len(rooms)
+    occupied_rooms = sum(1 for room in rooms if room['occupied'])
+    by_status = {}
+    for room in rooms:
+        by_status[room['status']] = by_status.get(room['status'], 0) + 1
+    return {
+        'total_rooms': total_rooms,
+        'occupied_rooms': occupied_rooms,
+        'available_rooms': by_status.get('AVAILABLE', 0),
+        'out_of_order_rooms': sum(1 for room in rooms if room['out_of_order']),
+        'occupancy_rate': round(occupied_rooms / total_rooms * 100, 1) if total_rooms else 0,
+        'by_status': by_status,
+    }
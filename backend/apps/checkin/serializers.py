@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import CheckIn, RoomKey
+from .models import CheckIn, CheckOut, RoomKey
 
 
 class RoomKeySerializer(serializers.ModelSerializer):
@@ -208,6 +208,28 @@ class CheckOutSerializer(serializers.Serializer):
         return data
 
 
+class BatchCheckInSerializer(serializers.Serializer):
+    """Serializer for checking in a group of reservations at once"""
+    reservations = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=500,
+        help_text="Reservation IDs to check in"
+    )
+    number_of_keys = serializers.IntegerField(min_value=1, max_value=5, default=1)
+    key_type = serializers.ChoiceField(choices=RoomKey.KEY_TYPE_CHOICES, default='RFID')
+    verified_by = serializers.CharField(max_length=100, required=False)
+
+
+class BatchCheckOutSerializer(serializers.Serializer):
+    """Serializer for checking out a group of reservations at once"""
+    reservations = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=500,
+        help_text="Reservation IDs to check out"
+    )
+    room_condition = serializers.ChoiceField(choices=CheckOut.ROOM_CONDITION_CHOICES, default='CLEAN')
+    payment_status = serializers.ChoiceField(choices=CheckOut.PAYMENT_STATUS_CHOICES, default='PENDING')
+    processed_by = serializers.CharField(max_length=100, required=False)
+
+
 class RoomKeyCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating room keys"""
     class Meta:
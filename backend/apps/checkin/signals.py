@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.guests.models import Guest
+from apps.maintenance.models import WorkOrder
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import Room
+from .keyindex import key_index
+from .models import CheckIn, CheckOut, RoomKey
+from .occupancy import invalidate_occupancy_board
+
+
+@receiver(post_save, sender=RoomKey)
+def index_room_key(sender, instance, raw=False, **kwargs):
+    """Keep the key validation index in step with saved keys"""
+    if raw:
+        return
+    key_code = instance.key_code
+    if instance.is_active:
+        room_id = instance.room_id
+        room_number = instance.room.number
+        transaction.on_commit(lambda: key_index.add(key_code, room_id, room_number))
+    else:
+        transaction.on_commit(lambda: key_index.remove(key_code))
+
+
+@receiver(post_delete, sender=RoomKey)
+def unindex_room_key(sender, instance, **kwargs):
+    key_code = instance.key_code
+    transaction.on_commit(lambda: key_index.remove(key_code))
+
+
+def _invalidate_occupancy_board(sender, raw=False, **kwargs):
+    """Drop the cached occupancy board when anything shown on it changes"""
+    if not raw:
+        transaction.on_commit(invalidate_occupancy_board)
+
+
+for model in (Room, Guest, Reservation, ReservationRoom, CheckIn, CheckOut, RoomKey, WorkOrder):
+    post_save.connect(_invalidate_occupancy_board, sender=model, dispatch_uid=f'occupancy-save-{model.__name__}')
+    post_delete.connect(_invalidate_occupancy_board, sender=model, dispatch_uid=f'occupancy-delete-{model.__name__}')
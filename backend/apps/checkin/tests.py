@@ -1,4 +1,6 @@
-from django.test import TestCase
+import json
+import time
+from django.test import TestCase, RequestFactory, override_settings
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from datetime import date, datetime, timedelta
@@ -6,6 +8,10 @@ from apps.guests.models import Guest
 from apps.rooms.models import RoomType, Room
 from apps.reservations.models import Reservation, ReservationRoom
 from .models import CheckIn, CheckOut, RoomKey
+from .batch import BatchError, batch_check_in, batch_check_out
+from .keyindex import key_index
+from .views import validate_key
+from .occupancy import build_occupancy_board, filter_board, get_occupancy_board, invalidate_occupancy_board
 
 
 class CheckInModelTest(TestCase):
@@ -292,3 +298,264 @@ class RoomKeyModelTest(TestCase):
         key.deactivate()
         self.assertFalse(key.is_active)
         self.assertIsNotNone(key.deactivated_at)
+
+
+class BatchCheckInTest(TestCase):
+    def setUp(self):
+        self.room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        self.reservations = self.create_group(120)
+
+    def create_group(self, size, offset=0):
+        reservations = []
+        for i in range(offset, offset + size):
+            guest = Guest.objects.create(
+                first_name=f'Tour{i}',
+                last_name='Member',
+                email=f'tour{i}@example.com'
+            )
+            room = Room.objects.create(number=f'{1000 + i}', room_type=self.room_type, floor=i % 5)
+            reservation = Reservation.objects.create(
+                guest=guest,
+                check_in_date=date.today(),
+                check_out_date=date.today() + timedelta(days=2),
+                status='CONFIRMED'
+            )
+            ReservationRoom.objects.create(reservation=reservation, room=room, rate=Decimal('100.00'))
+            reservations.append(reservation)
+        return reservations
+
+    def test_batch_check_in_group(self):
+        """Test a whole group is checked in with rooms occupied and keys issued"""
+        ids = [reservation.id for reservation in self.reservations]
+        checkins = batch_check_in(ids, number_of_keys=2, verified_by='Front Desk')
+
+        self.assertEqual(len(checkins), 120)
+        self.assertEqual(CheckIn.objects.filter(reservation_id__in=ids, verified_by='Front Desk').count(), 120)
+        self.assertEqual(Reservation.objects.filter(id__in=ids, status='CHECKED_IN').count(), 120)
+        self.assertEqual(Room.objects.filter(status='OCCUPIED').count(), 120)
+        self.assertEqual(RoomKey.objects.filter(is_active=True).count(), 240)
+        self.assertEqual(len(set(RoomKey.objects.values_list('key_code', flat=True))), 240)
+
+    def test_batch_check_in_query_count_does_not_grow_with_group_size(self):
+        """Test the number of queries is the same for 5 and 60 reservations"""
+        small_group = self.create_group(5, offset=500)
+        with self.assertNumQueries(10):
+            batch_check_in([reservation.id for reservation in small_group])
+        # 60 rows stay within one SQLite bulk insert batch
+        with self.assertNumQueries(10):
+            batch_check_in([reservation.id for reservation in self.reservations[:60]])
+
+    def test_batch_check_in_is_all_or_nothing(self):
+        """Test one invalid reservation rejects the whole batch"""
+        cancelled = self.reservations[-1]
+        cancelled.status = 'CANCELLED'
+        cancelled.save()
+
+        with self.assertRaises(BatchError) as context:
+            batch_check_in([reservation.id for reservation in self.reservations])
+        self.assertEqual(list(context.exception.errors), [cancelled.id])
+        self.assertFalse(CheckIn.objects.exists())
+        self.assertFalse(RoomKey.objects.exists())
+        self.assertFalse(Room.objects.filter(status='OCCUPIED').exists())
+
+    def test_batch_check_out_group(self):
+        """Test a whole group is checked out, keys deactivated and rooms sent to cleaning"""
+        ids = [reservation.id for reservation in self.reservations]
+        batch_check_in(ids)
+
+        checkouts = batch_check_out(ids, room_condition='NEEDS_CLEANING', processed_by='Front Desk')
+
+        self.assertEqual(len(checkouts), 120)
+        self.assertEqual(Reservation.objects.filter(id__in=ids, status='CHECKED_OUT').count(), 120)
+        self.assertEqual(Room.objects.filter(status='MAINTENANCE').count(), 120)
+        self.assertFalse(RoomKey.objects.filter(is_active=True).exists())
+        with self.assertRaises(BatchError):
+            batch_check_out(ids[:1])
+
+
+@override_settings(LOCK_CONTROLLER_TOKEN='lock-secret')
+class KeyValidationTest(TestCase):
+    def setUp(self):
+        room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        guest = Guest.objects.create(first_name='John', last_name='Doe', email='john@example.com')
+        self.room = Room.objects.create(number='301', room_type=room_type)
+        self.other_room = Room.objects.create(number='302', room_type=room_type)
+        reservation = Reservation.objects.create(
+            guest=guest,
+            check_in_date=date.today(),
+            check_out_date=date.today() + timedelta(days=1),
+            status='CONFIRMED'
+        )
+        self.checkin = CheckIn.objects.create(reservation=reservation, actual_check_in_time=datetime.now())
+        key_index.clear()
+        self.factory = RequestFactory()
+
+    def validate(self, key_code, room, token='lock-secret'):
+        request = self.factory.get(
+            '/api/locks/validate/', {'key_code': key_code, 'room': room},
+            HTTP_X_CONTROLLER_TOKEN=token
+        )
+        return validate_key(request)
+
+    def test_valid_key_for_its_room_only(self):
+        """Test an active key opens its own room by number or id"""
+        key = RoomKey.objects.create(check_in=self.checkin, room=self.room, key_code='K-301')
+        self.assertTrue(key_index.validate(key.key_code, '301'))
+        self.assertTrue(key_index.validate(key.key_code, room_id=self.room.id))
+        self.assertFalse(key_index.validate(key.key_code, '302'))
+        self.assertFalse(key_index.validate('UNKNOWN', '301'))
+
+    def test_room_id_is_not_taken_for_a_room_number(self):
+        """Test a key does not open the room whose number is its own room's id"""
+        collision = Room.objects.create(number=str(self.room.id), room_type=self.room.room_type)
+        RoomKey.objects.create(check_in=self.checkin, room=self.room, key_code='K-301')
+        self.assertFalse(key_index.validate('K-301', collision.number))
+        self.assertTrue(key_index.validate('K-301', room_id=self.room.id))
+        self.assertFalse(key_index.validate('K-301', room_id=collision.id))
+        self.assertEqual(json.loads(self.validate('K-301', collision.number).content), {'valid': False})
+        response = validate_key(self.factory.get(
+            '/api/locks/validate/', {'key_code': 'K-301', 'room_id': self.room.id}, HTTP_X_CONTROLLER_TOKEN='lock-secret'
+        ))
+        self.assertEqual(json.loads(response.content), {'valid': True})
+        response = validate_key(self.factory.get(
+            '/api/locks/validate/', {'key_code': 'K-301', 'room': '301', 'room_id': self.room.id},
+            HTTP_X_CONTROLLER_TOKEN='lock-secret'
+        ))
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_key_signals(self):
+        """Test issuing and deactivating keys updates a warmed index"""
+        key_index.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            key = RoomKey.objects.create(check_in=self.checkin, room=self.other_room, key_code='K-302')
+        self.assertTrue(key_index.validate('K-302', '302'))
+        with self.captureOnCommitCallbacks(execute=True):
+            key.deactivate()
+        self.assertFalse(key_index.validate('K-302', '302'))
+
+    def test_expired_index_is_reloaded_by_one_request(self):
+        """Test requests answer from the old keys while another one reloads them"""
+        RoomKey.objects.create(check_in=self.checkin, room=self.room, key_code='K-301')
+        key_index.warm()
+        with override_settings(ROOM_KEY_INDEX_TTL=0):
+            with key_index._reload_lock, self.assertNumQueries(0):
+                self.assertTrue(key_index.validate('K-301', '301'))
+            with self.assertNumQueries(1):
+                self.assertTrue(key_index.validate('K-301', '301'))
+
+    def test_endpoint_requires_controller_token(self):
+        """Test controllers must send the shared token"""
+        self.assertEqual(self.validate('K-301', '301', token='wrong').status_code, 403)
+        with override_settings(LOCK_CONTROLLER_TOKEN=None):
+            self.assertEqual(self.validate('K-301', '301').status_code, 503)
+
+    def test_endpoint_rejects_non_object_body(self):
+        """Test a JSON body that is not an object is a bad request"""
+        RoomKey.objects.create(check_in=self.checkin, room=self.room, key_code='K-301')
+
+        def post(body):
+            request = self.factory.post(
+                '/api/locks/validate/', body, content_type='application/json', HTTP_X_CONTROLLER_TOKEN='lock-secret'
+            )
+            return validate_key(request)
+
+        self.assertEqual(post('["K-301", "301"]').status_code, 400)
+        self.assertEqual(post('"K-301"').status_code, 400)
+        self.assertEqual(post('{"key_code": "K-301", "room": "301"}').status_code, 200)
+
+    def test_endpoint_serves_thousands_of_validations_per_second(self):
+        """Test validations are answered from memory without queries"""
+        RoomKey.objects.bulk_create([
+            RoomKey(check_in=self.checkin, room=self.room, key_code=f'301-{i:06d}')
+            for i in range(2000)
+        ])
+        key_index.warm()
+        requests = [
+            self.factory.get('/api/locks/validate/', {'key_code': f'301-{i:06d}', 'room': '301'},
+                             HTTP_X_CONTROLLER_TOKEN='lock-secret')
+            for i in range(2000)
+        ]
+
+        with self.assertNumQueries(0):
+            started = time.perf_counter()
+            for i in range(20000):
+                response = validate_key(requests[i % len(requests)])
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.content, b'{"valid": true}')
+        self.assertGreater(20000 / elapsed, 5000)
+
+
+class OccupancyBoardTest(TestCase):
+    def setUp(self):
+        self.standard = RoomType.objects.create(name='Standard', base_price=Decimal('100.00'), max_occupancy=2)
+        self.suite = RoomType.objects.create(name='Suite', base_price=Decimal('250.00'), max_occupancy=4)
+        self.rooms = [
+            Room.objects.create(
+                number=f'{floor}{i:02d}', floor=floor,
+                room_type=self.suite if i == 0 else self.standard
+            )
+            for floor in (1, 2, 3) for i in range(10)
+        ]
+        self.guest = Guest.objects.create(first_name='Jane', last_name='Smith', email='jane@example.com')
+        invalidate_occupancy_board()
+
+    def check_in(self, room, keys=1):
+        reservation = Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=date.today(),
+            check_out_date=date.today() + timedelta(days=3),
+            status='CONFIRMED'
+        )
+        ReservationRoom.objects.create(reservation=reservation, room=room, rate=Decimal('100.00'))
+        return CheckIn.objects.create(
+            reservation=reservation, actual_check_in_time=datetime.now(), number_of_keys=keys
+        )
+
+    def test_board_lists_every_room_with_stay_and_keys(self):
+        """Test the board shows the current stay and active key count per room"""
+        self.check_in(self.rooms[0], keys=2)
+        rooms = {room['room_number']: room for room in build_occupancy_board()['rooms']}
+
+        self.assertEqual(len(rooms), 30)
+        self.assertTrue(rooms['100']['occupied'])
+        self.assertEqual(rooms['100']['active_keys'], 2)
+        self.assertEqual(rooms['100']['stay']['guest']['name'], 'Jane Smith')
+        self.assertEqual(rooms['100']['stay']['nights'], 3)
+        self.assertFalse(rooms['101']['occupied'])
+        self.assertIsNone(rooms['101']['stay'])
+
+    def test_board_uses_constant_queries(self):
+        """Test the board is built from four queries however many rooms are occupied"""
+        for room in self.rooms[:12]:
+            self.check_in(room, keys=2)
+        with self.assertNumQueries(4):
+            build_occupancy_board()
+
+    def test_board_is_cached_until_a_change(self):
+        """Test the cached board is reused and dropped after a check-in"""
+        self.assertFalse(get_occupancy_board()['rooms'][0]['occupied'])
+        with self.assertNumQueries(0):
+            get_occupancy_board()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.check_in(self.rooms[0])
+        self.assertTrue(get_occupancy_board()['rooms'][0]['occupied'])
+
+    def test_filter_by_floor_and_type(self):
+        """Test the board can be narrowed to a floor and room type"""
+        rooms = build_occupancy_board()['rooms']
+        self.assertEqual(len(filter_board(rooms, floor=2)), 10)
+        self.assertEqual(len(filter_board(rooms, room_type='suite')), 3)
+        self.assertEqual(
+            [room['room_number'] for room in filter_board(rooms, floor=2, room_type=self.suite.id)],
+            ['200']
+        )
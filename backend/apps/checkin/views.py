@@ -7,20 +7,32 @@ from django.db.models import Q, Count, Avg, F
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
+import hmac
+import json
 
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from apps.guests.preferences import GuestPreferenceFilter
+from apps.guests.search import GuestSearchFilter
+from .keyindex import key_index
+from .occupancy import filter_board, get_occupancy_board, summarize
 from .models import CheckIn, RoomKey
 from .serializers import (
     CheckInSerializer, CheckInListSerializer, CheckInCreateSerializer,
     CheckOutSerializer, RoomKeySerializer, RoomKeyCreateSerializer,
-    CheckInStatsSerializer, GuestStayHistorySerializer, RoomOccupancySerializer
+    CheckInStatsSerializer, GuestStayHistorySerializer, RoomOccupancySerializer,
+    BatchCheckInSerializer, BatchCheckOutSerializer
 )
+from .batch import BatchError, batch_check_in, batch_check_out
 
 
 class CheckInViewSet(viewsets.ModelViewSet):
     """ViewSet for managing check-ins"""
     queryset = CheckIn.objects.select_related('reservation__guest').order_by('-created_at')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, GuestSearchFilter, GuestPreferenceFilter]
     filterset_fields = ['reservation', 'early_checkout', 'late_checkout']
     search_fields = [
         'reservation__reservation_number', 
@@ -28,6 +40,9 @@ class CheckInViewSet(viewsets.ModelViewSet):
         'reservation__guest__last_name',
         'reservation__guest__email'
     ]
+    guest_search_field = 'reservation__guest'
+    guest_preference_path = 'reservation__guest'
+    search_exact_fields = ['reservation__reservation_number']
     ordering = ['-created_at']
 
     def get_serializer_class(self):
@@ -204,45 +219,100 @@ class CheckInViewSet(viewsets.ModelViewSet):
             'checkin': CheckInSerializer(checkin).data
         })
 
+    @action(detail=False, methods=['post'])
+    def batch_check_in(self, request):
+        """Check in a group of reservations in one transaction"""
+        serializer = BatchCheckInSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            checkins = batch_check_in(
+                data['reservations'],
+                number_of_keys=data['number_of_keys'],
+                key_type=data['key_type'],
+                verified_by=data.get('verified_by') or request.user.get_username()
+            )
+        except BatchError as e:
+            return Response({
+                'error': str(e),
+                'errors': e.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f'{len(checkins)} reservations checked in',
+            'total_checked_in': len(checkins),
+            'checkins': [
+                {
+                    'checkin_id': checkin.id,
+                    'reservation': checkin.reservation_id,
+                    'reservation_number': checkin.reservation.reservation_number,
+                    'check_in_time': checkin.actual_check_in_time,
+                    'number_of_keys': checkin.number_of_keys
+                }
+                for checkin in checkins
+            ]
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def batch_check_out(self, request):
+        """Check out a group of reservations in one transaction"""
+        serializer = BatchCheckOutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            checkouts = batch_check_out(
+                data['reservations'],
+                room_condition=data['room_condition'],
+                payment_status=data['payment_status'],
+                processed_by=data.get('processed_by') or request.user.get_username()
+            )
+        except BatchError as e:
+            return Response({
+                'error': str(e),
+                'errors': e.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f'{len(checkouts)} reservations checked out',
+            'total_checked_out': len(checkouts),
+            'checkouts': [
+                {
+                    'checkout_id': checkout.id,
+                    'checkin_id': checkout.check_in_id,
+                    'reservation': checkout.check_in.reservation_id,
+                    'check_out_time': checkout.actual_check_out_time,
+                    'room_condition': checkout.room_condition
+                }
+                for checkout in checkouts
+            ]
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def room_occupancy(self, request):
-        """Get current room occupancy status"""
-        current_checkins = self.get_queryset().filter(check_out_time__isnull=True)
-        
-        occupancy_data = []
-        for checkin in current_checkins:
-            for room_reservation in checkin.reservation.rooms.all():
-                room = room_reservation.room
-                
-                # Get active key status
-                active_keys = RoomKey.objects.filter(room=room, status='ACTIVE')
-                key_status = f"{active_keys.count()} keys active" if active_keys.exists() else "No active keys"
-                
-                occupancy_data.append({
-                    'room_id': room.id,
-                    'room_number': room.number,
-                    'room_type': room.room_type.name,
-                    'floor': room.floor,
-                    'current_status': room.status,
-                    'guest_name': checkin.reservation.guest.full_name,
-                    'check_in_time': checkin.check_in_time,
-                    'expected_checkout': checkin.reservation.check_out_date,
-                    'nights_staying': checkin.reservation.nights,
-                    'key_status': key_status
-                })
-        
-        # Calculate occupancy statistics
-        from apps.rooms.models import Room
-        total_rooms = Room.objects.filter(is_active=True).count()
-        occupied_rooms = len(occupancy_data)
-        occupancy_rate = (occupied_rooms / total_rooms) * 100 if total_rooms > 0 else 0
+        """Get the occupancy board: every room with its current stay and active keys"""
+        floor = request.query_params.get('floor')
+        if floor is not None:
+            try:
+                floor = int(floor)
+            except ValueError:
+                return Response({'error': 'floor must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        board = get_occupancy_board()
+        rooms = filter_board(
+            board['rooms'],
+            floor=floor,
+            room_type=request.query_params.get('room_type'),
+            status=request.query_params.get('status')
+        )
         
         return Response({
-            'total_rooms': total_rooms,
-            'occupied_rooms': occupied_rooms,
-            'available_rooms': total_rooms - occupied_rooms,
-            'occupancy_rate': round(occupancy_rate, 1),
-            'room_occupancy': occupancy_data
+            **summarize(rooms),
+            'generated_at': board['generated_at'],
+            'room_occupancy': rooms
         })
 
     @action(detail=False, methods=['get'])
@@ -505,3 +575,47 @@ class RoomKeyViewSet(viewsets.ModelViewSet):
         }
         
         return Response(statistics)
+
+
+@csrf_exempt
+def validate_key(request):
+    """Answer whether a key opens a room, for door-lock and elevator controllers.
+
+    Takes ``key_code`` and either ``room`` (the room number) or ``room_id`` as
+    query parameters or a JSON body and authenticates controllers with the shared
+    ``LOCK_CONTROLLER_TOKEN`` in the ``X-Controller-Token`` header. Answers
+    come from the in-memory key index, without ORM or serializer work.
+    """
+    expected_token = getattr(settings, 'LOCK_CONTROLLER_TOKEN', None)
+    if not expected_token:
+        return JsonResponse({'error': 'Lock controller token is not configured'}, status=503)
+    token = request.headers.get('X-Controller-Token', '')
+    if not hmac.compare_digest(token.encode(), expected_token.encode()):
+        return JsonResponse({'error': 'Invalid controller token'}, status=403)
+
+    if request.method == 'GET':
+        params = request.GET
+    elif request.method == 'POST':
+        if request.content_type == 'application/json':
+            try:
+                params = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+            if not isinstance(params, dict):
+                return JsonResponse({'error': 'JSON body must be an object'}, status=400)
+        else:
+            params = request.POST
+    else:
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    key_code = params.get('key_code')
+    room = params.get('room')
+    room_id = params.get('room_id')
+    if room in (None, ''):
+        room = None
+    if room_id in (None, ''):
+        room_id = None
+    if not key_code or (room is None) == (room_id is None):
+        return JsonResponse({'error': 'key_code and one of room or room_id are required'}, status=400)
+
+    return JsonResponse({'valid': key_index.validate(key_code, room_number=room, room_id=room_id)})
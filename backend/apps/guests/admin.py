@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count, Sum
 from django.urls import reverse
-from .models import Guest, GuestDocument
+from .loyalty import adjust_points
+from .models import Guest, GuestDocument, GuestStats, LoyaltyTransaction, DuplicateCandidate
 
 
 class GuestDocumentInline(admin.TabularInline):
@@ -47,17 +47,17 @@ class GuestAdmin(admin.ModelAdmin):
     inlines = [GuestDocumentInline]
     actions = ['add_loyalty_points', 'reset_loyalty_points', 'mark_as_vip']
     
+    list_select_related = ('stats',)
+
     def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        # Annotate with reservation statistics
-        queryset = queryset.annotate(
-            _total_visits=Count('reservations', distinct=True),
-            _total_spent=Sum('reservations__bill__total_amount')
-        ).select_related()
-        return queryset
+        # Lifetime statistics are stored per guest, no per-row aggregates
+        return super().get_queryset(request).select_related('stats')
+    
+    def _stats(self, obj):
+        return getattr(obj, 'stats', None) or GuestStats(guest=obj)
     
     def total_visits(self, obj):
-        count = getattr(obj, '_total_visits', 0)
+        count = self._stats(obj).total_stays
         if count > 0:
             try:
                 url = reverse('admin:reservations_reservation_changelist')
@@ -70,34 +70,36 @@ class GuestAdmin(admin.ModelAdmin):
             except (ValueError, TypeError, AttributeError):
                 return f'{count} visits'
         return '0 visits'
-    total_visits.admin_order_field = '_total_visits'
+    total_visits.admin_order_field = 'stats__total_stays'
     total_visits.short_description = 'Total Visits'
     
     def total_spent(self, obj):
-        amount = getattr(obj, '_total_spent', None)
-        if amount is not None and amount > 0:
+        amount = self._stats(obj).total_spent
+        if amount > 0:
             try:
-                return format_html('<strong>${:,.2f}</strong>', float(amount))
+                return format_html('<strong>${}</strong>', f'{float(amount):,.2f}')
             except (ValueError, TypeError):
                 return '$0.00'
         return '$0.00'
-    total_spent.admin_order_field = '_total_spent'
+    total_spent.admin_order_field = 'stats__total_spent'
     total_spent.short_description = 'Total Spent'
     
     def last_visit(self, obj):
-        last_reservation = obj.reservations.order_by('-check_in_date').first()
-        if last_reservation:
+        last_stay = self._stats(obj).last_stay_date
+        if last_stay:
+            date_str = last_stay.strftime('%Y-%m-%d')
             try:
-                url = reverse('admin:reservations_reservation_change', args=[last_reservation.id])
-                date_str = last_reservation.check_in_date.strftime('%Y-%m-%d')
+                url = reverse('admin:reservations_reservation_changelist')
                 return format_html(
-                    '<a href="{}">{}</a>',
+                    '<a href="{}?guest={}">{}</a>',
                     str(url),
-                    str(date_str)
+                    obj.id,
+                    date_str
                 )
             except (ValueError, TypeError, AttributeError):
-                return str(last_reservation.check_in_date.strftime('%Y-%m-%d'))
+                return date_str
         return 'Never'
+    last_visit.admin_order_field = 'stats__last_stay_date'
     last_visit.short_description = 'Last Visit'
     
     def loyalty_level(self, obj):
@@ -126,8 +128,9 @@ class GuestAdmin(admin.ModelAdmin):
     
     def is_vip(self, obj):
         # VIP if they have >= 5 visits or spent >= $5000 or loyalty points >= 500
-        visits = getattr(obj, '_total_visits', 0)
-        spent = getattr(obj, '_total_spent', 0) or 0
+        stats = self._stats(obj)
+        visits = stats.total_stays
+        spent = stats.total_spent
         
         if visits >= 5 or spent >= 5000 or obj.loyalty_points >= 500:
             try:
@@ -139,25 +142,37 @@ class GuestAdmin(admin.ModelAdmin):
     
     def add_loyalty_points(self, request, queryset):
         for guest in queryset:
-            guest.loyalty_points += 50
-            guest.save()
+            adjust_points(guest, 50, 'Bonus points added in admin')
         self.message_user(request, f'Added 50 loyalty points to {queryset.count()} guests.')
     add_loyalty_points.short_description = 'Add 50 loyalty points'
     
     def reset_loyalty_points(self, request, queryset):
-        queryset.update(loyalty_points=0)
+        for guest in queryset.filter(loyalty_points__gt=0):
+            adjust_points(guest, -guest.loyalty_points, 'Points reset in admin')
         self.message_user(request, f'Reset loyalty points for {queryset.count()} guests.')
     reset_loyalty_points.short_description = 'Reset loyalty points'
     
     def mark_as_vip(self, request, queryset):
-        for guest in queryset:
-            if guest.loyalty_points < 500:
-                guest.loyalty_points = 500
-                guest.save()
+        for guest in queryset.filter(loyalty_points__lt=500):
+            adjust_points(guest, 500 - guest.loyalty_points, 'Raised to VIP in admin')
         self.message_user(request, f'Marked {queryset.count()} guests as VIP.')
     mark_as_vip.short_description = 'Mark as VIP (set 500+ points)'
 
 
+@admin.register(LoyaltyTransaction)
+class LoyaltyTransactionAdmin(admin.ModelAdmin):
+    list_display = ('guest', 'transaction_type', 'points', 'remaining', 'expires_at', 'reservation', 'created_at')
+    list_filter = ('transaction_type', 'expires_at', 'created_at')
+    search_fields = ('guest__first_name', 'guest__last_name', 'guest__email', 'description')
+    list_select_related = ('guest', 'reservation')
+    raw_id_fields = ('guest', 'reservation')
+    readonly_fields = [field.name for field in LoyaltyTransaction._meta.fields]
+
+    def has_add_permission(self, request):
+        # Entries are only written through the ledger so balances stay in sync
+        return False
+
+
 @admin.register(GuestDocument)
 class GuestDocumentAdmin(admin.ModelAdmin):
     list_display = ('guest', 'document_type', 'document_number', 'issue_date', 'expiry_date', 'is_expired', 'created_at')
@@ -197,3 +212,20 @@ class GuestDocumentAdmin(admin.ModelAdmin):
                     return '✅ Valid'
             return 'Unknown'
     is_expired.short_description = 'Status'
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ('guest', 'duplicate', 'score', 'reasons', 'status', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('guest__first_name', 'guest__last_name', 'duplicate__first_name', 'duplicate__last_name')
+    readonly_fields = ('guest', 'duplicate', 'score', 'reasons', 'created_at', 'updated_at')
+    actions = ['dismiss_candidates']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('guest', 'duplicate')
+    
+    def dismiss_candidates(self, request, queryset):
+        updated = queryset.filter(status='PENDING').update(status='DISMISSED')
+        self.message_user(request, f'{updated} duplicate candidates dismissed.')
+    dismiss_candidates.short_description = 'Dismiss selected candidates'
@@ -0,0 +1,338 @@
+"""
+Guest duplicate detection and merging.
+
+Comparing every guest with every other one is quadratic, so candidates are
+found by blocking: each guest gets a few blocking keys (normalized phone
+number, document number, normalized email and a phonetic name key) and
+only guests sharing a key are compared. Keys are hashed into 64-bit
+integers together with the guest id and sorted in a compact array, so
+millions of guests fit in memory and grouping is one linear scan. Blocks
+larger than ``MAX_BLOCK_SIZE`` (a shared company phone number, a very
+common name) carry no useful signal and are skipped.
+
+Candidate pairs are scored from the evidence they share and saved as
+``DuplicateCandidate`` rows for review. ``merge_guests`` folds duplicates
+into one guest: related records are re-pointed in bulk, loyalty points
+are summed and the duplicates are kept inactive with ``merged_into`` set.
+"""
+import re
+from array import array
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DuplicateCandidate, Guest, GuestDocument
+from .search import normalize_name, normalize_phone, similarity, unindex_guests
+from .stats import refresh_guest_stats
+
+
+# Guests sharing a key with more guests than this are not compared
+MAX_BLOCK_SIZE = 50
+
+# Least score for a pair to be saved as a duplicate candidate
+MIN_SCORE = 0.5
+
+# Evidence weights, summed and capped at 1
+DOCUMENT_WEIGHT = 0.6
+EMAIL_WEIGHT = 0.5
+PHONE_WEIGHT = 0.4
+NAME_WEIGHT = 0.4
+BIRTH_DATE_WEIGHT = 0.2
+BIRTH_DATE_CONFLICT = -0.4
+
+# Sort keys pack a hashed blocking key above the guest id
+ID_BITS = 28
+KEY_MASK = (1 << (63 - ID_BITS)) - 1
+
+CHUNK_SIZE = 10000
+
+# Fields copied from a duplicate when the kept guest has no value
+FILLABLE_FIELDS = [
+    'phone', 'date_of_birth', 'gender', 'nationality', 'address', 'postal_code', 'city', 'country'
+]
+
+# Relations to Guest that merging handles itself instead of re-pointing
+MERGE_SKIP_RELATIONS = {'documents', 'merged_guests', 'duplicate_candidates'}
+
+
+def name_key(first_name, last_name):
+    """Phonetic key of a name: consonant skeletons of its words, in any order.
+
+    Spelling variants are folded first, then vowels and the weak letters h,
+    w and y are dropped after the first letter, so Muhammad / Mohamad and
+    Santoso / Santosa share a key.
+    """
+    skeletons = []
+    for word in normalize_name(f'{first_name} {last_name}').split():
+        if len(word) < 2 or word.isdigit():
+            continue
+        skeletons.append(word[0] + re.sub(r'[aeiouhwy]', '', word[1:]))
+    return ' '.join(sorted(skeletons))
+
+
+def email_key(email):
+    """Normalize an email so gmail-style dots and +tags do not hide a duplicate"""
+    local, _, domain = (email or '').lower().partition('@')
+    local = local.split('+', 1)[0].replace('.', '')
+    return f'{local}@{domain}' if local and domain else ''
+
+
+def document_key(document_number):
+    return re.sub(r'[^0-9A-Z]', '', (document_number or '').upper())
+
+
+def blocking_keys(first_name, last_name, email, phone):
+    """Get the blocking keys of a guest, without documents"""
+    keys = []
+    phone = normalize_phone(phone)
+    if len(phone) >= 8:
+        keys.append(f'phone:{phone}')
+    email = email_key(email)
+    if email:
+        keys.append(f'email:{email}')
+    name = name_key(first_name, last_name)
+    if name:
+        keys.append(f'name:{name}')
+    return keys
+
+
+def _pack(key, guest_id):
+    if guest_id >> ID_BITS:
+        raise ValueError(f'Guest id {guest_id} does not fit in {ID_BITS} bits')
+    return ((hash(key) & KEY_MASK) << ID_BITS) | guest_id
+
+
+def candidate_pairs(max_block_size=MAX_BLOCK_SIZE):
+    """Find pairs of active guests sharing a blocking key.
+
+    Returns ``(pairs, stats)`` where pairs is a set of ``(low_id, high_id)``.
+    """
+    entries = array('q')
+    guests = Guest.objects.filter(is_active=True).values_list(
+        'id', 'first_name', 'last_name', 'email', 'phone'
+    )
+    guest_count = 0
+    for guest_id, first_name, last_name, email, phone in guests.iterator(chunk_size=CHUNK_SIZE):
+        guest_count += 1
+        for key in blocking_keys(first_name, last_name, email, phone):
+            entries.append(_pack(key, guest_id))
+
+    documents = GuestDocument.objects.filter(guest__is_active=True).values_list('guest_id', 'document_number')
+    for guest_id, number in documents.iterator(chunk_size=CHUNK_SIZE):
+        number = document_key(number)
+        if len(number) >= 5:
+            entries.append(_pack(f'document:{number}', guest_id))
+
+    entries = sorted(entries)
+
+    pairs = set()
+    skipped_blocks = 0
+    mask = (1 << ID_BITS) - 1
+    start = 0
+    while start < len(entries):
+        key = entries[start] >> ID_BITS
+        end = start + 1
+        while end < len(entries) and entries[end] >> ID_BITS == key:
+            end += 1
+        if end - start > 1:
+            if end - start > max_block_size:
+                skipped_blocks += 1
+            else:
+                ids = sorted({entry & mask for entry in entries[start:end]})
+                pairs.update(combinations(ids, 2))
+        start = end
+
+    return pairs, {'guests': guest_count, 'keys': len(entries), 'skipped_blocks': skipped_blocks}
+
+
+def _load_profiles(guest_ids):
+    """Load what scoring compares for a set of guests"""
+    profiles = {}
+    guest_ids = list(guest_ids)
+    for i in range(0, len(guest_ids), CHUNK_SIZE):
+        chunk = guest_ids[i:i + CHUNK_SIZE]
+        for guest_id, first_name, last_name, email, phone, date_of_birth in Guest.objects.filter(
+            id__in=chunk
+        ).values_list('id', 'first_name', 'last_name', 'email', 'phone', 'date_of_birth'):
+            profiles[guest_id] = {
+                'name': normalize_name(f'{first_name} {last_name}').strip(),
+                'email': email_key(email),
+                'phone': normalize_phone(phone),
+                'date_of_birth': date_of_birth,
+                'documents': set(),
+            }
+        for guest_id, number in GuestDocument.objects.filter(guest_id__in=chunk).values_list(
+            'guest_id', 'document_number'
+        ):
+            profiles[guest_id]['documents'].add(document_key(number))
+    return profiles
+
+
+def score_pair(a, b):
+    """Score two guest profiles, returning ``(score, reasons)``"""
+    score = 0.0
+    reasons = []
+    if a['documents'] & b['documents']:
+        score += DOCUMENT_WEIGHT
+        reasons.append('document')
+    if a['email'] and a['email'] == b['email']:
+        score += EMAIL_WEIGHT
+        reasons.append('email')
+    if len(a['phone']) >= 8 and a['phone'] == b['phone']:
+        score += PHONE_WEIGHT
+        reasons.append('phone')
+    name_similarity = similarity(a['name'], b['name'])
+    if name_similarity >= 0.5:
+        score += NAME_WEIGHT * name_similarity
+        reasons.append('name')
+    if a['date_of_birth'] and b['date_of_birth']:
+        if a['date_of_birth'] == b['date_of_birth']:
+            score += BIRTH_DATE_WEIGHT
+            reasons.append('date_of_birth')
+        else:
+            score += BIRTH_DATE_CONFLICT
+    return round(max(0.0, min(score, 1.0)), 3), reasons
+
+
+def find_duplicates(min_score=MIN_SCORE, max_block_size=MAX_BLOCK_SIZE):
+    """Find and save duplicate candidates among active guests.
+
+    Rescoring keeps the review status of pairs seen in an earlier run, so a
+    dismissed pair stays dismissed.
+    """
+    pairs, stats = candidate_pairs(max_block_size)
+    profiles = _load_profiles({guest_id for pair in pairs for guest_id in pair})
+
+    candidates = []
+    for guest_id, duplicate_id in pairs:
+        score, reasons = score_pair(profiles[guest_id], profiles[duplicate_id])
+        if score >= min_score:
+            candidates.append(DuplicateCandidate(
+                guest_id=guest_id, duplicate_id=duplicate_id, score=score, reasons=reasons
+            ))
+
+    DuplicateCandidate.objects.bulk_create(
+        candidates,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['guest', 'duplicate'],
+        update_fields=['score', 'reasons', 'updated_at']
+    )
+    stats.update({'pairs_compared': len(pairs), 'candidates': len(candidates)})
+    return stats
+
+
+def _merge_documents(primary, duplicate_ids):
+    """Move documents to the kept guest, one per document type.
+
+    Documents superseded by one the kept guest has stay with their merged
+    guest, which points at the kept guest, so no document is lost and a
+    merge can still be traced back.
+    """
+    documents = list(
+        GuestDocument.objects.filter(guest_id__in=[primary.id, *duplicate_ids]).order_by('-updated_at')
+    )
+    kept = {}
+    for document in documents:
+        if document.guest_id == primary.id:
+            kept[document.document_type] = document
+    for document in documents:
+        kept.setdefault(document.document_type, document)
+
+    keep_ids = {document.id for document in kept.values()}
+    return GuestDocument.objects.filter(id__in=keep_ids).exclude(guest=primary).update(guest=primary)
+
+
+@transaction.atomic
+def merge_guests(primary, duplicates):
+    """Merge duplicate guests into a primary guest.
+
+    Reservations and every other record pointing at a duplicate are moved in
+    one update per relation, documents are moved unless the primary already
+    has one of that type (those stay with their merged guest), loyalty
+    points are summed and empty profile fields are filled from the
+    duplicates. Duplicates are deactivated and
+    point at the primary through ``merged_into``, and the stay statistics
+    of every guest involved are recomputed.
+    """
+    duplicates = [guest for guest in duplicates if guest.pk != primary.pk]
+    duplicate_ids = [guest.pk for guest in duplicates]
+    if not duplicate_ids:
+        return {'merged': 0}
+
+    # Points are read from the locked rows, so none accrued meanwhile are
+    # lost when the duplicates are zeroed
+    points = sum(Guest.objects.select_for_update().filter(pk__in=duplicate_ids).values_list(
+        'loyalty_points', flat=True
+    ))
+
+    moved = {}
+    for relation in Guest._meta.related_objects:
+        if not relation.one_to_many or relation.get_accessor_name() in MERGE_SKIP_RELATIONS:
+            continue
+        if relation.related_model is DuplicateCandidate:
+            continue
+        field = relation.field.name
+        count = relation.related_model._base_manager.filter(
+            **{f'{field}__in': duplicate_ids}
+        ).update(**{field: primary})
+        if count:
+            moved[relation.get_accessor_name()] = count
+    moved['documents'] = _merge_documents(primary, duplicate_ids)
+
+    update_fields = ['updated_at']
+    for field in FILLABLE_FIELDS:
+        if getattr(primary, field) in (None, ''):
+            value = next((getattr(guest, field) for guest in duplicates if getattr(guest, field) not in (None, '')), None)
+            if value is not None:
+                setattr(primary, field, value)
+                update_fields.append(field)
+    preferences = {}
+    for guest in reversed(duplicates):
+        preferences.update(guest.preferences or {})
+    preferences.update(primary.preferences or {})
+    if preferences != primary.preferences:
+        primary.preferences = preferences
+        update_fields.append('preferences')
+    if any(guest.is_vip for guest in duplicates) and not primary.is_vip:
+        primary.is_vip = True
+        update_fields.append('is_vip')
+    note = f"Merged guests {', '.join(f'#{guest_id}' for guest_id in duplicate_ids)} on {timezone.now().date()}"
+    primary.notes = f"{primary.notes}\n{note}" if primary.notes else note
+    update_fields.append('notes')
+    primary.save(update_fields=update_fields)
+
+    if points:
+        Guest.objects.filter(pk=primary.pk).update(loyalty_points=F('loyalty_points') + points)
+        primary.refresh_from_db(fields=['loyalty_points'])
+
+    Guest.objects.filter(pk__in=duplicate_ids).update(
+        merged_into=primary, is_active=False, loyalty_points=0, updated_at=timezone.now()
+    )
+    Guest.objects.filter(merged_into__in=duplicate_ids).update(merged_into=primary)
+    # Merged guests are found through the guest they were merged into
+    unindex_guests(duplicate_ids)
+
+    for stats in refresh_guest_stats([primary.pk, *duplicate_ids]):
+        if stats.guest_id == primary.pk:
+            primary.stats = stats
+
+    pairs = DuplicateCandidate.objects.filter(status='PENDING')
+    pairs.filter(guest=primary, duplicate__in=duplicate_ids).update(status='MERGED')
+    pairs.filter(duplicate=primary, guest__in=duplicate_ids).update(status='MERGED')
+    pairs.filter(guest__in=duplicate_ids, duplicate__in=duplicate_ids).update(status='MERGED')
+
+    return {'merged': len(duplicate_ids), 'loyalty_points_added': points, 'moved': moved}
+
+
+def merge_candidate(candidate, keep=None):
+    """Merge a candidate pair, keeping the older guest unless told otherwise"""
+    primary, duplicate = candidate.guest, candidate.duplicate
+    if keep is not None and keep == duplicate.pk:
+        primary, duplicate = duplicate, primary
+    result = merge_guests(primary, [duplicate])
+    DuplicateCandidate.objects.filter(pk=candidate.pk).update(status='MERGED')
+    return primary, result
+
@@ -0,0 +1,242 @@
+"""
+Loyalty points ledger.
+
+Every change to a guest's points balance is recorded as a
+``LoyaltyTransaction`` and applied to ``Guest.loyalty_points`` with an
+``F()`` expression in the same transaction, so concurrent earns and
+redemptions cannot overwrite each other the way a read-modify-write
+``save()`` did. Redemptions use a conditional ``UPDATE`` that only matches
+while the balance covers them.
+
+Earned entries keep the points not yet used in ``remaining``. Redemptions
+use up the oldest entries first and the expiry job sweeps entries past
+their expiry date through a partial index on unused entries, a batch at a
+time, so the work is proportional to what expires rather than to the size
+of the ledger. Accrual for checked-out stays is applied to a whole batch of
+reservations with one insert and one balance update, each guest's amount
+picked by a ``CASE`` on the guest id.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.reservations.models import Reservation
+from .models import Guest, LoyaltyTransaction
+
+
+# Loyalty tiers from the highest, with the points needed to reach them
+LOYALTY_TIERS = [
+    ('platinum', 1000),
+    ('gold', 500),
+    ('silver', 100),
+    ('bronze', 0),
+]
+
+
+class InsufficientPoints(Exception):
+    """Raised when a guest does not have enough points for a deduction"""
+
+    def __init__(self, balance, requested):
+        self.balance = balance
+        self.requested = requested
+        super().__init__(f'Balance of {balance} points does not cover {requested} points')
+
+
+def points_expiry_date(day=None):
+    """Get the date points earned on a day expire"""
+    return (day or date.today()) + timedelta(days=getattr(settings, 'LOYALTY_POINTS_EXPIRY_DAYS', 730))
+
+
+def _points_per_guest(points):
+    """Expression giving each guest's amount of a ``{guest_id: points}`` batch"""
+    # One branch per distinct amount keeps the expression small for large batches
+    guests_by_amount = defaultdict(list)
+    for guest_id, amount in points.items():
+        guests_by_amount[amount].append(guest_id)
+    return Case(
+        *[When(pk__in=guest_ids, then=Value(amount)) for amount, guest_ids in guests_by_amount.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def _credit(guest, points, transaction_type, description, reservation=None, expires_at=None):
+    with transaction.atomic():
+        entry = LoyaltyTransaction.objects.create(
+            guest_id=guest.pk,
+            transaction_type=transaction_type,
+            points=points,
+            remaining=points,
+            expires_at=expires_at,
+            reservation=reservation,
+            description=description
+        )
+        Guest.objects.filter(pk=guest.pk).update(
+            loyalty_points=F('loyalty_points') + points, updated_at=timezone.now()
+        )
+    guest.refresh_from_db(fields=['loyalty_points'])
+    return entry
+
+
+def _use_oldest_points(guest_id, points):
+    """Take points from the guest's oldest unused entries"""
+    entries = list(
+        LoyaltyTransaction.objects.select_for_update().filter(guest_id=guest_id, remaining__gt=0)
+        .order_by(F('expires_at').asc(nulls_last=True), 'id')
+        .only('id', 'remaining')
+    )
+    used = []
+    for entry in entries:
+        if points <= 0:
+            break
+        take = min(entry.remaining, points)
+        entry.remaining -= take
+        points -= take
+        used.append(entry)
+    # Balances from before the ledger have no entries to take points from
+    LoyaltyTransaction.objects.bulk_update(used, ['remaining'])
+
+
+def _debit(guest, points, transaction_type, description, reservation=None):
+    with transaction.atomic():
+        updated = Guest.objects.filter(pk=guest.pk, loyalty_points__gte=points).update(
+            loyalty_points=F('loyalty_points') - points, updated_at=timezone.now()
+        )
+        if not updated:
+            guest.refresh_from_db(fields=['loyalty_points'])
+            raise InsufficientPoints(guest.loyalty_points, points)
+        _use_oldest_points(guest.pk, points)
+        entry = LoyaltyTransaction.objects.create(
+            guest_id=guest.pk,
+            transaction_type=transaction_type,
+            points=-points,
+            reservation=reservation,
+            description=description
+        )
+    guest.refresh_from_db(fields=['loyalty_points'])
+    return entry
+
+
+def adjust_points(guest, points, description='Manual adjustment'):
+    """Add (positive) or remove (negative) points by hand"""
+    if points > 0:
+        return _credit(guest, points, 'ADJUST', description)
+    if points < 0:
+        return _debit(guest, -points, 'ADJUST', description)
+    return None
+
+
+def redeem_points(guest, points, description='', reservation=None):
+    """Redeem points, raising ``InsufficientPoints`` if the balance is too low"""
+    return _debit(guest, points, 'REDEEM', description, reservation=reservation)
+
+
+def accrue_points(reservation_ids):
+    """Award points for checked-out stays that have not earned yet"""
+    per_night = getattr(settings, 'LOYALTY_POINTS_PER_NIGHT', 10)
+    expires_at = points_expiry_date()
+    stays = Reservation.objects.filter(id__in=reservation_ids, status='CHECKED_OUT').exclude(
+        Exists(LoyaltyTransaction.objects.filter(reservation=OuterRef('pk'), transaction_type='EARN'))
+    ).order_by().values_list('id', 'guest_id', 'reservation_number', 'check_in_date', 'check_out_date')
+
+    entries = []
+    for reservation_id, guest_id, number, check_in, check_out in stays:
+        points = (check_out - check_in).days * per_night
+        if points > 0:
+            entries.append(LoyaltyTransaction(
+                guest_id=guest_id,
+                transaction_type='EARN',
+                points=points,
+                remaining=points,
+                expires_at=expires_at,
+                reservation_id=reservation_id,
+                description=f'Stay {number}'
+            ))
+    if not entries:
+        return {'reservations': 0, 'points': 0}
+
+    earned = defaultdict(int)
+    for entry in entries:
+        earned[entry.guest_id] += entry.points
+    with transaction.atomic():
+        LoyaltyTransaction.objects.bulk_create(entries)
+        Guest.objects.filter(pk__in=earned).update(
+            loyalty_points=F('loyalty_points') + _points_per_guest(earned), updated_at=timezone.now()
+        )
+    return {'reservations': len(entries), 'points': sum(entry.points for entry in entries)}
+
+
+def accrue_pending_points(since, batch_size=1000):
+    """Award points for every stay checked out since a date that has not earned yet"""
+    pending = Reservation.objects.filter(status='CHECKED_OUT', check_out_date__gte=since).exclude(
+        Exists(LoyaltyTransaction.objects.filter(reservation=OuterRef('pk'), transaction_type='EARN'))
+    ).order_by('id')
+    totals = {'reservations': 0, 'points': 0}
+    last_id = 0
+    while True:
+        ids = list(pending.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return totals
+        last_id = ids[-1]
+        result = accrue_points(ids)
+        totals['reservations'] += result['reservations']
+        totals['points'] += result['points']
+
+
+def expire_points(as_of=None, batch_size=1000):
+    """Expire unused points of entries past their expiry date"""
+    as_of = as_of or date.today()
+    due = LoyaltyTransaction.objects.filter(remaining__gt=0, expires_at__lte=as_of).order_by('expires_at', 'id')
+    totals = {'entries': 0, 'guests': 0, 'points': 0}
+    guests = set()
+    while True:
+        with transaction.atomic():
+            batch = list(due.select_for_update().values_list('id', 'guest_id', 'remaining')[:batch_size])
+            if not batch:
+                totals['guests'] = len(guests)
+                return totals
+            ids = [entry_id for entry_id, guest_id, remaining in batch]
+            expired = defaultdict(int)
+            for entry_id, guest_id, remaining in batch:
+                expired[guest_id] += remaining
+
+            Guest.objects.filter(pk__in=expired).update(
+                loyalty_points=Greatest(F('loyalty_points') - _points_per_guest(expired), Value(0)),
+                updated_at=timezone.now()
+            )
+            LoyaltyTransaction.objects.bulk_create([
+                LoyaltyTransaction(
+                    guest_id=guest_id,
+                    transaction_type='EXPIRE',
+                    points=-points,
+                    description=f'Points expired on {as_of}'
+                )
+                for guest_id, points in expired.items()
+            ])
+            LoyaltyTransaction.objects.filter(id__in=ids).update(remaining=0)
+
+        totals['entries'] += len(batch)
+        guests.update(expired)
+        totals['points'] += sum(expired.values())
+
+
+def tier_summary(guests):
+    """Count guests, VIPs and points per loyalty tier with one grouped query"""
+    tier = Case(
+        *[When(loyalty_points__gte=points, then=Value(name)) for name, points in LOYALTY_TIERS[:-1]],
+        default=Value(LOYALTY_TIERS[-1][0])
+    )
+    rows = guests.order_by().annotate(tier=tier).values('tier').annotate(
+        guests=Count('id'),
+        vip=Count('id', filter=Q(is_vip=True)),
+        points=Sum('loyalty_points')
+    )
+    tiers = {name: {'guests': 0, 'vip': 0, 'points': 0} for name, points in LOYALTY_TIERS}
+    for row in rows:
+        tiers[row['tier']] = {'guests': row['guests'], 'vip': row['vip'], 'points': row['points'] or 0}
+    return tiers
@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.guests.loyalty import accrue_pending_points
+
+
+class Command(BaseCommand):
+    help = 'Award loyalty points for recently checked-out stays that have not earned yet, e.g. in the night audit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Look back this many days of check-outs')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = date.today() - timedelta(days=options['days'])
+        result = accrue_pending_points(since, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['points']} points awarded for {result['reservations']} stays checked out since {since}"
+        ))
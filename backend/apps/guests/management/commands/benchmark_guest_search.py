@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.guests.models import Guest
+from apps.guests.search import rebuild_index, search_available, search_guest_ids
+
+
+FIRST_NAMES = [
+    'Budi', 'Sari', 'Andi', 'Dewi', 'Rina', 'Agus', 'Siti', 'Joko', 'Wahyu', 'Putri',
+    'Bambang', 'Ratna', 'Hendra', 'Yuni', 'Eko', 'Fitri', 'Rudi', 'Indah', 'Dedi', 'Lestari',
+    'Achmad', 'Muhammad', 'Nyoman', 'Wayan', 'Ketut', 'Made', 'Cahyono', 'Suharto', 'Syahrir', 'Kartika',
+]
+LAST_NAMES = [
+    'Santoso', 'Wijaya', 'Pratama', 'Saputra', 'Hidayat', 'Setiawan', 'Kusuma', 'Nugroho', 'Susanto', 'Gunawan',
+    'Hasanuddin', 'Siregar', 'Nasution', 'Harahap', 'Sitompul', 'Wibowo', 'Purnomo', 'Halim', 'Tanoto', 'Sugiarto',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure guest search and type-ahead latency, optionally seeding synthetic guests first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic guests to add before measuring')
+        parser.add_argument('--queries', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The guest search index is not available on this database')
+
+        if options['seed']:
+            self.seed(options['seed'])
+            started = time.perf_counter()
+            total = rebuild_index()
+            self.stdout.write(f'Indexed {total} guests in {time.perf_counter() - started:.1f}s')
+
+        rng = random.Random(7)
+        queries = []
+        for _ in range(options['queries']):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            queries.append(rng.choice([
+                first[:2], first[:4], f'{first} {last[:3]}', last, self.typo(rng, last), self.typo(rng, first),
+            ]))
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search_guest_ids(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        self.stdout.write(f'Guests: {Guest.objects.count()}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings)} searches: median {timings[len(timings) // 2]:.1f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95)]:.1f} ms, max {timings[-1]:.1f} ms'
+        ))
+
+    def typo(self, rng, word):
+        i = rng.randrange(1, len(word))
+        return word[:i] + rng.choice('aeiouknrst') + word[i + 1:]
+
+    def seed(self, count):
+        rng = random.Random(1)
+        start = Guest.objects.count()
+        batch = []
+        with transaction.atomic():
+            for i in range(start, start + count):
+                batch.append(Guest(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    email=f'benchmark.guest{i}@example.com',
+                    phone=f'+628{rng.randrange(10**9, 10**10)}'
+                ))
+                if len(batch) == 5000:
+                    Guest.objects.bulk_create(batch)
+                    batch = []
+            Guest.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {count} guests')
@@ -0,0 +1,23 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.guests.loyalty import expire_points
+
+
+class Command(BaseCommand):
+    help = 'Expire unused loyalty points past their expiry date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='Expire as of this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = expire_points(as_of=options['date'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['points']} points expired from {result['entries']} entries "
+            f"of {result['guests']} guests in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.guests.dedup import MAX_BLOCK_SIZE, MIN_SCORE, find_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Find likely duplicate guests and save them for review'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-score', type=float, default=MIN_SCORE)
+        parser.add_argument('--max-block-size', type=int, default=MAX_BLOCK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = find_duplicates(min_score=options['min_score'], max_block_size=options['max_block_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Guests scanned: {stats['guests']} ({stats['keys']} blocking keys)")
+        self.stdout.write(f"Pairs compared: {stats['pairs_compared']}, oversized blocks skipped: {stats['skipped_blocks']}")
+        self.stdout.write(self.style.SUCCESS(f"{stats['candidates']} duplicate candidates saved in {elapsed:.1f}s"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.guests.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Re-index every guest in the guest search index, e.g. after bulk imports'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The guest search index is not available on this database')
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'{total} guests indexed'))
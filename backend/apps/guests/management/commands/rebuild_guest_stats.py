@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.guests.segments import segment_guests
+from apps.guests.stats import rebuild_guest_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute lifetime stay statistics of every guest, e.g. after imports or data fixes'
+
+    def handle(self, *args, **options):
+        result = rebuild_guest_stats()
+        # Rebuilt rows start without RFM scores
+        segment_guests()
+        self.stdout.write(self.style.SUCCESS(
+            f"Statistics rebuilt for {result['guests']} guests, {result['with_stays']} with stays"
+        ))
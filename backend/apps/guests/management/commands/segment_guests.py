@@ -0,0 +1,24 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.guests.segments import segment_guests
+
+
+class Command(BaseCommand):
+    help = 'Score every guest on recency, frequency and monetary value and assign a segment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='Measure recency as of this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = segment_guests(as_of=options['date'])
+        elapsed = time.perf_counter() - started
+
+        for segment, count in sorted(result['segments'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'{segment}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['guests']} guests segmented ({result['unscored']} without stays) in {elapsed:.1f}s"
+        ))
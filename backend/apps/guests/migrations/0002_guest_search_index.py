@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from apps.guests.search import create_search_tables, rebuild_index
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        create_search_tables(cursor)
+    rebuild_index(guests=apps.get_model('guests', 'Guest').objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    from apps.guests.search import drop_search_tables
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        drop_search_tables(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
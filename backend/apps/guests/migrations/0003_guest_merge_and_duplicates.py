@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0002_guest_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guest',
+            name='merged_into',
+            field=models.ForeignKey(blank=True, help_text='Guest record this duplicate was merged into', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='merged_guests', to='guests.guest'),
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Likelihood both records are the same guest, from 0 to 1')),
+                ('reasons', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Review'), ('MERGED', 'Merged'), ('DISMISSED', 'Dismissed')], default='PENDING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='guests.guest')),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='guests.guest')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='guests_dupl_status_ad6e28_idx')],
+                'unique_together': {('guest', 'duplicate')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:12
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def populate_guest_stats(apps, schema_editor):
+    from apps.guests.stats import rebuild_guest_stats
+
+    rebuild_guest_stats()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0003_guest_merge_and_duplicates'),
+        ('payments', '0001_initial'),
+        ('reservations', '0003_groupblock_reservation_group_block_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestStats',
+            fields=[
+                ('guest', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='guests.guest')),
+                ('total_stays', models.PositiveIntegerField(default=0)),
+                ('total_nights', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('last_stay_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Guest Statistics',
+                'verbose_name_plural': 'Guest Statistics',
+                'indexes': [models.Index(fields=['-total_spent'], name='guests_gues_total_s_8fc084_idx'), models.Index(fields=['-last_stay_date'], name='guests_gues_last_st_08f440_idx')],
+            },
+        ),
+        migrations.RunPython(populate_guest_stats, migrations.RunPython.noop),
+    ]
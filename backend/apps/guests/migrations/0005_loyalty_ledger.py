@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    Guest = apps.get_model('guests', 'Guest')
+    LoyaltyTransaction = apps.get_model('guests', 'LoyaltyTransaction')
+
+    entries = []
+    for guest_id, points in Guest.objects.filter(loyalty_points__gt=0).values_list('id', 'loyalty_points').iterator():
+        entries.append(LoyaltyTransaction(
+            guest_id=guest_id, transaction_type='ADJUST', points=points, remaining=points,
+            description='Opening balance'
+        ))
+        if len(entries) >= 2000:
+            LoyaltyTransaction.objects.bulk_create(entries)
+            entries = []
+    LoyaltyTransaction.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0004_guest_stats'),
+        ('reservations', '0003_groupblock_reservation_group_block_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('EARN', 'Earned'), ('REDEEM', 'Redeemed'), ('EXPIRE', 'Expired'), ('ADJUST', 'Adjustment')], max_length=10)),
+                ('points', models.IntegerField(help_text='Points added (positive) or removed (negative)')),
+                ('remaining', models.PositiveIntegerField(default=0, help_text='Points of this entry not yet redeemed or expired')),
+                ('expires_at', models.DateField(blank=True, null=True)),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_transactions', to='guests.guest')),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_transactions', to='reservations.reservation')),
+            ],
+            options={
+                'verbose_name': 'Loyalty Transaction',
+                'verbose_name_plural': 'Loyalty Transactions',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['guest', '-created_at'], name='guests_loya_guest_i_4e8d14_idx'), models.Index(condition=models.Q(('remaining__gt', 0)), fields=['expires_at'], name='loyalty_unexpired_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('transaction_type', 'EARN')), fields=('reservation',), name='loyalty_one_earn_per_reservation')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
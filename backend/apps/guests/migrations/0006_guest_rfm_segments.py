@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0005_loyalty_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gueststats',
+            name='frequency_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gueststats',
+            name='monetary_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gueststats',
+            name='recency_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gueststats',
+            name='segment',
+            field=models.CharField(blank=True, choices=[('CHAMPIONS', 'Champions'), ('LOYAL', 'Loyal'), ('HIGH_VALUE_LAPSED', 'High-Value Lapsed'), ('AT_RISK', 'At Risk'), ('NEW', 'New'), ('PROMISING', 'Promising'), ('NEEDS_ATTENTION', 'Needs Attention'), ('HIBERNATING', 'Hibernating')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='gueststats',
+            name='segmented_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gueststats',
+            index=models.Index(fields=['segment'], name='guests_gues_segment_c5304b_idx'),
+        ),
+    ]
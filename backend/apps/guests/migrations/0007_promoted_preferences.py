@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:39
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0006_guest_rfm_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guest',
+            name='pref_bed',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('bed', 'preferences'), output_field=models.CharField(max_length=50)),
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='pref_floor',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('floor', 'preferences'), output_field=models.CharField(max_length=50)),
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='pref_smoking',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Case(models.When(models.Q(('preferences__smoking', True)), then=models.Value(True)), models.When(models.Q(('preferences__smoking', False)), then=models.Value(False)), output_field=models.BooleanField()), output_field=models.BooleanField()),
+        ),
+    ]
@@ -1,10 +1,29 @@
 from django.db import models
+from django.db.models.fields.json import KT
 from django.core.validators import EmailValidator
 from django.core.exceptions import ValidationError
 from datetime import date
+from decimal import Decimal
 import re
 
 
+def promoted_preference(key, output_field=None):
+    """Indexed column generated by the database from a ``preferences`` key"""
+    if isinstance(output_field, models.BooleanField):
+        # JSON true/false compare as booleans on every backend, a text cast does not
+        expression = models.Case(
+            models.When(models.Q(**{f'preferences__{key}': True}), then=models.Value(True)),
+            models.When(models.Q(**{f'preferences__{key}': False}), then=models.Value(False)),
+            output_field=output_field
+        )
+    else:
+        output_field = output_field or models.CharField(max_length=50)
+        expression = KT(f'preferences__{key}')
+    field = models.GeneratedField(expression=expression, output_field=output_field, db_persist=True, db_index=True)
+    field.preference_key = key
+    return field
+
+
 class Guest(models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
@@ -25,9 +44,17 @@ class Guest(models.Model):
     country = models.CharField(max_length=100, blank=True, null=True)
     loyalty_points = models.PositiveIntegerField(default=0)
     preferences = models.JSONField(default=dict, blank=True)
+    # Frequently filtered preference keys, kept in sync by the database
+    pref_floor = promoted_preference('floor')
+    pref_bed = promoted_preference('bed')
+    pref_smoking = promoted_preference('smoking', models.BooleanField())
     notes = models.TextField(blank=True, null=True)
     is_vip = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    merged_into = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='merged_guests',
+        help_text='Guest record this duplicate was merged into'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -51,18 +78,19 @@ class Guest(models.Model):
             if not re.match(phone_pattern, self.phone.replace(' ', '').replace('-', '')):
                 raise ValidationError('Invalid phone number format')
 
-    def add_loyalty_points(self, points):
+    def add_loyalty_points(self, points, description='Manual adjustment'):
         """Add loyalty points to guest account"""
-        self.loyalty_points += points
-        self.save(update_fields=['loyalty_points', 'updated_at'])
+        from .loyalty import adjust_points
+        adjust_points(self, points, description)
 
-    def deduct_loyalty_points(self, points):
+    def deduct_loyalty_points(self, points, description='Manual deduction'):
         """Deduct loyalty points from guest account"""
-        if self.loyalty_points >= points:
-            self.loyalty_points -= points
-            self.save(update_fields=['loyalty_points', 'updated_at'])
-            return True
-        return False
+        from .loyalty import InsufficientPoints, redeem_points
+        try:
+            redeem_points(self, points, description)
+        except InsufficientPoints:
+            return False
+        return True
 
     @property
     def age(self):
@@ -73,6 +101,17 @@ class Guest(models.Model):
         return None
 
 
+# Preference key -> generated column holding it
+PROMOTED_PREFERENCES = {
+    field.preference_key: field.name
+    for field in Guest._meta.local_fields if hasattr(field, 'preference_key')
+}
+BOOLEAN_PREFERENCES = {
+    field.name for field in Guest._meta.local_fields
+    if hasattr(field, 'preference_key') and isinstance(field.output_field, models.BooleanField)
+}
+
+
 class GuestDocument(models.Model):
     DOCUMENT_TYPE_CHOICES = [
         ('KTP', 'KTP (Indonesian ID)'),
@@ -106,3 +145,121 @@ class GuestDocument(models.Model):
         if self.expiry_date:
             return date.today() > self.expiry_date
         return False
+
+
+class GuestStats(models.Model):
+    """Lifetime stay statistics of a guest, kept up to date by signals"""
+    SEGMENT_CHOICES = [
+        ('CHAMPIONS', 'Champions'),
+        ('LOYAL', 'Loyal'),
+        ('HIGH_VALUE_LAPSED', 'High-Value Lapsed'),
+        ('AT_RISK', 'At Risk'),
+        ('NEW', 'New'),
+        ('PROMISING', 'Promising'),
+        ('NEEDS_ATTENTION', 'Needs Attention'),
+        ('HIBERNATING', 'Hibernating'),
+    ]
+
+    guest = models.OneToOneField(Guest, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_stays = models.PositiveIntegerField(default=0)
+    total_nights = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    last_stay_date = models.DateField(null=True, blank=True)
+    # RFM scores from 1 (lowest fifth of guests) to 5, set by segment_guests
+    recency_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    frequency_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    monetary_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    segment = models.CharField(max_length=20, choices=SEGMENT_CHOICES, blank=True)
+    segmented_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Guest Statistics'
+        verbose_name_plural = 'Guest Statistics'
+        indexes = [
+            models.Index(fields=['-total_spent']),
+            models.Index(fields=['-last_stay_date']),
+            models.Index(fields=['segment']),
+        ]
+
+    def __str__(self):
+        return f"{self.guest_id}: {self.total_stays} stays"
+
+    @property
+    def average_daily_rate(self):
+        """Average amount spent per night stayed"""
+        if not self.total_nights:
+            return Decimal('0.00')
+        return (self.total_spent / self.total_nights).quantize(Decimal('0.01'))
+
+
+class LoyaltyTransaction(models.Model):
+    """Entry of a guest's loyalty points ledger"""
+    TYPE_CHOICES = [
+        ('EARN', 'Earned'),
+        ('REDEEM', 'Redeemed'),
+        ('EXPIRE', 'Expired'),
+        ('ADJUST', 'Adjustment'),
+    ]
+
+    guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='loyalty_transactions')
+    transaction_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    points = models.IntegerField(help_text='Points added (positive) or removed (negative)')
+    remaining = models.PositiveIntegerField(
+        default=0, help_text='Points of this entry not yet redeemed or expired'
+    )
+    expires_at = models.DateField(null=True, blank=True)
+    reservation = models.ForeignKey(
+        'reservations.Reservation', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='loyalty_transactions'
+    )
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name = 'Loyalty Transaction'
+        verbose_name_plural = 'Loyalty Transactions'
+        indexes = [
+            models.Index(fields=['guest', '-created_at']),
+            # Only unused earned points are swept by the expiry job
+            models.Index(fields=['expires_at'], condition=models.Q(remaining__gt=0), name='loyalty_unexpired_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reservation'], condition=models.Q(transaction_type='EARN'),
+                name='loyalty_one_earn_per_reservation'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.guest_id} {self.get_transaction_type_display()} {self.points:+d}"
+
+
+class DuplicateCandidate(models.Model):
+    """Pair of guest records that probably belong to the same person"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending Review'),
+        ('MERGED', 'Merged'),
+        ('DISMISSED', 'Dismissed'),
+    ]
+
+    guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='duplicate_candidates')
+    duplicate = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text='Likelihood both records are the same guest, from 0 to 1')
+    reasons = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+        unique_together = ['guest', 'duplicate']
+        verbose_name = 'Duplicate Candidate'
+        verbose_name_plural = 'Duplicate Candidates'
+        indexes = [
+            models.Index(fields=['status', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.guest.full_name} / {self.duplicate.full_name} ({self.score:.2f})"
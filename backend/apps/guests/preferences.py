@@ -0,0 +1,57 @@
+"""
+Filtering on guest preferences.
+
+``Guest.preferences`` is free-form JSON, and filtering on a JSON path
+cannot use an index, so every such filter scans the guest table. Keys that
+room assignment and the front desk filter on often are promoted to
+generated columns with ``promoted_preference`` on the model; the database
+keeps them in sync with ``preferences`` on every write, including bulk
+updates, and indexes them.
+
+``GuestPreferenceFilter`` accepts ``pref_<key>=<value>`` query parameters
+and filters on the promoted column when there is one, falling back to the
+JSON path otherwise, so clients do not need to know which keys are
+promoted.
+"""
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+from .models import BOOLEAN_PREFERENCES, PROMOTED_PREFERENCES
+
+
+PREFERENCE_PARAM_PREFIX = 'pref_'
+
+
+def parse_preference_value(value):
+    """Read ``true``/``false`` as booleans, anything else as text"""
+    lowered = value.strip().lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    return value
+
+
+def preference_condition(key, value, guest_path=''):
+    """Condition matching guests whose preference ``key`` equals ``value``"""
+    prefix = f'{guest_path}__' if guest_path else ''
+    column = PROMOTED_PREFERENCES.get(key)
+    if column is not None:
+        if isinstance(value, bool) and column not in BOOLEAN_PREFERENCES:
+            value = str(value).lower()
+        return Q(**{f'{prefix}{column}': value})
+    return Q(**{f'{prefix}preferences__{key}': value})
+
+
+class GuestPreferenceFilter(BaseFilterBackend):
+    """Filter a list by ``pref_<key>`` query parameters.
+
+    Views set ``guest_preference_path`` to the path of the guest from their
+    model (``''`` for guests, ``'guest'`` for reservations).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        guest_path = getattr(view, 'guest_preference_path', '')
+        for param, value in request.query_params.items():
+            if param.startswith(PREFERENCE_PARAM_PREFIX) and value != '':
+                key = param[len(PREFERENCE_PARAM_PREFIX):]
+                queryset = queryset.filter(preference_condition(key, parse_preference_value(value), guest_path))
+        return queryset
@@ -0,0 +1,383 @@
+"""
+Full-text and fuzzy guest search.
+
+Guests are indexed in an SQLite FTS5 table with the trigram tokenizer, kept
+up to date from ``Guest`` saves and deletes. Names are indexed in a
+normalized form that folds common Indonesian spelling variants together
+(old ``Soeharto`` / ``Djoko`` / ``Tjahjono`` and new ``Suharto`` / ``Joko``
+/ ``Cahyono``), so either spelling finds the other.
+
+A search runs in up to two passes:
+
+* prefix: every term must start a word of the name, or appear in the email
+  or phone number. Name words are stored between spaces, so the trigram of
+  a space and the first characters anchors a term to the start of a word
+  and two letters are enough for type-ahead.
+* fuzzy: when the prefix pass finds too few guests, each term is corrected
+  against a second index of the distinct name words. Words sharing either
+  half of the term (one typo leaves at least one half intact) are ranked
+  by trigram similarity, and guests having one of the closest words are
+  fetched. There are far fewer distinct name words than guests, so this
+  stays fast however many guests share a name.
+
+Candidates are ranked in Python by how well the terms match the name
+words. Guest queries never ask FTS5 to rank, so a short prefix shared by
+many guests stops at the first matches instead of scoring all of them.
+On databases without FTS5 the search falls back to ``icontains`` lookups.
+"""
+import re
+import unicodedata
+
+from django.db import connection, connections, transaction
+from django.db.models import Case, Q, When
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Guest
+
+
+SEARCH_TABLE = 'guests_guest_search'
+WORD_TABLE = 'guests_guest_search_word'
+
+# Applied in order, so Tjahjono -> cahjono -> cahyono and Djoko -> joko -> yoko
+SPELLING_VARIANTS = [
+    ('oe', 'u'),   # Soekarno / Sukarno
+    ('dj', 'j'),   # Djoko / Joko
+    ('tj', 'c'),   # Tjahjono / Cahjono
+    ('sj', 'sy'),  # Sjahrir / Syahrir
+    ('nj', 'ny'),  # Njoman / Nyoman
+    ('ch', 'h'),   # Achmad / Ahmad
+    ('kh', 'h'),   # Akhmad / Ahmad
+    ('j', 'y'),    # Cahjono / Cahyono
+]
+
+# Candidates fetched per requested result before ranking
+CANDIDATE_FACTOR = 5
+
+# Least trigram similarity for a fuzzy match, as in pg_trgm
+FUZZY_THRESHOLD = 0.3
+
+# Closest name words a misspelled term is expanded to
+FUZZY_WORDS = 5
+
+# Aliases of databases known to have the search table
+_available = {}
+
+
+def normalize_name(value):
+    """Fold case, accents and spelling variants of a name into a search key"""
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode().lower()
+    value = re.sub(r'[^a-z0-9\s]', ' ', value)
+    for old, new in SPELLING_VARIANTS:
+        value = value.replace(old, new)
+    # Hasanuddin / Hasanudin, Muhammad / Muhamad
+    return re.sub(r'(.)\1+', r'\1', value)
+
+
+def name_words(value):
+    return normalize_name(value).split()
+
+
+def normalize_phone(value):
+    """Get the digits of a phone number in local form, +62 812 as 0812"""
+    digits = re.sub(r'[^0-9]', '', value or '')
+    if digits.startswith('62'):
+        digits = '0' + digits[2:]
+    return digits
+
+
+def _contact(guest_email, guest_phone):
+    return f"{(guest_email or '').lower()} {normalize_phone(guest_phone)}".strip()
+
+
+def _document(first_name, last_name, email, phone):
+    """Get the (name, contact) columns indexed for a guest"""
+    words = name_words(f'{first_name} {last_name}')
+    return f" {' '.join(words)} ", _contact(email, phone)
+
+
+def _quote(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def trigrams(word):
+    """Get the trigrams of a word padded with spaces on both sides"""
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Trigram similarity of two words between 0 and 1"""
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def search_available(using=None):
+    """Check the FTS5 search table exists on the database"""
+    db = connections[using or connection.alias]
+    if db.vendor != 'sqlite':
+        return False
+    if db.alias not in _available:
+        if SEARCH_TABLE not in db.introspection.table_names():
+            return False
+        _available[db.alias] = True
+    return True
+
+
+def create_search_tables(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(name, contact, tokenize='trigram')"
+    )
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {WORD_TABLE} USING fts5(word, tokenize='trigram')"
+    )
+
+
+def drop_search_tables(cursor):
+    cursor.execute(f'DROP TABLE IF EXISTS {WORD_TABLE}')
+    cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def index_guest(guest):
+    """Add or replace a guest in the search index"""
+    if not search_available():
+        return
+    name, contact = _document(guest.first_name, guest.last_name, guest.email, guest.phone)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [guest.pk])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, contact) VALUES (%s, %s, %s)',
+            [guest.pk, name, contact]
+        )
+        for word in name.split():
+            # Words are stored between spaces, so a phrase query matches whole words only
+            cursor.execute(f'SELECT 1 FROM {WORD_TABLE} WHERE word MATCH %s LIMIT 1', [_quote(f' {word} ')])
+            if cursor.fetchone() is None:
+                cursor.execute(f'INSERT INTO {WORD_TABLE} (word) VALUES (%s)', [f' {word} '])
+
+
+def index_guests(guests):
+    """Add or replace guests in the search index in one batch, e.g. after ``bulk_create``"""
+    guests = list(guests)
+    if not guests or not search_available():
+        return
+    documents = [(guest.pk, *_document(guest.first_name, guest.last_name, guest.email, guest.phone)) for guest in guests]
+    words = {word for _, name, _ in documents for word in name.split()}
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(guest.pk,) for guest in guests])
+        cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, name, contact) VALUES (%s, %s, %s)', documents)
+        new_words = []
+        for word in sorted(words):
+            cursor.execute(f'SELECT 1 FROM {WORD_TABLE} WHERE word MATCH %s LIMIT 1', [_quote(f' {word} ')])
+            if cursor.fetchone() is None:
+                new_words.append((f' {word} ',))
+        cursor.executemany(f'INSERT INTO {WORD_TABLE} (word) VALUES (%s)', new_words)
+
+
+def unindex_guest(guest_id):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [guest_id])
+
+
+def unindex_guests(guest_ids):
+    """Remove guests from the search index with one statement"""
+    guest_ids = list(guest_ids)
+    if not guest_ids or not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(guest_ids))})", guest_ids
+        )
+
+
+def rebuild_index(batch_size=5000, guests=None):
+    """Re-index every guest not merged into another, e.g. after bulk imports that bypass signals"""
+    if not search_available():
+        return 0
+    total = 0
+    if guests is None:
+        guests = Guest.objects.filter(merged_into__isnull=True)
+    guests = guests.order_by('pk').values_list('pk', 'first_name', 'last_name', 'email', 'phone')
+    words = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(f'DELETE FROM {WORD_TABLE}')
+        batch = []
+        for guest_id, first_name, last_name, email, phone in guests.iterator(chunk_size=batch_size):
+            document = _document(first_name, last_name, email, phone)
+            words.update(document[0].split())
+            batch.append((guest_id, *document))
+            if len(batch) >= batch_size:
+                cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, name, contact) VALUES (%s, %s, %s)', batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, name, contact) VALUES (%s, %s, %s)', batch)
+            total += len(batch)
+        cursor.executemany(f'INSERT INTO {WORD_TABLE} (word) VALUES (%s)', [(f' {word} ',) for word in sorted(words)])
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _score(terms, contact_terms, name, contact):
+    """Score how well the terms match a guest, from 0 to 1"""
+    words = name.split()
+    total = 0.0
+    for term, contact_term in zip(terms, contact_terms):
+        best = 0.0
+        for word in words:
+            if word == term:
+                best = 1.0
+                break
+            if word.startswith(term):
+                best = max(best, 0.9)
+            else:
+                best = max(best, similarity(term, word) * 0.8)
+        if contact_term and contact_term in contact:
+            best = max(best, 0.8)
+        total += best
+    return total / len(terms)
+
+
+def _fetch(cursor, match, limit):
+    cursor.execute(
+        f'SELECT rowid, name, contact FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT %s',
+        [match, limit]
+    )
+    return cursor.fetchall()
+
+
+def _prefix_match(terms, contact_terms):
+    clauses = []
+    for term, contact_term in zip(terms, contact_terms):
+        options = []
+        if term:
+            options.append(f'name : {_quote(" " + term)}')
+        if len(contact_term) >= 3:
+            options.append(f'contact : {_quote(contact_term)}')
+        if not options:
+            return None
+        clauses.append('(' + ' OR '.join(options) + ')')
+    return ' AND '.join(clauses)
+
+
+def _similar_words(cursor, term):
+    """Get the indexed name words closest to a possibly misspelled term"""
+    if len(term) >= 6:
+        middle = len(term) // 2
+        pieces = [' ' + term[:middle], term[middle:] + ' ']
+    else:
+        pieces = sorted(trigrams(term))
+    cursor.execute(
+        f'SELECT word FROM {WORD_TABLE} WHERE word MATCH %s ORDER BY rank LIMIT 200',
+        [' OR '.join(_quote(piece) for piece in pieces)]
+    )
+    scored = sorted(
+        ((similarity(term, word.strip()), word.strip()) for (word,) in cursor.fetchall()),
+        reverse=True
+    )
+    return [word for score, word in scored[:FUZZY_WORDS] if score >= FUZZY_THRESHOLD]
+
+
+def _fuzzy_match(cursor, terms):
+    """Match guests having a word close to every term, or starting with it"""
+    clauses = []
+    for term in terms:
+        options = [_quote(' ' + term)] if term else []
+        if len(term) >= 3:
+            options += [_quote(f' {word} ') for word in _similar_words(cursor, term)]
+        if options:
+            clauses.append('name : (' + ' OR '.join(options) + ')')
+    return ' AND '.join(clauses) if clauses else None
+
+
+def search_guest_ids(query, limit=20, fuzzy=True):
+    """Get ids of the guests best matching a query, best first.
+
+    Returns ``(guest_id, score)`` pairs. Every term of the query must match
+    in the prefix pass; fuzzy matches are added when there are fewer than
+    ``limit`` of them.
+    """
+    raw_terms = (query or '').lower().split()
+    terms = [normalize_name(term).replace(' ', '') for term in raw_terms]
+    contact_terms = [
+        normalize_phone(term) if term.lstrip('+').replace('-', '').isdigit() else term
+        for term in raw_terms
+    ]
+    if not raw_terms:
+        return []
+
+    if not search_available():
+        return [(guest_id, 1.0) for guest_id in _fallback_ids(raw_terms, limit)]
+
+    results = {}
+    with connection.cursor() as cursor:
+        match = _prefix_match(terms, contact_terms)
+        if match:
+            for guest_id, name, contact in _fetch(cursor, match, limit * CANDIDATE_FACTOR):
+                results[guest_id] = _score(terms, contact_terms, name, contact)
+
+        if fuzzy and len(results) < limit and any(len(term) >= 3 for term in terms):
+            match = _fuzzy_match(cursor, terms)
+            if match:
+                for guest_id, name, contact in _fetch(cursor, match, limit * CANDIDATE_FACTOR):
+                    if guest_id in results:
+                        continue
+                    score = _score(terms, contact_terms, name, contact)
+                    if score >= FUZZY_THRESHOLD:
+                        results[guest_id] = score
+
+    ranked = sorted(results.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [(guest_id, round(score, 3)) for guest_id, score in ranked]
+
+
+def _fallback_ids(terms, limit):
+    guests = Guest.objects.all()
+    for term in terms:
+        guests = guests.filter(
+            Q(first_name__icontains=term) | Q(last_name__icontains=term) |
+            Q(email__icontains=term) | Q(phone__icontains=term)
+        )
+    return list(guests.values_list('pk', flat=True)[:limit])
+
+
+def search_guests(query, limit=20, fuzzy=True, queryset=None):
+    """Get guests best matching a query as a list, best first"""
+    ranked = search_guest_ids(query, limit=limit, fuzzy=fuzzy)
+    queryset = Guest.objects.all() if queryset is None else queryset
+    guests = queryset.in_bulk([guest_id for guest_id, _ in ranked])
+    return [guests[guest_id] for guest_id, _ in ranked if guest_id in guests]
+
+
+class GuestSearchFilter(BaseFilterBackend):
+    """Filter a list by the ``search`` query parameter through the guest index.
+
+    Views set ``guest_search_field`` to the path of the guest from their
+    model (``'pk'`` for guests, ``'guest'`` for reservations) and may list
+    ``search_exact_fields`` matched case-insensitively as a whole, such as a
+    reservation number. Results keep the search ranking unless an explicit
+    ordering is requested.
+    """
+    search_param = 'search'
+    max_results = 500
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        field = getattr(view, 'guest_search_field', 'pk')
+        guest_ids = [guest_id for guest_id, _ in search_guest_ids(query, limit=self.max_results)]
+        condition = Q(**{f'{field}__in': guest_ids})
+        for exact_field in getattr(view, 'search_exact_fields', ()):
+            condition |= Q(**{f'{exact_field}__iexact': query})
+        queryset = queryset.filter(condition)
+
+        if field == 'pk' and guest_ids and 'ordering' not in request.query_params:
+            queryset = queryset.order_by(
+                Case(*[When(pk=guest_id, then=position) for position, guest_id in enumerate(guest_ids)])
+            )
+        return queryset
@@ -0,0 +1,111 @@
+"""
+RFM (recency, frequency, monetary) segmentation of guests.
+
+Recency, frequency and monetary value come from ``GuestStats`` (last stay
+date, checked-out stays and paid spend), which are already kept per guest,
+so the job streams one ``values_list`` over that table instead of
+aggregating reservations and bills. Each measure is scored from 1 to 5 by
+the fifth of guests it falls in: values are sorted once and each guest's
+rank is found by binary search, so guests with equal values get equal
+scores. Guests sharing the same scores are written back together with
+chunked ``UPDATE`` statements and can be filtered on through the guest API.
+"""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import GuestStats
+
+
+SCORE_LEVELS = 5
+
+# First matching rule gives the segment: (segment, recency, frequency,
+# monetary) with inclusive score ranges
+SEGMENT_RULES = [
+    ('CHAMPIONS', (4, 5), (4, 5), (4, 5)),
+    ('HIGH_VALUE_LAPSED', (1, 2), (1, 5), (5, 5)),
+    ('AT_RISK', (1, 2), (3, 5), (1, 4)),
+    ('LOYAL', (3, 5), (4, 5), (1, 5)),
+    ('NEW', (4, 5), (1, 1), (1, 5)),
+    ('PROMISING', (4, 5), (1, 3), (1, 5)),
+    ('HIBERNATING', (1, 2), (1, 2), (1, 4)),
+]
+DEFAULT_SEGMENT = 'NEEDS_ATTENTION'
+
+def score_values(values, higher_is_better=True):
+    """Score each value 1-5 by the fifth of all values it ranks in"""
+    ordered = sorted(values)
+    count = len(ordered)
+    scores = array('b')
+    for value in values:
+        level = 1 + bisect_left(ordered, value) * SCORE_LEVELS // count
+        scores.append(level if higher_is_better else SCORE_LEVELS + 1 - level)
+    return scores
+
+
+def segment_for(recency, frequency, monetary):
+    """Get the segment of a guest's RFM scores"""
+    for segment, (r_min, r_max), (f_min, f_max), (m_min, m_max) in SEGMENT_RULES:
+        if r_min <= recency <= r_max and f_min <= frequency <= f_max and m_min <= monetary <= m_max:
+            return segment
+    return DEFAULT_SEGMENT
+
+
+def segment_guests(as_of=None, batch_size=900):
+    """Score and segment every guest with at least one stay"""
+    as_of = as_of or date.today()
+    guest_ids, days_since, stays, spent = array('q'), array('l'), array('l'), array('d')
+    unscored = []
+    rows = GuestStats.objects.order_by().values_list(
+        'guest_id', 'last_stay_date', 'total_stays', 'total_spent'
+    ).iterator(chunk_size=batch_size)
+    for guest_id, last_stay, total_stays, total_spent in rows:
+        if not total_stays or last_stay is None:
+            unscored.append(guest_id)
+            continue
+        guest_ids.append(guest_id)
+        days_since.append((as_of - last_stay).days)
+        stays.append(total_stays)
+        spent.append(total_spent)
+
+    recency = score_values(days_since, higher_is_better=False)
+    frequency = score_values(stays)
+    monetary = score_values(spent)
+
+    # At most 125 score combinations, so guests sharing one are updated
+    # together rather than row by row
+    by_scores = defaultdict(list)
+    for index, guest_id in enumerate(guest_ids):
+        by_scores[(recency[index], frequency[index], monetary[index])].append(guest_id)
+
+    now = timezone.now()
+    segments = defaultdict(int)
+    with transaction.atomic():
+        for (r, f, m), ids in by_scores.items():
+            segment = segment_for(r, f, m)
+            segments[segment] += len(ids)
+            for start in range(0, len(ids), batch_size):
+                GuestStats.objects.filter(guest_id__in=ids[start:start + batch_size]).update(
+                    recency_score=r, frequency_score=f, monetary_score=m, segment=segment, segmented_at=now
+                )
+        for start in range(0, len(unscored), batch_size):
+            GuestStats.objects.filter(guest_id__in=unscored[start:start + batch_size]).update(
+                recency_score=None, frequency_score=None, monetary_score=None, segment='', segmented_at=now
+            )
+
+    return {'guests': len(guest_ids), 'unscored': len(unscored), 'segments': dict(segments)}
+
+
+def segment_summary():
+    """Count guests per segment"""
+    rows = GuestStats.objects.exclude(segment='').order_by().values('segment').annotate(guests=Count('guest'))
+    counts = {row['segment']: row['guests'] for row in rows}
+    return [
+        {'segment': segment, 'label': label, 'guests': counts.get(segment, 0)}
+        for segment, label in GuestStats.SEGMENT_CHOICES
+    ]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Guest, GuestDocument
+from .models import Guest, GuestDocument, GuestStats, LoyaltyTransaction, DuplicateCandidate
 
 
 class GuestDocumentSerializer(serializers.ModelSerializer):
@@ -20,6 +20,17 @@ class GuestDocumentSerializer(serializers.ModelSerializer):
         return obj.is_expired()
 
 
+class GuestStatsSerializer(serializers.ModelSerializer):
+    average_daily_rate = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = GuestStats
+        fields = [
+            'total_stays', 'total_nights', 'total_spent', 'average_daily_rate', 'last_stay_date',
+            'recency_score', 'frequency_score', 'monetary_score', 'segment', 'segmented_at'
+        ]
+
+
 class GuestSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
     age = serializers.IntegerField(read_only=True)
@@ -28,6 +39,7 @@ class GuestSerializer(serializers.ModelSerializer):
     loyalty_level = serializers.SerializerMethodField()
     total_stays = serializers.SerializerMethodField()
     total_spent = serializers.SerializerMethodField()
+    stay_stats = serializers.SerializerMethodField()
     
     class Meta:
         model = Guest
@@ -35,10 +47,10 @@ class GuestSerializer(serializers.ModelSerializer):
             'id', 'first_name', 'last_name', 'full_name', 'email', 'phone',
             'date_of_birth', 'age', 'gender', 'gender_display', 'nationality',
             'address', 'postal_code', 'city', 'country', 'loyalty_points',
-            'preferences', 'notes', 'is_vip', 'is_active', 'created_at',
-            'updated_at', 'documents', 'loyalty_level', 'total_stays', 'total_spent'
+            'preferences', 'notes', 'is_vip', 'is_active', 'merged_into', 'created_at',
+            'updated_at', 'documents', 'loyalty_level', 'total_stays', 'total_spent', 'stay_stats'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'full_name', 'age']
+        read_only_fields = ['created_at', 'updated_at', 'full_name', 'age', 'merged_into']
 
     def get_loyalty_level(self, obj):
         """Get loyalty level based on points"""
@@ -54,18 +66,17 @@ class GuestSerializer(serializers.ModelSerializer):
 
     def get_total_stays(self, obj):
         """Get total number of stays"""
-        return obj.reservations.filter(status='CHECKED_OUT').count()
+        stats = getattr(obj, 'stats', None)
+        return stats.total_stays if stats else 0
 
     def get_total_spent(self, obj):
         """Get total amount spent"""
-        from django.db.models import Sum
-        total = obj.reservations.filter(
-            status='CHECKED_OUT',
-            bill__status='PAID'
-        ).aggregate(
-            total=Sum('bill__total_amount')
-        )['total']
-        return float(total) if total else 0.0
+        stats = getattr(obj, 'stats', None)
+        return float(stats.total_spent) if stats else 0.0
+
+    def get_stay_stats(self, obj):
+        """Get lifetime stay statistics"""
+        return GuestStatsSerializer(getattr(obj, 'stats', None) or GuestStats(guest=obj)).data
 
 
 class GuestListSerializer(serializers.ModelSerializer):
@@ -73,13 +84,14 @@ class GuestListSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
     gender_display = serializers.CharField(source='get_gender_display', read_only=True)
     loyalty_level = serializers.SerializerMethodField()
+    segment = serializers.SerializerMethodField()
     
     class Meta:
         model = Guest
         fields = [
             'id', 'full_name', 'email', 'phone', 'nationality',
             'loyalty_points', 'is_vip', 'is_active', 'gender_display',
-            'loyalty_level'
+            'loyalty_level', 'segment'
         ]
 
     def get_loyalty_level(self, obj):
@@ -94,6 +106,11 @@ class GuestListSerializer(serializers.ModelSerializer):
         else:
             return "Bronze"
 
+    def get_segment(self, obj):
+        """Get RFM segment from the last segmentation run"""
+        stats = getattr(obj, 'stats', None)
+        return stats.segment if stats and stats.segment else None
+
 
 class GuestCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating guests with documents"""
@@ -138,4 +155,43 @@ class GuestCreateUpdateSerializer(serializers.ModelSerializer):
 class LoyaltyPointsSerializer(serializers.Serializer):
     """Serializer for loyalty points operations"""
     points = serializers.IntegerField(min_value=1)
-    reason = serializers.CharField(max_length=200, required=False, default="Manual adjustment")
\ No newline at end of file
+    reason = serializers.CharField(max_length=200, required=False, default="Manual adjustment")
+
+
+class LoyaltyTransactionSerializer(serializers.ModelSerializer):
+    transaction_type_display = serializers.CharField(source='get_transaction_type_display', read_only=True)
+    reservation_number = serializers.CharField(source='reservation.reservation_number', read_only=True, default=None)
+
+    class Meta:
+        model = LoyaltyTransaction
+        fields = [
+            'id', 'transaction_type', 'transaction_type_display', 'points', 'remaining',
+            'expires_at', 'reservation', 'reservation_number', 'description', 'created_at'
+        ]
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    guest = GuestListSerializer(read_only=True)
+    duplicate = GuestListSerializer(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = DuplicateCandidate
+        fields = [
+            'id', 'guest', 'duplicate', 'score', 'reasons', 'status', 'status_display',
+            'created_at', 'updated_at'
+        ]
+
+
+class MergeGuestsSerializer(serializers.Serializer):
+    """Serializer for merging duplicate guests into one"""
+    duplicates = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False,
+        help_text="Ids of the guests to merge into this one"
+    )
+
+
+class MergeCandidateSerializer(serializers.Serializer):
+    """Serializer for merging a duplicate candidate pair"""
+    keep = serializers.IntegerField(
+        required=False, help_text="Id of the guest to keep, defaults to the older record"
+    )
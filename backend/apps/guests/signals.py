@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.checkin.batch import checkouts_processed
+from apps.checkin.models import CheckOut
+from apps.payments.models import Bill
+from apps.reservations.models import Reservation
+from .loyalty import accrue_points
+from .models import Guest
+from .search import index_guest, unindex_guest
+from .stats import refresh_guest_stats_on_commit
+
+
+# Guest fields stored in the search index
+SEARCH_FIELDS = {'first_name', 'last_name', 'email', 'phone'}
+
+
+@receiver(post_save, sender=Guest)
+def update_guest_search(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index a guest when a searchable field may have changed"""
+    if raw:
+        return
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields | {'merged_into'}):
+        return
+    if instance.merged_into_id is not None:
+        unindex_guest(instance.pk)
+    else:
+        index_guest(instance)
+
+
+@receiver(post_delete, sender=Guest)
+def remove_guest_search(sender, instance, **kwargs):
+    unindex_guest(instance.pk)
+
+
+@receiver(post_save, sender=Reservation)
+def update_guest_on_checkout(sender, instance, raw=False, **kwargs):
+    """Refresh guest statistics and award loyalty points when a reservation is checked out"""
+    if not raw and instance.status == 'CHECKED_OUT':
+        reservation_id = instance.id
+        refresh_guest_stats_on_commit([instance.guest_id])
+        transaction.on_commit(lambda: accrue_points([reservation_id]))
+
+
+@receiver(post_delete, sender=Reservation)
+def update_stats_on_reservation_delete(sender, instance, **kwargs):
+    if instance.status == 'CHECKED_OUT':
+        refresh_guest_stats_on_commit([instance.guest_id])
+
+
+@receiver(post_save, sender=Bill)
+@receiver(post_delete, sender=Bill)
+def update_stats_on_bill(sender, instance, raw=False, **kwargs):
+    """Refresh guest statistics when a bill is paid, refunded or removed"""
+    if not raw:
+        refresh_guest_stats_on_commit(
+            Reservation.objects.filter(pk=instance.reservation_id).values_list('guest_id', flat=True)
+        )
+
+
+@receiver(checkouts_processed)
+def update_guests_on_group_checkout(sender, checkouts, **kwargs):
+    stays = list(CheckOut.objects.filter(pk__in=[checkout.pk for checkout in checkouts]).values_list(
+        'check_in__reservation_id', 'check_in__reservation__guest_id'
+    ))
+    refresh_guest_stats_on_commit(guest_id for reservation_id, guest_id in stays)
+    accrue_points([reservation_id for reservation_id, guest_id in stays])
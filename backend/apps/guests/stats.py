@@ -0,0 +1,76 @@
+"""
+Denormalized lifetime statistics per guest.
+
+Stays, nights, paid spend and the last stay date used to be aggregated from
+reservations and bills every time a guest was serialized, two queries per
+guest in lists and per reservation in reservation detail. They are stored in
+``GuestStats`` instead and refreshed for the affected guests when a
+reservation is checked out or a bill is saved.
+
+A refresh recomputes the affected guests from their reservations with one
+grouped query and writes them with one upsert, rather than applying
+deltas, so the same event arriving twice or a bill going from paid to
+refunded cannot make the totals drift.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Q, Sum
+
+from apps.reservations.models import Reservation
+from .models import Guest, GuestStats
+
+
+STATS_FIELDS = ['total_stays', 'total_nights', 'total_spent', 'last_stay_date', 'updated_at']
+
+
+def _aggregate_stays(guest_ids=None):
+    """Yield ``GuestStats`` computed from checked-out reservations"""
+    reservations = Reservation.objects.filter(status='CHECKED_OUT')
+    if guest_ids is not None:
+        reservations = reservations.filter(guest_id__in=guest_ids)
+    rows = reservations.values('guest_id').annotate(
+        stays=Count('id'),
+        nights=Sum(ExpressionWrapper(F('check_out_date') - F('check_in_date'), output_field=DurationField())),
+        spent=Sum('bill__total_amount', filter=Q(bill__status='PAID')),
+        last_stay=Max('check_out_date'),
+    ).order_by()
+    for row in rows:
+        yield GuestStats(
+            guest_id=row['guest_id'],
+            total_stays=row['stays'],
+            total_nights=(row['nights'] or timedelta()).days,
+            total_spent=row['spent'] or Decimal('0.00'),
+            last_stay_date=row['last_stay'],
+        )
+
+
+def refresh_guest_stats(guest_ids):
+    """Recompute the statistics of some guests"""
+    guest_ids = set(guest_ids)
+    if not guest_ids:
+        return []
+    stats = {row.guest_id: row for row in _aggregate_stays(guest_ids)}
+    for guest_id in guest_ids - stats.keys():
+        stats[guest_id] = GuestStats(guest_id=guest_id)
+    return GuestStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=['guest'],
+        update_fields=STATS_FIELDS
+    )
+
+
+def refresh_guest_stats_on_commit(guest_ids):
+    """Refresh some guests once the current transaction commits"""
+    guest_ids = list(guest_ids)
+    transaction.on_commit(lambda: refresh_guest_stats(guest_ids))
+
+
+def rebuild_guest_stats(batch_size=2000):
+    """Recompute the statistics of every guest"""
+    with transaction.atomic():
+        GuestStats.objects.all().delete()
+        stats = GuestStats.objects.bulk_create(_aggregate_stays(), batch_size=batch_size)
+    return {'guests': Guest.objects.count(), 'with_stays': len(stats)}
@@ -1,8 +1,22 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from datetime import date
-from .models import Guest, GuestDocument
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from apps.checkin.batch import batch_check_out
+from apps.checkin.models import CheckIn
+from apps.payments.models import Bill
+from apps.reservations.models import Reservation
+from .dedup import candidate_pairs, document_key, email_key, find_duplicates, merge_guests, name_key
+from .loyalty import InsufficientPoints, accrue_points, adjust_points, expire_points, redeem_points, tier_summary
+from .models import Guest, GuestDocument, GuestStats, LoyaltyTransaction, DuplicateCandidate, PROMOTED_PREFERENCES
+from .search import normalize_name, rebuild_index, search_guest_ids, search_guests
+from .segments import score_values, segment_for, segment_guests
+from .stats import rebuild_guest_stats
 
 
 class GuestModelTest(TestCase):
@@ -183,3 +197,545 @@ class GuestDocumentModelTest(TestCase):
             expiry_date=date(2020, 1, 1)
         )
         self.assertTrue(past_document.is_expired())
+
+
+class GuestSearchTest(TestCase):
+    def setUp(self):
+        names = [
+            ('Soeharto', 'Wijaya'), ('Budi', 'Santoso'), ('Budiman', 'Hasanuddin'),
+            ('Djoko', 'Tjahjono'), ('Achmad', 'Syahrir'), ('Sari', 'Dewi'),
+        ]
+        self.guests = {
+            first: Guest.objects.create(
+                first_name=first, last_name=last,
+                email=f'{first.lower()}.{last.lower()}@example.com',
+                phone=f'+62812000{i:04d}'
+            )
+            for i, (first, last) in enumerate(names)
+        }
+
+    def ids(self, query, **kwargs):
+        return [guest_id for guest_id, _ in search_guest_ids(query, **kwargs)]
+
+    def test_normalize_folds_old_spelling(self):
+        """Test old and new Indonesian spellings share a search key"""
+        self.assertEqual(normalize_name('Soeharto'), normalize_name('Suharto'))
+        self.assertEqual(normalize_name('Djoko Tjahjono'), normalize_name('Joko Cahyono'))
+        self.assertEqual(normalize_name('Achmad'), normalize_name('Ahmad'))
+        self.assertEqual(normalize_name('Hasanuddin'), normalize_name('Hasanudin'))
+
+    def test_prefix_search_ranks_exact_word_first(self):
+        """Test a term matches the start of name words, whole words first"""
+        self.assertEqual(self.ids('budi', fuzzy=False), [self.guests['Budi'].id, self.guests['Budiman'].id])
+        self.assertEqual(self.ids('bu sant'), [self.guests['Budi'].id])
+        self.assertEqual([score for _, score in search_guest_ids('budi', fuzzy=False)], [1.0, 0.9])
+
+    def test_spelling_variants_and_typos(self):
+        """Test new spellings find old ones and misspelled names still match"""
+        self.assertEqual(self.ids('suharto')[0], self.guests['Soeharto'].id)
+        self.assertEqual(self.ids('joko cahyono')[0], self.guests['Djoko'].id)
+        self.assertEqual(self.ids('santsso')[0], self.guests['Budi'].id)
+        self.assertEqual(self.ids('hasanudn')[0], self.guests['Budiman'].id)
+        self.assertEqual(self.ids('xyzzy'), [])
+
+    def test_email_and_phone(self):
+        """Test guests are found by email and phone number digits"""
+        self.assertEqual(self.ids('sari.dewi@'), [self.guests['Sari'].id])
+        self.assertEqual(self.ids('0812-000-0003'), [self.guests['Djoko'].id])
+        self.assertEqual(self.ids('+628120000003'), [self.guests['Djoko'].id])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is updated incrementally from guest changes"""
+        guest = self.guests['Sari']
+        guest.last_name = 'Kartika'
+        guest.save()
+        self.assertEqual(self.ids('kartika'), [guest.id])
+
+        guest.delete()
+        self.assertEqual(self.ids('kartika'), [])
+
+    def test_rebuild_indexes_bulk_created_guests(self):
+        """Test a rebuild picks up guests created without signals"""
+        Guest.objects.bulk_create([Guest(first_name='Wayan', last_name='Sudarma', email='wayan@example.com')])
+        self.assertEqual(self.ids('wayan'), [])
+        self.assertEqual(rebuild_index(), 7)
+        self.assertEqual([guest.first_name for guest in search_guests('wayan')], ['Wayan'])
+
+    def test_search_uses_constant_queries(self):
+        """Test a fuzzy search runs a fixed number of queries"""
+        with self.assertNumQueries(3):
+            search_guest_ids('santsso')
+
+
+class GuestSearchAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='frontdesk', password='pass'))
+        self.guest = Guest.objects.create(first_name='Djoko', last_name='Santoso', email='djoko@example.com')
+        Guest.objects.create(first_name='Sari', last_name='Dewi', email='sari@example.com')
+
+    def test_typeahead(self):
+        """Test type-ahead suggests guests from two letters"""
+        response = self.client.get('/api/guests/typeahead/', {'q': 'jo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.guest.id])
+        self.assertEqual(response.data['results'][0]['full_name'], 'Djoko Santoso')
+
+    def test_search_action_and_list_filter(self):
+        """Test ranked search and the search filter of guest and reservation lists"""
+        response = self.client.get('/api/guests/search/', {'q': 'santsoso'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], self.guest.id)
+
+        response = self.client.get('/api/guests/', {'search': 'joko'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.guest.id])
+
+        reservation = Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=date.today(),
+            check_out_date=date.today() + timedelta(days=1)
+        )
+        response = self.client.get('/api/reservations/', {'search': 'santoso'})
+        self.assertEqual([res['id'] for res in response.data['results']], [reservation.id])
+        response = self.client.get('/api/reservations/', {'search': reservation.reservation_number})
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class GuestDedupTest(TestCase):
+    def setUp(self):
+        self.original = Guest.objects.create(
+            first_name='Muhammad', last_name='Santoso', email='muhammad.santoso@gmail.com',
+            phone='+62812-1111-2222', loyalty_points=300, preferences={'floor': 'high'}
+        )
+        # Walk-in with another email, local phone format and old spelling
+        self.walk_in = Guest.objects.create(
+            first_name='Mohamad', last_name='Santosa', email='m.santosa@yahoo.com',
+            phone='0812 1111 2222', loyalty_points=150, date_of_birth=date(1985, 5, 1),
+            preferences={'pillow': 'soft'}
+        )
+        # OTA booking with the same KTP
+        self.ota = Guest.objects.create(first_name='M', last_name='Santoso', email='guest-4821@ota.example.com')
+        GuestDocument.objects.create(guest=self.walk_in, document_type='KTP', document_number='3171-0101-8505-0001')
+        GuestDocument.objects.create(guest=self.ota, document_type='KTP', document_number='3171010185050001')
+        GuestDocument.objects.create(guest=self.ota, document_type='PASSPORT', document_number='B1234567')
+        # Same common name, nothing else shared
+        self.namesake = Guest.objects.create(first_name='Muhammad', last_name='Santoso', email='other@example.com')
+
+    def test_keys_fold_spelling_and_format_variants(self):
+        """Test phonetic, email and document keys ignore spelling and formatting"""
+        self.assertEqual(name_key('Muhammad', 'Santoso'), name_key('Mohamad', 'Santosa'))
+        self.assertEqual(name_key('Santoso', 'Muhammad'), name_key('Muhammad', 'Santoso'))
+        self.assertEqual(email_key('Sari.Dewi+ota@gmail.com'), 'saridewi@gmail.com')
+        self.assertEqual(document_key('3171-0101 8505.0001'), '3171010185050001')
+
+    def test_blocking_finds_pairs_without_comparing_everyone(self):
+        """Test only guests sharing a blocking key are paired"""
+        pairs, stats = candidate_pairs()
+        self.assertIn((self.original.id, self.walk_in.id), pairs)
+        self.assertIn((self.walk_in.id, self.ota.id), pairs)
+        self.assertNotIn((self.original.id, self.ota.id), pairs)
+        self.assertEqual(stats['guests'], 4)
+
+        pairs, stats = candidate_pairs(max_block_size=2)
+        self.assertNotIn((self.original.id, self.namesake.id), pairs)
+        self.assertEqual(stats['skipped_blocks'], 1)
+
+    def test_find_duplicates_scores_and_keeps_review_status(self):
+        """Test candidates are scored by shared evidence and rescoring keeps dismissals"""
+        stats = find_duplicates()
+        candidates = {
+            (c.guest_id, c.duplicate_id): c for c in DuplicateCandidate.objects.all()
+        }
+        self.assertEqual(stats['candidates'], len(candidates))
+        by_phone = candidates[(self.original.id, self.walk_in.id)]
+        self.assertIn('phone', by_phone.reasons)
+        self.assertIn('name', by_phone.reasons)
+        self.assertIn('document', candidates[(self.walk_in.id, self.ota.id)].reasons)
+        # A shared common name alone is not enough
+        self.assertNotIn((self.original.id, self.namesake.id), candidates)
+
+        by_phone.status = 'DISMISSED'
+        by_phone.save()
+        find_duplicates()
+        by_phone.refresh_from_db()
+        self.assertEqual(by_phone.status, 'DISMISSED')
+
+    def test_merge_moves_history_and_sums_points(self):
+        """Test merging re-points reservations and documents and sums loyalty points"""
+        reservation = Reservation.objects.create(
+            guest=self.walk_in, check_in_date=date.today(), check_out_date=date.today() + timedelta(days=1)
+        )
+        GuestDocument.objects.create(guest=self.original, document_type='PASSPORT', document_number='A7654321')
+
+        with self.assertNumQueries(19):
+            result = merge_guests(self.original, [self.walk_in, self.ota])
+
+        self.original.refresh_from_db()
+        reservation.refresh_from_db()
+        self.walk_in.refresh_from_db()
+        self.assertEqual(result['merged'], 2)
+        self.assertEqual(reservation.guest, self.original)
+        self.assertEqual(self.original.loyalty_points, 450)
+        self.assertEqual(self.original.date_of_birth, date(1985, 5, 1))
+        self.assertEqual(self.original.preferences, {'floor': 'high', 'pillow': 'soft'})
+        # One document per type: the KTP moves over, the original keeps its passport
+        documents = sorted(self.original.documents.values_list('document_type', 'document_number'))
+        self.assertEqual([(kind, document_key(number)) for kind, number in documents],
+                         [('KTP', '3171010185050001'), ('PASSPORT', 'A7654321')])
+        self.assertFalse(self.walk_in.is_active)
+        self.assertEqual(self.walk_in.merged_into, self.original)
+        self.assertEqual(self.walk_in.loyalty_points, 0)
+        # Superseded documents are kept with the merged guests
+        self.assertEqual(
+            sorted(GuestDocument.objects.exclude(guest=self.original).values_list('guest__email', 'document_type')),
+            [('guest-4821@ota.example.com', 'PASSPORT'), ('m.santosa@yahoo.com', 'KTP')]
+        )
+
+    def test_merge_moves_current_points(self):
+        """Test points accrued after the duplicates were loaded are moved, not lost"""
+        duplicates = list(Guest.objects.filter(pk__in=[self.walk_in.pk, self.ota.pk]))
+        self.walk_in.add_loyalty_points(50)
+        self.ota.add_loyalty_points(25)
+
+        result = merge_guests(self.original, duplicates)
+        self.original.refresh_from_db()
+        self.assertEqual(result['loyalty_points_added'], 225)
+        self.assertEqual(self.original.loyalty_points, 525)
+        self.assertEqual(sum(Guest.objects.filter(merged_into=self.original).values_list('loyalty_points', flat=True)), 0)
+
+    def test_merged_guests_leave_search(self):
+        """Test search finds the kept guest, not the guests merged into it"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='frontdesk', password='pass'))
+        merge_guests(self.original, [self.walk_in, self.ota])
+
+        response = client.get('/api/guests/search/', {'q': 'santosa'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.original.id, self.namesake.id])
+        # The passport stayed with the merged OTA guest
+        response = client.get('/api/guests/search/', {'q': 'B1234567'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.original.id])
+        response = client.get('/api/guests/search/', {'q': 'santosa', 'limit': 1})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_merge_candidate_api(self):
+        """Test a reviewed candidate can be merged keeping a chosen guest"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='manager', password='pass'))
+        find_duplicates()
+        candidate = DuplicateCandidate.objects.get(guest=self.original, duplicate=self.walk_in)
+
+        response = client.post(f'/api/guest-duplicates/{candidate.id}/merge/', {'keep': self.walk_in.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['guest']['id'], self.walk_in.id)
+        self.assertEqual(response.data['guest']['loyalty_points'], 450)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, 'MERGED')
+
+        response = client.post(f'/api/guests/{self.original.id}/merge/', {'duplicates': [self.ota.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class GuestStatsTest(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Sari', last_name='Dewi', email='sari@example.com')
+        self.today = date.today()
+
+    def stay(self, days_ago, nights, total=None, bill_status='PAID'):
+        check_in = self.today - timedelta(days=days_ago)
+        reservation = Reservation.objects.create(
+            guest=self.guest, check_in_date=check_in, check_out_date=check_in + timedelta(days=nights),
+            status='CHECKED_IN'
+        )
+        if total is not None:
+            Bill.objects.create(reservation=reservation, total_amount=Decimal(total), status=bill_status)
+        return reservation
+
+    def check_out(self, reservation):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.status = 'CHECKED_OUT'
+            reservation.save(update_fields=['status', 'updated_at'])
+
+    def test_check_out_and_bill_updates_stats(self):
+        """Test checking out and paying bills updates stays, nights and paid spend"""
+        first = self.stay(30, 2, '200.00')
+        second = self.stay(10, 3, '450.00', bill_status='PENDING')
+        self.stay(1, 2)
+        self.check_out(first)
+        self.check_out(second)
+
+        stats = GuestStats.objects.get(guest=self.guest)
+        self.assertEqual(stats.total_stays, 2)
+        self.assertEqual(stats.total_nights, 5)
+        self.assertEqual(stats.total_spent, Decimal('200.00'))
+        self.assertEqual(stats.last_stay_date, self.today - timedelta(days=7))
+        self.assertEqual(stats.average_daily_rate, Decimal('40.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.bill.status = 'PAID'
+            second.bill.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.bill.status = 'REFUNDED'
+            first.bill.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.total_spent, Decimal('450.00'))
+
+    def test_group_check_out_updates_stats(self):
+        """Test a batch check-out refreshes the stats of every guest"""
+        reservation = self.stay(2, 2)
+        CheckIn.objects.create(reservation=reservation, actual_check_in_time=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            batch_check_out([reservation.id])
+        self.assertEqual(GuestStats.objects.get(guest=self.guest).total_stays, 1)
+
+    def test_rebuild_matches_incremental_stats(self):
+        """Test rebuilding recomputes stats from reservations and bills"""
+        self.check_out(self.stay(20, 4, '800.00'))
+        # Bulk updates skip signals and leave the stored stats stale
+        Reservation.objects.filter(guest=self.guest).update(status='CANCELLED')
+        rebuild_guest_stats()
+        self.assertFalse(GuestStats.objects.filter(guest=self.guest).exists())
+
+        Reservation.objects.filter(guest=self.guest).update(status='CHECKED_OUT')
+        call_command('rebuild_guest_stats', stdout=StringIO())
+        stats = GuestStats.objects.get(guest=self.guest)
+        self.assertEqual((stats.total_stays, stats.total_nights, stats.total_spent), (1, 4, Decimal('800.00')))
+
+    def test_serializers_read_stored_stats(self):
+        """Test guests and reservations are serialized without aggregate queries"""
+        self.check_out(self.stay(5, 2, '300.00'))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='frontdesk', password='pass'))
+
+        response = client.get(f'/api/guests/{self.guest.id}/')
+        self.assertEqual(response.data['total_stays'], 1)
+        self.assertEqual(response.data['total_spent'], 300.0)
+        self.assertEqual(response.data['stay_stats']['average_daily_rate'], '150.00')
+
+        reservation = self.stay(0, 1)
+        with self.assertNumQueries(3):
+            response = client.get(f'/api/reservations/{reservation.id}/')
+        self.assertEqual(response.data['guest_details']['total_stays'], 1)
+
+
+class LoyaltyLedgerTest(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Budi', last_name='Hartono', email='budi@example.com')
+        self.today = date.today()
+
+    def checked_out(self, guest, nights, days_ago=1):
+        check_in = self.today - timedelta(days=days_ago + nights)
+        return Reservation.objects.create(
+            guest=guest, check_in_date=check_in, check_out_date=check_in + timedelta(days=nights),
+            status='CHECKED_OUT'
+        )
+
+    def test_every_change_is_recorded(self):
+        """Test adding and deducting points writes ledger entries and updates the balance"""
+        self.guest.add_loyalty_points(120)
+        self.assertTrue(self.guest.deduct_loyalty_points(20))
+        self.assertFalse(self.guest.deduct_loyalty_points(500))
+        self.assertEqual(self.guest.loyalty_points, 100)
+        self.assertEqual(
+            list(self.guest.loyalty_transactions.order_by('id').values_list('transaction_type', 'points', 'remaining')),
+            [('ADJUST', 120, 100), ('REDEEM', -20, 0)]
+        )
+
+    def test_redeem_uses_stale_instance_safely(self):
+        """Test deductions from two stale copies of a guest cannot overdraw the balance"""
+        adjust_points(self.guest, 100)
+        first = Guest.objects.get(pk=self.guest.pk)
+        second = Guest.objects.get(pk=self.guest.pk)
+        redeem_points(first, 70)
+        with self.assertRaises(InsufficientPoints):
+            redeem_points(second, 70)
+        adjust_points(second, 5)
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.loyalty_points, 35)
+
+    def test_accrual_is_batched_and_runs_once(self):
+        """Test points for many stays are awarded in a fixed number of queries"""
+        other = Guest.objects.create(first_name='Rina', last_name='Sari', email='rina@example.com')
+        stays = [self.checked_out(self.guest, 2), self.checked_out(self.guest, 3), self.checked_out(other, 1)]
+
+        with self.assertNumQueries(5):
+            result = accrue_points([stay.id for stay in stays])
+        self.assertEqual(result, {'reservations': 3, 'points': 60})
+        self.guest.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.guest.loyalty_points, other.loyalty_points), (50, 10))
+
+        self.assertEqual(accrue_points([stay.id for stay in stays])['reservations'], 0)
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.loyalty_points, 50)
+
+    def test_checkout_awards_points(self):
+        """Test checking out a reservation earns points for its nights"""
+        reservation = Reservation.objects.create(
+            guest=self.guest, check_in_date=self.today - timedelta(days=2), check_out_date=self.today,
+            status='CHECKED_IN'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.status = 'CHECKED_OUT'
+            reservation.save()
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.loyalty_points, 20)
+        self.assertEqual(LoyaltyTransaction.objects.get(reservation=reservation).transaction_type, 'EARN')
+
+    def test_expiry_sweeps_unused_points_in_batches(self):
+        """Test only unused points past their expiry date expire"""
+        stays = [self.checked_out(self.guest, 5), self.checked_out(self.guest, 5)]
+        accrue_points([stays[0].id])
+        LoyaltyTransaction.objects.filter(reservation=stays[0]).update(expires_at=self.today - timedelta(days=1))
+        accrue_points([stays[1].id])
+        # 30 of the 50 expiring points are redeemed first
+        redeem_points(self.guest, 30)
+
+        result = expire_points(batch_size=1)
+        self.assertEqual(result, {'entries': 1, 'guests': 1, 'points': 20})
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.loyalty_points, 50)
+        self.assertEqual(self.guest.loyalty_transactions.get(transaction_type='EXPIRE').points, -20)
+        self.assertEqual(expire_points()['entries'], 0)
+
+    def test_loyalty_summary_in_one_query(self):
+        """Test tier counts come from a single grouped query"""
+        Guest.objects.create(first_name='A', last_name='P', email='a@example.com', loyalty_points=1500, is_vip=True)
+        Guest.objects.create(first_name='B', last_name='G', email='b@example.com', loyalty_points=600)
+        Guest.objects.create(first_name='C', last_name='S', email='c@example.com', loyalty_points=100)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='manager', password='pass'))
+
+        with self.assertNumQueries(1):
+            tiers = tier_summary(Guest.objects.filter(is_active=True))
+        self.assertEqual(tiers['platinum'], {'guests': 1, 'vip': 1, 'points': 1500})
+
+        response = client.get('/api/guests/loyalty_summary/')
+        self.assertEqual(response.data, {
+            'total_guests': 4,
+            'vip_guests': 1,
+            'loyalty_levels': {'platinum': 1, 'gold': 1, 'silver': 1, 'bronze': 1},
+            'total_loyalty_points': 2200
+        })
+
+        response = client.post(f'/api/guests/{self.guest.id}/deduct_loyalty_points/', {'points': 10}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['current_balance'], 0)
+        response = client.get(f'/api/guests/{self.guest.id}/loyalty_transactions/')
+        self.assertEqual(response.data, [])
+
+
+class GuestSegmentTest(TestCase):
+    def setUp(self):
+        self.today = date.today()
+
+    def guest_with_stats(self, name, stays, spent, days_ago):
+        guest = Guest.objects.create(first_name=name, last_name='Guest', email=f'{name.lower()}@example.com')
+        GuestStats.objects.create(
+            guest=guest, total_stays=stays, total_nights=stays * 2, total_spent=Decimal(spent),
+            last_stay_date=self.today - timedelta(days=days_ago)
+        )
+        return guest
+
+    def test_scores_rank_values_into_fifths(self):
+        """Test values are scored by the fifth they fall in, ties sharing a score"""
+        self.assertEqual(list(score_values(list(range(10)))), [1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+        self.assertEqual(list(score_values([1, 1, 1, 1, 3])), [1, 1, 1, 1, 5])
+        self.assertEqual(list(score_values([0, 10, 400], higher_is_better=False)), [5, 4, 2])
+        self.assertEqual(segment_for(5, 5, 5), 'CHAMPIONS')
+        self.assertEqual(segment_for(1, 3, 5), 'HIGH_VALUE_LAPSED')
+        self.assertEqual(segment_for(2, 4, 4), 'AT_RISK')
+        self.assertEqual(segment_for(5, 1, 2), 'NEW')
+        self.assertEqual(segment_for(3, 2, 2), 'NEEDS_ATTENTION')
+
+    def test_segment_guests_and_filter(self):
+        """Test every guest is scored and segments can be filtered through the API"""
+        champion = self.guest_with_stats('Champion', 12, '9000.00', 5)
+        lapsed = self.guest_with_stats('Lapsed', 4, '8000.00', 500)
+        newcomer = self.guest_with_stats('Newcomer', 1, '150.00', 2)
+        for index in range(7):
+            self.guest_with_stats(f'Regular{index}', 1 + index % 2, f'{100 + index * 20}.00', 60 + index * 30)
+        never = Guest.objects.create(first_name='Never', last_name='Stayed', email='never@example.com')
+        GuestStats.objects.create(guest=never)
+
+        result = segment_guests()
+        self.assertEqual(result['guests'], 10)
+        self.assertEqual(result['unscored'], 1)
+
+        champion.stats.refresh_from_db()
+        self.assertEqual(
+            (champion.stats.recency_score, champion.stats.frequency_score, champion.stats.monetary_score),
+            (5, 5, 5)
+        )
+        self.assertEqual(champion.stats.segment, 'CHAMPIONS')
+        self.assertEqual(GuestStats.objects.get(guest=newcomer).segment, 'NEW')
+        self.assertEqual(GuestStats.objects.get(guest=never).segment, '')
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='marketing', password='pass'))
+        response = client.get('/api/guests/', {'stats__segment': 'HIGH_VALUE_LAPSED'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [lapsed.id])
+        self.assertEqual(response.data['results'][0]['segment'], 'HIGH_VALUE_LAPSED')
+
+        response = client.get('/api/guests/segments/')
+        counts = {row['segment']: row['guests'] for row in response.data}
+        self.assertEqual(sum(counts.values()), 10)
+        self.assertEqual(counts['CHAMPIONS'], 1)
+
+
+class GuestPreferenceTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='frontdesk', password='pass'))
+        self.high = Guest.objects.create(
+            first_name='Tinggi', last_name='Guest', email='high@example.com', is_vip=True,
+            preferences={'floor': 'high', 'bed': 'king', 'smoking': False, 'pillow': 'soft'}
+        )
+        self.smoker = Guest.objects.create(
+            first_name='Rokok', last_name='Guest', email='smoker@example.com',
+            preferences={'floor': 'low', 'smoking': True}
+        )
+        self.plain = Guest.objects.create(first_name='Biasa', last_name='Guest', email='plain@example.com')
+
+    def test_promoted_columns_follow_preferences(self):
+        """Test promoted columns are kept in sync by saves and bulk updates"""
+        self.assertEqual(PROMOTED_PREFERENCES, {'floor': 'pref_floor', 'bed': 'pref_bed', 'smoking': 'pref_smoking'})
+        self.high.refresh_from_db()
+        self.assertEqual((self.high.pref_floor, self.high.pref_bed, self.high.pref_smoking), ('high', 'king', False))
+        self.plain.refresh_from_db()
+        self.assertEqual((self.plain.pref_floor, self.plain.pref_smoking), (None, None))
+
+        Guest.objects.filter(pk=self.plain.pk).update(preferences={'floor': 'high', 'smoking': True})
+        self.assertEqual(
+            set(Guest.objects.filter(pref_floor='high').values_list('id', flat=True)), {self.high.id, self.plain.id}
+        )
+        self.assertEqual(
+            set(Guest.objects.filter(pref_smoking=True).values_list('id', flat=True)), {self.smoker.id, self.plain.id}
+        )
+
+    def test_filter_lists_by_preference(self):
+        """Test pref_ parameters filter guest and reservation lists"""
+        response = self.client.get('/api/guests/', {'pref_floor': 'high'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.high.id])
+        response = self.client.get('/api/guests/', {'pref_smoking': 'true'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.smoker.id])
+        # Keys without a column fall back to the JSON path
+        response = self.client.get('/api/guests/', {'pref_pillow': 'soft'})
+        self.assertEqual([guest['id'] for guest in response.data['results']], [self.high.id])
+
+        today = date.today()
+        reservations = {
+            guest.id: Reservation.objects.create(
+                guest=guest, check_in_date=today, check_out_date=today + timedelta(days=2), status='CONFIRMED'
+            )
+            for guest in (self.high, self.smoker)
+        }
+        response = self.client.get('/api/reservations/', {'pref_floor': 'low'})
+        self.assertEqual([res['id'] for res in response.data['results']], [reservations[self.smoker.id].id])
+
+        response = self.client.get('/api/reservations/vip_prep_list/')
+        self.assertEqual(response.data['total_arrivals'], 1)
+        self.assertEqual(
+            response.data['arrivals'][0]['preferences'], {'floor': 'high', 'bed': 'king', 'smoking': False}
+        )
+        response = self.client.get('/api/reservations/vip_prep_list/', {'date': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
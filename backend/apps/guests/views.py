@@ -3,23 +3,34 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import Guest, GuestDocument
+from .dedup import merge_candidate, merge_guests
+from .loyalty import InsufficientPoints, adjust_points, redeem_points, tier_summary
+from .models import Guest, GuestDocument, DuplicateCandidate
+from .preferences import GuestPreferenceFilter
+from .search import GuestSearchFilter, search_guest_ids
+from .segments import segment_summary
 from .serializers import (
     GuestSerializer, GuestListSerializer, GuestCreateUpdateSerializer,
-    GuestDocumentSerializer, LoyaltyPointsSerializer
+    GuestDocumentSerializer, LoyaltyPointsSerializer, LoyaltyTransactionSerializer,
+    DuplicateCandidateSerializer,
+    MergeGuestsSerializer, MergeCandidateSerializer
 )
 
 
 class GuestViewSet(viewsets.ModelViewSet):
     """ViewSet for managing guests"""
-    queryset = Guest.objects.select_related().prefetch_related('documents', 'reservations')
+    queryset = Guest.objects.select_related('stats').prefetch_related('documents', 'reservations')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['nationality', 'gender', 'is_vip', 'is_active']
+    filter_backends = [DjangoFilterBackend, GuestSearchFilter, GuestPreferenceFilter]
+    filterset_fields = [
+        'nationality', 'gender', 'is_vip', 'is_active', 'stats__segment',
+        'stats__recency_score', 'stats__frequency_score', 'stats__monetary_score'
+    ]
     search_fields = ['first_name', 'last_name', 'email', 'phone']
+    guest_search_field = 'pk'
     ordering_fields = ['first_name', 'last_name', 'loyalty_points', 'created_at']
     ordering = ['last_name', 'first_name']
 
@@ -37,21 +48,21 @@ class GuestViewSet(viewsets.ModelViewSet):
         serializer = GuestListSerializer(vip_guests, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def segments(self, request):
+        """Get the number of guests in each RFM segment"""
+        return Response(segment_summary())
+
     @action(detail=False, methods=['get'])
     def loyalty_summary(self, request):
         """Get loyalty program summary"""
-        guests = self.get_queryset().filter(is_active=True)
+        tiers = tier_summary(self.get_queryset().filter(is_active=True))
         
         summary = {
-            'total_guests': guests.count(),
-            'vip_guests': guests.filter(is_vip=True).count(),
-            'loyalty_levels': {
-                'platinum': guests.filter(loyalty_points__gte=1000).count(),
-                'gold': guests.filter(loyalty_points__gte=500, loyalty_points__lt=1000).count(),
-                'silver': guests.filter(loyalty_points__gte=100, loyalty_points__lt=500).count(),
-                'bronze': guests.filter(loyalty_points__lt=100).count()
-            },
-            'total_loyalty_points': guests.aggregate(total=Sum('loyalty_points'))['total'] or 0
+            'total_guests': sum(tier['guests'] for tier in tiers.values()),
+            'vip_guests': sum(tier['vip'] for tier in tiers.values()),
+            'loyalty_levels': {name: tier['guests'] for name, tier in tiers.items()},
+            'total_loyalty_points': sum(tier['points'] for tier in tiers.values())
         }
         
         return Response(summary)
@@ -68,19 +79,20 @@ class GuestViewSet(viewsets.ModelViewSet):
         points = serializer.validated_data['points']
         reason = serializer.validated_data['reason']
         
-        guest.add_loyalty_points(points)
+        entry = adjust_points(guest, points, reason)
         
         return Response({
             'success': True,
             'message': f'Added {points} loyalty points to {guest.full_name}',
             'reason': reason,
             'new_balance': guest.loyalty_points,
-            'loyalty_level': GuestSerializer(guest).data['loyalty_level']
+            'loyalty_level': GuestSerializer(guest).data['loyalty_level'],
+            'transaction': LoyaltyTransactionSerializer(entry).data
         })
 
     @action(detail=True, methods=['post'])
     def deduct_loyalty_points(self, request, pk=None):
-        """Deduct loyalty points from a guest"""
+        """Redeem loyalty points of a guest"""
         guest = self.get_object()
         serializer = LoyaltyPointsSerializer(data=request.data)
         
@@ -90,22 +102,37 @@ class GuestViewSet(viewsets.ModelViewSet):
         points = serializer.validated_data['points']
         reason = serializer.validated_data['reason']
         
-        if guest.deduct_loyalty_points(points):
-            return Response({
-                'success': True,
-                'message': f'Deducted {points} loyalty points from {guest.full_name}',
-                'reason': reason,
-                'new_balance': guest.loyalty_points,
-                'loyalty_level': GuestSerializer(guest).data['loyalty_level']
-            })
-        else:
+        try:
+            entry = redeem_points(guest, points, reason)
+        except InsufficientPoints as e:
             return Response({
                 'success': False,
                 'error': 'Insufficient loyalty points',
-                'current_balance': guest.loyalty_points,
+                'current_balance': e.balance,
                 'requested_deduction': points
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response({
+            'success': True,
+            'message': f'Deducted {points} loyalty points from {guest.full_name}',
+            'reason': reason,
+            'new_balance': guest.loyalty_points,
+            'loyalty_level': GuestSerializer(guest).data['loyalty_level'],
+            'transaction': LoyaltyTransactionSerializer(entry).data
+        })
+
+    @action(detail=True, methods=['get'])
+    def loyalty_transactions(self, request, pk=None):
+        """Get the loyalty points ledger of a guest"""
+        guest = self.get_object()
+        transactions = guest.loyalty_transactions.select_related('reservation')
+        
+        transaction_type = request.query_params.get('type')
+        if transaction_type:
+            transactions = transactions.filter(transaction_type=transaction_type.upper())
+        
+        return Response(LoyaltyTransactionSerializer(transactions, many=True).data)
+
     @action(detail=True, methods=['get'])
     def reservation_history(self, request, pk=None):
         """Get guest's reservation history"""
@@ -175,24 +202,97 @@ class GuestViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Advanced guest search"""
-        query = request.query_params.get('q', '')
+        """Ranked guest search tolerating typos and spelling variants"""
+        query = request.query_params.get('q', '').strip()
         if not query:
             return Response({'error': 'Query parameter "q" is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        guests = self.get_queryset().filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query) |
-            Q(phone__icontains=query) |
-            Q(documents__document_number__icontains=query)
-        ).distinct()
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 200)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ranked = search_guest_ids(query, limit=limit)
+        scores = dict(ranked)
+        guests = self.get_queryset().filter(merged_into__isnull=True).in_bulk(scores.keys())
+        results = [guests[guest_id] for guest_id, _ in ranked if guest_id in guests]
+        
+        # Document numbers are matched as a whole, those kept with merged
+        # guests finding the guest they were merged into
+        by_document = self.get_queryset().filter(
+            Q(documents__document_number__iexact=query) | Q(merged_guests__documents__document_number__iexact=query),
+            merged_into__isnull=True
+        ).exclude(id__in=scores.keys()).distinct()
+        results = (list(by_document[:limit]) + results)[:limit]
+        
+        data = GuestListSerializer(results, many=True).data
+        for guest in data:
+            guest['score'] = scores.get(guest['id'], 1.0)
+        return Response({
+            'query': query,
+            'count': len(data),
+            'results': data
+        })
+
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        """Suggest guests while a name, email or phone number is typed"""
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            return Response({'query': query, 'results': []})
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 25)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = GuestListSerializer(guests, many=True)
+        ranked = search_guest_ids(query, limit=limit)
+        guests = {
+            guest['id']: guest
+            for guest in Guest.objects.filter(
+                id__in=[guest_id for guest_id, _ in ranked], is_active=True
+            ).values('id', 'first_name', 'last_name', 'email', 'phone', 'is_vip')
+        }
         return Response({
             'query': query,
-            'count': len(serializer.data),
-            'results': serializer.data
+            'results': [
+                {
+                    'id': guest_id,
+                    'full_name': f"{guests[guest_id]['first_name']} {guests[guest_id]['last_name']}",
+                    'email': guests[guest_id]['email'],
+                    'phone': guests[guest_id]['phone'],
+                    'is_vip': guests[guest_id]['is_vip'],
+                    'score': score
+                }
+                for guest_id, score in ranked if guest_id in guests
+            ]
+        })
+
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Merge duplicate guest records into this guest"""
+        guest = self.get_object()
+        serializer = MergeGuestsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        ids = set(serializer.validated_data['duplicates']) - {guest.id}
+        duplicates = list(Guest.objects.filter(id__in=ids, is_active=True))
+        if len(duplicates) != len(ids):
+            return Response({
+                'error': 'Duplicates must be other active guests'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not guest.is_active:
+            return Response({'error': 'Cannot merge into an inactive guest'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = merge_guests(guest, duplicates)
+        guest.refresh_from_db()
+        
+        return Response({
+            'success': True,
+            'message': f"{result['merged']} guests merged into {guest.full_name}",
+            **result,
+            'guest': GuestSerializer(guest).data
         })
 
 
@@ -225,4 +325,46 @@ class GuestDocumentViewSet(viewsets.ModelViewSet):
             expiry_date__gt=timezone.now().date()
         )
         serializer = self.get_serializer(expiring_docs, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class DuplicateCandidateViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for reviewing likely duplicate guests"""
+    queryset = DuplicateCandidate.objects.select_related('guest', 'duplicate')
+    serializer_class = DuplicateCandidateSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'guest', 'duplicate']
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Merge the pair, keeping the older guest unless another is chosen"""
+        candidate = self.get_object()
+        serializer = MergeCandidateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        keep = serializer.validated_data.get('keep')
+        
+        if candidate.status != 'PENDING':
+            return Response({
+                'error': f'Cannot merge candidate with status: {candidate.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if keep is not None and keep not in (candidate.guest_id, candidate.duplicate_id):
+            return Response({'error': 'keep must be one of the two guests'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (candidate.guest.is_active and candidate.duplicate.is_active):
+            return Response({'error': 'One of the guests was already merged'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        guest, result = merge_candidate(candidate, keep=keep)
+        guest.refresh_from_db()
+        
+        return Response({
+            'success': True,
+            **result,
+            'guest': GuestSerializer(guest).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """Mark the pair as different guests"""
+        candidate = self.get_object()
+        candidate.status = 'DISMISSED'
+        candidate.save(update_fields=['status', 'updated_at'])
+        return Response({'success': True, 'candidate': DuplicateCandidateSerializer(candidate).data})
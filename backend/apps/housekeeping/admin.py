@@ -0,0 +1,30 @@
+from django.contrib import admin
+from .models import HousekeepingTask
+
+
+@admin.register(HousekeepingTask)
+class HousekeepingTaskAdmin(admin.ModelAdmin):
+    list_display = ('room', 'task_type', 'status', 'scheduled_date', 'due_at', 'assigned_to', 'estimated_minutes', 'completed_at')
+    list_filter = ('status', 'task_type', 'scheduled_date', 'room__floor')
+    search_fields = ('room__number', 'assigned_to__user__first_name', 'assigned_to__user__last_name', 'notes')
+    readonly_fields = ('check_out', 'next_reservation', 'due_at', 'started_at', 'completed_at', 'created_at', 'updated_at')
+    date_hierarchy = 'scheduled_date'
+    
+    fieldsets = (
+        ('Task', {
+            'fields': ('room', 'task_type', 'status', 'scheduled_date', 'estimated_minutes', 'release_room')
+        }),
+        ('Assignment', {
+            'fields': ('assigned_to', 'started_at', 'completed_at')
+        }),
+        ('Priority', {
+            'fields': ('due_at', 'next_reservation', 'check_out'),
+        }),
+        ('Additional Information', {
+            'fields': ('notes', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room', 'assigned_to__user')
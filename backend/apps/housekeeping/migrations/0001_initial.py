@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('checkin', '0001_initial'),
+        ('employees', '0001_initial'),
+        ('reservations', '0003_groupblock_reservation_group_block_and_more'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HousekeepingTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(choices=[('DEPARTURE', 'Departure Clean'), ('STAYOVER', 'Stay-over Service'), ('TOUCH_UP', 'Touch-up')], default='DEPARTURE', max_length=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('ASSIGNED', 'Assigned'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=20)),
+                ('scheduled_date', models.DateField()),
+                ('due_at', models.DateTimeField(blank=True, help_text='Time the room is needed by the next arrival', null=True)),
+                ('estimated_minutes', models.PositiveIntegerField(default=30)),
+                ('release_room', models.BooleanField(default=False, help_text='Make the room available again when the task is completed')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='housekeeping_tasks', to='employees.employee')),
+                ('check_out', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='housekeeping_tasks', to='checkin.checkout')),
+                ('next_reservation', models.ForeignKey(blank=True, help_text='Next arrival in this room, which sets the task priority', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='housekeeping_tasks', to='reservations.reservation')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='housekeeping_tasks', to='rooms.room')),
+            ],
+            options={
+                'verbose_name': 'Housekeeping Task',
+                'verbose_name_plural': 'Housekeeping Tasks',
+                'ordering': [models.OrderBy(models.F('due_at'), nulls_last=True), 'scheduled_date', 'room__number'],
+                'indexes': [models.Index(fields=['status', 'scheduled_date'], name='housekeepin_status_3a6fe1_idx'), models.Index(fields=['assigned_to', 'status'], name='housekeepin_assigne_e4f54b_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'CANCELLED'), _negated=True), fields=('room', 'scheduled_date', 'task_type'), name='unique_open_housekeeping_task')],
+            },
+        ),
+    ]
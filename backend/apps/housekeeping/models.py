@@ -0,0 +1,98 @@
+from django.db import models
+from django.utils import timezone
+from apps.checkin.models import CheckOut
+from apps.employees.models import Employee
+from apps.reservations.models import Reservation
+from apps.rooms.models import Room
+
+
+class HousekeepingTask(models.Model):
+    TASK_TYPE_CHOICES = [
+        ('DEPARTURE', 'Departure Clean'),
+        ('STAYOVER', 'Stay-over Service'),
+        ('TOUCH_UP', 'Touch-up'),
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('ASSIGNED', 'Assigned'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    OPEN_STATUSES = ['PENDING', 'ASSIGNED', 'IN_PROGRESS']
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='housekeeping_tasks')
+    task_type = models.CharField(max_length=20, choices=TASK_TYPE_CHOICES, default='DEPARTURE')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    scheduled_date = models.DateField()
+    assigned_to = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='housekeeping_tasks'
+    )
+    check_out = models.ForeignKey(
+        CheckOut, on_delete=models.SET_NULL, null=True, blank=True, related_name='housekeeping_tasks'
+    )
+    next_reservation = models.ForeignKey(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True, related_name='housekeeping_tasks',
+        help_text='Next arrival in this room, which sets the task priority'
+    )
+    due_at = models.DateTimeField(null=True, blank=True, help_text='Time the room is needed by the next arrival')
+    estimated_minutes = models.PositiveIntegerField(default=30)
+    release_room = models.BooleanField(
+        default=False, help_text='Make the room available again when the task is completed'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = [models.F('due_at').asc(nulls_last=True), 'scheduled_date', 'room__number']
+        verbose_name = 'Housekeeping Task'
+        verbose_name_plural = 'Housekeeping Tasks'
+        indexes = [
+            models.Index(fields=['status', 'scheduled_date']),
+            models.Index(fields=['assigned_to', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['room', 'scheduled_date', 'task_type'],
+                condition=~models.Q(status='CANCELLED'),
+                name='unique_open_housekeeping_task'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_task_type_display()} - Room {self.room.number} ({self.scheduled_date})"
+
+    @property
+    def is_open(self):
+        return self.status in self.OPEN_STATUSES
+
+    def start(self, employee=None):
+        """Mark the task as started, optionally by a given attendant"""
+        self.status = 'IN_PROGRESS'
+        self.started_at = timezone.now()
+        if employee is not None:
+            self.assigned_to = employee
+        self.save(update_fields=['status', 'started_at', 'assigned_to', 'updated_at'])
+
+    def complete(self, notes=None):
+        """Mark the task as completed and release the room when it was waiting on it"""
+        self.status = 'COMPLETED'
+        self.completed_at = timezone.now()
+        if notes:
+            self.notes = f"{self.notes}\n{notes}" if self.notes else notes
+        self.save(update_fields=['status', 'completed_at', 'notes', 'updated_at'])
+
+        if self.release_room and self.room.status == 'MAINTENANCE':
+            still_open = HousekeepingTask.objects.filter(
+                room_id=self.room_id,
+                release_room=True,
+                status__in=self.OPEN_STATUSES
+            ).exists()
+            if not still_open:
+                self.room.status = 'AVAILABLE'
+                self.room.save(update_fields=['status', 'updated_at'])
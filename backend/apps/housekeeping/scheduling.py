@@ -0,0 +1,258 @@
+"""
+Housekeeping task generation, prioritisation and assignment.
+
+Tasks are generated in bulk for the rooms of the day's check-outs
+(departure cleans) and for occupied rooms whose guests stay on (stay-over
+service). Each task is due when its room is needed next: the check-in time
+of the next arrival booked into the room, or of today's room-type bookings
+still waiting for a room of that type. Open tasks form a priority queue
+ordered by that due time.
+
+Assignment walks the queue in priority order and hands every task to the
+attendant with the least work so far (a min-heap keyed on assigned
+minutes), so the most urgent rooms are spread across attendants and
+cleaned first.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from apps.checkin.models import CheckOut
+from apps.employees.models import Employee
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import Room
+from .models import HousekeepingTask
+
+
+# Typical minutes needed per task type, used to balance attendant workload
+ESTIMATED_MINUTES = {
+    'DEPARTURE': 45,
+    'STAYOVER': 20,
+    'TOUCH_UP': 10,
+}
+
+# Reservation statuses that are still expected to arrive
+ARRIVING_STATUSES = ['PENDING', 'CONFIRMED']
+
+# Room conditions at check-out that need a departure clean. Damaged rooms are
+# out of order and go to maintenance instead.
+CLEANING_CONDITIONS = ['CLEAN', 'NEEDS_CLEANING', 'MAINTENANCE_REQUIRED']
+
+
+def check_in_time():
+    """Standard check-in time from ``HOTEL_CHECK_IN_TIME`` ("HH:MM")"""
+    value = getattr(settings, 'HOTEL_CHECK_IN_TIME', '14:00')
+    hours, minutes = value.split(':')
+    return time(int(hours), int(minutes))
+
+
+def arrival_due_at(day):
+    return timezone.make_aware(datetime.combine(day, check_in_time()))
+
+
+def housekeeping_attendants(employee_ids=None):
+    """Active employees of the housekeeping department"""
+    attendants = Employee.objects.filter(
+        is_active=True,
+        employment_status='ACTIVE',
+        department__name__iexact=getattr(settings, 'HOUSEKEEPING_DEPARTMENT', 'Housekeeping')
+    )
+    if employee_ids:
+        attendants = attendants.filter(id__in=employee_ids)
+    return attendants
+
+
+def create_departure_tasks(checkouts):
+    """Create departure cleans for check-outs, skipping rooms already tasked.
+
+    ``checkouts`` are ``CheckOut`` instances or ids. Returns the created tasks.
+    """
+    checkout_ids = [getattr(checkout, 'id', checkout) for checkout in checkouts]
+    rows = list(
+        CheckOut.objects.filter(
+            id__in=checkout_ids,
+            room_condition__in=CLEANING_CONDITIONS
+        ).values_list('id', 'room_condition', 'actual_check_out_time', 'check_in__reservation_id')
+    )
+    if not rows:
+        return []
+
+    rooms = defaultdict(list)
+    for reservation_id, room_id in ReservationRoom.objects.filter(
+        reservation_id__in=[row[3] for row in rows]
+    ).values_list('reservation_id', 'room_id'):
+        rooms[reservation_id].append(room_id)
+
+    days = {timezone.localtime(row[2]).date() for row in rows}
+    existing = set(
+        HousekeepingTask.objects.filter(
+            scheduled_date__in=days, task_type='DEPARTURE'
+        ).exclude(status='CANCELLED').values_list('room_id', 'scheduled_date')
+    )
+
+    tasks = []
+    for checkout_id, room_condition, checked_out_at, reservation_id in rows:
+        day = timezone.localtime(checked_out_at).date()
+        for room_id in rooms[reservation_id]:
+            if (room_id, day) in existing:
+                continue
+            existing.add((room_id, day))
+            tasks.append(HousekeepingTask(
+                room_id=room_id,
+                task_type='DEPARTURE',
+                scheduled_date=day,
+                check_out_id=checkout_id,
+                estimated_minutes=ESTIMATED_MINUTES['DEPARTURE'],
+                release_room=room_condition == 'NEEDS_CLEANING'
+            ))
+    tasks = HousekeepingTask.objects.bulk_create(tasks)
+    prioritize_tasks(days)
+    return tasks
+
+
+def create_stayover_tasks(day):
+    """Create stay-over service for rooms whose guests neither arrive nor leave on ``day``"""
+    room_ids = set(
+        ReservationRoom.objects.filter(
+            reservation__status='CHECKED_IN',
+            reservation__check_in_date__lt=day,
+            reservation__check_out_date__gt=day
+        ).values_list('room_id', flat=True)
+    )
+    existing = set(
+        HousekeepingTask.objects.filter(
+            scheduled_date=day, task_type='STAYOVER', room_id__in=room_ids
+        ).exclude(status='CANCELLED').values_list('room_id', flat=True)
+    )
+    return HousekeepingTask.objects.bulk_create([
+        HousekeepingTask(
+            room_id=room_id,
+            task_type='STAYOVER',
+            scheduled_date=day,
+            estimated_minutes=ESTIMATED_MINUTES['STAYOVER']
+        )
+        for room_id in sorted(room_ids - existing)
+    ])
+
+
+def prioritize_tasks(days):
+    """Set ``due_at`` and ``next_reservation`` of open tasks from upcoming arrivals"""
+    tasks = list(
+        HousekeepingTask.objects.filter(
+            scheduled_date__in=days, status__in=HousekeepingTask.OPEN_STATUSES
+        ).select_related('room')
+    )
+    if not tasks:
+        return 0
+
+    first_day = min(days)
+    arrivals = {}
+    for room_id, reservation_id, check_in_date in ReservationRoom.objects.filter(
+        room_id__in={task.room_id for task in tasks},
+        reservation__status__in=ARRIVING_STATUSES,
+        reservation__check_in_date__gte=first_day
+    ).order_by('reservation__check_in_date').values_list(
+        'room_id', 'reservation_id', 'reservation__check_in_date'
+    ):
+        arrivals.setdefault(room_id, (reservation_id, check_in_date))
+
+    # Arrivals booked by room type without a room yet need one room of the
+    # type each; the lowest-numbered departures of that type are kept for them
+    demand = defaultdict(int)
+    for room_type_id, day, missing in Reservation.objects.filter(
+        status__in=ARRIVING_STATUSES,
+        requested_room_type__isnull=False,
+        check_in_date__in=days
+    ).annotate(
+        assigned_rooms=Count('rooms')
+    ).filter(
+        assigned_rooms__lt=F('rooms_requested')
+    ).values_list('requested_room_type_id', 'check_in_date', F('rooms_requested') - F('assigned_rooms')):
+        demand[(room_type_id, day)] += missing
+
+    changed = []
+    for task in sorted(tasks, key=lambda t: (t.task_type, t.room.number)):
+        next_reservation, due_at = None, None
+        arrival = arrivals.get(task.room_id)
+        if arrival is not None:
+            next_reservation, due_at = arrival[0], arrival_due_at(arrival[1])
+        elif task.task_type == 'DEPARTURE' and demand[(task.room.room_type_id, task.scheduled_date)] > 0:
+            demand[(task.room.room_type_id, task.scheduled_date)] -= 1
+            due_at = arrival_due_at(task.scheduled_date)
+        if task.next_reservation_id != next_reservation or task.due_at != due_at:
+            task.next_reservation_id = next_reservation
+            task.due_at = due_at
+            changed.append(task)
+
+    HousekeepingTask.objects.bulk_update(changed, ['next_reservation', 'due_at'], batch_size=500)
+    return len(changed)
+
+
+def generate_tasks(day=None):
+    """Generate departure and stay-over tasks for a day and refresh priorities"""
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        departures = create_departure_tasks(
+            CheckOut.objects.filter(actual_check_out_time__date=day).values_list('id', flat=True)
+        )
+        stayovers = create_stayover_tasks(day)
+        prioritize_tasks([day])
+    return {'date': day, 'departures': len(departures), 'stayovers': len(stayovers)}
+
+
+def task_queue(day=None, floor=None):
+    """Open tasks up to a day, most urgent first"""
+    day = day or timezone.localdate()
+    tasks = HousekeepingTask.objects.filter(
+        scheduled_date__lte=day,
+        status__in=HousekeepingTask.OPEN_STATUSES
+    ).select_related('room', 'assigned_to__user', 'next_reservation')
+    if floor is not None:
+        tasks = tasks.filter(room__floor=floor)
+    # Departure cleans sort before stay-overs when due at the same time
+    return tasks.order_by(F('due_at').asc(nulls_last=True), 'task_type', 'room__number')
+
+
+def assign_tasks(day=None, employee_ids=None, rebalance=False):
+    """Assign pending tasks to housekeeping attendants, balancing workload.
+
+    With ``rebalance`` set, assigned tasks that have not been started are
+    handed out again as well. Returns ``(assignments, workload)`` where
+    workload maps employee ids to assigned minutes.
+    """
+    day = day or timezone.localdate()
+    attendants = list(housekeeping_attendants(employee_ids).values_list('id', flat=True))
+    if not attendants:
+        raise ValueError('No active housekeeping attendants to assign tasks to')
+
+    with transaction.atomic():
+        statuses = ['PENDING', 'ASSIGNED'] if rebalance else ['PENDING']
+        tasks = list(task_queue(day).filter(status__in=statuses).select_for_update(of=('self',)))
+
+        workload = dict.fromkeys(attendants, 0)
+        busy = HousekeepingTask.objects.filter(
+            scheduled_date__lte=day,
+            assigned_to_id__in=attendants,
+            status__in=['IN_PROGRESS'] if rebalance else ['ASSIGNED', 'IN_PROGRESS']
+        ).values('assigned_to_id').annotate(minutes=Sum('estimated_minutes'))
+        for row in busy:
+            workload[row['assigned_to_id']] = row['minutes']
+
+        heap = [(minutes, employee_id) for employee_id, minutes in workload.items()]
+        heapq.heapify(heap)
+        now = timezone.now()
+        for task in tasks:
+            minutes, employee_id = heapq.heappop(heap)
+            task.assigned_to_id = employee_id
+            task.status = 'ASSIGNED'
+            task.updated_at = now
+            heapq.heappush(heap, (minutes + task.estimated_minutes, employee_id))
+            workload[employee_id] = minutes + task.estimated_minutes
+
+        HousekeepingTask.objects.bulk_update(tasks, ['assigned_to', 'status', 'updated_at'], batch_size=500)
+    return tasks, workload
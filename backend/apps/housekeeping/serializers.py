@@ -0,0 +1,41 @@
+from rest_framework import serializers
+from .models import HousekeepingTask
+
+
+class HousekeepingTaskSerializer(serializers.ModelSerializer):
+    room_number = serializers.CharField(source='room.number', read_only=True)
+    floor = serializers.IntegerField(source='room.floor', read_only=True)
+    room_status = serializers.CharField(source='room.status', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.full_name', read_only=True)
+    next_reservation_number = serializers.CharField(source='next_reservation.reservation_number', read_only=True)
+    task_type_display = serializers.CharField(source='get_task_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = HousekeepingTask
+        fields = [
+            'id', 'room', 'room_number', 'floor', 'room_status', 'task_type', 'task_type_display',
+            'status', 'status_display', 'scheduled_date', 'assigned_to', 'assigned_to_name',
+            'check_out', 'next_reservation', 'next_reservation_number', 'due_at',
+            'estimated_minutes', 'release_room', 'started_at', 'completed_at', 'notes',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'check_out', 'next_reservation', 'due_at', 'started_at', 'completed_at',
+            'created_at', 'updated_at'
+        ]
+
+
+class GenerateTasksSerializer(serializers.Serializer):
+    """Serializer for generating the day's housekeeping tasks"""
+    date = serializers.DateField(required=False, help_text="Day to generate tasks for, defaults to today")
+
+
+class AssignTasksSerializer(serializers.Serializer):
+    """Serializer for batch assignment of housekeeping tasks"""
+    date = serializers.DateField(required=False, help_text="Assign tasks due up to this day, defaults to today")
+    employees = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text="Attendants to assign to, defaults to all active housekeeping staff"
+    )
+    rebalance = serializers.BooleanField(default=False, help_text="Also redistribute tasks not started yet")
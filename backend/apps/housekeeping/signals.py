@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.checkin.batch import checkouts_processed
+from apps.checkin.models import CheckOut
+from .scheduling import create_departure_tasks
+
+
+@receiver(post_save, sender=CheckOut)
+def queue_departure_clean(sender, instance, created, raw=False, **kwargs):
+    """Queue a departure clean as soon as a guest checks out"""
+    if created and not raw:
+        checkout_id = instance.id
+        transaction.on_commit(lambda: create_departure_tasks([checkout_id]))
+
+
+@receiver(checkouts_processed)
+def queue_group_departure_cleans(sender, checkouts, **kwargs):
+    create_departure_tasks(checkouts)
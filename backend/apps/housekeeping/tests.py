@@ -0,0 +1,157 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from decimal import Decimal
+from datetime import date, datetime, timedelta
+from apps.checkin.batch import batch_check_in, batch_check_out
+from apps.checkin.models import CheckIn, CheckOut
+from apps.employees.models import Department, Employee
+from apps.guests.models import Guest
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import RoomType, Room
+from .models import HousekeepingTask
+from .scheduling import assign_tasks, generate_tasks, task_queue
+
+
+class HousekeepingTestMixin:
+    def setUp(self):
+        self.room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        self.rooms = [
+            Room.objects.create(number=f'{101 + i}', room_type=self.room_type, floor=1)
+            for i in range(6)
+        ]
+        self.guest = Guest.objects.create(first_name='John', last_name='Doe', email='john@example.com')
+        self.today = date.today()
+        department = Department.objects.create(name='Housekeeping')
+        self.attendants = [
+            Employee.objects.create(
+                user=User.objects.create(username=f'attendant{i}', first_name='Attendant', last_name=str(i)),
+                department=department
+            )
+            for i in range(2)
+        ]
+
+    def stay(self, room, check_in, check_out, status='CONFIRMED'):
+        reservation = Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=check_in,
+            check_out_date=check_out,
+            status=status
+        )
+        ReservationRoom.objects.create(reservation=reservation, room=room, rate=Decimal('100.00'))
+        return reservation
+
+    def check_out(self, room, condition='NEEDS_CLEANING'):
+        reservation = self.stay(room, self.today - timedelta(days=2), self.today)
+        checkin = CheckIn.objects.create(reservation=reservation, actual_check_in_time=datetime.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            return CheckOut.objects.create(
+                check_in=checkin,
+                actual_check_out_time=datetime.now(),
+                room_condition=condition
+            )
+
+
+class HousekeepingTaskGenerationTest(HousekeepingTestMixin, TestCase):
+    def test_check_out_queues_departure_clean(self):
+        """Test a check-out creates a departure clean that releases the room"""
+        self.check_out(self.rooms[0])
+        task = HousekeepingTask.objects.get(room=self.rooms[0])
+        self.assertEqual(task.task_type, 'DEPARTURE')
+        self.assertTrue(task.release_room)
+        self.rooms[0].refresh_from_db()
+        self.assertEqual(self.rooms[0].status, 'MAINTENANCE')
+
+    def test_batch_check_out_queues_departure_cleans(self):
+        """Test group check-outs queue a clean per room"""
+        reservations = [self.stay(room, self.today, self.today + timedelta(days=1)) for room in self.rooms[:3]]
+        ids = [reservation.id for reservation in reservations]
+        batch_check_in(ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            batch_check_out(ids, room_condition='NEEDS_CLEANING')
+        self.assertEqual(HousekeepingTask.objects.filter(task_type='DEPARTURE', release_room=True).count(), 3)
+
+    def test_damaged_room_gets_no_cleaning_task(self):
+        """Test out-of-order rooms are left to maintenance"""
+        self.check_out(self.rooms[0], condition='DAMAGED')
+        self.assertFalse(HousekeepingTask.objects.exists())
+
+    def test_generate_creates_stayovers_once(self):
+        """Test stay-over rooms get one service task per day"""
+        self.stay(self.rooms[1], self.today - timedelta(days=1), self.today + timedelta(days=2), status='CHECKED_IN')
+        self.stay(self.rooms[2], self.today, self.today + timedelta(days=2), status='CHECKED_IN')
+
+        result = generate_tasks(self.today)
+        self.assertEqual(result['stayovers'], 1)
+        self.assertEqual(generate_tasks(self.today)['stayovers'], 0)
+        self.assertEqual(HousekeepingTask.objects.get().room, self.rooms[1])
+
+    def test_queue_orders_by_next_arrival(self):
+        """Test rooms needed soonest are cleaned first"""
+        for room in self.rooms[:3]:
+            self.check_out(room)
+        self.stay(self.rooms[2], self.today, self.today + timedelta(days=1))
+        self.stay(self.rooms[1], self.today + timedelta(days=1), self.today + timedelta(days=2))
+        generate_tasks(self.today)
+
+        queue = [task.room.number for task in task_queue(self.today)]
+        self.assertEqual(queue, ['103', '102', '101'])
+
+    def test_room_type_arrivals_without_rooms_raise_priority(self):
+        """Test arrivals booked by room type make a departure room urgent"""
+        self.check_out(self.rooms[0])
+        Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=self.today,
+            check_out_date=self.today + timedelta(days=1),
+            requested_room_type=self.room_type,
+            status='CONFIRMED'
+        )
+        generate_tasks(self.today)
+        self.assertIsNotNone(HousekeepingTask.objects.get().due_at)
+
+    def test_completing_task_releases_room(self):
+        """Test finishing a departure clean makes the room available again"""
+        self.check_out(self.rooms[0])
+        task = HousekeepingTask.objects.get()
+        task.start()
+        task.complete(notes='Ready')
+        self.rooms[0].refresh_from_db()
+        self.assertEqual(self.rooms[0].status, 'AVAILABLE')
+        self.assertEqual(task.status, 'COMPLETED')
+
+
+class HousekeepingAssignmentTest(HousekeepingTestMixin, TestCase):
+    def test_assignment_balances_workload(self):
+        """Test tasks are spread so attendants get similar minutes"""
+        for room in self.rooms[:4]:
+            self.check_out(room)
+        self.stay(self.rooms[4], self.today - timedelta(days=1), self.today + timedelta(days=2), status='CHECKED_IN')
+        self.stay(self.rooms[5], self.today - timedelta(days=1), self.today + timedelta(days=2), status='CHECKED_IN')
+        generate_tasks(self.today)
+
+        tasks, workload = assign_tasks(self.today)
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual(sorted(workload.values()), [110, 110])
+        self.assertFalse(HousekeepingTask.objects.filter(assigned_to__isnull=True).exists())
+
+    def test_urgent_tasks_go_to_different_attendants(self):
+        """Test the two most urgent rooms are cleaned in parallel"""
+        for room in self.rooms[:4]:
+            self.check_out(room)
+        self.stay(self.rooms[0], self.today, self.today + timedelta(days=1))
+        self.stay(self.rooms[1], self.today, self.today + timedelta(days=1))
+        generate_tasks(self.today)
+
+        assign_tasks(self.today)
+        urgent = HousekeepingTask.objects.filter(room__in=self.rooms[:2])
+        self.assertEqual(len({task.assigned_to_id for task in urgent}), 2)
+
+    def test_assignment_requires_attendants(self):
+        """Test assigning without housekeeping staff fails"""
+        Employee.objects.update(is_active=False)
+        with self.assertRaises(ValueError):
+            assign_tasks(self.today)
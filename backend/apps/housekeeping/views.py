@@ -0,0 +1,145 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+from django.utils import timezone
+
+from apps.employees.models import Employee
+from .models import HousekeepingTask
+from .serializers import HousekeepingTaskSerializer, GenerateTasksSerializer, AssignTasksSerializer
+from .scheduling import generate_tasks, task_queue, assign_tasks
+
+
+class HousekeepingTaskViewSet(viewsets.ModelViewSet):
+    """ViewSet for managing housekeeping tasks"""
+    queryset = HousekeepingTask.objects.select_related('room', 'assigned_to__user', 'next_reservation')
+    serializer_class = HousekeepingTaskSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'task_type', 'scheduled_date', 'assigned_to', 'room', 'room__floor']
+    search_fields = ['room__number', 'notes']
+
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Generate departure and stay-over tasks for a day"""
+        serializer = GenerateTasksSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = generate_tasks(serializer.validated_data.get('date'))
+        
+        return Response({
+            'success': True,
+            'date': result['date'],
+            'departures_created': result['departures'],
+            'stayovers_created': result['stayovers']
+        })
+
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """Get open tasks, most urgent first"""
+        floor = request.query_params.get('floor')
+        try:
+            floor = int(floor) if floor is not None else None
+        except ValueError:
+            return Response({'error': 'floor must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        tasks = task_queue(floor=floor)
+        assigned_to = request.query_params.get('assigned_to')
+        if assigned_to:
+            tasks = tasks.filter(assigned_to_id=assigned_to)
+        
+        serializer = HousekeepingTaskSerializer(tasks, many=True)
+        return Response({
+            'total_tasks': len(serializer.data),
+            'tasks': serializer.data
+        })
+
+    @action(detail=False, methods=['post'])
+    def assign(self, request):
+        """Assign pending tasks to attendants, balancing their workload"""
+        serializer = AssignTasksSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            tasks, workload = assign_tasks(
+                data.get('date'),
+                employee_ids=data.get('employees'),
+                rebalance=data['rebalance']
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        names = {
+            employee.id: employee.full_name
+            for employee in Employee.objects.filter(id__in=workload).select_related('user')
+        }
+        return Response({
+            'success': True,
+            'total_assigned': len(tasks),
+            'workload': [
+                {'employee': employee_id, 'name': names.get(employee_id), 'minutes': minutes}
+                for employee_id, minutes in sorted(workload.items(), key=lambda item: -item[1])
+            ],
+            'assignments': [
+                {'task': task.id, 'room': task.room.number, 'employee': task.assigned_to_id, 'due_at': task.due_at}
+                for task in tasks
+            ]
+        })
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Start working on a task"""
+        task = self.get_object()
+        
+        if task.status not in ['PENDING', 'ASSIGNED']:
+            return Response({
+                'error': f'Cannot start task with status: {task.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        task.start()
+        
+        return Response({
+            'success': True,
+            'message': f'Task started for room {task.room.number}',
+            'task': HousekeepingTaskSerializer(task).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Complete a task and release the room when it is ready"""
+        task = self.get_object()
+        
+        if not task.is_open:
+            return Response({
+                'error': f'Cannot complete task with status: {task.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        task.complete(notes=request.data.get('notes'))
+        
+        return Response({
+            'success': True,
+            'message': f'Room {task.room.number} is {task.room.get_status_display().lower()}',
+            'room_status': task.room.status,
+            'task': HousekeepingTaskSerializer(task).data
+        })
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Get today's task counts by status and type"""
+        today = timezone.localdate()
+        tasks = HousekeepingTask.objects.filter(scheduled_date=today)
+        
+        by_status = {}
+        by_type = {}
+        for task_status, task_type in tasks.values_list('status', 'task_type'):
+            by_status[task_status] = by_status.get(task_status, 0) + 1
+            by_type[task_type] = by_type.get(task_type, 0) + 1
+        
+        return Response({
+            'date': today,
+            'total_tasks': sum(by_status.values()),
+            'by_status': by_status,
+            'by_type': by_type
+        })
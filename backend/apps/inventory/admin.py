@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Sum, Count, F
 from django.urls import reverse
-from .models import InventoryCategory, InventoryItem, StockMovement
+from .forecasting import needs_reorder
+from .models import (
+    CostLayer, InventoryCategory, InventoryItem, LocationStock, MinibarConsumption, PurchaseOrder, PurchaseOrderLine,
+    StockForecast, StockLocation, StockMovement, StockSnapshot, SupplierStats
+)
 
 
 class StockMovementInline(admin.TabularInline):
@@ -99,18 +103,18 @@ class InventoryCategoryAdmin(admin.ModelAdmin):
 class InventoryItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'category_link', 'location', 'current_stock', 'stock_status', 'unit_cost', 'total_value', 'movements_count')
     list_filter = ('category', 'unit', 'location', 'minimum_stock', 'maximum_stock')
-    search_fields = ('name', 'sku', 'location', 'notes')
+    search_fields = ('name', 'sku', 'barcode', 'location', 'notes')
     readonly_fields = ('created_at', 'updated_at', 'stock_status', 'total_value', 'movements_count', 'last_movement')
     
     fieldsets = (
         ('Item Information', {
-            'fields': ('name', 'category', 'sku', 'unit', 'location', 'supplier')
+            'fields': ('name', 'category', 'sku', 'barcode', 'unit', 'location', 'supplier')
         }),
         ('Stock Levels', {
             'fields': ('current_stock', 'minimum_stock', 'maximum_stock', 'stock_status')
         }),
         ('Pricing', {
-            'fields': ('unit_cost', 'total_value')
+            'fields': ('unit_cost', 'selling_price', 'total_value')
         }),
         ('Tracking', {
             'fields': ('movements_count', 'last_movement')
@@ -129,7 +133,7 @@ class InventoryItemAdmin(admin.ModelAdmin):
     actions = ['restock_items', 'mark_low_stock', 'update_costs']
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('category').annotate(
+        return super().get_queryset(request).select_related('category', 'forecast').annotate(
             _movements_count=Count('movements', distinct=True)
         )
     
@@ -148,14 +152,14 @@ class InventoryItemAdmin(admin.ModelAdmin):
     
     def stock_status(self, obj):
         try:
-            if obj.current_stock <= obj.minimum_stock:
+            if obj.current_stock <= obj.reorder_level():
                 return format_html('<span style="color: red; font-weight: bold;">🔴 Low Stock</span>')
             elif obj.maximum_stock and obj.current_stock >= obj.maximum_stock:
                 return format_html('<span style="color: orange; font-weight: bold;">🟡 Overstock</span>')
             else:
                 return format_html('<span style="color: green; font-weight: bold;">🟢 Normal</span>')
         except (ValueError, TypeError, AttributeError):
-            if obj.current_stock <= obj.minimum_stock:
+            if obj.current_stock <= obj.reorder_level():
                 return '🔴 Low Stock'
             elif obj.maximum_stock and obj.current_stock >= obj.maximum_stock:
                 return '🟡 Overstock'
@@ -208,12 +212,12 @@ class InventoryItemAdmin(admin.ModelAdmin):
     
     def restock_items(self, request, queryset):
         # This would typically integrate with a restocking system
-        low_stock_items = queryset.filter(current_stock__lte=F('minimum_stock'))
+        low_stock_items = needs_reorder(queryset)
         self.message_user(request, f'Found {low_stock_items.count()} items that need restocking.')
     restock_items.short_description = 'Check items for restocking'
     
     def mark_low_stock(self, request, queryset):
-        low_stock_count = queryset.filter(current_stock__lte=F('minimum_stock')).count()
+        low_stock_count = needs_reorder(queryset).count()
         self.message_user(request, f'{low_stock_count} items are currently low on stock.')
     mark_low_stock.short_description = 'Identify low stock items'
     
@@ -225,15 +229,15 @@ class InventoryItemAdmin(admin.ModelAdmin):
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
-    list_display = ('inventory_item_link', 'movement_type_badge', 'quantity', 'reason', 'unit_cost', 'total_cost', 'performed_by', 'created_at')
-    list_filter = ('movement_type', 'reason', 'created_at', 'item__location', 'item__category')
+    list_display = ('inventory_item_link', 'movement_type_badge', 'quantity', 'balance_after', 'location', 'to_location', 'reason', 'department', 'unit_cost', 'total_cost', 'cost_amount', 'performed_by', 'created_at')
+    list_filter = ('movement_type', 'reason', 'created_at', 'location', 'item__category')
     search_fields = ('item__name', 'item__location', 'performed_by', 'notes')
-    readonly_fields = ('created_at', 'total_cost', 'inventory_item_link')
+    readonly_fields = ('created_at', 'total_cost', 'inventory_item_link', 'balance_after', 'cost_amount')
     date_hierarchy = 'created_at'
     
     fieldsets = (
         ('Movement Information', {
-            'fields': ('item', 'movement_type', 'quantity', 'reason', 'unit_cost', 'total_cost')
+            'fields': ('item', 'movement_type', 'quantity', 'balance_after', 'location', 'to_location', 'reason', 'department', 'unit_cost', 'total_cost', 'cost_amount')
         }),
         ('Processing', {
             'fields': ('performed_by', 'reference_number', 'notes')
@@ -249,7 +253,7 @@ class StockMovementAdmin(admin.ModelAdmin):
     )
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('item', 'item__category')
+        return super().get_queryset(request).select_related('item', 'item__category', 'location', 'to_location')
     
     def inventory_item_link(self, obj):
         try:
@@ -304,3 +308,111 @@ class StockMovementAdmin(admin.ModelAdmin):
                 return '—'
         return '—'
     total_cost.short_description = 'Total Cost'
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('item', 'snapshot_date', 'quantity', 'last_movement_id', 'created_at')
+    list_filter = ('snapshot_date', 'item__category')
+    search_fields = ('item__name', 'item__sku')
+    list_select_related = ('item',)
+    readonly_fields = [field.name for field in StockSnapshot._meta.fields]
+
+    def has_add_permission(self, request):
+        # Snapshots are only taken by the snapshot job so they match the ledger
+        return False
+
+
+@admin.register(CostLayer)
+class CostLayerAdmin(admin.ModelAdmin):
+    list_display = ('item', 'lot_number', 'expiry_date', 'quantity', 'remaining', 'unit_cost', 'movement', 'created_at')
+    list_filter = ('item__category', 'expiry_date', 'created_at')
+    search_fields = ('item__name', 'item__sku', 'lot_number')
+    list_select_related = ('item', 'movement')
+    raw_id_fields = ('item', 'movement')
+    readonly_fields = [field.name for field in CostLayer._meta.fields]
+
+    def has_add_permission(self, request):
+        # Layers are only opened and used up by the stock ledger
+        return False
+
+
+@admin.register(StockForecast)
+class StockForecastAdmin(admin.ModelAdmin):
+    list_display = (
+        'item', 'forecast_date', 'daily_demand', 'lead_time_days', 'safety_stock', 'reorder_point', 'order_up_to'
+    )
+    list_filter = ('forecast_date', 'item__category', 'item__supplier')
+    search_fields = ('item__name', 'item__sku')
+    list_select_related = ('item',)
+    readonly_fields = [field.name for field in StockForecast._meta.fields]
+
+    def has_add_permission(self, request):
+        # Forecasts are only written by the forecast job
+        return False
+
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model = PurchaseOrderLine
+    extra = 0
+    fields = ('item', 'quantity_ordered', 'quantity_received', 'unit_cost')
+    readonly_fields = ('quantity_received',)
+    raw_id_fields = ('item',)
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display = ('po_number', 'supplier', 'status', 'order_date', 'expected_date', 'closed_date', 'total_amount', 'received_amount')
+    list_filter = ('status', 'supplier', 'order_date')
+    search_fields = ('po_number', 'supplier__name', 'notes')
+    list_select_related = ('supplier',)
+    # Status changes go through the purchase order API so supplier stats follow them
+    readonly_fields = ('po_number', 'status', 'order_date', 'closed_date', 'total_amount', 'received_amount', 'created_at', 'updated_at')
+    inlines = [PurchaseOrderLineInline]
+
+
+@admin.register(SupplierStats)
+class SupplierStatsAdmin(admin.ModelAdmin):
+    list_display = ('supplier', 'total_orders', 'open_orders', 'total_spend', 'fill_rate', 'average_lead_time_days', 'last_receipt_date')
+    search_fields = ('supplier__name',)
+    list_select_related = ('supplier',)
+    readonly_fields = [field.name for field in SupplierStats._meta.fields]
+
+    def has_add_permission(self, request):
+        # Stats are only kept by purchase orders
+        return False
+
+
+@admin.register(StockLocation)
+class StockLocationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'location_type', 'floor', 'room', 'is_default', 'is_active')
+    list_filter = ('location_type', 'floor', 'is_active')
+    search_fields = ('name',)
+    raw_id_fields = ('room',)
+
+
+@admin.register(LocationStock)
+class LocationStockAdmin(admin.ModelAdmin):
+    list_display = ('item', 'location', 'quantity', 'par_level', 'updated_at')
+    list_filter = ('location', 'item__category')
+    search_fields = ('item__name', 'item__sku', 'location__name')
+    list_select_related = ('item', 'location')
+    list_editable = ('par_level',)
+    # Quantities only change through stock movements
+    readonly_fields = ('item', 'location', 'quantity', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(MinibarConsumption)
+class MinibarConsumptionAdmin(admin.ModelAdmin):
+    list_display = ('location', 'item', 'quantity', 'unit_price', 'recorded_by', 'recorded_at', 'reservation', 'posted_at')
+    list_filter = ('posted_at', 'recorded_at')
+    search_fields = ('item__name', 'item__sku', 'location__name', 'reservation__reservation_number')
+    list_select_related = ('item', 'location', 'reservation')
+    readonly_fields = [field.name for field in MinibarConsumption._meta.fields]
+
+    def has_add_permission(self, request):
+        # Consumption is recorded through the API and posted at check-out
+        return False
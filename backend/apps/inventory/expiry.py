@@ -0,0 +1,88 @@
+"""
+Stock lots and expiry.
+
+``InventoryItem.expiry_date`` held one date per item, so stock received in
+batches with different expiries could not be told apart, and nothing looked
+for expired stock. Receipts now carry a lot number and an expiry date,
+which the ledger keeps on the cost layer each receipt opens. Every lot still
+in stock is an open layer, and stock is issued from the lots expiring first.
+Lots expiring within some days are found through a partial index on the
+expiry date of open layers, so the query reads only the lots it returns,
+however long the stock history is.
+
+The nightly sweep writes off what is left of expired lots with ``OUT``
+movements (reason ``Expired``), posted through the ledger a batch of items
+at a time. Because the ledger issues the lots expiring first, a write-off
+uses up exactly the expired lots, costed at their own unit cost under
+``FIFO`` costing. Stock is written off at the default location first, then
+wherever else the item is held, such as floor pantries and minibars.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .ledger import default_location_id, post_movements
+from .models import CostLayer, LocationStock, StockMovement
+
+
+def expiring_lots(within_days=None, as_of=None):
+    """Get the lots in stock expiring within ``within_days`` days, expired ones included"""
+    as_of = as_of or timezone.localdate()
+    if within_days is None:
+        within_days = getattr(settings, 'INVENTORY_EXPIRY_WARNING_DAYS', 7)
+    return CostLayer.objects.filter(
+        remaining__gt=0, expiry_date__lte=as_of + timedelta(days=within_days)
+    ).order_by('expiry_date', 'id')
+
+
+def write_off_expired(as_of=None, batch_size=500, performed_by='Expiry sweep'):
+    """Write off the stock left in lots that expired before ``as_of``"""
+    as_of = as_of or timezone.localdate()
+    expired = CostLayer.objects.filter(remaining__gt=0, expiry_date__lt=as_of)
+    item_ids = sorted(set(expired.values_list('item_id', flat=True).order_by()))
+    totals = {'date': as_of, 'items': 0, 'lots': 0, 'quantity': 0, 'value': Decimal('0.00')}
+    if not item_ids:
+        return totals
+    default_location = default_location_id()
+
+    for start in range(0, len(item_ids), batch_size):
+        batch = item_ids[start:start + batch_size]
+        with transaction.atomic():
+            rows = expired.filter(item_id__in=batch).values('item_id').annotate(
+                quantity=Sum('remaining'), lots=Count('id')
+            ).values_list('item_id', 'quantity', 'lots').order_by()
+            held = defaultdict(list)
+            for item_id, location_id, quantity in LocationStock.objects.filter(
+                item_id__in=batch, quantity__gt=0
+            ).values_list('item_id', 'location_id', 'quantity').order_by('item_id', '-quantity'):
+                held[item_id].append((location_id, quantity))
+
+            movements = []
+            for item_id, quantity, lots in rows:
+                totals['items'] += 1
+                totals['lots'] += lots
+                # The default location first, then the locations holding most
+                for location_id, available in sorted(held[item_id], key=lambda place: place[0] != default_location):
+                    if not quantity:
+                        break
+                    taken = min(quantity, available)
+                    movements.append(StockMovement(
+                        item_id=item_id,
+                        movement_type='OUT',
+                        quantity=taken,
+                        reason='Expired',
+                        location_id=location_id,
+                        performed_by=performed_by,
+                        notes=f'Expired lots written off on {as_of}'
+                    ))
+                    quantity -= taken
+            post_movements(movements)
+
+        totals['quantity'] += sum(movement.quantity for movement in movements)
+        totals['value'] -= sum((movement.cost_amount for movement in movements), Decimal('0.00'))
+    return totals
@@ -0,0 +1,280 @@
+"""
+Stock ledger.
+
+Stock levels used to be changed by reading ``InventoryItem.current_stock``
+into Python, adding the movement and saving the item, so two movements
+posted at the same time for one item left only one of them applied.
+
+Movements are now posted in a transaction that first locks the items they
+touch (an ``UPDATE`` locks the rows, and the whole database on SQLite),
+then reads the opening balances, walks the movements in order and writes
+each item's change back as an ``F()`` expression. Every movement records
+the item's balance after it in ``balance_after``, so the ledger can be
+checked against ``current_stock`` and the history can be read without
+replaying it. A batch of any size is one transaction with one insert and
+one update per item, and it is rejected as a whole if any movement would
+take an item below zero.
+
+Stock received opens a ``CostLayer`` at its unit cost, carrying the lot
+number and expiry date of the receipt, and stock taken out uses up the
+open layers expiring first, then the oldest. Each layer is used up once,
+and a posting only reads the open layers of its items, so costing a
+movement takes constant time on average however long the item's history
+is. Every movement records the cost of the stock it added or took in
+``cost_amount``: with the ``FIFO`` method the cost of the layers it used,
+with ``AVERAGE`` (the default, see ``INVENTORY_COSTING_METHOD``) the
+moving weighted average unit cost. Cost of goods used over a period is
+then a sum over the movements of that period.
+
+Stock is also kept per ``StockLocation`` in ``LocationStock``, which the
+same posting updates with one upsert: receipts and issues change the
+balance where they happen (the default location when a movement names
+none), and ``TRANSFER`` movements take stock from one location and add it
+to another without changing the item's total or its cost. An adjustment
+naming a location sets that location's stock; one without sets the item's
+total, counting stock found at the default location and stock missing
+there first, then at the locations holding most.
+"""
+from collections import deque
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CostLayer, InventoryItem, LocationStock, StockLocation, StockMovement
+
+
+CENT = Decimal('0.01')
+
+
+class InsufficientStock(Exception):
+    """Raised when a movement takes more than an item has in stock"""
+
+    def __init__(self, item_id, available, requested, location_id=None):
+        self.item_id = item_id
+        self.available = available
+        self.requested = requested
+        self.location_id = location_id
+        where = f' at location {location_id}' if location_id else ''
+        super().__init__(f'Item {item_id} has {available} in stock{where}, {requested} requested')
+
+
+class InvalidTransfer(ValueError):
+    """Raised when a transfer has no destination or moves stock to where it is"""
+
+
+def default_location_id():
+    """Get the id of the default stock location, creating it if there is none"""
+    location_id = StockLocation.objects.filter(is_default=True).values_list('id', flat=True).first()
+    if location_id is None:
+        location_id = StockLocation.objects.get_or_create(
+            name='Main Store', defaults={'location_type': 'STORE', 'is_default': True}
+        )[0].id
+    return location_id
+
+
+def costing_method():
+    """Get the method stock taken out is costed with, ``FIFO`` or ``AVERAGE``"""
+    return getattr(settings, 'INVENTORY_COSTING_METHOD', 'AVERAGE')
+
+
+class _ItemPosting:
+    """Balance, unit cost and open cost layers of one item while posting"""
+
+    def __init__(self, item_id, balance, unit_cost, method):
+        self.item_id = item_id
+        self.opening_balance = self.balance = balance
+        self.opening_cost = self.unit_cost = unit_cost
+        self.method = method
+        self.layers = deque()
+        self.used_layers = {}
+        self.new_layers = []
+        self.locations = {}
+        self.changed_locations = set()
+
+    def receive(self, movement, quantity, unit_cost):
+        """Add stock, returning its cost"""
+        if quantity <= 0:
+            return Decimal('0')
+        if unit_cost is None:
+            unit_cost = self.unit_cost
+        # Receipts move the unit cost to the weighted average
+        value = self.balance * self.unit_cost + quantity * unit_cost
+        self.unit_cost = (value / (self.balance + quantity)).quantize(CENT)
+        self.balance += quantity
+        layer = CostLayer(
+            item_id=self.item_id, movement=movement, quantity=quantity, remaining=quantity, unit_cost=unit_cost,
+            lot_number=movement.lot_number, expiry_date=movement.expiry_date
+        )
+        self.queue(layer)
+        self.new_layers.append(layer)
+        return quantity * unit_cost
+
+    def queue(self, layer):
+        """Queue an open layer so stock expiring first is used first, then the oldest"""
+        if layer.expiry_date is not None:
+            for index, queued in enumerate(self.layers):
+                if queued.expiry_date is None or queued.expiry_date > layer.expiry_date:
+                    self.layers.insert(index, layer)
+                    return
+        self.layers.append(layer)
+
+    def issue(self, quantity):
+        """Take stock out of the first layers queued, returning its cost"""
+        cost = Decimal('0')
+        left = quantity
+        while left and self.layers:
+            layer = self.layers[0]
+            used = min(layer.remaining, left)
+            layer.remaining -= used
+            left -= used
+            cost += used * layer.unit_cost
+            if layer.pk:
+                self.used_layers[layer.pk] = layer
+            if not layer.remaining:
+                self.layers.popleft()
+        # Stock received before cost layers is costed at the unit cost
+        cost += left * self.unit_cost
+        self.balance -= quantity
+        if self.method == 'AVERAGE':
+            return quantity * self.unit_cost
+        return cost
+
+    def move(self, location_id, quantity):
+        """Change the stock at a location, refusing to take more than it has"""
+        available = self.locations.get(location_id, 0)
+        if available + quantity < 0:
+            raise InsufficientStock(self.item_id, available, -quantity, location_id)
+        self.locations[location_id] = available + quantity
+        self.changed_locations.add(location_id)
+
+    def take(self, location_id, quantity):
+        """Take stock from a location first, then from the others holding most"""
+        others = sorted(
+            (other for other, held in self.locations.items() if other != location_id and held > 0),
+            key=lambda other: -self.locations[other]
+        )
+        left = quantity
+        for place in [location_id, *others]:
+            taken = min(left, self.locations.get(place, 0))
+            if taken:
+                self.move(place, -taken)
+                left -= taken
+            if not left:
+                return
+        raise InsufficientStock(self.item_id, quantity - left, quantity)
+
+    def apply(self, movement, default_location):
+        """Apply a movement, setting its location, balance and cost"""
+        scoped = movement.location_id is not None
+        location = movement.location_id = movement.location_id or default_location
+        cost = Decimal('0')
+        if movement.movement_type == 'IN':
+            self.move(location, movement.quantity)
+            cost = self.receive(movement, movement.quantity, movement.unit_cost)
+        elif movement.movement_type == 'OUT':
+            if movement.quantity > self.balance:
+                raise InsufficientStock(movement.item_id, self.balance, movement.quantity)
+            self.move(location, -movement.quantity)
+            cost = -self.issue(movement.quantity)
+        elif movement.movement_type == 'TRANSFER':
+            if movement.to_location_id in (None, location):
+                raise InvalidTransfer('A transfer needs a destination other than its source location')
+            self.move(location, -movement.quantity)
+            self.move(movement.to_location_id, movement.quantity)
+        elif movement.movement_type == 'ADJUSTMENT':
+            # For adjustments, quantity represents the new stock level of the
+            # location named, or of the item when none is
+            current = self.locations.get(location, 0) if scoped else self.balance
+            change = movement.quantity - current
+            if scoped or change >= 0:
+                self.move(location, change)
+            else:
+                # Stock counted short may have been moved out of the default location
+                self.take(location, -change)
+            if change > 0:
+                cost = self.receive(movement, change, movement.unit_cost)
+            elif change < 0:
+                cost = -self.issue(-change)
+        movement.balance_after = self.balance
+        movement.cost_amount = cost.quantize(CENT)
+
+    def closing_cost(self):
+        """Get the unit cost to leave on the item"""
+        if self.method == 'FIFO' and self.balance:
+            layered = sum(layer.remaining for layer in self.layers)
+            value = sum(layer.remaining * layer.unit_cost for layer in self.layers)
+            value += max(self.balance - layered, 0) * self.unit_cost
+            return (value / self.balance).quantize(CENT)
+        return self.unit_cost
+
+
+def post_movements(movements):
+    """Save unsaved movements in order and apply them to their items' stock"""
+    movements = list(movements)
+    if not movements:
+        return []
+    item_ids = sorted({movement.item_id for movement in movements})
+    method = costing_method()
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Lock the items before reading their balances
+        InventoryItem.objects.filter(pk__in=item_ids).update(updated_at=now)
+        postings = {
+            item_id: _ItemPosting(item_id, stock, unit_cost, method)
+            for item_id, stock, unit_cost in InventoryItem.objects.filter(pk__in=item_ids).values_list(
+                'id', 'current_stock', 'unit_cost'
+            )
+        }
+        for layer in CostLayer.objects.filter(item_id__in=item_ids, remaining__gt=0).order_by(
+            'item_id', F('expiry_date').asc(nulls_last=True), 'id'
+        ):
+            postings[layer.item_id].layers.append(layer)
+        for item_id, location_id, quantity in LocationStock.objects.filter(item_id__in=item_ids).values_list(
+            'item_id', 'location_id', 'quantity'
+        ):
+            postings[item_id].locations[location_id] = quantity
+        default_location = None
+        if any(movement.location_id is None for movement in movements):
+            default_location = default_location_id()
+        for movement in movements:
+            postings[movement.item_id].apply(movement, default_location)
+
+        StockMovement.objects.bulk_create(movements)
+        new_layers, used_layers = [], []
+        for posting in postings.values():
+            new_layers.extend(posting.new_layers)
+            used_layers.extend(posting.used_layers.values())
+        # New layers pick up their movement's id now that it is saved
+        CostLayer.objects.bulk_create(new_layers)
+        # Most used layers are used up; at most one per item is left partly used
+        used_up = [layer.pk for layer in used_layers if not layer.remaining]
+        for start in range(0, len(used_up), 900):
+            CostLayer.objects.filter(pk__in=used_up[start:start + 900]).update(remaining=0)
+        CostLayer.objects.bulk_update([layer for layer in used_layers if layer.remaining], ['remaining'])
+        LocationStock.objects.bulk_create(
+            [
+                LocationStock(item_id=posting.item_id, location_id=location_id, quantity=posting.locations[location_id])
+                for posting in postings.values()
+                for location_id in posting.changed_locations
+            ],
+            update_conflicts=True, unique_fields=['item', 'location'], update_fields=['quantity', 'updated_at']
+        )
+
+        for item_id in item_ids:
+            posting = postings[item_id]
+            unit_cost = posting.closing_cost()
+            if (posting.balance, unit_cost) == (posting.opening_balance, posting.opening_cost):
+                continue
+            InventoryItem.objects.filter(pk=item_id).update(
+                current_stock=F('current_stock') + (posting.balance - posting.opening_balance), unit_cost=unit_cost
+            )
+
+    for movement in movements:
+        if StockMovement.item.is_cached(movement):
+            posting = postings[movement.item_id]
+            movement.item.current_stock, movement.item.unit_cost = posting.balance, posting.closing_cost()
+    return movements
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.purchasing import rebuild_supplier_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute every supplier\'s purchase order stats from their orders'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        suppliers = rebuild_supplier_stats()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stats of {suppliers} suppliers rebuilt in {elapsed:.1f}s'))
@@ -182,7 +182,10 @@ class Command(BaseCommand):
                     if movement_type == 'IN':
                         quantity = random.randint(10, 50)
                     elif movement_type == 'OUT':
-                        quantity = random.randint(5, 25)
+                        # The ledger rejects taking more than is in stock
+                        quantity = min(random.randint(5, 25), item.current_stock)
+                        if not quantity:
+                            continue
                     else:  # ADJUSTMENT
                         quantity = random.randint(1, 10)
                     
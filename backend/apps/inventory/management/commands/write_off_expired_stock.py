@@ -0,0 +1,26 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.expiry import write_off_expired
+
+
+class Command(BaseCommand):
+    help = 'Write off the stock left in lots past their expiry date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', type=date.fromisoformat, default=None,
+            help='Write off lots that expired before this date (YYYY-MM-DD), today by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = write_off_expired(as_of=options['date'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['quantity']} units from {result['lots']} expired lots of {result['items']} items "
+            f"written off ({result['value']}) as of {result['date']} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='balance_after',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def take_opening_snapshot(apps, schema_editor):
+    InventoryItem = apps.get_model('inventory', 'InventoryItem')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockSnapshot = apps.get_model('inventory', 'StockSnapshot')
+
+    last_id = StockMovement.objects.aggregate(last=Max('id'))['last'] or 0
+    today = timezone.localdate()
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(item_id=item_id, snapshot_date=today, quantity=stock, last_movement_id=last_id)
+        for item_id, stock in InventoryItem.objects.values_list('id', 'current_stock').iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(db_index=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('last_movement_id', models.BigIntegerField(default=0, help_text='Highest stock movement id included in the quantity')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'ordering': ['-snapshot_date', 'item'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at'], name='inventory_s_created_05ebf5_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.inventoryitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('snapshot_date', 'item'), name='one_stock_snapshot_per_item_day'),
+        ),
+        migrations.RunPython(take_opening_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_cost_layers(apps, schema_editor):
+    InventoryItem = apps.get_model('inventory', 'InventoryItem')
+    CostLayer = apps.get_model('inventory', 'CostLayer')
+
+    CostLayer.objects.bulk_create([
+        CostLayer(item_id=item_id, quantity=stock, remaining=stock, unit_cost=unit_cost)
+        for item_id, stock, unit_cost in InventoryItem.objects.filter(current_stock__gt=0).values_list(
+            'id', 'current_stock', 'unit_cost'
+        ).iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('inventory', '0003_stock_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='cost_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Cost of the stock added (positive) or taken (negative), set when posted', max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='employees.department'),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('remaining', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.inventoryitem')),
+                ('movement', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cost_layer', to='inventory.stockmovement')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer',
+                'verbose_name_plural': 'Cost Layers',
+                'ordering': ['item', 'id'],
+                'indexes': [models.Index(condition=models.Q(('remaining__gt', 0)), fields=['item', 'id'], name='cost_layer_open_idx')],
+            },
+        ),
+        migrations.RunPython(open_cost_layers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_cost_layers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='inventory.inventoryitem')),
+                ('forecast_date', models.DateField()),
+                ('daily_demand', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('demand_deviation', models.DecimalField(decimal_places=2, help_text='Standard deviation of past one-day forecast errors', max_digits=12)),
+                ('lead_time_days', models.PositiveIntegerField()),
+                ('lead_time_demand', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('safety_stock', models.PositiveIntegerField()),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('order_up_to', models.PositiveIntegerField(help_text='Stock level a reorder brings the item up to')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stock Forecast',
+                'verbose_name_plural': 'Stock Forecasts',
+                'ordering': ['item'],
+            },
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_days',
+            field=models.PositiveIntegerField(default=7, help_text='Days from ordering to delivery'),
+        ),
+    ]
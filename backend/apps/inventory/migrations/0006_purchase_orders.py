@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:11
+
+import django.db.models.deletion
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_forecasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierStats',
+            fields=[
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='inventory.supplier')),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('open_orders', models.PositiveIntegerField(default=0)),
+                ('closed_orders', models.PositiveIntegerField(default=0)),
+                ('on_time_orders', models.PositiveIntegerField(default=0)),
+                ('ordered_quantity', models.PositiveIntegerField(default=0)),
+                ('received_quantity', models.PositiveIntegerField(default=0)),
+                ('lead_time_days_total', models.PositiveIntegerField(default=0)),
+                ('total_spend', models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('last_order_date', models.DateField(blank=True, null=True)),
+                ('last_receipt_date', models.DateField(blank=True, null=True)),
+                ('fill_rate', models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('received_quantity'), '*', models.Value(100.0)), '/', django.db.models.functions.comparison.NullIf(models.F('ordered_quantity'), 0)), output_field=models.FloatField())),
+                ('average_lead_time_days', models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('lead_time_days_total'), '*', models.Value(1.0)), '/', django.db.models.functions.comparison.NullIf(models.F('closed_orders'), 0)), output_field=models.FloatField())),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Supplier Stats',
+                'verbose_name_plural': 'Supplier Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('po_number', models.CharField(blank=True, max_length=20, unique=True)),
+                ('status', models.CharField(choices=[('DRAFT', 'Draft'), ('ORDERED', 'Ordered'), ('PARTIAL', 'Partially Received'), ('RECEIVED', 'Received'), ('CLOSED', 'Closed Short'), ('CANCELLED', 'Cancelled')], default='DRAFT', max_length=20)),
+                ('order_date', models.DateField(blank=True, null=True)),
+                ('expected_date', models.DateField(blank=True, null=True)),
+                ('closed_date', models.DateField(blank=True, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('received_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('created_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='purchase_orders', to='inventory.supplier')),
+            ],
+            options={
+                'verbose_name': 'Purchase Order',
+                'verbose_name_plural': 'Purchase Orders',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity_ordered', models.PositiveIntegerField()),
+                ('quantity_received', models.PositiveIntegerField(default=0)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='purchase_order_lines', to='inventory.inventoryitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.purchaseorder')),
+            ],
+            options={
+                'verbose_name': 'Purchase Order Line',
+                'verbose_name_plural': 'Purchase Order Lines',
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='purchase_order_line',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipts', to='inventory.purchaseorderline'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', 'status'], name='inventory_p_supplie_80088d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='purchaseorderline',
+            constraint=models.UniqueConstraint(fields=('order', 'item'), name='one_purchase_order_line_per_item'),
+        ),
+    ]
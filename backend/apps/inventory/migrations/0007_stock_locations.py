@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_main_store(apps, schema_editor):
+    InventoryItem = apps.get_model('inventory', 'InventoryItem')
+    StockLocation = apps.get_model('inventory', 'StockLocation')
+    LocationStock = apps.get_model('inventory', 'LocationStock')
+
+    # Stock on hand so far is held in the default location
+    store = StockLocation.objects.create(name='Main Store', location_type='STORE', is_default=True)
+    LocationStock.objects.bulk_create([
+        LocationStock(item_id=item_id, location=store, quantity=stock)
+        for item_id, stock in InventoryItem.objects.filter(current_stock__gt=0).values_list(
+            'id', 'current_stock'
+        ).iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_purchase_orders'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('location_type', models.CharField(choices=[('STORE', 'Store Room'), ('PANTRY', 'Floor Pantry'), ('MINIBAR', 'Minibar'), ('KITCHEN', 'Kitchen'), ('OTHER', 'Other')], default='STORE', max_length=20)),
+                ('floor', models.IntegerField(blank=True, null=True)),
+                ('is_default', models.BooleanField(default=False, help_text='Where stock is received and counted when a movement names no location')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_locations', to='rooms.room')),
+            ],
+            options={
+                'verbose_name': 'Stock Location',
+                'verbose_name_plural': 'Stock Locations',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LocationStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('par_level', models.PositiveIntegerField(default=0, help_text='Stock the location is refilled up to')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_stocks', to='inventory.inventoryitem')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock', to='inventory.stocklocation')),
+            ],
+            options={
+                'verbose_name': 'Location Stock',
+                'verbose_name_plural': 'Location Stock',
+                'ordering': ['location', 'item'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='inventory.stocklocation'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='to_location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transfers_in', to='inventory.stocklocation'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklocation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='one_default_stock_location'),
+        ),
+        migrations.AddConstraint(
+            model_name='locationstock',
+            constraint=models.UniqueConstraint(fields=('item', 'location'), name='one_stock_balance_per_item_location'),
+        ),
+        migrations.RunPython(open_main_store, migrations.RunPython.noop),
+    ]
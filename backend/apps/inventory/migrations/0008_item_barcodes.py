@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_stock_locations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='barcode',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
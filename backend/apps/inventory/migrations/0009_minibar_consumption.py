@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_item_barcodes'),
+        ('payments', '0002_bill_charges'),
+        ('reservations', '0003_groupblock_reservation_group_block_and_more'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinibarConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('recorded_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Minibar Consumption',
+                'verbose_name_plural': 'Minibar Consumption',
+                'ordering': ['-recorded_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='selling_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Price charged to guests, e.g. from the minibar', max_digits=10, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklocation',
+            constraint=models.UniqueConstraint(condition=models.Q(('location_type', 'MINIBAR')), fields=('room',), name='one_minibar_per_room'),
+        ),
+        migrations.AddField(
+            model_name='minibarconsumption',
+            name='charge',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='minibar_consumption', to='payments.billcharge'),
+        ),
+        migrations.AddField(
+            model_name='minibarconsumption',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='minibar_consumption', to='inventory.inventoryitem'),
+        ),
+        migrations.AddField(
+            model_name='minibarconsumption',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='minibar_consumption', to='inventory.stocklocation'),
+        ),
+        migrations.AddField(
+            model_name='minibarconsumption',
+            name='movement',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='minibar_consumption', to='inventory.stockmovement'),
+        ),
+        migrations.AddField(
+            model_name='minibarconsumption',
+            name='reservation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='minibar_consumption', to='reservations.reservation'),
+        ),
+    ]
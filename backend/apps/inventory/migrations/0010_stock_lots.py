@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_minibar_consumption'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='costlayer',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='costlayer',
+            name='lot_number',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='lot_number',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('Purchase', 'Purchase'), ('Room Usage', 'Room Usage'), ('Housekeeping', 'Housekeeping'), ('Damage', 'Damage/Loss'), ('Return', 'Return'), ('Inventory Count', 'Inventory Count'), ('Transfer', 'Transfer'), ('Expired', 'Expired'), ('Other', 'Other')], max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='costlayer',
+            index=models.Index(condition=models.Q(('remaining__gt', 0)), fields=['expiry_date'], name='cost_layer_open_expiry_idx'),
+        ),
+    ]
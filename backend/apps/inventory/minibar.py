@@ -0,0 +1,198 @@
+"""
+Minibar consumption and posting it at check-out.
+
+Minibar charges used to be one amount typed into ``CheckOut.minibar_charges``
+with no link to the stock taken or to the bill, so every minibar was
+reconciled by hand on busy check-out mornings. Each room now has a
+``MINIBAR`` stock location whose par levels say what it is stocked with,
+and what a guest takes is recorded per item at the item's selling price.
+
+Checking out posts the recorded consumption of every room vacated at once:
+one ledger posting for all the ``OUT`` movements, one insert of
+``BillCharge`` lines, one bulk update of the bills' totals and one of the
+consumption rows, so 200 check-outs take the same number of queries as
+one. Reservations without a bill get one in the same transaction. Posted
+consumption keeps its movement, charge and reservation, and the minibars
+are refilled to par from the store like any other location.
+"""
+import random
+import string
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.payments.models import Bill, BillCharge
+from apps.reservations.models import ReservationRoom
+from apps.rooms.models import Room
+from .ledger import InsufficientStock, post_movements
+from .models import InventoryItem, LocationStock, MinibarConsumption, StockLocation, StockMovement
+
+
+CENT = Decimal('0.01')
+
+
+class MinibarError(Exception):
+    """Raised when minibar consumption cannot be recorded or posted"""
+
+    def __init__(self, message, reservation_id=None):
+        self.reservation_id = reservation_id
+        super().__init__(message)
+
+
+def minibar_locations(room_ids):
+    """Get the minibar location of each room, creating those missing"""
+    locations = dict(StockLocation.objects.filter(location_type='MINIBAR', room_id__in=room_ids).values_list(
+        'room_id', 'id'
+    ))
+    missing = Room.objects.filter(pk__in=set(room_ids) - set(locations)).values_list('id', 'number', 'floor')
+    created = StockLocation.objects.bulk_create([
+        StockLocation(name=f'Minibar {number}', location_type='MINIBAR', floor=floor, room_id=room_id)
+        for room_id, number, floor in missing
+    ])
+    locations.update((location.room_id, location.id) for location in created)
+    return locations
+
+
+def set_par_levels(room_ids, par_levels):
+    """Stock the minibars of ``room_ids`` with ``par_levels`` (item id to par level)"""
+    locations = minibar_locations(room_ids)
+    with transaction.atomic():
+        LocationStock.objects.bulk_create(
+            [
+                LocationStock(item_id=item_id, location_id=location_id, par_level=par_level)
+                for location_id in locations.values()
+                for item_id, par_level in par_levels.items()
+            ],
+            update_conflicts=True, unique_fields=['item', 'location'], update_fields=['par_level', 'updated_at']
+        )
+    return locations
+
+
+def record_consumption(location, quantities, recorded_by=None):
+    """Record ``quantities`` (item id to quantity) taken from a minibar"""
+    if location.location_type != 'MINIBAR' or not location.is_active:
+        raise MinibarError(f'{location.name} is not an active minibar')
+    prices = dict(InventoryItem.objects.filter(pk__in=quantities, is_active=True).values_list('id', 'selling_price'))
+    stocked = dict(LocationStock.objects.filter(location=location, item_id__in=quantities).values_list(
+        'item_id', 'quantity'
+    ))
+    pending = dict(MinibarConsumption.objects.filter(
+        location=location, item_id__in=quantities, posted_at__isnull=True
+    ).values('item_id').annotate(taken=Sum('quantity')).values_list('item_id', 'taken').order_by())
+
+    consumption = []
+    for item_id, quantity in quantities.items():
+        if item_id not in prices:
+            raise MinibarError(f'Item {item_id} is unknown or inactive')
+        if prices[item_id] is None:
+            raise MinibarError(f'Item {item_id} has no selling price')
+        available = stocked.get(item_id, 0) - pending.get(item_id, 0)
+        if quantity > available:
+            raise MinibarError(f'{location.name} has {available} of item {item_id}, {quantity} recorded')
+        consumption.append(MinibarConsumption(
+            location=location, item_id=item_id, quantity=quantity, unit_price=prices[item_id],
+            recorded_by=recorded_by
+        ))
+    return MinibarConsumption.objects.bulk_create(consumption)
+
+
+def _new_bill_numbers(count):
+    """Generate ``count`` bill numbers no bill has yet"""
+    numbers = set()
+    while len(numbers) < count:
+        numbers.update(f"BILL{''.join(random.choices(string.digits, k=6))}" for _ in range(count - len(numbers)))
+        numbers -= set(Bill.objects.filter(bill_number__in=numbers).values_list('bill_number', flat=True))
+    return list(numbers)
+
+
+def post_minibar_charges(reservation_ids, performed_by=None):
+    """Post the unposted minibar consumption of reservations' rooms to stock and their bills.
+
+    Returns the amount charged per reservation before tax and service. If a
+    minibar holds less than was recorded, ``MinibarError`` is raised naming
+    the reservation and nothing is posted.
+    """
+    stays = dict(ReservationRoom.objects.filter(reservation_id__in=reservation_ids).values_list(
+        'room_id', 'reservation_id'
+    ))
+    if not stays:
+        return {}
+
+    with transaction.atomic():
+        consumption = list(MinibarConsumption.objects.select_for_update().filter(
+            location__room_id__in=stays, posted_at__isnull=True
+        ).select_related('item', 'location').order_by('id'))
+        if not consumption:
+            return {}
+        for row in consumption:
+            row.reservation_id = stays[row.location.room_id]
+
+        charged = {row.reservation_id for row in consumption}
+        bills = {bill.reservation_id: bill for bill in Bill.objects.select_for_update().filter(
+            reservation_id__in=charged
+        )}
+        missing = sorted(charged - set(bills))
+        for reservation_id, number in zip(missing, _new_bill_numbers(len(missing))):
+            bills[reservation_id] = Bill(reservation_id=reservation_id, bill_number=number, total_amount=Decimal('0.00'))
+        Bill.objects.bulk_create([bills[reservation_id] for reservation_id in missing])
+
+        movements = [
+            StockMovement(
+                item_id=row.item_id,
+                movement_type='OUT',
+                quantity=row.quantity,
+                reason='Room Usage',
+                location_id=row.location_id,
+                reference_number=bills[row.reservation_id].bill_number,
+                performed_by=performed_by,
+                notes='Minibar'
+            )
+            for row in consumption
+        ]
+        try:
+            post_movements(movements)
+        except InsufficientStock as e:
+            short = next(
+                row for row in consumption if row.item_id == e.item_id and e.location_id in (None, row.location_id)
+            )
+            raise MinibarError(
+                f'{short.location.name} has {e.available} of item {e.item_id}, {e.requested} recorded',
+                reservation_id=short.reservation_id
+            )
+
+        charges = BillCharge.objects.bulk_create([
+            BillCharge(
+                bill=bills[row.reservation_id],
+                charge_type='MINIBAR',
+                description=f'{row.item.name} ({row.location.name})',
+                quantity=row.quantity,
+                unit_price=row.unit_price,
+                amount=row.amount
+            )
+            for row in consumption
+        ])
+
+        totals = defaultdict(Decimal)
+        for row in consumption:
+            totals[row.reservation_id] += row.amount
+        now = timezone.now()
+        for reservation_id, amount in totals.items():
+            bill = bills[reservation_id]
+            tax = (amount * bill.tax_rate / 100).quantize(CENT)
+            service = (amount * bill.service_charge_rate / 100).quantize(CENT)
+            bill.subtotal += amount
+            bill.tax_amount += tax
+            bill.service_charge += service
+            bill.total_amount += amount + tax + service
+            bill.updated_at = now
+        Bill.objects.bulk_update(
+            list(bills.values()), ['subtotal', 'tax_amount', 'service_charge', 'total_amount', 'updated_at']
+        )
+
+        for row, movement, charge in zip(consumption, movements, charges):
+            row.movement, row.charge, row.posted_at = movement, charge, now
+        MinibarConsumption.objects.bulk_update(consumption, ['reservation', 'movement', 'charge', 'posted_at'])
+    return dict(totals)
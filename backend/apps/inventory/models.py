@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models.functions import NullIf
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
@@ -28,6 +31,7 @@ class Supplier(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     country = models.CharField(max_length=100, blank=True, null=True)
     payment_terms = models.CharField(max_length=100, blank=True, null=True)
+    lead_time_days = models.PositiveIntegerField(default=7, help_text='Days from ordering to delivery')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -41,6 +45,45 @@ class Supplier(models.Model):
         return self.name
 
 
+class StockLocation(models.Model):
+    LOCATION_TYPE_CHOICES = [
+        ('STORE', 'Store Room'),
+        ('PANTRY', 'Floor Pantry'),
+        ('MINIBAR', 'Minibar'),
+        ('KITCHEN', 'Kitchen'),
+        ('OTHER', 'Other'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    location_type = models.CharField(max_length=20, choices=LOCATION_TYPE_CHOICES, default='STORE')
+    floor = models.IntegerField(null=True, blank=True)
+    room = models.ForeignKey(
+        'rooms.Room', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_locations'
+    )
+    is_default = models.BooleanField(
+        default=False, help_text='Where stock is received and counted when a movement names no location'
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Stock Location'
+        verbose_name_plural = 'Stock Locations'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_default'], condition=models.Q(is_default=True), name='one_default_stock_location'
+            ),
+            models.UniqueConstraint(
+                fields=['room'], condition=models.Q(location_type='MINIBAR'), name='one_minibar_per_room'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class InventoryItem(models.Model):
     UNIT_CHOICES = [
         ('piece', 'Piece'),
@@ -56,11 +99,15 @@ class InventoryItem(models.Model):
     name = models.CharField(max_length=200)
     category = models.ForeignKey(InventoryCategory, on_delete=models.CASCADE)
     sku = models.CharField(max_length=50, unique=True, blank=True, null=True)
+    barcode = models.CharField(max_length=64, unique=True, blank=True, null=True)
     unit = models.CharField(max_length=20, choices=UNIT_CHOICES, default='piece')
     current_stock = models.PositiveIntegerField(default=0)
     minimum_stock = models.PositiveIntegerField(default=0)
     maximum_stock = models.PositiveIntegerField(null=True, blank=True)
     unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    selling_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, help_text='Price charged to guests, e.g. from the minibar'
+    )
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
     location = models.CharField(max_length=100, blank=True, null=True)
     expiry_date = models.DateField(null=True, blank=True)
@@ -79,16 +126,44 @@ class InventoryItem(models.Model):
 
     def is_low_stock(self):
         """Check if item is low on stock"""
-        return self.current_stock <= self.minimum_stock
+        return self.current_stock <= self.reorder_level()
+
+    def reorder_level(self):
+        """Get the stock level to reorder at, forecast or ``minimum_stock``"""
+        forecast = getattr(self, 'forecast', None)
+        return forecast.reorder_point if forecast else self.minimum_stock
+
+    def suggested_order_quantity(self):
+        """Get the quantity to order when the item is at or below its reorder level"""
+        if self.current_stock > self.reorder_level():
+            return 0
+        forecast = getattr(self, 'forecast', None)
+        target = forecast.order_up_to if forecast else (self.maximum_stock or self.minimum_stock * 2)
+        return max(target - self.current_stock, 0)
 
     def stock_value(self):
         """Calculate total stock value"""
         return self.current_stock * self.unit_cost
 
     def save(self, *args, **kwargs):
+        opening_stock = 0
+        if self.pk is None:
+            # Opening stock is posted through the ledger once the item exists,
+            # so past stock can be replayed and the stock has a cost layer
+            opening_stock, self.current_stock = self.current_stock, 0
         if not self.sku:
             self.sku = self.generate_sku()
         super().save(*args, **kwargs)
+        
+        if opening_stock:
+            StockMovement.objects.create(
+                item=self,
+                movement_type='ADJUSTMENT',
+                quantity=opening_stock,
+                unit_cost=self.unit_cost,
+                reason='Inventory Count',
+                notes='Opening stock'
+            )
 
     def generate_sku(self):
         """Generate SKU automatically"""
@@ -113,6 +188,7 @@ class StockMovement(models.Model):
         ('Return', 'Return'),
         ('Inventory Count', 'Inventory Count'),
         ('Transfer', 'Transfer'),
+        ('Expired', 'Expired'),
         ('Other', 'Other'),
     ]
 
@@ -121,15 +197,40 @@ class StockMovement(models.Model):
     quantity = models.PositiveIntegerField()
     reason = models.CharField(max_length=50, choices=REASON_CHOICES)
     reference_number = models.CharField(max_length=50, blank=True, null=True)
+    # Lot received, kept on the cost layer the receipt opens
+    lot_number = models.CharField(max_length=50, blank=True, null=True)
+    expiry_date = models.DateField(null=True, blank=True)
     unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     performed_by = models.CharField(max_length=100, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    department = models.ForeignKey(
+        'employees.Department', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements'
+    )
+    purchase_order_line = models.ForeignKey(
+        'PurchaseOrderLine', on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts'
+    )
+    # Where the stock was added or taken, and where a transfer moved it to
+    location = models.ForeignKey(
+        StockLocation, on_delete=models.PROTECT, null=True, blank=True, related_name='movements'
+    )
+    to_location = models.ForeignKey(
+        StockLocation, on_delete=models.PROTECT, null=True, blank=True, related_name='transfers_in'
+    )
+    # Item's stock after this movement, set when the movement is posted
+    balance_after = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cost_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, null=True, blank=True, editable=False,
+        help_text='Cost of the stock added (positive) or taken (negative), set when posted'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Stock Movement'
         verbose_name_plural = 'Stock Movements'
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self):
         return f"{self.item.name} - {self.movement_type}: {self.quantity}"
@@ -140,20 +241,242 @@ class StockMovement(models.Model):
             raise ValidationError(f'Cannot remove {self.quantity} items. Only {self.item.current_stock} available.')
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        if self.pk is None:
+            # New movements are posted through the ledger, which applies
+            # them to the item's stock
+            from .ledger import post_movements
+            post_movements([self])
+            return
         super().save(*args, **kwargs)
-        
-        if is_new:
-            self.update_item_stock()
-
-    def update_item_stock(self):
-        """Update item stock based on movement"""
-        if self.movement_type == 'IN':
-            self.item.current_stock += self.quantity
-        elif self.movement_type == 'OUT':
-            self.item.current_stock = max(0, self.item.current_stock - self.quantity)
-        elif self.movement_type == 'ADJUSTMENT':
-            # For adjustments, quantity represents the new stock level
-            self.item.current_stock = self.quantity
-        
-        self.item.save(update_fields=['current_stock', 'updated_at'])
+
+
+class LocationStock(models.Model):
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='location_stocks')
+    location = models.ForeignKey(StockLocation, on_delete=models.PROTECT, related_name='stock')
+    quantity = models.PositiveIntegerField(default=0)
+    par_level = models.PositiveIntegerField(default=0, help_text='Stock the location is refilled up to')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'item']
+        verbose_name = 'Location Stock'
+        verbose_name_plural = 'Location Stock'
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'location'], name='one_stock_balance_per_item_location'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.name}: {self.quantity}"
+
+
+class CostLayer(models.Model):
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='cost_layers')
+    movement = models.OneToOneField(
+        StockMovement, on_delete=models.CASCADE, null=True, blank=True, related_name='cost_layer'
+    )
+    quantity = models.PositiveIntegerField()
+    remaining = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    lot_number = models.CharField(max_length=50, blank=True, null=True)
+    expiry_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['item', 'id']
+        verbose_name = 'Cost Layer'
+        verbose_name_plural = 'Cost Layers'
+        indexes = [
+            # Postings only read the layers still holding stock, oldest first
+            models.Index(fields=['item', 'id'], condition=models.Q(remaining__gt=0), name='cost_layer_open_idx'),
+            # Expiry queries and the expiry sweep only read lots still in stock
+            models.Index(
+                fields=['expiry_date'], condition=models.Q(remaining__gt=0), name='cost_layer_open_expiry_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name}: {self.remaining}/{self.quantity} at {self.unit_cost}"
+
+
+class StockSnapshot(models.Model):
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='snapshots')
+    snapshot_date = models.DateField(db_index=True)
+    quantity = models.PositiveIntegerField()
+    last_movement_id = models.BigIntegerField(
+        default=0, help_text='Highest stock movement id included in the quantity'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-snapshot_date', 'item']
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'item'], name='one_stock_snapshot_per_item_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} on {self.snapshot_date}: {self.quantity}"
+
+
+class StockForecast(models.Model):
+    item = models.OneToOneField(InventoryItem, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    forecast_date = models.DateField()
+    daily_demand = models.DecimalField(max_digits=12, decimal_places=2)
+    demand_deviation = models.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Standard deviation of past one-day forecast errors'
+    )
+    lead_time_days = models.PositiveIntegerField()
+    lead_time_demand = models.DecimalField(max_digits=12, decimal_places=2)
+    safety_stock = models.PositiveIntegerField()
+    reorder_point = models.PositiveIntegerField()
+    order_up_to = models.PositiveIntegerField(help_text='Stock level a reorder brings the item up to')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['item']
+        verbose_name = 'Stock Forecast'
+        verbose_name_plural = 'Stock Forecasts'
+
+    def __str__(self):
+        return f"{self.item.name}: reorder at {self.reorder_point}"
+
+
+class PurchaseOrder(models.Model):
+    STATUS_CHOICES = [
+        ('DRAFT', 'Draft'),
+        ('ORDERED', 'Ordered'),
+        ('PARTIAL', 'Partially Received'),
+        ('RECEIVED', 'Received'),
+        ('CLOSED', 'Closed Short'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    po_number = models.CharField(max_length=20, unique=True, blank=True)
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='purchase_orders')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
+    order_date = models.DateField(null=True, blank=True)
+    expected_date = models.DateField(null=True, blank=True)
+    closed_date = models.DateField(null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    received_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    created_by = models.CharField(max_length=100, blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Purchase Order'
+        verbose_name_plural = 'Purchase Orders'
+        indexes = [
+            models.Index(fields=['supplier', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.po_number} - {self.supplier.name}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and not self.po_number:
+            # The number comes from the primary key, which is never handed out
+            # twice, so orders created at once or after a draft was deleted
+            # cannot share one; a placeholder stands in until the key is known
+            with transaction.atomic():
+                self.po_number = f'NEW-{uuid.uuid4().hex[:16]}'
+                super().save(*args, **kwargs)
+                self.po_number = self.generate_po_number()
+                PurchaseOrder.objects.filter(pk=self.pk).update(po_number=self.po_number)
+            return
+        if not self.po_number:
+            self.po_number = self.generate_po_number()
+        super().save(*args, **kwargs)
+
+    def generate_po_number(self):
+        """Generate purchase order number from the saved order's id"""
+        return f"PO-{self.pk:06d}"
+
+
+class PurchaseOrderLine(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey(InventoryItem, on_delete=models.PROTECT, related_name='purchase_order_lines')
+    quantity_ordered = models.PositiveIntegerField()
+    quantity_received = models.PositiveIntegerField(default=0)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['order', 'id']
+        verbose_name = 'Purchase Order Line'
+        verbose_name_plural = 'Purchase Order Lines'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'item'], name='one_purchase_order_line_per_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.order.po_number}: {self.quantity_ordered} x {self.item.name}"
+
+    @property
+    def quantity_outstanding(self):
+        return max(self.quantity_ordered - self.quantity_received, 0)
+
+
+class SupplierStats(models.Model):
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_orders = models.PositiveIntegerField(default=0)
+    open_orders = models.PositiveIntegerField(default=0)
+    closed_orders = models.PositiveIntegerField(default=0)
+    on_time_orders = models.PositiveIntegerField(default=0)
+    # Quantities of closed orders, so open orders do not lower the fill rate
+    ordered_quantity = models.PositiveIntegerField(default=0)
+    received_quantity = models.PositiveIntegerField(default=0)
+    lead_time_days_total = models.PositiveIntegerField(default=0)
+    total_spend = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), db_index=True)
+    last_order_date = models.DateField(null=True, blank=True)
+    last_receipt_date = models.DateField(null=True, blank=True)
+    fill_rate = models.GeneratedField(
+        expression=models.F('received_quantity') * 100.0 / NullIf(models.F('ordered_quantity'), 0),
+        output_field=models.FloatField(), db_persist=True, db_index=True
+    )
+    average_lead_time_days = models.GeneratedField(
+        expression=models.F('lead_time_days_total') * 1.0 / NullIf(models.F('closed_orders'), 0),
+        output_field=models.FloatField(), db_persist=True, db_index=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Supplier Stats'
+        verbose_name_plural = 'Supplier Stats'
+
+    def __str__(self):
+        return f"{self.supplier.name}: {self.total_orders} orders"
+
+
+class MinibarConsumption(models.Model):
+    location = models.ForeignKey(StockLocation, on_delete=models.PROTECT, related_name='minibar_consumption')
+    item = models.ForeignKey(InventoryItem, on_delete=models.PROTECT, related_name='minibar_consumption')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    recorded_by = models.CharField(max_length=100, blank=True, null=True)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    # Set when the consumption is posted at check-out
+    reservation = models.ForeignKey(
+        'reservations.Reservation', on_delete=models.SET_NULL, null=True, blank=True, related_name='minibar_consumption'
+    )
+    movement = models.OneToOneField(
+        StockMovement, on_delete=models.SET_NULL, null=True, blank=True, related_name='minibar_consumption'
+    )
+    charge = models.OneToOneField(
+        'payments.BillCharge', on_delete=models.SET_NULL, null=True, blank=True, related_name='minibar_consumption'
+    )
+    posted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-recorded_at']
+        verbose_name = 'Minibar Consumption'
+        verbose_name_plural = 'Minibar Consumption'
+
+    def __str__(self):
+        return f"{self.location.name}: {self.quantity} x {self.item.name}"
+
+    @property
+    def amount(self):
+        return self.quantity * self.unit_price
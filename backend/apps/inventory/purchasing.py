@@ -0,0 +1,216 @@
+"""
+Purchase orders and supplier performance.
+
+Supplier performance used to be guessed from stock movements that had no
+link to a supplier or an order, once per supplier per request. Stock is now
+bought through purchase orders: placing an order, receiving against its
+lines (each receipt is an ``IN`` movement posted through the ledger and
+linked to its line), and closing or cancelling it.
+
+Every step updates the supplier's ``SupplierStats`` row in the same
+transaction with ``F()`` increments, so the numbers are never recomputed
+from the order history and concurrent receipts cannot overwrite each
+other. Fill rate and average lead time are generated columns over those
+counters, indexed like total spend, so ranking suppliers by any of them is
+one indexed query. Lead time and fill rate count closed orders only, so an
+order still on its way does not lower them. ``rebuild_supplier_stats``
+recomputes every row from the orders in case they ever drift.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Q, Sum
+from django.utils import timezone
+
+from .ledger import post_movements
+from .models import PurchaseOrder, PurchaseOrderLine, StockMovement, SupplierStats
+
+
+OPEN_STATUSES = ['ORDERED', 'PARTIAL']
+CLOSED_STATUSES = ['RECEIVED', 'CLOSED']
+
+STATS_FIELDS = [
+    'total_orders', 'open_orders', 'closed_orders', 'on_time_orders', 'ordered_quantity',
+    'received_quantity', 'lead_time_days_total', 'total_spend', 'last_order_date', 'last_receipt_date',
+    'updated_at'
+]
+
+
+class PurchaseOrderError(Exception):
+    """Raised when a purchase order cannot change as requested"""
+
+
+def _update_stats(supplier_id, values=None, **increments):
+    """Add ``increments`` to a supplier's stats and set ``values``"""
+    SupplierStats.objects.bulk_create([SupplierStats(supplier_id=supplier_id)], ignore_conflicts=True)
+    changes = {field: F(field) + delta for field, delta in increments.items()}
+    SupplierStats.objects.filter(supplier_id=supplier_id).update(
+        updated_at=timezone.now(), **changes, **(values or {})
+    )
+
+
+def _claim(order, statuses, **changes):
+    """Move an order on from one of ``statuses``, failing if another request got there first"""
+    changes['updated_at'] = timezone.now()
+    if not PurchaseOrder.objects.filter(pk=order.pk, status__in=statuses).update(**changes):
+        order.refresh_from_db(fields=['status'])
+        raise PurchaseOrderError(f'Purchase order {order.po_number} is {order.get_status_display().lower()}')
+    # The order may have changed since it was read
+    order.refresh_from_db()
+
+
+def _close_stats(order, lines, closed_on):
+    """Count a received or closed order in its supplier's stats"""
+    on_time = order.expected_date is None or closed_on <= order.expected_date
+    _update_stats(
+        order.supplier_id,
+        open_orders=-1,
+        closed_orders=1,
+        on_time_orders=int(on_time),
+        ordered_quantity=sum(line.quantity_ordered for line in lines),
+        received_quantity=sum(line.quantity_received for line in lines),
+        lead_time_days_total=max((closed_on - order.order_date).days, 0),
+    )
+
+
+def place_order(order, order_date=None):
+    """Send a draft order to its supplier"""
+    order_date = order_date or timezone.localdate()
+    if not order.lines.exists():
+        raise PurchaseOrderError(f'Purchase order {order.po_number} has no lines')
+    with transaction.atomic():
+        _claim(order, ['DRAFT'], status='ORDERED', order_date=order_date)
+        _update_stats(order.supplier_id, values={'last_order_date': order_date}, total_orders=1, open_orders=1)
+    return order
+
+
+def receive_order(order, quantities, performed_by=None, lots=None):
+    """Receive ``quantities`` (line id to quantity) of an order into stock.
+
+    ``lots`` maps line ids to the lot number and expiry date of what was
+    received against them.
+    """
+    lots = lots or {}
+    received_on = timezone.localdate()
+    with transaction.atomic():
+        # Claiming the order also locks it against other receipts
+        _claim(order, OPEN_STATUSES)
+        lines = {line.id: line for line in order.lines.all()}
+        movements = []
+        for line_id, quantity in quantities.items():
+            line = lines.get(line_id)
+            if line is None:
+                raise PurchaseOrderError(f'Line {line_id} is not on purchase order {order.po_number}')
+            if quantity <= 0:
+                raise PurchaseOrderError(f'Quantity received for line {line_id} must be greater than zero')
+            if quantity > line.quantity_outstanding:
+                raise PurchaseOrderError(
+                    f'Line {line_id} has {line.quantity_outstanding} outstanding, {quantity} received'
+                )
+            line.quantity_received += quantity
+            lot_number, expiry_date = lots.get(line_id, (None, None))
+            movements.append(StockMovement(
+                item_id=line.item_id,
+                movement_type='IN',
+                quantity=quantity,
+                unit_cost=line.unit_cost,
+                reason='Purchase',
+                reference_number=order.po_number,
+                lot_number=lot_number,
+                expiry_date=expiry_date,
+                performed_by=performed_by,
+                purchase_order_line=line,
+            ))
+        if not movements:
+            raise PurchaseOrderError('No quantities to receive')
+
+        post_movements(movements)
+        PurchaseOrderLine.objects.bulk_update(
+            [movement.purchase_order_line for movement in movements], ['quantity_received']
+        )
+        value = sum((movement.quantity * movement.unit_cost for movement in movements), Decimal('0'))
+        complete = not any(line.quantity_outstanding for line in lines.values())
+        order.status = 'RECEIVED' if complete else 'PARTIAL'
+        order.received_amount += value
+        if complete:
+            order.closed_date = received_on
+        order.save(update_fields=['status', 'received_amount', 'closed_date', 'updated_at'])
+
+        _update_stats(order.supplier_id, values={'last_receipt_date': received_on}, total_spend=value)
+        if complete:
+            _close_stats(order, lines.values(), received_on)
+    return movements
+
+
+def close_order(order):
+    """Close a partly received order, counting what is missing against the supplier"""
+    closed_on = timezone.localdate()
+    with transaction.atomic():
+        _claim(order, ['PARTIAL'], status='CLOSED', closed_date=closed_on)
+        _close_stats(order, list(order.lines.all()), closed_on)
+    return order
+
+
+def cancel_order(order):
+    """Cancel an order nothing has been received against"""
+    with transaction.atomic():
+        try:
+            _claim(order, ['ORDERED'], status='CANCELLED')
+        except PurchaseOrderError:
+            _claim(order, ['DRAFT'], status='CANCELLED')
+        else:
+            _update_stats(order.supplier_id, total_orders=-1, open_orders=-1)
+    return order
+
+
+def rebuild_supplier_stats():
+    """Recompute every supplier's stats from their purchase orders"""
+    placed = PurchaseOrder.objects.exclude(status__in=['DRAFT', 'CANCELLED']).order_by()
+    closed = Q(status__in=CLOSED_STATUSES)
+    rows = placed.values('supplier_id').annotate(
+        orders=Count('id'),
+        open=Count('id', filter=Q(status__in=OPEN_STATUSES)),
+        closed=Count('id', filter=closed),
+        on_time=Count('id', filter=closed & (Q(expected_date__isnull=True) | Q(closed_date__lte=F('expected_date')))),
+        lead_time=Sum(
+            ExpressionWrapper(F('closed_date') - F('order_date'), output_field=DurationField()), filter=closed
+        ),
+        spend=Sum('received_amount'),
+        last_order=Max('order_date'),
+    )
+    quantities = {
+        row['order__supplier_id']: row
+        for row in PurchaseOrderLine.objects.filter(order__status__in=CLOSED_STATUSES).values(
+            'order__supplier_id'
+        ).annotate(ordered=Sum('quantity_ordered'), received=Sum('quantity_received')).order_by()
+    }
+    last_receipts = dict(
+        StockMovement.objects.filter(purchase_order_line__isnull=False).values(
+            'purchase_order_line__order__supplier_id'
+        ).annotate(last=Max('created_at')).values_list('purchase_order_line__order__supplier_id', 'last').order_by()
+    )
+
+    stats = []
+    for row in rows:
+        supplier_id = row['supplier_id']
+        lines = quantities.get(supplier_id, {})
+        last_receipt = last_receipts.get(supplier_id)
+        stats.append(SupplierStats(
+            supplier_id=supplier_id,
+            total_orders=row['orders'],
+            open_orders=row['open'],
+            closed_orders=row['closed'],
+            on_time_orders=row['on_time'],
+            ordered_quantity=lines.get('ordered') or 0,
+            received_quantity=lines.get('received') or 0,
+            lead_time_days_total=row['lead_time'].days if row['lead_time'] else 0,
+            total_spend=row['spend'] or Decimal('0.00'),
+            last_order_date=row['last_order'],
+            last_receipt_date=timezone.localdate(last_receipt) if last_receipt else None,
+        ))
+    with transaction.atomic():
+        SupplierStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['supplier'], update_fields=STATS_FIELDS
+        )
+        SupplierStats.objects.exclude(supplier_id__in=[row.supplier_id for row in stats]).delete()
+    return len(stats)
@@ -0,0 +1,100 @@
+"""
+In-memory index of active inventory items by barcode and SKU.
+
+Storeroom handhelds resolve every scan to an item, and going through the
+item API meant filter backends and a serializer that loads recent
+movements for each scan. Scans are resolved from dicts of
+``barcode -> record`` and ``sku -> record`` instead, where a record holds
+the few fields a handheld shows. The index is loaded with one query, kept
+current in this process by ``InventoryItem`` and ``InventoryCategory``
+signals, and reloaded after ``INVENTORY_SCAN_INDEX_TTL`` seconds so items
+changed by other processes are picked up within a bounded delay. Stock
+levels change with every movement and are not kept in the index.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+def item_record(item_id, sku, barcode, name, unit, category):
+    """Compact record of an item as returned to scanners"""
+    return {'id': item_id, 'sku': sku, 'barcode': barcode, 'name': name, 'unit': unit, 'category': category}
+
+
+class ItemScanIndex:
+    """Active items by barcode and SKU"""
+
+    def __init__(self):
+        self._barcodes = None
+        self._skus = None
+        self._items = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'INVENTORY_SCAN_INDEX_TTL', 300)
+
+    def warm(self):
+        """(Re)load every active item with a single query"""
+        from .models import InventoryItem
+
+        rows = InventoryItem.objects.filter(is_active=True).values_list(
+            'id', 'sku', 'barcode', 'name', 'unit', 'category__name'
+        ).order_by().iterator(chunk_size=5000)
+        items = {row[0]: item_record(*row) for row in rows}
+        with self._lock:
+            self._items = items
+            self._barcodes = {record['barcode']: record for record in items.values() if record['barcode']}
+            self._skus = {record['sku']: record for record in items.values() if record['sku']}
+            self._loaded_at = time.monotonic()
+        return len(items)
+
+    def clear(self):
+        with self._lock:
+            self._items = self._barcodes = self._skus = None
+
+    def _current(self):
+        if self._items is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.warm()
+        return self._barcodes, self._skus
+
+    def __len__(self):
+        self._current()
+        return len(self._items)
+
+    def lookup(self, code):
+        """Get the record of the active item with a barcode or SKU, or None"""
+        barcodes, skus = self._current()
+        code = code.strip()
+        return barcodes.get(code) or skus.get(code)
+
+    def _unindex(self, item_id):
+        record = self._items.pop(item_id, None)
+        if record is not None:
+            if self._barcodes.get(record['barcode']) is record:
+                del self._barcodes[record['barcode']]
+            if self._skus.get(record['sku']) is record:
+                del self._skus[record['sku']]
+
+    def update(self, record, is_active=True):
+        """Replace an item's record, dropping it if the item is inactive"""
+        with self._lock:
+            if self._items is None:
+                return
+            self._unindex(record['id'])
+            if is_active:
+                self._items[record['id']] = record
+                if record['barcode']:
+                    self._barcodes[record['barcode']] = record
+                if record['sku']:
+                    self._skus[record['sku']] = record
+
+    def remove(self, item_id):
+        with self._lock:
+            if self._items is not None:
+                self._unindex(item_id)
+
+
+scan_index = ItemScanIndex()
@@ -1,6 +1,15 @@
 from rest_framework import serializers
+from django.db.models import Q
+from django.utils import timezone
 from decimal import Decimal
-from .models import InventoryCategory, Supplier, InventoryItem, StockMovement
+from apps.employees.models import Department
+from apps.rooms.models import Room
+from .ledger import InsufficientStock, InvalidTransfer, post_movements
+from .models import (
+    InventoryCategory, Supplier, InventoryItem, StockMovement, PurchaseOrder, PurchaseOrderLine, StockLocation,
+    LocationStock, MinibarConsumption, CostLayer
+)
+from .valuation import inventory_totals, with_location_totals
 
 
 class InventoryCategorySerializer(serializers.ModelSerializer):
@@ -17,15 +26,117 @@ class InventoryCategorySerializer(serializers.ModelSerializer):
 
     def get_items_count(self, obj):
         """Get total number of items in category"""
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.inventoryitem_set.filter(is_active=True).count()
 
     def get_total_stock_value(self, obj):
         """Get total stock value for category"""
-        total = sum([
-            item.current_stock * item.unit_cost 
-            for item in obj.inventoryitem_set.filter(is_active=True)
-        ])
-        return float(total)
+        if not hasattr(obj, 'total_stock_value'):
+            obj.total_stock_value = inventory_totals(obj.inventoryitem_set.filter(is_active=True))['total_value']
+        return float(obj.total_stock_value)
+
+
+class StockLocationSerializer(serializers.ModelSerializer):
+    location_type_display = serializers.CharField(source='get_location_type_display', read_only=True)
+    room_number = serializers.CharField(source='room.number', read_only=True)
+    totals = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StockLocation
+        fields = [
+            'id', 'name', 'location_type', 'location_type_display', 'floor', 'room', 'room_number',
+            'is_default', 'is_active', 'totals', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['is_default', 'created_at', 'updated_at']
+
+    def get_totals(self, obj):
+        """Get counts and value of the stock held at the location"""
+        if not hasattr(obj, 'total_quantity'):
+            obj = with_location_totals(StockLocation.objects.filter(pk=obj.pk)).get()
+        return {
+            'items_count': obj.items_count,
+            'total_quantity': obj.total_quantity,
+            'below_par_items': obj.below_par_items,
+            'total_stock_value': float(obj.total_stock_value)
+        }
+
+
+class LocationStockSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    item_sku = serializers.CharField(source='item.sku', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    refill_quantity = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LocationStock
+        fields = [
+            'item', 'item_name', 'item_sku', 'location', 'location_name', 'quantity', 'par_level',
+            'refill_quantity', 'updated_at'
+        ]
+
+    def get_refill_quantity(self, obj):
+        """Get the quantity needed to bring the location up to par"""
+        return max(obj.par_level - obj.quantity, 0)
+
+
+class ParLevelSerializer(serializers.Serializer):
+    """Par level of one item at a location"""
+    item = serializers.PrimaryKeyRelatedField(queryset=InventoryItem.objects.filter(is_active=True))
+    par_level = serializers.IntegerField(min_value=0)
+
+
+class ParLevelsSerializer(serializers.Serializer):
+    """Serializer for setting par levels of many items at a location"""
+    items = ParLevelSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        ids = [line['item'].id for line in items]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each item can only be listed once.")
+        return items
+
+
+class MinibarParLevelsSerializer(ParLevelsSerializer):
+    """Serializer for stocking the minibars of many rooms with the same par levels"""
+    rooms = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.all(), many=True, required=False,
+        help_text="Rooms to set par levels for, all rooms when left out"
+    )
+
+
+class MinibarConsumptionSerializer(serializers.ModelSerializer):
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    room_number = serializers.CharField(source='location.room.number', read_only=True, default=None)
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = MinibarConsumption
+        fields = [
+            'id', 'location', 'location_name', 'room_number', 'item', 'item_name', 'quantity', 'unit_price',
+            'amount', 'recorded_by', 'recorded_at', 'reservation', 'posted_at'
+        ]
+        read_only_fields = fields
+
+
+class MinibarLineSerializer(serializers.Serializer):
+    """One item taken from a minibar"""
+    item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class MinibarRecordSerializer(serializers.Serializer):
+    """Serializer for recording what was taken from a room's minibar"""
+    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all())
+    items = MinibarLineSerializer(many=True, allow_empty=False)
+    recorded_by = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate_items(self, items):
+        ids = [line['item'] for line in items]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each item can only be listed once.")
+        return items
 
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -37,7 +148,7 @@ class SupplierSerializer(serializers.ModelSerializer):
         model = Supplier
         fields = [
             'id', 'name', 'contact_person', 'contact_person_display', 'email', 
-            'phone', 'address', 'city', 'country', 'payment_terms', 'is_active',
+            'phone', 'address', 'city', 'country', 'payment_terms', 'lead_time_days', 'is_active',
             'created_at', 'updated_at', 'items_supplied', 'total_orders'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -53,8 +164,9 @@ class SupplierSerializer(serializers.ModelSerializer):
         return obj.inventoryitem_set.filter(is_active=True).count()
 
     def get_total_orders(self, obj):
-        """Get total number of stock movements from this supplier"""
-        return obj.stockmovement_set.filter(movement_type='IN').count()
+        """Get total number of purchase orders placed with this supplier"""
+        stats = getattr(obj, 'stats', None)
+        return stats.total_orders if stats else 0
 
 
 class InventoryItemSerializer(serializers.ModelSerializer):
@@ -62,15 +174,18 @@ class InventoryItemSerializer(serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     stock_value = serializers.SerializerMethodField()
     stock_status = serializers.SerializerMethodField()
+    reorder_level = serializers.IntegerField(read_only=True)
+    suggested_order_quantity = serializers.IntegerField(read_only=True)
+    location_stock = serializers.SerializerMethodField()
     recent_movements = serializers.SerializerMethodField()
     
     class Meta:
         model = InventoryItem
         fields = [
-            'id', 'name', 'description', 'sku', 'category', 'category_name',
+            'id', 'name', 'notes', 'sku', 'barcode', 'category', 'category_name',
             'supplier', 'supplier_name', 'unit', 'current_stock', 'minimum_stock',
-            'unit_cost', 'stock_value', 'stock_status', 'location', 'is_active',
-            'created_at', 'updated_at', 'recent_movements'
+            'reorder_level', 'suggested_order_quantity', 'unit_cost', 'selling_price', 'stock_value', 'stock_status', 'location', 'is_active',
+            'created_at', 'updated_at', 'location_stock', 'recent_movements'
         ]
         read_only_fields = ['created_at', 'updated_at']
 
@@ -79,16 +194,26 @@ class InventoryItemSerializer(serializers.ModelSerializer):
         return float(obj.current_stock * obj.unit_cost)
 
     def get_stock_status(self, obj):
-        """Get stock status based on minimum stock level"""
+        """Get stock status based on the reorder level"""
+        reorder_level = obj.reorder_level()
         if obj.current_stock <= 0:
             return {'status': 'OUT_OF_STOCK', 'color': 'red'}
-        elif obj.current_stock <= obj.minimum_stock:
+        elif obj.current_stock <= reorder_level:
             return {'status': 'LOW_STOCK', 'color': 'orange'}
-        elif obj.current_stock <= (obj.minimum_stock * 2):
+        elif obj.current_stock <= (reorder_level * 2):
             return {'status': 'MODERATE_STOCK', 'color': 'yellow'}
         else:
             return {'status': 'IN_STOCK', 'color': 'green'}
 
+    def get_location_stock(self, obj):
+        """Get the item's stock at each location holding or stocking it"""
+        stock = obj.location_stocks.filter(Q(quantity__gt=0) | Q(par_level__gt=0)).select_related('location')
+        return [
+            {'location': row.location_id, 'location_name': row.location.name, 'quantity': row.quantity,
+             'par_level': row.par_level}
+            for row in stock
+        ]
+
     def get_recent_movements(self, obj):
         """Get last 5 stock movements"""
         movements = obj.movements.order_by('-created_at')[:5]
@@ -100,12 +225,13 @@ class InventoryItemListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     stock_status = serializers.SerializerMethodField()
     stock_value = serializers.SerializerMethodField()
+    reorder_level = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = InventoryItem
         fields = [
-            'id', 'name', 'sku', 'category_name', 'current_stock',
-            'minimum_stock', 'unit_cost', 'stock_value', 'stock_status',
+            'id', 'name', 'sku', 'barcode', 'category_name', 'current_stock',
+            'minimum_stock', 'reorder_level', 'unit_cost', 'stock_value', 'stock_status',
             'is_active'
         ]
 
@@ -113,7 +239,7 @@ class InventoryItemListSerializer(serializers.ModelSerializer):
         """Get stock status"""
         if obj.current_stock <= 0:
             return 'OUT_OF_STOCK'
-        elif obj.current_stock <= obj.minimum_stock:
+        elif obj.current_stock <= obj.reorder_level():
             return 'LOW_STOCK'
         else:
             return 'IN_STOCK'
@@ -128,8 +254,8 @@ class InventoryItemCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = InventoryItem
         fields = [
-            'name', 'description', 'sku', 'category', 'supplier', 'unit',
-            'current_stock', 'minimum_stock', 'unit_cost', 'location'
+            'name', 'notes', 'sku', 'barcode', 'category', 'supplier', 'unit',
+            'current_stock', 'minimum_stock', 'unit_cost', 'selling_price', 'location'
         ]
 
     def validate_sku(self, value):
@@ -142,6 +268,10 @@ class InventoryItemCreateUpdateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Item with this SKU already exists.")
         return value
 
+    def validate_barcode(self, value):
+        """Store a blank barcode as none so it does not clash with other items"""
+        return (value or '').strip() or None
+
     def validate(self, data):
         """Validate item data"""
         if data.get('current_stock', 0) < 0:
@@ -159,8 +289,9 @@ class InventoryItemCreateUpdateSerializer(serializers.ModelSerializer):
 class StockMovementSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source='item.name', read_only=True)
     item_sku = serializers.CharField(source='item.sku', read_only=True)
-    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     movement_type_display = serializers.CharField(source='get_movement_type_display', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    to_location_name = serializers.CharField(source='to_location.name', read_only=True)
     total_cost = serializers.SerializerMethodField()
     
     class Meta:
@@ -168,14 +299,15 @@ class StockMovementSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'item', 'item_name', 'item_sku', 'movement_type',
             'movement_type_display', 'quantity', 'unit_cost', 'total_cost',
-            'supplier', 'supplier_name', 'reference_number', 'notes',
-            'created_at'
+            'reason', 'department', 'location', 'location_name', 'to_location', 'to_location_name',
+            'reference_number', 'lot_number', 'expiry_date', 'performed_by', 'notes',
+            'purchase_order_line', 'balance_after', 'cost_amount', 'created_at'
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['purchase_order_line', 'balance_after', 'cost_amount', 'created_at']
 
     def get_total_cost(self, obj):
         """Calculate total cost of movement"""
-        return float(obj.quantity * obj.unit_cost)
+        return float(obj.quantity * (obj.unit_cost or 0))
 
 
 class StockMovementCreateSerializer(serializers.ModelSerializer):
@@ -183,48 +315,235 @@ class StockMovementCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockMovement
         fields = [
-            'item', 'movement_type', 'quantity', 'unit_cost', 'supplier',
-            'reference_number', 'notes'
+            'item', 'movement_type', 'quantity', 'unit_cost', 'reason', 'department',
+            'location', 'to_location', 'reference_number', 'lot_number', 'expiry_date', 'performed_by', 'notes'
         ]
 
     def validate(self, data):
         """Validate stock movement data"""
-        if data['quantity'] <= 0:
+        if data['quantity'] <= 0 and data['movement_type'] != 'ADJUSTMENT':
             raise serializers.ValidationError("Quantity must be greater than zero.")
         
-        if data['unit_cost'] < 0:
-            raise serializers.ValidationError("Unit cost cannot be negative.")
+        validate_transfer(data)
+        validate_lot(data)
         
-        # For OUT movements, check if there's enough stock
-        if data['movement_type'] == 'OUT':
-            item = data['item']
-            if item.current_stock < data['quantity']:
-                raise serializers.ValidationError(
-                    f"Insufficient stock. Available: {item.current_stock}, Requested: {data['quantity']}"
-                )
+        if data.get('unit_cost') is not None and data['unit_cost'] < 0:
+            raise serializers.ValidationError("Unit cost cannot be negative.")
         
         return data
 
     def create(self, validated_data):
-        """Create stock movement and update item stock"""
-        movement = StockMovement.objects.create(**validated_data)
-        
-        # Update item stock based on movement type
-        item = movement.item
-        if movement.movement_type == 'IN':
-            item.current_stock += movement.quantity
-            # Update unit cost with weighted average
-            if item.current_stock > 0:
-                total_value = (item.current_stock - movement.quantity) * item.unit_cost + movement.quantity * movement.unit_cost
-                item.unit_cost = total_value / item.current_stock
-        else:  # OUT movement
-            item.current_stock -= movement.quantity
-        
-        item.save(update_fields=['current_stock', 'unit_cost', 'updated_at'])
-        
+        """Post the movement to the stock ledger"""
+        movement = StockMovement(**validated_data)
+        try:
+            post_movements([movement])
+        except InsufficientStock as e:
+            raise serializers.ValidationError(
+                f"Insufficient stock. Available: {e.available}, Requested: {e.requested}"
+            )
+        except InvalidTransfer as e:
+            raise serializers.ValidationError(str(e))
         return movement
 
 
+def validate_transfer(data):
+    """Check a transfer names a destination other than its source, and nothing else does"""
+    source, destination = data.get('location'), data.get('to_location')
+    if data['movement_type'] != 'TRANSFER':
+        if destination is not None:
+            raise serializers.ValidationError("Only transfers have a destination location.")
+    elif destination is None:
+        raise serializers.ValidationError("Transfers need a destination location.")
+    elif destination == source:
+        raise serializers.ValidationError("A transfer cannot move stock to the location it comes from.")
+
+
+def validate_lot(data):
+    """Check only stock coming in names the lot it belongs to"""
+    if data['movement_type'] not in ('IN', 'ADJUSTMENT') and (data.get('lot_number') or data.get('expiry_date')):
+        raise serializers.ValidationError("Only receipts and adjustments can name a lot or expiry date.")
+
+
+class StockMovementLineSerializer(serializers.Serializer):
+    """One movement of a batch, referring to its item by id"""
+    item = serializers.IntegerField(min_value=1)
+    movement_type = serializers.ChoiceField(choices=StockMovement.MOVEMENT_TYPE_CHOICES)
+    quantity = serializers.IntegerField(min_value=0)
+    reason = serializers.ChoiceField(choices=StockMovement.REASON_CHOICES)
+    department = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    location = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    to_location = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    unit_cost = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False, allow_null=True
+    )
+    reference_number = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    lot_number = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    expiry_date = serializers.DateField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if data['quantity'] <= 0 and data['movement_type'] != 'ADJUSTMENT':
+            raise serializers.ValidationError("Quantity must be greater than zero.")
+        validate_transfer(data)
+        validate_lot(data)
+        return data
+
+
+class StockMovementBatchSerializer(serializers.Serializer):
+    """Serializer for posting many stock movements in one transaction"""
+    movements = StockMovementLineSerializer(many=True, allow_empty=False, max_length=5000)
+    performed_by = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class ScanLineSerializer(serializers.Serializer):
+    """One scan of a batch, referring to its item by barcode or SKU"""
+    code = serializers.CharField(max_length=64)
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class ScanBatchSerializer(serializers.Serializer):
+    """Serializer for posting a batch of scans as stock movements"""
+    scans = ScanLineSerializer(many=True, allow_empty=False, max_length=5000)
+    movement_type = serializers.ChoiceField(choices=StockMovement.MOVEMENT_TYPE_CHOICES)
+    reason = serializers.ChoiceField(choices=StockMovement.REASON_CHOICES)
+    department = serializers.PrimaryKeyRelatedField(
+        queryset=Department.objects.all(), required=False, allow_null=True
+    )
+    location = serializers.PrimaryKeyRelatedField(
+        queryset=StockLocation.objects.filter(is_active=True), required=False, allow_null=True
+    )
+    to_location = serializers.PrimaryKeyRelatedField(
+        queryset=StockLocation.objects.filter(is_active=True), required=False, allow_null=True
+    )
+    reference_number = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    performed_by = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate(self, data):
+        if data['movement_type'] != 'ADJUSTMENT' and any(scan['quantity'] <= 0 for scan in data['scans']):
+            raise serializers.ValidationError("Quantity must be greater than zero.")
+        validate_transfer(data)
+        return data
+
+
+class PurchaseOrderLineSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    item_sku = serializers.CharField(source='item.sku', read_only=True)
+    line_total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PurchaseOrderLine
+        fields = [
+            'id', 'item', 'item_name', 'item_sku', 'quantity_ordered', 'quantity_received',
+            'quantity_outstanding', 'unit_cost', 'line_total'
+        ]
+        read_only_fields = ['quantity_received', 'quantity_outstanding']
+
+    def get_line_total(self, obj):
+        """Calculate ordered value of the line"""
+        return float(obj.quantity_ordered * obj.unit_cost)
+
+    def validate(self, data):
+        if data['quantity_ordered'] <= 0:
+            raise serializers.ValidationError("Quantity ordered must be greater than zero.")
+        if data['unit_cost'] < 0:
+            raise serializers.ValidationError("Unit cost cannot be negative.")
+        return data
+
+
+class PurchaseOrderSerializer(serializers.ModelSerializer):
+    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    lines = PurchaseOrderLineSerializer(many=True)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = [
+            'id', 'po_number', 'supplier', 'supplier_name', 'status', 'status_display',
+            'order_date', 'expected_date', 'closed_date', 'total_amount', 'received_amount',
+            'created_by', 'notes', 'lines', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'po_number', 'status', 'order_date', 'closed_date', 'total_amount', 'received_amount',
+            'created_at', 'updated_at'
+        ]
+
+    def validate(self, data):
+        """Validate purchase order data"""
+        if self.instance and self.instance.status != 'DRAFT':
+            raise serializers.ValidationError("Only draft purchase orders can be changed.")
+        lines = data.get('lines')
+        if lines is not None:
+            if not lines:
+                raise serializers.ValidationError("A purchase order needs at least one line.")
+            items = [line['item'].id for line in lines]
+            if len(set(items)) != len(items):
+                raise serializers.ValidationError("Each item can only be ordered once per purchase order.")
+        return data
+
+    def _save_lines(self, order, lines):
+        order.lines.all().delete()
+        PurchaseOrderLine.objects.bulk_create([PurchaseOrderLine(order=order, **line) for line in lines])
+        order.total_amount = sum((line['quantity_ordered'] * line['unit_cost'] for line in lines), Decimal('0.00'))
+        order.save(update_fields=['total_amount', 'updated_at'])
+
+    def create(self, validated_data):
+        lines = validated_data.pop('lines')
+        order = PurchaseOrder.objects.create(**validated_data)
+        self._save_lines(order, lines)
+        return order
+
+    def update(self, instance, validated_data):
+        lines = validated_data.pop('lines', None)
+        order = super().update(instance, validated_data)
+        if lines is not None:
+            self._save_lines(order, lines)
+        return order
+
+
+class PurchaseOrderReceiptLineSerializer(serializers.Serializer):
+    """Quantity received against one purchase order line"""
+    line = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    lot_number = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    expiry_date = serializers.DateField(required=False, allow_null=True)
+
+
+class PurchaseOrderReceiptSerializer(serializers.Serializer):
+    """Serializer for receiving a purchase order into stock"""
+    lines = PurchaseOrderReceiptLineSerializer(many=True, allow_empty=False)
+    performed_by = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate_lines(self, lines):
+        ids = [line['line'] for line in lines]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each line can only be received once per receipt.")
+        return lines
+
+
+class StockLotSerializer(serializers.ModelSerializer):
+    """A lot still in stock, from the cost layer its receipt opened"""
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    item_sku = serializers.CharField(source='item.sku', read_only=True)
+    value = serializers.SerializerMethodField()
+    days_to_expiry = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CostLayer
+        fields = [
+            'id', 'item', 'item_name', 'item_sku', 'lot_number', 'expiry_date', 'days_to_expiry', 'quantity',
+            'remaining', 'unit_cost', 'value', 'movement', 'created_at'
+        ]
+        read_only_fields = fields
+
+    def get_value(self, obj):
+        return float(obj.remaining * obj.unit_cost)
+
+    def get_days_to_expiry(self, obj):
+        if obj.expiry_date is None:
+            return None
+        return (obj.expiry_date - timezone.localdate()).days
+
+
 class InventoryReportSerializer(serializers.Serializer):
     """Serializer for inventory reports"""
     total_items = serializers.IntegerField()
@@ -244,6 +563,8 @@ class LowStockAlertSerializer(serializers.Serializer):
     sku = serializers.CharField()
     current_stock = serializers.IntegerField()
     minimum_stock = serializers.IntegerField()
+    reorder_point = serializers.IntegerField()
+    suggested_quantity = serializers.IntegerField()
     category = serializers.CharField()
     supplier = serializers.CharField()
     stock_status = serializers.CharField()
@@ -267,8 +588,14 @@ class SupplierPerformanceSerializer(serializers.Serializer):
     supplier_id = serializers.IntegerField()
     supplier_name = serializers.CharField()
     total_orders = serializers.IntegerField()
+    open_orders = serializers.IntegerField()
+    closed_orders = serializers.IntegerField()
     total_items_supplied = serializers.IntegerField()
-    total_value_supplied = serializers.DecimalField(max_digits=12, decimal_places=2)
-    average_order_value = serializers.DecimalField(max_digits=10, decimal_places=2)
-    last_order_date = serializers.DateTimeField()
-    payment_terms = serializers.CharField()
\ No newline at end of file
+    total_spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    average_order_value = serializers.DecimalField(max_digits=14, decimal_places=2)
+    fill_rate = serializers.FloatField(allow_null=True)
+    on_time_rate = serializers.FloatField(allow_null=True)
+    average_lead_time_days = serializers.FloatField(allow_null=True)
+    last_order_date = serializers.DateField(allow_null=True)
+    last_receipt_date = serializers.DateField(allow_null=True)
+    payment_terms = serializers.CharField(allow_null=True)
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import InventoryCategory, InventoryItem
+from .scanindex import item_record, scan_index
+
+
+@receiver(post_save, sender=InventoryItem)
+def index_item(sender, instance, raw=False, **kwargs):
+    """Keep the scan index in step with saved items"""
+    if raw:
+        return
+    record = item_record(
+        instance.pk, instance.sku or None, instance.barcode or None, instance.name, instance.unit,
+        instance.category.name
+    )
+    is_active = instance.is_active
+    transaction.on_commit(lambda: scan_index.update(record, is_active))
+
+
+@receiver(post_delete, sender=InventoryItem)
+def unindex_item(sender, instance, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: scan_index.remove(item_id))
+
+
+@receiver(post_save, sender=InventoryCategory)
+def reload_scan_index(sender, raw=False, **kwargs):
+    """Reload the scan index when a category, whose name it holds, changes"""
+    if not raw:
+        transaction.on_commit(scan_index.clear)
@@ -0,0 +1,119 @@
+"""
+Stock as of a past date.
+
+Stock on a past day used to be answerable only by replaying every
+``StockMovement`` from the beginning. ``take_snapshots`` records every
+item's stock at the end of a day (monthly, or nightly from the night
+audit) together with the highest movement id it includes. An as-of query
+starts from the latest snapshot on or before the day and replays only the
+movements after that id with one grouped query, so its cost depends on
+the activity since the checkpoint rather than on the size of the ledger.
+
+Adjustments set the stock level instead of changing it, so items adjusted
+since the checkpoint replay from their last adjustment on; those are the
+only movements read row by row.
+
+The first snapshot is taken when the table is created, from the items'
+stock at that time. Days before it are replayed from zero and are only
+exact when every unit of stock came in through a movement.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, When
+from django.utils import timezone
+
+from .models import InventoryItem, StockMovement, StockSnapshot
+
+
+def _day_end(day):
+    """Get the first moment after a day in the current time zone"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def _signed_quantity():
+    return Case(
+        When(movement_type='IN', then=F('quantity')),
+        When(movement_type='OUT', then=-F('quantity')),
+        default=0,
+        output_field=IntegerField()
+    )
+
+
+def _last_movement_id(day):
+    """Get the id of the last movement posted by the end of a day"""
+    return StockMovement.objects.filter(created_at__lt=_day_end(day)).aggregate(last=Max('id'))['last'] or 0
+
+
+def _checkpoint(day, item_ids=None):
+    """Get the balances and movement id of the latest snapshot on or before a day"""
+    latest = StockSnapshot.objects.filter(snapshot_date__lte=day).order_by('-snapshot_date').values(
+        'snapshot_date', 'last_movement_id'
+    ).first()
+    if latest is None:
+        return None, {}, 0
+    snapshots = StockSnapshot.objects.filter(snapshot_date=latest['snapshot_date'])
+    if item_ids is not None:
+        snapshots = snapshots.filter(item_id__in=item_ids)
+    balances = dict(snapshots.values_list('item_id', 'quantity'))
+    return latest['snapshot_date'], balances, latest['last_movement_id']
+
+
+def _replay(balances, after_id, up_to_id, item_ids=None):
+    """Apply the movements with ids in ``(after_id, up_to_id]`` to some balances"""
+    window = StockMovement.objects.filter(id__gt=after_id, id__lte=up_to_id)
+    if item_ids is not None:
+        window = window.filter(item_id__in=item_ids)
+    rows = window.order_by().values('item_id').annotate(
+        net=Sum(_signed_quantity()),
+        last_adjustment=Max('id', filter=Q(movement_type='ADJUSTMENT'))
+    )
+    adjusted = {}
+    for row in rows:
+        if row['last_adjustment']:
+            adjusted[row['item_id']] = row['last_adjustment']
+        else:
+            balances[row['item_id']] = balances.get(row['item_id'], 0) + row['net']
+    if adjusted:
+        # Only the last adjustment of an item and what follows it count
+        tail = window.filter(item_id__in=adjusted, id__gte=min(adjusted.values())).order_by('id').values_list(
+            'item_id', 'id', 'movement_type', 'quantity', 'balance_after'
+        )
+        for item_id, movement_id, movement_type, quantity, balance_after in tail:
+            if movement_id < adjusted[item_id]:
+                continue
+            if movement_type == 'ADJUSTMENT':
+                # An adjustment of one location sets that location's stock,
+                # so the item's total is the balance it was posted with
+                balances[item_id] = quantity if balance_after is None else balance_after
+            elif movement_type == 'IN':
+                balances[item_id] += quantity
+            elif movement_type == 'OUT':
+                balances[item_id] -= quantity
+    return balances
+
+
+def stock_as_of(day, item_ids=None):
+    """Get ``(checkpoint date, {item_id: stock})`` at the end of a day"""
+    checkpoint_date, balances, after_id = _checkpoint(day, item_ids)
+    return checkpoint_date, _replay(balances, after_id, _last_movement_id(day), item_ids)
+
+
+def take_snapshots(day=None):
+    """Record every item's stock at the end of a day, today by default"""
+    day = day or timezone.localdate()
+    # Fix the high-water mark first so movements posted meanwhile are left
+    # for the replay after this snapshot
+    last_id = _last_movement_id(day)
+    checkpoint_date, balances, after_id = _checkpoint(day)
+    balances = _replay(balances, after_id, last_id)
+    item_ids = InventoryItem.objects.filter(created_at__lt=_day_end(day)).values_list('id', flat=True)
+    snapshots = [
+        StockSnapshot(item_id=item_id, snapshot_date=day, quantity=max(balances.get(item_id, 0), 0),
+                      last_movement_id=last_id)
+        for item_id in item_ids
+    ]
+    with transaction.atomic():
+        StockSnapshot.objects.filter(snapshot_date=day).delete()
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+    return {'date': day, 'items': len(snapshots), 'last_movement_id': last_id}
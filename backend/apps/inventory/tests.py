@@ -1,7 +1,29 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from datetime import datetime, time, timedelta
 from decimal import Decimal
-from .models import InventoryCategory, InventoryItem, StockMovement, Supplier
+from apps.checkin.batch import BatchError, batch_check_in, batch_check_out
+from apps.guests.models import Guest
+from apps.payments.models import Bill, BillCharge
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import Room, RoomType
+from .expiry import expiring_lots, write_off_expired
+from .forecasting import forecast_demand
+from .minibar import MinibarError, record_consumption
+from .ledger import InsufficientStock, post_movements
+from apps.employees.models import Department
+from .models import (
+    CostLayer, InventoryCategory, InventoryItem, LocationStock, MinibarConsumption, PurchaseOrder, StockForecast,
+    StockLocation, StockMovement, StockSnapshot, Supplier, SupplierStats
+)
+from .purchasing import PurchaseOrderError, cancel_order, close_order, place_order, rebuild_supplier_stats, receive_order
+from .scanindex import scan_index
+from .snapshots import stock_as_of, take_snapshots
+from .valuation import cost_of_goods_used, inventory_totals, ranked_items, with_category_totals, with_location_totals
 
 
 class InventoryCategoryModelTest(TestCase):
@@ -142,3 +164,852 @@ class StockMovementModelTest(TestCase):
         )
         expected = 'Toilet Paper - IN: 10'
         self.assertEqual(str(movement), expected)
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.category = InventoryCategory.objects.create(name='Amenities')
+        self.soap = InventoryItem.objects.create(
+            name='Soap', category=self.category, current_stock=50, unit_cost=Decimal('2.00')
+        )
+        self.shampoo = InventoryItem.objects.create(
+            name='Shampoo', category=self.category, current_stock=20, unit_cost=Decimal('5.00')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='storekeeper', password='pass'))
+
+    def test_concurrent_movements_are_not_lost(self):
+        """Test movements posted from stale item copies all apply"""
+        cart_one = InventoryItem.objects.get(pk=self.soap.pk)
+        cart_two = InventoryItem.objects.get(pk=self.soap.pk)
+        StockMovement.objects.create(item=cart_one, movement_type='OUT', quantity=15, reason='Housekeeping')
+        second = StockMovement.objects.create(item=cart_two, movement_type='OUT', quantity=10, reason='Housekeeping')
+
+        self.soap.refresh_from_db()
+        self.assertEqual(self.soap.current_stock, 25)
+        self.assertEqual(second.balance_after, 25)
+        self.assertEqual(cart_two.current_stock, 25)
+
+    def test_batch_applies_in_order_with_checkpoints(self):
+        """Test a batch is one insert and one update per item, recording balances"""
+        movements = [
+            StockMovement(item_id=self.soap.pk, movement_type='OUT', quantity=2, reason='Housekeeping')
+            for _ in range(20)
+        ] + [
+            StockMovement(item_id=self.shampoo.pk, movement_type='IN', quantity=20, reason='Purchase',
+                          unit_cost=Decimal('6.00')),
+            StockMovement(item_id=self.soap.pk, movement_type='ADJUSTMENT', quantity=12, reason='Inventory Count'),
+        ]
+        # Savepoint, lock, balances, open cost layers, location balances,
+        # default location, movements, new layers, used layers, location
+        # balances, two item updates, release
+        with self.assertNumQueries(13):
+            post_movements(movements)
+
+        self.assertEqual([m.balance_after for m in movements[:3]], [48, 46, 44])
+        self.assertEqual(movements[-1].balance_after, 12)
+        self.soap.refresh_from_db()
+        self.shampoo.refresh_from_db()
+        self.assertEqual(self.soap.current_stock, 12)
+        self.assertEqual((self.shampoo.current_stock, self.shampoo.unit_cost), (40, Decimal('5.50')))
+        # Both items' opening stock is recorded as well
+        self.assertEqual(StockMovement.objects.filter(balance_after__isnull=False).count(), 24)
+
+    def test_overdrawn_batch_is_rejected_whole(self):
+        """Test a batch taking an item below zero posts nothing"""
+        movements = [
+            StockMovement(item_id=self.shampoo.pk, movement_type='OUT', quantity=5, reason='Room Usage'),
+            StockMovement(item_id=self.soap.pk, movement_type='OUT', quantity=30, reason='Room Usage'),
+            StockMovement(item_id=self.soap.pk, movement_type='OUT', quantity=30, reason='Room Usage'),
+        ]
+        with self.assertRaises(InsufficientStock) as raised:
+            post_movements(movements)
+        self.assertEqual((raised.exception.item_id, raised.exception.available), (self.soap.pk, 20))
+        self.assertFalse(StockMovement.objects.filter(movement_type='OUT').exists())
+        self.shampoo.refresh_from_db()
+        self.assertEqual(self.shampoo.current_stock, 20)
+
+    def test_batch_and_adjust_api(self):
+        """Test the batch movement endpoint and a single stock adjustment"""
+        url = '/api/inventory/stock-movements/batch/'
+        usage = [
+            {'item': item.pk, 'movement_type': 'OUT', 'quantity': 1, 'reason': 'Housekeeping'}
+            for _ in range(15) for item in (self.soap, self.shampoo)
+        ]
+        response = self.client.post(url, {'movements': usage}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_movements'], 30)
+        self.assertEqual(
+            {row['item_id']: row['current_stock'] for row in response.data['items']},
+            {self.soap.pk: 35, self.shampoo.pk: 5}
+        )
+        self.assertEqual(StockMovement.objects.filter(performed_by='storekeeper').count(), 30)
+
+        response = self.client.post(url, {'movements': usage}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['item'], response.data['available']), (self.shampoo.pk, 0))
+        response = self.client.post(url, {'movements': [dict(usage[0], item=999)]}, format='json')
+        self.assertEqual(response.data['items'], [999])
+
+        response = self.client.post(
+            f'/api/inventory/items/{self.soap.pk}/adjust_stock/', {'new_stock': 40, 'reason': 'Count'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['old_stock'], response.data['adjustment']), (35, 5))
+        self.soap.refresh_from_db()
+        self.assertEqual(self.soap.current_stock, 40)
+
+
+class StockSnapshotTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.days = [self.today - timedelta(days=ago) for ago in (10, 5, 2)]
+        category = InventoryCategory.objects.create(name='Amenities')
+        self.soap = InventoryItem.objects.create(name='Soap', category=category, current_stock=50)
+        self.towel = InventoryItem.objects.create(name='Towel', category=category)
+        self.post(0, self.soap, 'OUT', 10)
+        self.post(0, self.towel, 'IN', 8)
+        self.post(1, self.soap, 'IN', 30)
+        self.post(2, self.soap, 'ADJUSTMENT', 60)
+        self.post(2, self.soap, 'OUT', 5)
+        self.post(2, self.towel, 'OUT', 3)
+        StockMovement.objects.filter(notes='Opening stock').update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        InventoryItem.objects.update(created_at=timezone.now() - timedelta(days=10))
+
+    def post(self, day, item, movement_type, quantity):
+        movement = StockMovement.objects.create(
+            item=item, movement_type=movement_type, quantity=quantity, reason='Other'
+        )
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=timezone.now() - timedelta(days=(10, 5, 2)[day]))
+
+    def test_stock_as_of_replays_movements(self):
+        """Test past stock is rebuilt from movements, honouring adjustments"""
+        expected = [{self.soap.pk: 40, self.towel.pk: 8}, {self.soap.pk: 70, self.towel.pk: 8}, {self.soap.pk: 55, self.towel.pk: 5}]
+        for day, balances in zip(self.days, expected):
+            self.assertEqual(stock_as_of(day), (None, balances))
+        self.assertEqual(stock_as_of(self.days[0] - timedelta(days=1)), (None, {}))
+
+    def test_replay_starts_from_latest_snapshot(self):
+        """Test as-of queries replay only the movements after the nearest snapshot"""
+        self.assertEqual(take_snapshots(self.days[1])['items'], 2)
+        self.assertEqual(
+            dict(StockSnapshot.objects.values_list('item_id', 'quantity')), {self.soap.pk: 70, self.towel.pk: 8}
+        )
+        # Snapshot, its balances, high-water mark, grouped replay, adjusted tail
+        with self.assertNumQueries(5):
+            checkpoint, balances = stock_as_of(self.days[2])
+        self.assertEqual((checkpoint, balances), (self.days[1], {self.soap.pk: 55, self.towel.pk: 5}))
+        self.assertEqual(stock_as_of(self.days[1]), (self.days[1], {self.soap.pk: 70, self.towel.pk: 8}))
+
+        # A snapshot taken after later movements still matches the ledger
+        take_snapshots()
+        self.soap.refresh_from_db()
+        self.assertEqual(StockSnapshot.objects.get(item=self.soap, snapshot_date=self.today).quantity, 55)
+        self.assertEqual(self.soap.current_stock, 55)
+
+    def test_stock_as_of_api(self):
+        """Test the as-of endpoint lists every item's past stock"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='auditor', password='pass'))
+        response = client.get('/api/inventory/items/stock_as_of/', {'date': self.days[1].isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['item_id']: row['quantity'] for row in response.data['items']},
+                         {self.soap.pk: 70, self.towel.pk: 8})
+        self.assertEqual(response.data['total_quantity'], 78)
+        response = client.get('/api/inventory/items/stock_as_of/')
+        self.assertEqual(response.status_code, 400)
+
+
+class InventoryValuationTest(TestCase):
+    def setUp(self):
+        self.amenities = InventoryCategory.objects.create(name='Amenities')
+        self.linen = InventoryCategory.objects.create(name='Linen')
+        self.items = {}
+        for name, category, stock, cost, minimum in [
+            ('Soap', self.amenities, 100, '2.00', 20),
+            ('Shampoo', self.amenities, 10, '5.00', 20),
+            ('Slippers', self.amenities, 0, '3.00', 10),
+            ('Towel', self.linen, 40, '15.00', 10),
+            ('Sheet', self.linen, 20, '25.00', 10),
+        ]:
+            self.items[name] = InventoryItem.objects.create(
+                name=name, category=category, current_stock=stock, unit_cost=Decimal(cost), minimum_stock=minimum
+            )
+        InventoryItem.objects.create(
+            name='Old robe', category=self.linen, current_stock=5, unit_cost=Decimal('90.00'), is_active=False
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='controller', password='pass'))
+
+    def test_category_totals_in_one_query(self):
+        """Test category counts and stock value come from one grouped query"""
+        with self.assertNumQueries(1):
+            categories = {c.name: c for c in with_category_totals(InventoryCategory.objects.all())}
+        amenities, linen = categories['Amenities'], categories['Linen']
+        self.assertEqual((amenities.items_count, amenities.low_stock_items, amenities.out_of_stock_items), (3, 2, 1))
+        self.assertEqual(amenities.total_stock_value, Decimal('250.00'))
+        self.assertEqual((linen.items_count, linen.total_stock_value), (2, Decimal('1100.00')))
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inventory/categories/summary/')
+        self.assertEqual({row['name']: row['total_stock_value'] for row in response.data}, {'Amenities': 250.0, 'Linen': 1100.0})
+
+    def test_ranked_items(self):
+        """Test items are ranked by stock value overall and per category"""
+        items = InventoryItem.objects.filter(is_active=True)
+        self.assertEqual(inventory_totals(items)['total_value'], Decimal('1350.00'))
+        top = list(ranked_items(items, limit=2))
+        self.assertEqual([item.name for item in top], ['Towel', 'Sheet'])
+        self.assertEqual(top[0].total_value, Decimal('1350.00'))
+        per_category = [(item.name, item.value_rank) for item in ranked_items(items, limit=1, per_category=True)]
+        self.assertEqual(per_category, [('Soap', 1), ('Towel', 1)])
+
+        response = self.client.get('/api/inventory/items/valuation/', {'limit': 3})
+        self.assertEqual(response.data['total_inventory_value'], 1350.0)
+        self.assertEqual(response.data['total_items_valued'], 4)
+        self.assertEqual([row['item_name'] for row in response.data['items']], ['Towel', 'Sheet', 'Soap'])
+        self.assertEqual(response.data['items'][0]['percentage_of_total'], 44.44)
+
+
+class CostLayerTest(TestCase):
+    def setUp(self):
+        category = InventoryCategory.objects.create(name='Minibar')
+        self.item = InventoryItem.objects.create(
+            name='Cola', category=category, current_stock=10, unit_cost=Decimal('1.00')
+        )
+        StockMovement.objects.create(
+            item=self.item, movement_type='IN', quantity=10, unit_cost=Decimal('2.00'), reason='Purchase'
+        )
+
+    def issue(self, quantity, **kwargs):
+        return StockMovement.objects.create(
+            item=self.item, movement_type='OUT', quantity=quantity, reason='Room Usage', **kwargs
+        )
+
+    @override_settings(INVENTORY_COSTING_METHOD='FIFO')
+    def test_fifo_uses_oldest_layers(self):
+        """Test FIFO costs stock taken out at the cost of the oldest layers"""
+        self.assertEqual(self.issue(6).cost_amount, Decimal('-6.00'))
+        self.assertEqual(self.issue(6).cost_amount, Decimal('-8.00'))
+        self.assertEqual(
+            list(CostLayer.objects.values_list('remaining', 'unit_cost')), [(0, Decimal('1.00')), (8, Decimal('2.00'))]
+        )
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.current_stock, self.item.unit_cost), (8, Decimal('2.00')))
+
+    def test_average_uses_moving_average(self):
+        """Test the default method costs stock at the moving weighted average"""
+        self.assertEqual(self.issue(6).cost_amount, Decimal('-9.00'))
+        StockMovement.objects.create(
+            item=self.item, movement_type='IN', quantity=6, unit_cost=Decimal('3.00'), reason='Purchase'
+        )
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.unit_cost, Decimal('1.95'))
+        adjustment = StockMovement.objects.create(
+            item=self.item, movement_type='ADJUSTMENT', quantity=15, reason='Inventory Count'
+        )
+        self.assertEqual(adjustment.cost_amount, Decimal('-9.75'))
+
+    def test_cost_of_goods_by_department(self):
+        """Test cost of goods used is summed per department over a period"""
+        minibar = Department.objects.create(name='Minibar')
+        kitchen = Department.objects.create(name='Kitchen')
+        self.issue(4, department=minibar)
+        self.issue(2, department=kitchen)
+        self.issue(2, department=minibar)
+        rows = cost_of_goods_used(StockMovement.objects.all(), group_by='department')
+        self.assertEqual(rows, [
+            {'department': 'Minibar', 'quantity': 6, 'cost': Decimal('9.00')},
+            {'department': 'Kitchen', 'quantity': 2, 'cost': Decimal('3.00')},
+        ])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='finance', password='pass'))
+        today = timezone.localdate().isoformat()
+        response = client.get('/api/inventory/stock-movements/cost_of_goods/', {
+            'start_date': today, 'end_date': today, 'group_by': 'reason'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_quantity'], response.data['total_cost']), (8, 12.0))
+        self.assertEqual(response.data['groups'], [{'reason': 'Room Usage', 'quantity': 8, 'cost': 12.0}])
+        response = client.get('/api/inventory/stock-movements/cost_of_goods/', {
+            'start_date': today, 'end_date': today, 'group_by': 'guest'
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(INVENTORY_FORECAST_HISTORY_DAYS=28)
+class StockForecastTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.supplier = Supplier.objects.create(name='Amenity Co', lead_time_days=5)
+        category = InventoryCategory.objects.create(name='Amenities')
+        self.soap = InventoryItem.objects.create(
+            name='Soap', category=category, supplier=self.supplier, current_stock=200, minimum_stock=10
+        )
+        self.robe = InventoryItem.objects.create(name='Robe', category=category, current_stock=3, minimum_stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='storekeeper', password='pass'))
+
+    def book(self, rooms, check_in, check_out, status):
+        guest = Guest.objects.create(first_name='Test', last_name='Guest', email=f'{status.lower()}@example.com')
+        reservation = Reservation.objects.create(
+            guest=guest, check_in_date=check_in, check_out_date=check_out, status=status
+        )
+        room_type = RoomType.objects.get_or_create(name='Standard', defaults={'base_price': Decimal('100.00'), 'max_occupancy': 2})[0]
+        for number in range(rooms):
+            room = Room.objects.get_or_create(number=str(101 + number), room_type=room_type)[0]
+            ReservationRoom.objects.create(reservation=reservation, room=room, rate=Decimal('100.00'))
+
+    def use_daily(self, quantity, days=28):
+        movements = post_movements([
+            StockMovement(item=self.soap, movement_type='OUT', quantity=quantity, reason='Room Usage')
+            for _ in range(days)
+        ])
+        for days_ago, movement in enumerate(movements, start=1):
+            day = self.today - timedelta(days=days_ago)
+            StockMovement.objects.filter(pk=movement.pk).update(
+                created_at=timezone.make_aware(datetime.combine(day, time(12)))
+            )
+
+    def test_reorder_point_follows_booked_occupancy(self):
+        """Test demand per occupied room is forecast over the rooms booked for the lead time"""
+        self.book(2, self.today - timedelta(days=28), self.today, 'CHECKED_OUT')
+        self.book(4, self.today, self.today + timedelta(days=10), 'CONFIRMED')
+        self.use_daily(4)
+        result = forecast_demand()
+        self.assertEqual((result['items'], result['cleared']), (1, 0))
+
+        forecast = StockForecast.objects.get(item=self.soap)
+        # 2 per occupied room, 4 rooms booked for each of 5 lead time days
+        self.assertEqual(forecast.lead_time_demand, Decimal('40.00'))
+        self.assertEqual((forecast.daily_demand, forecast.safety_stock), (Decimal('8.00'), 0))
+        self.assertEqual((forecast.reorder_point, forecast.order_up_to), (40, 152))
+        self.assertFalse(StockForecast.objects.filter(item=self.robe).exists())
+
+    def test_forecast_without_occupancy_uses_daily_use(self):
+        """Test daily use is smoothed when no rooms were occupied"""
+        self.use_daily(3)
+        forecast_demand()
+        forecast = StockForecast.objects.get(item=self.soap)
+        self.assertEqual((forecast.daily_demand, forecast.reorder_point), (Decimal('3.00'), 15))
+
+        # Once the item is no longer used it falls back to its minimum stock
+        result = forecast_demand(self.today + timedelta(days=60))
+        self.assertEqual((result['items'], result['cleared']), (0, 1))
+
+    def test_alerts_use_forecast_reorder_point(self):
+        """Test stock alerts and reorder suggestions compare stock with the forecast"""
+        self.use_daily(3)
+        forecast_demand()
+        StockMovement.objects.create(item=self.soap, movement_type='OUT', quantity=110, reason='Room Usage')
+        self.soap.refresh_from_db()
+        self.assertEqual(self.soap.current_stock, 6)
+        self.assertTrue(self.soap.is_low_stock())
+        # Reorder point of 15 plus 14 days of 3, less the stock left
+        self.assertEqual(self.soap.suggested_order_quantity(), 51)
+
+        response = self.client.get('/api/inventory/items/low_stock/')
+        self.assertEqual([item['name'] for item in response.data['items']], ['Robe', 'Soap'])
+        response = self.client.get('/api/inventory/items/stock_alerts/')
+        alerts = {alert['item_name']: alert for alert in response.data['alerts']}
+        self.assertEqual((alerts['Soap']['reorder_point'], alerts['Soap']['suggested_quantity']), (15, 51))
+        self.assertEqual((alerts['Robe']['reorder_point'], alerts['Robe']['suggested_quantity']), (5, 7))
+
+        response = self.client.get('/api/inventory/items/reorder_suggestions/')
+        suppliers = {entry['supplier_name']: entry for entry in response.data['suppliers']}
+        self.assertEqual(suppliers['Amenity Co']['lead_time_days'], 5)
+        self.assertEqual(suppliers['Amenity Co']['items'][0]['suggested_quantity'], 51)
+        self.assertEqual(suppliers['No supplier']['items'][0]['item_name'], 'Robe')
+
+
+class PurchaseOrderTest(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Linen House', lead_time_days=10)
+        self.other = Supplier.objects.create(name='Soap Works')
+        category = InventoryCategory.objects.create(name='Linen')
+        self.towel = InventoryItem.objects.create(name='Towel', category=category, unit_cost=Decimal('10.00'))
+        self.sheet = InventoryItem.objects.create(name='Sheet', category=category, unit_cost=Decimal('20.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='buyer', password='pass'))
+
+    def create_order(self, supplier=None, expected_date=None):
+        response = self.client.post('/api/inventory/purchase-orders/', {
+            'supplier': (supplier or self.supplier).id,
+            'expected_date': expected_date,
+            'lines': [
+                {'item': self.towel.id, 'quantity_ordered': 10, 'unit_cost': '12.00'},
+                {'item': self.sheet.id, 'quantity_ordered': 5, 'unit_cost': '20.00'},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return PurchaseOrder.objects.get(pk=response.data['id'])
+
+    def test_po_numbers_are_not_reused(self):
+        """Test a deleted draft's number is not given to the next order"""
+        first = self.create_order()
+        draft = self.create_order()
+        self.assertEqual(first.po_number, f'PO-{first.pk:06d}')
+        self.client.delete(f'/api/inventory/purchase-orders/{draft.id}/')
+        self.assertFalse(PurchaseOrder.objects.filter(pk=draft.pk).exists())
+        self.assertNotIn(self.create_order().po_number, {first.po_number, draft.po_number})
+
+    def test_receipts_post_stock_and_update_stats(self):
+        """Test receiving an order posts IN movements and keeps supplier stats"""
+        order = self.create_order()
+        self.assertEqual(order.total_amount, Decimal('220.00'))
+        today = timezone.localdate()
+        place_order(order, order_date=today - timedelta(days=4))
+        towel_line, sheet_line = order.lines.order_by('id')
+
+        response = self.client.post(f'/api/inventory/purchase-orders/{order.id}/receive/', {
+            'lines': [{'line': towel_line.id, 'quantity': 6}]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'PARTIAL')
+        self.towel.refresh_from_db()
+        self.assertEqual((self.towel.current_stock, self.towel.unit_cost), (6, Decimal('12.00')))
+        receipt = StockMovement.objects.get(purchase_order_line=towel_line)
+        self.assertEqual((receipt.movement_type, receipt.reference_number), ('IN', order.po_number))
+
+        stats = SupplierStats.objects.get(supplier=self.supplier)
+        self.assertEqual((stats.total_orders, stats.open_orders, stats.total_spend), (1, 1, Decimal('72.00')))
+        self.assertIsNone(stats.fill_rate)
+
+        # Receiving more than is outstanding is refused
+        with self.assertRaises(PurchaseOrderError):
+            receive_order(order, {towel_line.id: 5})
+        receive_order(order, {towel_line.id: 4, sheet_line.id: 5})
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.closed_date, order.received_amount), ('RECEIVED', today, Decimal('220.00')))
+
+        stats.refresh_from_db()
+        self.assertEqual((stats.open_orders, stats.closed_orders, stats.on_time_orders), (0, 1, 1))
+        self.assertEqual((stats.fill_rate, stats.average_lead_time_days), (100.0, 4.0))
+        self.assertEqual(stats.total_spend, Decimal('220.00'))
+
+    def test_close_short_and_cancel(self):
+        """Test closing short lowers the fill rate and cancelling removes the order"""
+        order = self.create_order(expected_date=timezone.localdate() - timedelta(days=1))
+        place_order(order)
+        towel_line = order.lines.get(item=self.towel)
+        receive_order(order, {towel_line.id: 9})
+        close_order(order)
+        stats = SupplierStats.objects.get(supplier=self.supplier)
+        self.assertEqual((stats.closed_orders, stats.on_time_orders), (1, 0))
+        self.assertEqual(stats.fill_rate, 60.0)
+
+        cancelled = self.create_order()
+        place_order(cancelled)
+        cancel_order(cancelled)
+        with self.assertRaises(PurchaseOrderError):
+            place_order(cancelled)
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_orders, stats.open_orders), (1, 0))
+
+        # Rebuilding from the orders gives the same stats
+        before = SupplierStats.objects.values().get(supplier=self.supplier)
+        rebuild_supplier_stats()
+        after = SupplierStats.objects.values().get(supplier=self.supplier)
+        before.pop('updated_at'), after.pop('updated_at')
+        self.assertEqual(before, after)
+
+    def test_supplier_ranking_and_performance(self):
+        """Test suppliers are ranked from their stats in one query"""
+        for supplier, received in [(self.supplier, 10), (self.other, 5)]:
+            order = self.create_order(supplier)
+            place_order(order)
+            receive_order(order, {order.lines.get(item=self.towel).id: received})
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inventory/suppliers/top_suppliers/')
+        self.assertEqual([row['name'] for row in response.data], ['Linen House', 'Soap Works'])
+        self.assertEqual(response.data[0]['total_value'], 120.0)
+        response = self.client.get('/api/inventory/suppliers/top_suppliers/', {'by': 'fill_rate'})
+        self.assertEqual(response.data, [])
+        response = self.client.get('/api/inventory/suppliers/top_suppliers/', {'by': 'price'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(f'/api/inventory/suppliers/{self.supplier.id}/performance/')
+        self.assertEqual(response.data['total_orders'], 1)
+        self.assertEqual(response.data['total_spend'], '120.00')
+        response = self.client.get(f'/api/inventory/suppliers/{self.supplier.id}/')
+        self.assertEqual(response.data['total_orders'], 1)
+
+    def test_only_drafts_change(self):
+        """Test placed purchase orders cannot be edited or deleted"""
+        order = self.create_order()
+        place_order(order)
+        response = self.client.patch(f'/api/inventory/purchase-orders/{order.id}/', {'notes': 'Rush'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(f'/api/inventory/purchase-orders/{order.id}/')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/inventory/purchase-orders/{order.id}/place/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], f'Purchase order {order.po_number} is ordered')
+
+
+class StockLocationTest(TestCase):
+    def setUp(self):
+        self.store = StockLocation.objects.get(is_default=True)
+        self.pantry = StockLocation.objects.create(name='Floor 3 Pantry', location_type='PANTRY', floor=3)
+        category = InventoryCategory.objects.create(name='Linen')
+        self.towel = InventoryItem.objects.create(
+            name='Towel', category=category, current_stock=50, unit_cost=Decimal('10.00')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='housekeeper', password='pass'))
+
+    def balances(self):
+        return dict(LocationStock.objects.filter(item=self.towel).values_list('location__name', 'quantity'))
+
+    def move(self, **data):
+        data = {'item': self.towel.id, 'reason': 'Housekeeping', **data}
+        return self.client.post('/api/inventory/stock-movements/', data, format='json')
+
+    def test_transfer_moves_stock_between_locations(self):
+        """Test transfers debit and credit locations without changing the item's stock"""
+        self.assertEqual(self.balances(), {'Main Store': 50})
+        response = self.move(movement_type='TRANSFER', quantity=20, to_location=self.pantry.id, reason='Transfer')
+        self.assertEqual(response.status_code, 201)
+        transfer = StockMovement.objects.get(movement_type='TRANSFER')
+        self.assertEqual((transfer.location, transfer.balance_after, transfer.cost_amount), (self.store, 50, Decimal('0.00')))
+        self.assertEqual(self.balances(), {'Main Store': 30, 'Floor 3 Pantry': 20})
+
+        # Stock is taken where it is
+        response = self.move(movement_type='OUT', quantity=25, location=self.pantry.id)
+        self.assertEqual(response.status_code, 400)
+        self.move(movement_type='OUT', quantity=5, location=self.pantry.id)
+        self.towel.refresh_from_db()
+        self.assertEqual(self.towel.current_stock, 45)
+
+        # Counting one location sets its stock and moves the item's total
+        self.move(movement_type='ADJUSTMENT', quantity=12, location=self.pantry.id, reason='Inventory Count')
+        self.towel.refresh_from_db()
+        self.assertEqual(self.towel.current_stock, 42)
+        self.assertEqual(self.balances(), {'Main Store': 30, 'Floor 3 Pantry': 12})
+        self.assertEqual(stock_as_of(timezone.localdate())[1][self.towel.id], 42)
+
+    def test_transfer_validation(self):
+        """Test transfers need a destination other than their source"""
+        self.assertEqual(self.move(movement_type='TRANSFER', quantity=1, reason='Transfer').status_code, 400)
+        response = self.move(
+            movement_type='TRANSFER', quantity=1, location=self.pantry.id, to_location=self.pantry.id, reason='Transfer'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.move(movement_type='TRANSFER', quantity=1, to_location=self.store.id, reason='Transfer')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/inventory/stock-movements/batch/', {'movements': [
+            {'item': self.towel.id, 'movement_type': 'TRANSFER', 'quantity': 1, 'reason': 'Transfer', 'to_location': 999}
+        ]}, format='json')
+        self.assertEqual((response.status_code, response.data['locations']), (400, [999]))
+
+    def test_count_down_after_transfer(self):
+        """Test counting an item short takes the stock from the default location first, then the others"""
+        self.move(movement_type='TRANSFER', quantity=40, to_location=self.pantry.id, reason='Transfer')
+        response = self.client.post(
+            f'/api/inventory/items/{self.towel.id}/adjust_stock/', {'new_stock': 30, 'reason': 'Count'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balances(), {'Main Store': 0, 'Floor 3 Pantry': 30})
+        response = self.move(movement_type='ADJUSTMENT', quantity=25, reason='Inventory Count')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.balances(), {'Main Store': 0, 'Floor 3 Pantry': 25})
+        self.towel.refresh_from_db()
+        self.assertEqual(self.towel.current_stock, 25)
+
+        # Location stock short of the item's is reported, not a server error
+        LocationStock.objects.filter(location=self.pantry).update(quantity=10)
+        response = self.client.post(
+            f'/api/inventory/items/{self.towel.id}/adjust_stock/', {'new_stock': 5, 'reason': 'Count'}, format='json'
+        )
+        self.assertEqual((response.status_code, response.data['available'], response.data['requested']), (400, 10, 20))
+
+    def test_location_totals_and_refill(self):
+        """Test stock by location comes from one grouped query and pantries are refilled up to par"""
+        response = self.client.post('/api/inventory/stock-movements/batch/', {'movements': [
+            {'item': self.towel.id, 'movement_type': 'TRANSFER', 'quantity': 8, 'reason': 'Transfer',
+             'to_location': self.pantry.id}
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(1):
+            locations = {location.name: location for location in with_location_totals(StockLocation.objects.all())}
+        self.assertEqual((locations['Main Store'].total_quantity, locations['Floor 3 Pantry'].total_quantity), (42, 8))
+        self.assertEqual(locations['Floor 3 Pantry'].total_stock_value, Decimal('80.00'))
+
+        response = self.client.post(f'/api/inventory/locations/{self.pantry.id}/par_levels/', {
+            'items': [{'item': self.towel.id, 'par_level': 20}]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/inventory/locations/{self.pantry.id}/refill/')
+        self.assertEqual(response.data['source_location'], self.store.id)
+        self.assertEqual(
+            [(row['item_name'], row['refill_quantity'], row['transfer_quantity']) for row in response.data['items']],
+            [('Towel', 12, 12)]
+        )
+        response = self.client.get('/api/inventory/locations/')
+        totals = {row['name']: row['totals'] for row in response.data['results']}
+        self.assertEqual(totals['Floor 3 Pantry']['below_par_items'], 1)
+        response = self.client.delete(f'/api/inventory/locations/{self.pantry.id}/')
+        self.assertEqual(response.status_code, 400)
+
+
+class ItemScanTest(TestCase):
+    def setUp(self):
+        scan_index.clear()
+        self.category = InventoryCategory.objects.create(name='Minibar')
+        self.water = InventoryItem.objects.create(
+            name='Mineral Water', category=self.category, sku='MB-WATER', barcode='8991234567890',
+            unit='bottle', current_stock=40, unit_cost=Decimal('5000.00')
+        )
+        self.soda = InventoryItem.objects.create(
+            name='Soda', category=self.category, sku='MB-SODA', current_stock=10, unit_cost=Decimal('8000.00')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='storekeeper', password='pass'))
+
+    def tearDown(self):
+        scan_index.clear()
+
+    def test_lookup_by_barcode_or_sku(self):
+        """Test scans resolve barcodes and SKUs from the index without queries"""
+        scan_index.warm()
+        with self.assertNumQueries(0):
+            self.assertEqual(scan_index.lookup('8991234567890')['id'], self.water.id)
+            self.assertEqual(scan_index.lookup(' MB-SODA ')['name'], 'Soda')
+            self.assertIsNone(scan_index.lookup('unknown'))
+
+        response = self.client.get('/api/inventory/scan/8991234567890/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'id': self.water.id, 'sku': 'MB-WATER', 'barcode': '8991234567890', 'name': 'Mineral Water',
+            'unit': 'bottle', 'category': 'Minibar'
+        })
+        self.assertEqual(self.client.get('/api/inventory/scan/unknown/').status_code, 404)
+
+        response = self.client.get('/api/inventory/scan/?code=MB-SODA&code=unknown')
+        self.assertEqual([item['id'] for item in response.data['items']], [self.soda.id])
+        self.assertEqual(response.data['unknown'], ['unknown'])
+
+    def test_index_follows_item_changes(self):
+        """Test saving, deactivating and deleting items updates the index after commit"""
+        scan_index.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soda.barcode = '8990000000011'
+            self.soda.save()
+        self.assertEqual(scan_index.lookup('8990000000011')['id'], self.soda.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.water.is_active = False
+            self.water.save()
+        self.assertIsNone(scan_index.lookup('8991234567890'))
+        self.assertIsNone(scan_index.lookup('MB-WATER'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soda.delete()
+        self.assertEqual(len(scan_index), 0)
+
+    def test_batch_of_scans_posts_movements(self):
+        """Test repeated scans add up and post one movement per item"""
+        response = self.client.post('/api/inventory/scan/movements/', {
+            'movement_type': 'OUT',
+            'reason': 'Room Usage',
+            'scans': [{'code': '8991234567890'}, {'code': 'MB-SODA', 'quantity': 2}, {'code': '8991234567890'}]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(item['item_id'], item['quantity'], item['current_stock']) for item in response.data['items']],
+            [(self.water.id, 2, 38), (self.soda.id, 2, 8)]
+        )
+        self.assertEqual(StockMovement.objects.filter(performed_by='storekeeper').count(), 2)
+
+    def test_batch_with_unknown_code_posts_nothing(self):
+        """Test a batch with a code no active item has is rejected as a whole"""
+        response = self.client.post('/api/inventory/scan/movements/', {
+            'movement_type': 'OUT',
+            'reason': 'Room Usage',
+            'scans': [{'code': 'MB-SODA'}, {'code': '000'}]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['codes'], ['000'])
+        self.assertFalse(StockMovement.objects.filter(movement_type='OUT').exists())
+
+
+class MinibarTest(TestCase):
+    def setUp(self):
+        category = InventoryCategory.objects.create(name='Minibar')
+        self.water = InventoryItem.objects.create(
+            name='Mineral Water', category=category, current_stock=100, unit_cost=Decimal('5000.00'),
+            selling_price=Decimal('25000.00')
+        )
+        self.chips = InventoryItem.objects.create(
+            name='Chips', category=category, current_stock=100, unit_cost=Decimal('10000.00'),
+            selling_price=Decimal('40000.00')
+        )
+        room_type = RoomType.objects.create(name='Standard', base_price=Decimal('100.00'), max_occupancy=2)
+        self.reservations = []
+        for number in ('201', '202', '203'):
+            room = Room.objects.create(number=number, room_type=room_type, floor=2)
+            guest = Guest.objects.create(first_name='Guest', last_name=number, email=f'{number}@example.com')
+            reservation = Reservation.objects.create(
+                guest=guest, check_in_date=timezone.localdate(),
+                check_out_date=timezone.localdate() + timedelta(days=1), status='CONFIRMED'
+            )
+            ReservationRoom.objects.create(reservation=reservation, room=room, rate=Decimal('100.00'))
+            self.reservations.append(reservation)
+        batch_check_in([reservation.id for reservation in self.reservations])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='housekeeper', password='pass'))
+
+        response = self.client.post('/api/inventory/minibar/par_levels/', {
+            'items': [{'item': self.water.id, 'par_level': 2}, {'item': self.chips.id, 'par_level': 1}]
+        }, format='json')
+        self.assertEqual(response.data['updated_minibars'], 3)
+        self.minibars = {location.room.number: location for location in StockLocation.objects.filter(
+            location_type='MINIBAR'
+        ).select_related('room')}
+        # Refill every minibar to par from the store
+        post_movements([
+            StockMovement(
+                item_id=row.item_id, movement_type='TRANSFER', quantity=row.par_level, reason='Transfer',
+                to_location_id=row.location_id
+            )
+            for row in LocationStock.objects.filter(location__location_type='MINIBAR')
+        ])
+
+    def record(self, room, **items):
+        return self.client.post('/api/inventory/minibar/', {
+            'room': self.minibars[room].room_id,
+            'items': [{'item': getattr(self, name).id, 'quantity': quantity} for name, quantity in items.items()]
+        }, format='json')
+
+    def test_consumption_cannot_exceed_minibar_stock(self):
+        """Test recording more than a minibar holds, counting unposted consumption, is rejected"""
+        self.assertEqual(self.record('201', water=2).status_code, 201)
+        response = self.record('201', water=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('has 0', response.data['error'])
+        self.assertEqual(self.client.get('/api/inventory/minibar/?posted=false').data['count'], 1)
+
+    def test_batch_check_out_posts_consumption_to_stock_and_bills(self):
+        """Test check-out posts every room's consumption as movements and bill charges at once"""
+        first, second, third = self.reservations
+        bill = Bill.objects.create(
+            reservation=first, subtotal=Decimal('100.00'), tax_amount=Decimal('10.00'),
+            service_charge=Decimal('5.00'), total_amount=Decimal('115.00')
+        )
+        self.record('201', water=2, chips=1)
+        self.record('202', chips=1)
+
+        checkouts = batch_check_out([reservation.id for reservation in self.reservations])
+        minibar_charges = {checkout.check_in.reservation_id: checkout.minibar_charges for checkout in checkouts}
+        self.assertEqual(minibar_charges, {
+            first.id: Decimal('90000.00'), second.id: Decimal('40000.00'), third.id: Decimal('0.00')
+        })
+
+        bill.refresh_from_db()
+        self.assertEqual(bill.subtotal, Decimal('90100.00'))
+        # 10% tax and 5% service on the minibar charges
+        self.assertEqual(bill.total_amount, Decimal('103615.00'))
+        self.assertEqual(
+            list(bill.charges.values_list('description', 'quantity', 'amount')),
+            [('Mineral Water (Minibar 201)', 2, Decimal('50000.00')), ('Chips (Minibar 201)', 1, Decimal('40000.00'))]
+        )
+        # The second stay had no bill yet
+        self.assertEqual(Bill.objects.get(reservation=second).total_amount, Decimal('46000.00'))
+        self.assertFalse(Bill.objects.filter(reservation=third).exists())
+
+        self.water.refresh_from_db()
+        self.assertEqual(self.water.current_stock, 98)
+        self.assertEqual(LocationStock.objects.get(item=self.water, location=self.minibars['201']).quantity, 0)
+        self.assertFalse(MinibarConsumption.objects.filter(posted_at__isnull=True).exists())
+        self.assertEqual(
+            MinibarConsumption.objects.filter(reservation=first, movement__isnull=False, charge__isnull=False).count(), 2
+        )
+
+    def test_short_minibar_rejects_check_out(self):
+        """Test a minibar holding less than recorded rejects the batch and posts nothing"""
+        self.record('202', water=2)
+        post_movements([StockMovement(
+            item=self.water, movement_type='OUT', quantity=1, reason='Damage', location=self.minibars['202']
+        )])
+
+        with self.assertRaises(BatchError) as context:
+            batch_check_out([reservation.id for reservation in self.reservations])
+        self.assertEqual(list(context.exception.errors), [self.reservations[1].id])
+        self.assertFalse(BillCharge.objects.exists())
+        self.assertFalse(MinibarConsumption.objects.filter(posted_at__isnull=False).exists())
+
+        with self.assertRaises(MinibarError):
+            record_consumption(StockLocation.objects.get(is_default=True), {self.water.id: 1})
+
+
+@override_settings(INVENTORY_COSTING_METHOD='FIFO')
+class StockLotTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        category = InventoryCategory.objects.create(name='Food & Beverage')
+        self.milk = InventoryItem.objects.create(name='Milk', category=category)
+        self.pantry = StockLocation.objects.create(name='Floor 2 Pantry', location_type='PANTRY', floor=2)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='storekeeper', password='pass'))
+
+    def receive(self, quantity, unit_cost, lot_number, expires_in):
+        response = self.client.post('/api/inventory/stock-movements/', {
+            'item': self.milk.id, 'movement_type': 'IN', 'quantity': quantity, 'unit_cost': unit_cost,
+            'reason': 'Purchase', 'lot_number': lot_number,
+            'expiry_date': (self.today + timedelta(days=expires_in)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def remaining(self):
+        return dict(CostLayer.objects.filter(item=self.milk).values_list('lot_number', 'remaining'))
+
+    def test_lots_expiring_first_are_issued_first(self):
+        """Test issues use up the lot expiring first whatever order lots were received in"""
+        self.receive(10, '2.00', 'LATE', 10)
+        self.receive(10, '1.50', 'EARLY', 2)
+        post_movements([StockMovement(item=self.milk, movement_type='OUT', quantity=12, reason='Room Usage')])
+        self.assertEqual(self.remaining(), {'LATE': 8, 'EARLY': 0})
+
+        response = self.client.post('/api/inventory/stock-movements/', {
+            'item': self.milk.id, 'movement_type': 'OUT', 'quantity': 1, 'reason': 'Room Usage', 'lot_number': 'LATE'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_expiring_lots(self):
+        """Test expiring lots are found within the days asked, expired lots included"""
+        self.receive(5, '1.00', 'OLD', -1)
+        self.receive(5, '1.00', 'SOON', 3)
+        self.receive(5, '1.00', 'FRESH', 30)
+        self.assertEqual([lot.lot_number for lot in expiring_lots(3)], ['OLD', 'SOON'])
+
+        response = self.client.get('/api/inventory/lots/expiring/?days=3')
+        self.assertEqual((response.data['total_lots'], response.data['expired_lots']), (2, 1))
+        self.assertEqual(response.data['lots'][1]['days_to_expiry'], 3)
+        self.assertEqual(self.client.get('/api/inventory/lots/expiring/?days=-1').status_code, 400)
+
+    def test_sweep_writes_off_expired_lots_at_every_location(self):
+        """Test the sweep writes off exactly the expired lots, taking from the store before other locations"""
+        self.receive(6, '1.00', 'OLD', -2)
+        self.receive(10, '3.00', 'FRESH', 20)
+        post_movements([StockMovement(
+            item=self.milk, movement_type='TRANSFER', quantity=12, reason='Transfer', to_location=self.pantry
+        )])
+
+        result = write_off_expired()
+        self.assertEqual(
+            (result['items'], result['lots'], result['quantity'], result['value']), (1, 1, 6, Decimal('6.00'))
+        )
+        self.assertEqual(self.remaining(), {'OLD': 0, 'FRESH': 10})
+        self.assertEqual(
+            list(StockMovement.objects.filter(reason='Expired').order_by('id').values_list('location__name', 'quantity')),
+            [('Main Store', 4), ('Floor 2 Pantry', 2)]
+        )
+        self.milk.refresh_from_db()
+        self.assertEqual(self.milk.current_stock, 10)
+
+        # Nothing is left to write off
+        self.assertEqual(write_off_expired()['quantity'], 0)
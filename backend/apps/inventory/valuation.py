@@ -0,0 +1,112 @@
+"""
+Inventory valuation.
+
+Stock value (``current_stock * unit_cost``) used to be summed by loading
+every item into Python, once per category and once more for each category
+in serializers, and the valuation report loaded and sorted every item to
+return the top 50. These helpers compute it in the database instead: totals
+per category with one grouped query, and the most valuable items ranked
+with window functions so only the rows returned are fetched, each with its
+share of the total computed over the whole set. Stock held at each
+location is totalled the same way, with one grouped query over
+``LocationStock``.
+
+Posting a movement records the cost of the stock it moved (see
+``ledger``), so the cost of goods used in a period is one grouped sum over
+that period's movements rather than a replay of the item's history.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from .forecasting import reorder_level
+
+
+def stock_value(prefix=''):
+    """Expression for an item's stock value, ``prefix`` leading to the item"""
+    return ExpressionWrapper(
+        F(f'{prefix}current_stock') * F(f'{prefix}unit_cost'),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def _total(expression, filter=None):
+    return Coalesce(
+        Sum(expression, filter=filter), Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=16, decimal_places=2)
+    )
+
+
+def inventory_totals(items):
+    """Count items and sum their stock value"""
+    return items.order_by().aggregate(total_items=Count('id'), total_value=_total(stock_value()))
+
+
+def with_category_totals(categories):
+    """Annotate categories with counts and stock value of their active items"""
+    active = Q(inventoryitem__is_active=True)
+    return categories.annotate(
+        items_count=Count('inventoryitem', filter=active),
+        low_stock_items=Count(
+            'inventoryitem',
+            filter=active & Q(inventoryitem__current_stock__lte=reorder_level('inventoryitem__'))
+        ),
+        out_of_stock_items=Count('inventoryitem', filter=active & Q(inventoryitem__current_stock=0)),
+        total_stock_value=_total(stock_value('inventoryitem__'), filter=active),
+    )
+
+
+def with_location_totals(locations):
+    """Annotate locations with counts, quantity and value of the stock they hold"""
+    held = Q(stock__quantity__gt=0)
+    return locations.annotate(
+        items_count=Count('stock', filter=held),
+        total_quantity=Coalesce(Sum('stock__quantity'), Value(0)),
+        below_par_items=Count('stock', filter=Q(stock__quantity__lt=F('stock__par_level'))),
+        total_stock_value=_total(
+            ExpressionWrapper(
+                F('stock__quantity') * F('stock__item__unit_cost'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            filter=held
+        ),
+    )
+
+
+def ranked_items(items, limit=50, per_category=False):
+    """Get the items with the highest stock value, overall or per category
+
+    Each item carries ``stock_value``, ``value_rank`` and ``total_value``,
+    the value of all ranked items, so shares can be computed without
+    another query.
+    """
+    partition = [F('category')] if per_category else None
+    order = [F('stock_value').desc(), F('id').asc()]
+    ranked = items.filter(current_stock__gt=0).annotate(
+        stock_value=stock_value(),
+        value_rank=Window(RowNumber(), partition_by=partition, order_by=order),
+        total_value=Window(Sum(stock_value())),
+    )
+    return ranked.filter(value_rank__lte=limit).order_by(*(['category_id'] if per_category else []), 'value_rank')
+
+
+# Fields cost of goods used can be grouped by
+COGS_GROUPS = {
+    'department': 'department__name',
+    'reason': 'reason',
+    'category': 'item__category__name',
+    'item': 'item__name',
+}
+
+
+def cost_of_goods_used(movements, group_by=None):
+    """Sum the quantity and cost of stock taken out, optionally per ``COGS_GROUPS`` key"""
+    used = movements.filter(movement_type='OUT').order_by()
+    totals = {'quantity': Sum('quantity'), 'cost': -_total('cost_amount')}
+    if group_by is None:
+        row = used.aggregate(**totals)
+        return {'quantity': row['quantity'] or 0, 'cost': row['cost']}
+    field = COGS_GROUPS[group_by]
+    rows = used.values(field).annotate(**totals).order_by('-cost')
+    return [{group_by: row[field], 'quantity': row['quantity'], 'cost': row['cost']} for row in rows]
@@ -3,17 +3,37 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum, F, Max
+from django.db.models import Q, Count, Sum, F, Max, OuterRef, Subquery, ProtectedError
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from collections import defaultdict
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from .models import InventoryCategory, Supplier, InventoryItem, StockMovement
+from apps.employees.models import Department
+from apps.rooms.models import Room
+from .expiry import expiring_lots
+from .forecasting import needs_reorder
+from .ledger import InsufficientStock, InvalidTransfer, costing_method, default_location_id, post_movements
+from .minibar import MinibarError, record_consumption, set_par_levels
+from .models import (
+    InventoryCategory, Supplier, InventoryItem, StockMovement, PurchaseOrder, SupplierStats, StockLocation,
+    LocationStock, MinibarConsumption, CostLayer
+)
+from .purchasing import PurchaseOrderError, cancel_order, close_order, place_order, receive_order
+from .scanindex import scan_index
+from .snapshots import stock_as_of
+from .valuation import (
+    COGS_GROUPS, cost_of_goods_used, inventory_totals, ranked_items, with_category_totals, with_location_totals
+)
 from .serializers import (
     InventoryCategorySerializer, SupplierSerializer, InventoryItemSerializer, InventoryItemListSerializer,
     InventoryItemCreateUpdateSerializer, StockMovementSerializer, StockMovementCreateSerializer,
+    StockMovementBatchSerializer, PurchaseOrderSerializer, PurchaseOrderReceiptSerializer,
+    StockLocationSerializer, LocationStockSerializer, ParLevelsSerializer, ScanBatchSerializer,
     InventoryReportSerializer, LowStockAlertSerializer, StockValuationSerializer,
-    SupplierPerformanceSerializer
+    SupplierPerformanceSerializer, MinibarParLevelsSerializer, MinibarConsumptionSerializer, MinibarRecordSerializer,
+    StockLotSerializer
 )
 
 
@@ -27,51 +47,52 @@ class InventoryCategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering = ['name']
 
+    def get_queryset(self):
+        # Meta.ordering does not apply to aggregated querysets
+        return with_category_totals(super().get_queryset()).order_by('name')
+
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         """Get all items in category"""
         category = self.get_object()
-        items = category.inventoryitem_set.filter(is_active=True)
+        items = category.inventoryitem_set.filter(is_active=True).select_related('category', 'forecast')
         serializer = InventoryItemListSerializer(items, many=True)
         return Response({
             'category': category.name,
-            'total_items': items.count(),
-            'total_stock_value': sum([
-                float(item.current_stock * item.unit_cost) 
-                for item in items
-            ]),
+            'total_items': category.items_count,
+            'total_stock_value': float(category.total_stock_value),
             'items': serializer.data
         })
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get category summary statistics"""
-        categories = self.get_queryset()
-        summary_data = []
-        
-        for category in categories:
-            items = category.inventoryitem_set.filter(is_active=True)
-            low_stock_items = items.filter(current_stock__lte=F('minimum_stock'))
-            out_of_stock_items = items.filter(current_stock=0)
-            
-            summary_data.append({
+        summary_data = [
+            {
                 'id': category.id,
                 'name': category.name,
-                'total_items': items.count(),
-                'low_stock_items': low_stock_items.count(),
-                'out_of_stock_items': out_of_stock_items.count(),
-                'total_stock_value': sum([
-                    float(item.current_stock * item.unit_cost) 
-                    for item in items
-                ])
-            })
+                'total_items': category.items_count,
+                'low_stock_items': category.low_stock_items,
+                'out_of_stock_items': category.out_of_stock_items,
+                'total_stock_value': float(category.total_stock_value)
+            }
+            for category in self.get_queryset()
+        ]
         
         return Response(summary_data)
 
 
+# Supplier rankings: ordering and the suppliers that can be ranked by it
+SUPPLIER_RANKINGS = {
+    'spend': ('-stats__total_spend', Q(stats__total_orders__gt=0)),
+    'fill_rate': ('-stats__fill_rate', Q(stats__closed_orders__gt=0)),
+    'lead_time': ('stats__average_lead_time_days', Q(stats__closed_orders__gt=0)),
+}
+
+
 class SupplierViewSet(viewsets.ModelViewSet):
     """ViewSet for managing suppliers"""
-    queryset = Supplier.objects.filter(is_active=True)
+    queryset = Supplier.objects.select_related('stats').filter(is_active=True)
     serializer_class = SupplierSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -83,7 +104,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def items(self, request, pk=None):
         """Get all items supplied by this supplier"""
         supplier = self.get_object()
-        items = supplier.inventoryitem_set.filter(is_active=True)
+        items = supplier.inventoryitem_set.filter(is_active=True).select_related('category', 'forecast')
         serializer = InventoryItemListSerializer(items, many=True)
         return Response({
             'supplier': supplier.name,
@@ -95,45 +116,67 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def performance(self, request, pk=None):
         """Get supplier performance metrics"""
         supplier = self.get_object()
-        
-        # Get stock movements from this supplier
-        movements = supplier.stockmovement_set.filter(movement_type='IN')
-        
-        total_orders = movements.count()
-        total_value = movements.aggregate(
-            total=Sum(F('quantity') * F('unit_cost'))
-        )['total'] or Decimal('0')
-        
-        last_order = movements.order_by('-created_at').first()
+        stats = getattr(supplier, 'stats', None) or SupplierStats(supplier=supplier)
         
         performance_data = {
-            'supplier': supplier.name,
-            'total_orders': total_orders,
+            'supplier_id': supplier.id,
+            'supplier_name': supplier.name,
+            'total_orders': stats.total_orders,
+            'open_orders': stats.open_orders,
+            'closed_orders': stats.closed_orders,
             'total_items_supplied': supplier.inventoryitem_set.filter(is_active=True).count(),
-            'total_value_supplied': float(total_value),
-            'average_order_value': float(total_value / total_orders) if total_orders > 0 else 0,
-            'last_order_date': last_order.created_at if last_order else None,
+            'total_spend': stats.total_spend,
+            'average_order_value': (
+                stats.total_spend / stats.total_orders if stats.total_orders else Decimal('0.00')
+            ),
+            'fill_rate': round(stats.fill_rate, 1) if stats.pk and stats.fill_rate is not None else None,
+            'on_time_rate': (
+                round(stats.on_time_orders * 100 / stats.closed_orders, 1) if stats.closed_orders else None
+            ),
+            'average_lead_time_days': (
+                round(stats.average_lead_time_days, 1)
+                if stats.pk and stats.average_lead_time_days is not None else None
+            ),
+            'last_order_date': stats.last_order_date,
+            'last_receipt_date': stats.last_receipt_date,
             'payment_terms': supplier.payment_terms
         }
         
-        return Response(performance_data)
+        return Response(SupplierPerformanceSerializer(performance_data).data)
 
     @action(detail=False, methods=['get'])
     def top_suppliers(self, request):
-        """Get top suppliers by order volume"""
-        suppliers = self.get_queryset().annotate(
-            total_orders=Count('stockmovement', filter=Q(stockmovement__movement_type='IN')),
-            total_value=Sum(F('stockmovement__quantity') * F('stockmovement__unit_cost'))
-        ).filter(total_orders__gt=0).order_by('-total_value')[:10]
+        """Get top suppliers by spend, fill rate or lead time"""
+        ranking = request.query_params.get('by', 'spend')
+        if ranking not in SUPPLIER_RANKINGS:
+            return Response(
+                {'error': f"Invalid ranking. Use one of: {', '.join(SUPPLIER_RANKINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        order_by, ranked = SUPPLIER_RANKINGS[ranking]
+        
+        # One query ordered by an indexed stats column, counting items only
+        # for the suppliers returned
+        items_supplied = InventoryItem.objects.filter(
+            supplier=OuterRef('pk'), is_active=True
+        ).order_by().values('supplier').annotate(count=Count('id')).values('count')
+        suppliers = self.get_queryset().select_related('stats').filter(ranked).annotate(
+            items_supplied=Coalesce(Subquery(items_supplied), 0)
+        ).order_by(order_by, 'name')[:10]
         
         top_suppliers_data = []
         for supplier in suppliers:
+            stats = supplier.stats
             top_suppliers_data.append({
                 'id': supplier.id,
                 'name': supplier.name,
-                'total_orders': supplier.total_orders,
-                'total_value': float(supplier.total_value or 0),
-                'items_supplied': supplier.inventoryitem_set.filter(is_active=True).count()
+                'total_orders': stats.total_orders,
+                'total_value': float(stats.total_spend),
+                'fill_rate': round(stats.fill_rate, 1) if stats.fill_rate is not None else None,
+                'average_lead_time_days': (
+                    round(stats.average_lead_time_days, 1) if stats.average_lead_time_days is not None else None
+                ),
+                'items_supplied': supplier.items_supplied
             })
         
         return Response(top_suppliers_data)
@@ -141,7 +184,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
 
 class InventoryItemViewSet(viewsets.ModelViewSet):
     """ViewSet for managing inventory items"""
-    queryset = InventoryItem.objects.select_related('category', 'supplier').filter(is_active=True)
+    queryset = InventoryItem.objects.select_related('category', 'supplier', 'forecast').filter(is_active=True)
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category', 'supplier', 'is_active']
@@ -158,10 +201,8 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        """Get items with low stock"""
-        low_stock_items = self.get_queryset().filter(
-            current_stock__lte=F('minimum_stock')
-        ).exclude(current_stock=0).order_by('current_stock')
+        """Get items at or below their reorder level"""
+        low_stock_items = needs_reorder(self.get_queryset()).exclude(current_stock=0).order_by('current_stock')
         
         serializer = InventoryItemListSerializer(low_stock_items, many=True)
         return Response({
@@ -184,48 +225,44 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         """Get comprehensive stock alerts"""
         current_time = timezone.now()
         
-        # Get items with stock issues
-        low_stock_items = self.get_queryset().filter(
-            current_stock__lte=F('minimum_stock')
-        ).exclude(current_stock=0)
-        
-        out_of_stock_items = self.get_queryset().filter(current_stock=0)
+        # Get items with stock issues, with their last restock and issue
+        items = self.get_queryset().annotate(
+            last_restock=Max('movements__created_at', filter=Q(movements__movement_type='IN')),
+            last_issue=Max('movements__created_at', filter=Q(movements__movement_type='OUT'))
+        )
+        low_stock_items = needs_reorder(items).exclude(current_stock=0)
+        out_of_stock_items = items.filter(current_stock=0)
         
         # Format alert data
         alerts = []
         
         # Low stock alerts
         for item in low_stock_items:
-            last_movement = item.movements.filter(
-                movement_type='IN'
-            ).order_by('-created_at').first()
-            
             days_since_restock = 0
-            if last_movement:
-                days_since_restock = (current_time - last_movement.created_at).days
+            if item.last_restock:
+                days_since_restock = (current_time - item.last_restock).days
             
+            reorder_point = item.reorder_level()
             alerts.append({
                 'item_id': item.id,
                 'item_name': item.name,
                 'sku': item.sku,
                 'current_stock': item.current_stock,
                 'minimum_stock': item.minimum_stock,
+                'reorder_point': reorder_point,
+                'suggested_quantity': item.suggested_order_quantity(),
                 'category': item.category.name,
                 'supplier': item.supplier.name if item.supplier else 'No supplier',
                 'stock_status': 'LOW_STOCK',
                 'days_since_last_restock': days_since_restock,
-                'priority': 'HIGH' if item.current_stock <= (item.minimum_stock * 0.5) else 'MEDIUM'
+                'priority': 'HIGH' if item.current_stock <= (reorder_point * 0.5) else 'MEDIUM'
             })
         
         # Out of stock alerts
         for item in out_of_stock_items:
-            last_movement = item.movements.filter(
-                movement_type='OUT'
-            ).order_by('-created_at').first()
-            
             days_since_out = 0
-            if last_movement:
-                days_since_out = (current_time - last_movement.created_at).days
+            if item.last_issue:
+                days_since_out = (current_time - item.last_issue).days
             
             alerts.append({
                 'item_id': item.id,
@@ -233,6 +270,8 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
                 'sku': item.sku,
                 'current_stock': item.current_stock,
                 'minimum_stock': item.minimum_stock,
+                'reorder_point': item.reorder_level(),
+                'suggested_quantity': item.suggested_order_quantity(),
                 'category': item.category.name,
                 'supplier': item.supplier.name if item.supplier else 'No supplier',
                 'stock_status': 'OUT_OF_STOCK',
@@ -249,43 +288,118 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'])
-    def valuation(self, request):
-        """Get inventory valuation report"""
-        items = self.get_queryset().filter(current_stock__gt=0)
-        
-        total_value = Decimal('0')
-        valuation_data = []
+    def reorder_suggestions(self, request):
+        """Get items to reorder and their suggested quantities, grouped by supplier"""
+        items = needs_reorder(self.filter_queryset(self.get_queryset())).order_by('supplier__name', 'name')
         
+        suppliers = {}
         for item in items:
-            stock_value = item.current_stock * item.unit_cost
-            total_value += stock_value
-            
-            valuation_data.append({
+            quantity = item.suggested_order_quantity()
+            if not quantity:
+                continue
+            supplier = item.supplier
+            key = supplier.id if supplier else None
+            if key not in suppliers:
+                suppliers[key] = {
+                    'supplier_id': key,
+                    'supplier_name': supplier.name if supplier else 'No supplier',
+                    'lead_time_days': supplier.lead_time_days if supplier else None,
+                    'total_cost': Decimal('0.00'),
+                    'items': []
+                }
+            cost = quantity * item.unit_cost
+            suppliers[key]['total_cost'] += cost
+            suppliers[key]['items'].append({
                 'item_id': item.id,
                 'item_name': item.name,
                 'sku': item.sku,
-                'category': item.category.name,
                 'current_stock': item.current_stock,
-                'unit_cost': item.unit_cost,
-                'stock_value': stock_value
+                'reorder_point': item.reorder_level(),
+                'suggested_quantity': quantity,
+                'unit_cost': float(item.unit_cost),
+                'estimated_cost': float(cost),
+                'forecast': hasattr(item, 'forecast')
             })
         
-        # Calculate percentages
-        for item_data in valuation_data:
-            item_data['percentage_of_total'] = round(
-                (float(item_data['stock_value']) / float(total_value)) * 100, 2
-            ) if total_value > 0 else 0
-            item_data['stock_value'] = float(item_data['stock_value'])
-            item_data['unit_cost'] = float(item_data['unit_cost'])
+        for entry in suppliers.values():
+            entry['total_cost'] = float(entry['total_cost'])
+        return Response({
+            'total_suppliers': len(suppliers),
+            'total_items': sum(len(entry['items']) for entry in suppliers.values()),
+            'suppliers': list(suppliers.values())
+        })
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """Get inventory valuation report"""
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        per_category = request.query_params.get('per_category', '').lower() == 'true'
+        
+        items = self.filter_queryset(self.get_queryset())
+        totals = inventory_totals(items.filter(current_stock__gt=0))
+        top_items = ranked_items(items, limit=limit, per_category=per_category).values(
+            'id', 'name', 'sku', 'category__name', 'current_stock', 'unit_cost',
+            'stock_value', 'value_rank', 'total_value'
+        )
         
-        # Sort by stock value descending
-        valuation_data.sort(key=lambda x: x['stock_value'], reverse=True)
+        valuation_data = [
+            {
+                'item_id': item['id'],
+                'item_name': item['name'],
+                'sku': item['sku'],
+                'category': item['category__name'],
+                'current_stock': item['current_stock'],
+                'unit_cost': float(item['unit_cost']),
+                'stock_value': float(item['stock_value']),
+                'rank': item['value_rank'],
+                'percentage_of_total': round(
+                    float(item['stock_value']) / float(item['total_value']) * 100, 2
+                ) if item['total_value'] else 0
+            }
+            for item in top_items
+        ]
         
         return Response({
-            'total_inventory_value': float(total_value),
-            'total_items_valued': len(valuation_data),
+            'total_inventory_value': float(totals['total_value']),
+            'total_items_valued': totals['total_items'],
             'valuation_date': timezone.now().date(),
-            'items': valuation_data[:50]  # Top 50 by value
+            'items': valuation_data
+        })
+
+    @action(detail=False, methods=['get'])
+    def stock_as_of(self, request):
+        """Get item stock at the end of a past date"""
+        date_param = request.query_params.get('date')
+        if not date_param:
+            return Response({'error': 'date is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = list(self.filter_queryset(self.get_queryset()).values('id', 'name', 'sku', 'category__name'))
+        checkpoint_date, balances = stock_as_of(target_date, item_ids=[item['id'] for item in items])
+        
+        return Response({
+            'date': target_date,
+            'checkpoint_date': checkpoint_date,
+            'total_items': len(items),
+            'total_quantity': sum(balances.get(item['id'], 0) for item in items),
+            'items': [
+                {
+                    'item_id': item['id'],
+                    'item_name': item['name'],
+                    'sku': item['sku'],
+                    'category': item['category__name'],
+                    'quantity': balances.get(item['id'], 0)
+                }
+                for item in items
+            ]
         })
 
     @action(detail=True, methods=['post'])
@@ -306,23 +420,28 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid stock quantity'}, status=status.HTTP_400_BAD_REQUEST)
         
         old_stock = item.current_stock
-        adjustment = new_stock - old_stock
         
-        # Create stock movement record
-        if adjustment != 0:
-            movement_type = 'IN' if adjustment > 0 else 'OUT'
+        # The adjustment movement sets the stock level through the ledger
+        try:
             StockMovement.objects.create(
                 item=item,
-                movement_type=movement_type,
-                quantity=abs(adjustment),
+                movement_type='ADJUSTMENT',
+                quantity=new_stock,
+                reason='Inventory Count',
                 unit_cost=item.unit_cost,
                 notes=f"Stock adjustment: {reason}",
                 reference_number=f"ADJ-{timezone.now().strftime('%Y%m%d%H%M%S')}"
             )
-        
-        # Update item stock
-        item.current_stock = new_stock
-        item.save(update_fields=['current_stock', 'updated_at'])
+        except InsufficientStock as e:
+            return Response({
+                'error': 'Insufficient stock',
+                'location': e.location_id,
+                'available': e.available,
+                'requested': e.requested
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransfer as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        adjustment = new_stock - old_stock
         
         return Response({
             'success': True,
@@ -371,10 +490,12 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
 
 class StockMovementViewSet(viewsets.ModelViewSet):
     """ViewSet for managing stock movements"""
-    queryset = StockMovement.objects.select_related('item', 'supplier').order_by('-created_at')
+    queryset = StockMovement.objects.select_related('item', 'location', 'to_location').order_by('-created_at')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['item', 'movement_type', 'supplier']
+    filterset_fields = [
+        'item', 'movement_type', 'reason', 'department', 'location', 'to_location', 'item__category', 'item__supplier'
+    ]
     search_fields = ['item__name', 'item__sku', 'reference_number']
     ordering = ['-created_at']
 
@@ -383,6 +504,88 @@ class StockMovementViewSet(viewsets.ModelViewSet):
             return StockMovementCreateSerializer
         return StockMovementSerializer
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Post many stock movements in one transaction"""
+        serializer = StockMovementBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        performed_by = data.get('performed_by') or request.user.get_username()
+        item_ids = {line['item'] for line in data['movements']}
+        missing = item_ids - set(InventoryItem.objects.filter(pk__in=item_ids, is_active=True).values_list('id', flat=True))
+        if missing:
+            return Response({
+                'error': 'Unknown or inactive items',
+                'items': sorted(missing)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        department_ids = {line['department'] for line in data['movements'] if line.get('department')}
+        missing = department_ids - set(Department.objects.filter(pk__in=department_ids).values_list('id', flat=True))
+        if missing:
+            return Response({
+                'error': 'Unknown departments',
+                'departments': sorted(missing)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        location_ids = {
+            line[field] for line in data['movements'] for field in ('location', 'to_location') if line.get(field)
+        }
+        missing = location_ids - set(
+            StockLocation.objects.filter(pk__in=location_ids, is_active=True).values_list('id', flat=True)
+        )
+        if missing:
+            return Response({
+                'error': 'Unknown or inactive locations',
+                'locations': sorted(missing)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        movements = [
+            StockMovement(
+                item_id=line['item'],
+                movement_type=line['movement_type'],
+                quantity=line['quantity'],
+                reason=line['reason'],
+                department_id=line.get('department'),
+                location_id=line.get('location'),
+                to_location_id=line.get('to_location'),
+                unit_cost=line.get('unit_cost'),
+                reference_number=line.get('reference_number'),
+                lot_number=line.get('lot_number'),
+                expiry_date=line.get('expiry_date'),
+                notes=line.get('notes'),
+                performed_by=performed_by
+            )
+            for line in data['movements']
+        ]
+        try:
+            post_movements(movements)
+        except InsufficientStock as e:
+            return Response({
+                'success': False,
+                'error': 'Insufficient stock',
+                'item': e.item_id,
+                'location': e.location_id,
+                'available': e.available,
+                'requested': e.requested
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransfer as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        closing = {}
+        counts = defaultdict(int)
+        for movement in movements:
+            closing[movement.item_id] = movement.balance_after
+            counts[movement.item_id] += 1
+        
+        return Response({
+            'success': True,
+            'total_movements': len(movements),
+            'items': [
+                {'item_id': item_id, 'movements': counts[item_id], 'current_stock': stock}
+                for item_id, stock in closing.items()
+            ]
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def daily_summary(self, request):
         """Get daily stock movement summary"""
@@ -423,6 +626,43 @@ class StockMovementViewSet(viewsets.ModelViewSet):
         
         return Response(summary)
 
+    @action(detail=False, methods=['get'])
+    def cost_of_goods(self, request):
+        """Get the cost of stock used over a period, grouped by department, reason, category or item"""
+        try:
+            start_date = datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.query_params['end_date'], '%Y-%m-%d').date()
+        except KeyError:
+            return Response({'error': 'start_date and end_date are required'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        group_by = request.query_params.get('group_by', 'department')
+        if group_by not in COGS_GROUPS:
+            return Response({
+                'error': f"group_by must be one of: {', '.join(COGS_GROUPS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        movements = self.filter_queryset(self.get_queryset()).filter(
+            created_at__date__gte=start_date,
+            created_at__date__lte=end_date
+        )
+        totals = cost_of_goods_used(movements)
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'costing_method': costing_method(),
+            'total_quantity': totals['quantity'],
+            'total_cost': float(totals['cost']),
+            'group_by': group_by,
+            'groups': [
+                dict(row, cost=float(row['cost']))
+                for row in cost_of_goods_used(movements, group_by=group_by)
+            ]
+        })
+
     @action(detail=False, methods=['get'])
     def recent_activities(self, request):
         """Get recent stock movement activities"""
@@ -502,3 +742,368 @@ class StockMovementViewSet(viewsets.ModelViewSet):
             },
             'category_breakdown': category_stats
         })
+
+
+class StockLocationViewSet(viewsets.ModelViewSet):
+    """ViewSet for managing stock locations and the stock held at them"""
+    queryset = StockLocation.objects.select_related('room').filter(is_active=True)
+    serializer_class = StockLocationSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['location_type', 'floor', 'room']
+    search_fields = ['name']
+    ordering = ['name']
+
+    def get_queryset(self):
+        # Meta.ordering does not apply to aggregated querysets
+        return with_location_totals(super().get_queryset()).order_by('name')
+
+    def destroy(self, request, *args, **kwargs):
+        location = self.get_object()
+        if location.is_default:
+            return Response({'error': 'The default location cannot be deleted'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            location.delete()
+        except ProtectedError:
+            return Response(
+                {'error': 'Locations that have held stock cannot be deleted. Deactivate the location instead.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'])
+    def stock(self, request, pk=None):
+        """Get the stock held at a location"""
+        location = self.get_object()
+        stock = location.stock.select_related('item', 'location').filter(
+            Q(quantity__gt=0) | Q(par_level__gt=0)
+        ).order_by('item__name')
+        return Response({
+            'location': location.name,
+            'total_items': location.items_count,
+            'total_quantity': location.total_quantity,
+            'total_stock_value': float(location.total_stock_value),
+            'items': LocationStockSerializer(stock, many=True).data
+        })
+
+    @action(detail=True, methods=['get'])
+    def refill(self, request, pk=None):
+        """Get items below par at a location and how much of each the source location can send"""
+        location = self.get_object()
+        source_param = request.query_params.get('source')
+        try:
+            source_id = int(source_param) if source_param else default_location_id()
+        except ValueError:
+            return Response({'error': 'Invalid source location'}, status=status.HTTP_400_BAD_REQUEST)
+        if source_id == location.id:
+            return Response({'error': 'A location cannot be refilled from itself'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        below_par = list(
+            location.stock.select_related('item').filter(quantity__lt=F('par_level')).order_by('item__name')
+        )
+        available = dict(LocationStock.objects.filter(
+            location_id=source_id, item_id__in=[row.item_id for row in below_par]
+        ).values_list('item_id', 'quantity'))
+        
+        items = []
+        for row in below_par:
+            needed = row.par_level - row.quantity
+            items.append({
+                'item_id': row.item_id,
+                'item_name': row.item.name,
+                'sku': row.item.sku,
+                'quantity': row.quantity,
+                'par_level': row.par_level,
+                'refill_quantity': needed,
+                'available_at_source': available.get(row.item_id, 0),
+                'transfer_quantity': min(needed, available.get(row.item_id, 0))
+            })
+        
+        return Response({
+            'location': location.name,
+            'source_location': source_id,
+            'total_items': len(items),
+            'items': items
+        })
+
+    @action(detail=True, methods=['post'])
+    def par_levels(self, request, pk=None):
+        """Set the par levels of items at a location"""
+        location = self.get_object()
+        serializer = ParLevelsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        LocationStock.objects.bulk_create(
+            [
+                LocationStock(item=line['item'], location=location, par_level=line['par_level'])
+                for line in serializer.validated_data['items']
+            ],
+            update_conflicts=True, unique_fields=['item', 'location'], update_fields=['par_level', 'updated_at']
+        )
+        return Response({
+            'location': location.name,
+            'updated_items': len(serializer.validated_data['items'])
+        })
+
+
+class PurchaseOrderViewSet(viewsets.ModelViewSet):
+    """ViewSet for managing purchase orders and receiving them into stock"""
+    queryset = PurchaseOrder.objects.select_related('supplier').prefetch_related('lines__item')
+    serializer_class = PurchaseOrderSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['supplier', 'status']
+    search_fields = ['po_number', 'supplier__name', 'notes']
+    ordering = ['-created_at']
+
+    def destroy(self, request, *args, **kwargs):
+        order = self.get_object()
+        if order.status != 'DRAFT':
+            return Response(
+                {'error': 'Only draft purchase orders can be deleted. Cancel the order instead.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().destroy(request, *args, **kwargs)
+
+    def _transition(self, change, *args, **kwargs):
+        order = self.get_object()
+        try:
+            change(order, *args, **kwargs)
+        except PurchaseOrderError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=True, methods=['post'])
+    def place(self, request, pk=None):
+        """Send a draft purchase order to the supplier"""
+        return self._transition(place_order)
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        """Receive delivered quantities into stock"""
+        serializer = PurchaseOrderReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantities = {line['line']: line['quantity'] for line in serializer.validated_data['lines']}
+        lots = {
+            line['line']: (line.get('lot_number'), line.get('expiry_date'))
+            for line in serializer.validated_data['lines']
+        }
+        performed_by = serializer.validated_data.get('performed_by') or request.user.username
+        return self._transition(receive_order, quantities, performed_by=performed_by, lots=lots)
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """Close a partly received purchase order"""
+        return self._transition(close_order)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a purchase order nothing has been received against"""
+        return self._transition(cancel_order)
+
+
+class ItemScanViewSet(viewsets.ViewSet):
+    """Barcode and SKU scans from storeroom handhelds, resolved from the in-memory scan index"""
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'code'
+    lookup_value_regex = '[^/]+'
+
+    def list(self, request):
+        """Look up several scanned codes, given as repeated ?code= parameters"""
+        codes = request.query_params.getlist('code')
+        if not codes:
+            return Response({'error': 'code parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        items, unknown = [], []
+        for code in codes:
+            record = scan_index.lookup(code)
+            if record is None:
+                unknown.append(code)
+            else:
+                items.append({'code': code, **record})
+        return Response({'items': items, 'unknown': unknown})
+
+    def retrieve(self, request, code=None):
+        """Look up one scanned barcode or SKU"""
+        record = scan_index.lookup(code)
+        if record is None:
+            return Response({'error': f'No active item with code {code}'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(record)
+
+    @action(detail=False, methods=['post'])
+    def movements(self, request):
+        """Post a batch of scans as stock movements in one transaction"""
+        serializer = ScanBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        # Scanning an item several times adds up its quantity
+        quantities, records, unknown = {}, {}, []
+        for scan in data['scans']:
+            record = scan_index.lookup(scan['code'])
+            if record is None:
+                unknown.append(scan['code'])
+                continue
+            quantities[record['id']] = quantities.get(record['id'], 0) + scan['quantity']
+            records[record['id']] = record
+        # The index may still hold items deactivated by another process
+        stale = set(records) - set(
+            InventoryItem.objects.filter(pk__in=records, is_active=True).values_list('id', flat=True)
+        )
+        for item_id in stale:
+            scan_index.remove(item_id)
+            unknown.append(records[item_id]['barcode'] or records[item_id]['sku'])
+        if unknown:
+            return Response({
+                'error': 'Unknown or inactive codes',
+                'codes': unknown
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        performed_by = data.get('performed_by') or request.user.get_username()
+        movements = [
+            StockMovement(
+                item_id=item_id,
+                movement_type=data['movement_type'],
+                quantity=quantity,
+                reason=data['reason'],
+                department=data.get('department'),
+                location=data.get('location'),
+                to_location=data.get('to_location'),
+                reference_number=data.get('reference_number'),
+                performed_by=performed_by
+            )
+            for item_id, quantity in quantities.items()
+        ]
+        try:
+            post_movements(movements)
+        except InsufficientStock as e:
+            return Response({
+                'success': False,
+                'error': 'Insufficient stock',
+                'item': e.item_id,
+                'location': e.location_id,
+                'available': e.available,
+                'requested': e.requested
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransfer as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'total_movements': len(movements),
+            'items': [
+                {
+                    'item_id': movement.item_id,
+                    'sku': records[movement.item_id]['sku'],
+                    'name': records[movement.item_id]['name'],
+                    'quantity': movement.quantity,
+                    'current_stock': movement.balance_after
+                }
+                for movement in movements
+            ]
+        }, status=status.HTTP_201_CREATED)
+
+
+class MinibarViewSet(viewsets.ModelViewSet):
+    """ViewSet for recording minibar consumption, posted to stock and bills at check-out"""
+    queryset = MinibarConsumption.objects.select_related('item', 'location__room')
+    serializer_class = MinibarConsumptionSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['location', 'location__room', 'item', 'reservation']
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    ordering = ['-recorded_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        posted = self.request.query_params.get('posted')
+        if posted is not None:
+            queryset = queryset.filter(posted_at__isnull=posted.lower() not in ('true', '1'))
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """Record what was taken from a room's minibar"""
+        serializer = MinibarRecordSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        location = StockLocation.objects.filter(location_type='MINIBAR', room=data['room']).first()
+        if location is None:
+            return Response(
+                {'error': f"Room {data['room'].number} has no minibar"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            consumption = record_consumption(
+                location,
+                {line['item']: line['quantity'] for line in data['items']},
+                recorded_by=data.get('recorded_by') or request.user.get_username()
+            )
+        except MinibarError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        consumption = self.get_queryset().filter(pk__in=[row.pk for row in consumption]).order_by('id')
+        return Response(
+            MinibarConsumptionSerializer(consumption, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        consumption = self.get_object()
+        if consumption.posted_at:
+            return Response(
+                {'error': 'Consumption posted at check-out cannot be deleted'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().destroy(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def par_levels(self, request):
+        """Stock the minibars of many rooms with the same par levels"""
+        serializer = MinibarParLevelsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        if data.get('rooms'):
+            room_ids = [room.id for room in data['rooms']]
+        else:
+            room_ids = list(Room.objects.values_list('id', flat=True))
+        locations = set_par_levels(room_ids, {line['item'].id: line['par_level'] for line in data['items']})
+        return Response({
+            'updated_minibars': len(locations),
+            'updated_items': len(data['items'])
+        })
+
+
+class StockLotViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for the lots in stock and their expiry dates"""
+    queryset = CostLayer.objects.filter(remaining__gt=0).select_related('item').order_by(
+        F('expiry_date').asc(nulls_last=True), 'id'
+    )
+    serializer_class = StockLotSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['item', 'item__category', 'lot_number']
+
+    @action(detail=False, methods=['get'])
+    def expiring(self, request):
+        """Get lots expiring within ?days= days, expired lots included"""
+        days = request.query_params.get('days')
+        try:
+            days = int(days) if days is not None else None
+        except ValueError:
+            return Response({'error': 'days must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+        if days is not None and days < 0:
+            return Response({'error': 'days cannot be negative'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        lots = list(expiring_lots(days).select_related('item'))
+        today = timezone.localdate()
+        return Response({
+            'date': today,
+            'total_lots': len(lots),
+            'expired_lots': sum(1 for lot in lots if lot.expiry_date < today),
+            'total_quantity': sum(lot.remaining for lot in lots),
+            'total_value': float(sum((lot.remaining * lot.unit_cost for lot in lots), Decimal('0'))),
+            'lots': StockLotSerializer(lots, many=True).data
+        })
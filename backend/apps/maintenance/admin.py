@@ -0,0 +1,38 @@
+from django.contrib import admin
+from .models import WorkOrder
+
+
+@admin.register(WorkOrder)
+class WorkOrderAdmin(admin.ModelAdmin):
+    list_display = ('title', 'room', 'category', 'priority', 'status', 'out_of_order', 'start_date', 'end_date', 'assigned_to')
+    list_filter = ('status', 'category', 'priority', 'out_of_order', 'start_date', 'room__floor')
+    search_fields = ('title', 'description', 'room__number', 'assigned_to__user__first_name', 'assigned_to__user__last_name')
+    readonly_fields = ('started_at', 'completed_at', 'created_at', 'updated_at')
+    date_hierarchy = 'start_date'
+    
+    fieldsets = (
+        ('Work Order', {
+            'fields': ('room', 'title', 'description', 'category', 'priority', 'status')
+        }),
+        ('Out of Order', {
+            'fields': ('out_of_order', 'start_date', 'end_date')
+        }),
+        ('Assignment', {
+            'fields': ('reported_by', 'assigned_to', 'estimated_cost', 'started_at', 'completed_at')
+        }),
+        ('Additional Information', {
+            'fields': ('resolution', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    actions = ['complete_work_orders']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room', 'assigned_to__user')
+    
+    def complete_work_orders(self, request, queryset):
+        work_orders = list(queryset.filter(status__in=WorkOrder.ACTIVE_STATUSES).select_related('room'))
+        for work_order in work_orders:
+            work_order.complete()
+        self.message_user(request, f'{len(work_orders)} work orders completed.')
+    complete_work_orders.short_description = 'Complete selected work orders'
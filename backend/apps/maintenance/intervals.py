@@ -0,0 +1,101 @@
+"""
+Interval index of out-of-order room ranges.
+
+Active work orders that take a room out of order are loaded with one query
+and merged per room into sorted, non-overlapping ``[start, end)`` date
+ranges. Checking whether a stay overlaps a range is then a binary search on
+the room's range starts rather than a query or a scan per room, so
+availability and occupancy calculations can subtract planned maintenance
+for any number of rooms and date alternatives in memory.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from .models import WorkOrder
+
+
+def out_of_order_ranges(start_date, end_date, room_ids=None):
+    """Query ``(room_id, start, end)`` of active ranges overlapping the dates"""
+    work_orders = WorkOrder.objects.filter(
+        status__in=WorkOrder.ACTIVE_STATUSES,
+        out_of_order=True,
+        start_date__lt=end_date,
+        end_date__gt=start_date
+    )
+    if room_ids is not None:
+        work_orders = work_orders.filter(room_id__in=room_ids)
+    return work_orders.values_list('room_id', 'start_date', 'end_date')
+
+
+class OutOfOrderIndex:
+    """Merged out-of-order date ranges per room"""
+
+    def __init__(self, ranges=()):
+        by_room = defaultdict(list)
+        for room_id, start, end in ranges:
+            if end > start:
+                by_room[room_id].append((start, end))
+
+        # room_id -> (starts, ends) of disjoint ranges sorted by start
+        self._rooms = {}
+        for room_id, intervals in by_room.items():
+            intervals.sort()
+            starts, ends = [], []
+            for start, end in intervals:
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._rooms[room_id] = (starts, ends)
+
+    @classmethod
+    def load(cls, start_date, end_date, room_ids=None):
+        """Build an index of the ranges overlapping a date window"""
+        return cls(out_of_order_ranges(start_date, end_date, room_ids))
+
+    def __bool__(self):
+        return bool(self._rooms)
+
+    def __contains__(self, room_id):
+        return room_id in self._rooms
+
+    def ranges(self, room_id):
+        """Get the merged ``(start, end)`` ranges of a room"""
+        starts, ends = self._rooms.get(room_id, ((), ()))
+        return list(zip(starts, ends))
+
+    def overlaps(self, room_id, check_in, check_out):
+        """Check a room is out of order on any night from check-in to check-out"""
+        intervals = self._rooms.get(room_id)
+        if intervals is None:
+            return False
+        starts, ends = intervals
+        # Last range starting before check-out is the only candidate, since
+        # ranges are disjoint and sorted.
+        index = bisect_left(starts, check_out) - 1
+        return index >= 0 and ends[index] > check_in
+
+    def is_out_of_order(self, room_id, day):
+        """Check a room is out of order on the night of a day"""
+        intervals = self._rooms.get(room_id)
+        if intervals is None:
+            return False
+        starts, ends = intervals
+        index = bisect_right(starts, day) - 1
+        return index >= 0 and ends[index] > day
+
+    def blocked_rooms(self, check_in, check_out):
+        """Get ids of rooms out of order on any night of the dates"""
+        return {room_id for room_id in self._rooms if self.overlaps(room_id, check_in, check_out)}
+
+    def nights_out(self, room_id, start_date, end_date):
+        """Count nights of a date window a room is out of order"""
+        starts, ends = self._rooms.get(room_id, ((), ()))
+        nights = 0
+        index = max(bisect_left(starts, start_date) - 1, 0)
+        while index < len(starts) and starts[index] < end_date:
+            overlap = (min(ends[index], end_date) - max(starts[index], start_date)).days
+            nights += max(overlap, 0)
+            index += 1
+        return nights
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('category', models.CharField(choices=[('REPAIR', 'Repair'), ('PREVENTIVE', 'Preventive Maintenance'), ('RENOVATION', 'Renovation'), ('INSPECTION', 'Inspection')], default='REPAIR', max_length=20)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('URGENT', 'Urgent')], default='MEDIUM', max_length=10)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], default='OPEN', max_length=20)),
+                ('out_of_order', models.BooleanField(default=True, help_text='Take the room off sale between the start and end dates')),
+                ('start_date', models.DateField(help_text='First night the room is out of order')),
+                ('end_date', models.DateField(help_text='Day the room is back in service (not out of order)')),
+                ('estimated_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('resolution', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_work_orders', to='employees.employee')),
+                ('reported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reported_work_orders', to='employees.employee')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_orders', to='rooms.room')),
+            ],
+            options={
+                'verbose_name': 'Work Order',
+                'verbose_name_plural': 'Work Orders',
+                'ordering': ['start_date', 'room__number'],
+                'indexes': [models.Index(fields=['status', 'start_date', 'end_date'], name='maintenance_status_86b793_idx'), models.Index(fields=['room', 'start_date'], name='maintenance_room_id_f87e77_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='work_order_end_after_start')],
+            },
+        ),
+    ]
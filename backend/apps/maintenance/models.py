@@ -0,0 +1,124 @@
+from django.db import models
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from apps.employees.models import Employee
+from apps.rooms.models import Room
+
+
+class WorkOrder(models.Model):
+    CATEGORY_CHOICES = [
+        ('REPAIR', 'Repair'),
+        ('PREVENTIVE', 'Preventive Maintenance'),
+        ('RENOVATION', 'Renovation'),
+        ('INSPECTION', 'Inspection'),
+    ]
+
+    PRIORITY_CHOICES = [
+        ('LOW', 'Low'),
+        ('MEDIUM', 'Medium'),
+        ('HIGH', 'High'),
+        ('URGENT', 'Urgent'),
+    ]
+
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    # Work orders whose out-of-order range still takes the room off sale
+    ACTIVE_STATUSES = ['OPEN', 'IN_PROGRESS']
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='work_orders')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='REPAIR')
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='MEDIUM')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    out_of_order = models.BooleanField(
+        default=True, help_text='Take the room off sale between the start and end dates'
+    )
+    start_date = models.DateField(help_text='First night the room is out of order')
+    end_date = models.DateField(help_text='Day the room is back in service (not out of order)')
+    reported_by = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='reported_work_orders'
+    )
+    assigned_to = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_work_orders'
+    )
+    estimated_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    resolution = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_date', 'room__number']
+        verbose_name = 'Work Order'
+        verbose_name_plural = 'Work Orders'
+        indexes = [
+            models.Index(fields=['status', 'start_date', 'end_date']),
+            models.Index(fields=['room', 'start_date']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gt=models.F('start_date')),
+                name='work_order_end_after_start'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - Room {self.room.number} ({self.start_date} to {self.end_date})"
+
+    def clean(self):
+        super().clean()
+        if self.start_date and self.end_date and self.end_date <= self.start_date:
+            raise ValidationError('End date must be after start date')
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def nights(self):
+        return (self.end_date - self.start_date).days
+
+    def start(self, employee=None):
+        """Mark the work order as in progress, optionally by a given technician"""
+        self.status = 'IN_PROGRESS'
+        self.started_at = timezone.now()
+        if employee is not None:
+            self.assigned_to = employee
+        self.save(update_fields=['status', 'started_at', 'assigned_to', 'updated_at'])
+
+    def complete(self, resolution=None):
+        """Close the work order and put the room back in service"""
+        self.status = 'COMPLETED'
+        self.completed_at = timezone.now()
+        if resolution:
+            self.resolution = resolution
+        self.save(update_fields=['status', 'completed_at', 'resolution', 'updated_at'])
+        self._release_room()
+
+    def cancel(self):
+        self.status = 'CANCELLED'
+        self.save(update_fields=['status', 'updated_at'])
+        self._release_room()
+
+    def _release_room(self):
+        """Make a room flagged out of order available when nothing keeps it out today"""
+        if self.room.status != 'OUT_OF_ORDER':
+            return
+        today = timezone.now().date()
+        still_out = WorkOrder.objects.filter(
+            room_id=self.room_id,
+            status__in=self.ACTIVE_STATUSES,
+            out_of_order=True,
+            start_date__lte=today,
+            end_date__gt=today
+        ).exists()
+        if not still_out:
+            self.room.status = 'AVAILABLE'
+            self.room.save(update_fields=['status', 'updated_at'])
@@ -0,0 +1,43 @@
+from rest_framework import serializers
+from .models import WorkOrder
+
+
+class WorkOrderSerializer(serializers.ModelSerializer):
+    room_number = serializers.CharField(source='room.number', read_only=True)
+    floor = serializers.IntegerField(source='room.floor', read_only=True)
+    reported_by_name = serializers.CharField(source='reported_by.full_name', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.full_name', read_only=True)
+    category_display = serializers.CharField(source='get_category_display', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    nights = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WorkOrder
+        fields = [
+            'id', 'room', 'room_number', 'floor', 'title', 'description', 'category',
+            'category_display', 'priority', 'priority_display', 'status', 'status_display',
+            'out_of_order', 'start_date', 'end_date', 'nights', 'reported_by', 'reported_by_name',
+            'assigned_to', 'assigned_to_name', 'estimated_cost', 'started_at', 'completed_at',
+            'resolution', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['status', 'started_at', 'completed_at', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date <= start_date:
+            raise serializers.ValidationError("End date must be after start date")
+        return data
+
+
+class OutOfOrderQuerySerializer(serializers.Serializer):
+    """Serializer for listing out-of-order ranges in a date window"""
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    room_type = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data['end_date'] <= data['start_date']:
+            raise serializers.ValidationError("End date must be after start date")
+        return data
@@ -0,0 +1,195 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from decimal import Decimal
+from datetime import date, timedelta
+from apps.checkin.occupancy import build_occupancy_board
+from apps.guests.models import Guest
+from apps.reservations.assignment import auto_assign_rooms
+from apps.reservations.availability import AvailabilitySnapshot, quote_alternatives
+from apps.reservations.models import Reservation
+from apps.rooms.models import RoomType, Room
+from .intervals import OutOfOrderIndex
+from .models import WorkOrder
+
+
+class OutOfOrderIndexTest(TestCase):
+    def setUp(self):
+        self.day = date(2026, 3, 2)
+
+    def days(self, offset):
+        return self.day + timedelta(days=offset)
+
+    def test_overlapping_ranges_are_merged(self):
+        """Test overlapping and adjacent ranges of a room become one range"""
+        index = OutOfOrderIndex([
+            (1, self.days(0), self.days(3)),
+            (1, self.days(2), self.days(5)),
+            (1, self.days(5), self.days(6)),
+            (1, self.days(10), self.days(12)),
+        ])
+        self.assertEqual(index.ranges(1), [(self.days(0), self.days(6)), (self.days(10), self.days(12))])
+
+    def test_overlap_uses_half_open_nights(self):
+        """Test a stay may check in on the day a range ends and check out the day it starts"""
+        index = OutOfOrderIndex([(1, self.days(5), self.days(8)), (1, self.days(20), self.days(22))])
+        self.assertFalse(index.overlaps(1, self.days(0), self.days(5)))
+        self.assertFalse(index.overlaps(1, self.days(8), self.days(20)))
+        self.assertTrue(index.overlaps(1, self.days(7), self.days(9)))
+        self.assertTrue(index.overlaps(1, self.days(0), self.days(30)))
+        self.assertFalse(index.overlaps(2, self.days(0), self.days(30)))
+        self.assertTrue(index.is_out_of_order(1, self.days(5)))
+        self.assertFalse(index.is_out_of_order(1, self.days(8)))
+
+    def test_nights_out_and_blocked_rooms(self):
+        """Test out-of-order nights are counted within a window"""
+        index = OutOfOrderIndex([(1, self.days(-2), self.days(3)), (1, self.days(6), self.days(8)), (2, self.days(9), self.days(12))])
+        self.assertEqual(index.nights_out(1, self.days(0), self.days(7)), 4)
+        self.assertEqual(index.blocked_rooms(self.days(0), self.days(7)), {1})
+        self.assertEqual(index.blocked_rooms(self.days(7), self.days(10)), {1, 2})
+
+
+class WorkOrderAvailabilityTest(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='John', last_name='Doe', email='john@example.com')
+        self.room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        self.rooms = [
+            Room.objects.create(number=f'{101 + i}', room_type=self.room_type, floor=1)
+            for i in range(3)
+        ]
+        self.today = date.today()
+        # Room 101 is renovated from day 10 to day 13
+        self.work_order = WorkOrder.objects.create(
+            room=self.rooms[0],
+            title='Bathroom renovation',
+            category='RENOVATION',
+            start_date=self.today + timedelta(days=10),
+            end_date=self.today + timedelta(days=13)
+        )
+
+    def quote(self, check_in, check_out):
+        return quote_alternatives([{
+            'room_type': self.room_type.id,
+            'check_in_date': self.today + timedelta(days=check_in),
+            'check_out_date': self.today + timedelta(days=check_out),
+        }])[0]
+
+    def test_out_of_order_range_reduces_availability_for_its_dates_only(self):
+        """Test a planned work order takes the room off sale only while it runs"""
+        self.assertEqual(self.quote(11, 12)['rooms_available'], 2)
+        self.assertEqual(self.quote(8, 11)['rooms_available'], 2)
+        self.assertEqual(self.quote(3, 5)['rooms_available'], 3)
+        self.assertEqual(self.quote(13, 15)['rooms_available'], 3)
+
+    def test_completed_or_cancelled_work_orders_free_the_room(self):
+        """Test only open and in-progress work orders hold rooms"""
+        self.work_order.cancel()
+        self.assertEqual(self.quote(11, 12)['rooms_available'], 3)
+
+        WorkOrder.objects.create(
+            room=self.rooms[1], title='Inspection', out_of_order=False,
+            start_date=self.today + timedelta(days=10), end_date=self.today + timedelta(days=12)
+        )
+        self.assertEqual(self.quote(11, 12)['rooms_available'], 3)
+
+    def test_snapshot_loads_ranges_in_one_query(self):
+        """Test many work orders are loaded with a single query"""
+        for offset in range(20):
+            WorkOrder.objects.create(
+                room=self.rooms[offset % 3], title='Repair',
+                start_date=self.today + timedelta(days=20 + offset),
+                end_date=self.today + timedelta(days=21 + offset)
+            )
+        with self.assertNumQueries(1):
+            index = OutOfOrderIndex.load(self.today, self.today + timedelta(days=60))
+        self.assertEqual(len(index.ranges(self.rooms[0].id)), 8)
+        self.assertTrue(AvailabilitySnapshot(self.today, self.today + timedelta(days=60)).out_of_order)
+
+    def test_auto_assign_works_around_out_of_order_range(self):
+        """Test automatic assignment does not use a room during its work order"""
+        Room.objects.filter(id__in=[self.rooms[1].id, self.rooms[2].id]).update(is_active=False)
+        before = Reservation.objects.create(
+            guest=self.guest, check_in_date=self.today + timedelta(days=8),
+            check_out_date=self.today + timedelta(days=10), status='CONFIRMED',
+            requested_room_type=self.room_type
+        )
+        during = Reservation.objects.create(
+            guest=self.guest, check_in_date=self.today + timedelta(days=11),
+            check_out_date=self.today + timedelta(days=12), status='CONFIRMED',
+            requested_room_type=self.room_type
+        )
+        result = auto_assign_rooms(self.today, self.today + timedelta(days=14))
+        self.assertEqual([a['reservation_id'] for a in result['assigned']], [before.id])
+        self.assertEqual([u['reservation_id'] for u in result['unassigned']], [during.id])
+
+    def test_occupancy_board_flags_rooms_out_of_order_today(self):
+        """Test the board shows rooms kept out of order today and when they return"""
+        WorkOrder.objects.create(
+            room=self.rooms[2], title='Leaking pipe',
+            start_date=self.today, end_date=self.today + timedelta(days=2)
+        )
+        rooms = {room['room_number']: room for room in build_occupancy_board()['rooms']}
+        self.assertTrue(rooms['103']['out_of_order'])
+        self.assertEqual(rooms['103']['back_in_service'], self.today + timedelta(days=2))
+        self.assertFalse(rooms['101']['out_of_order'])
+
+    def test_complete_releases_out_of_order_room(self):
+        """Test completing the last active work order makes the room available"""
+        room = self.rooms[1]
+        room.status = 'OUT_OF_ORDER'
+        room.save()
+        work_order = WorkOrder.objects.create(
+            room=room, title='Broken AC',
+            start_date=self.today, end_date=self.today + timedelta(days=3)
+        )
+        work_order.start()
+        work_order.complete(resolution='Compressor replaced')
+
+        room.refresh_from_db()
+        self.assertEqual(room.status, 'AVAILABLE')
+        self.assertEqual(work_order.status, 'COMPLETED')
+
+
+class WorkOrderAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='engineer', password='pass'))
+        room_type = RoomType.objects.create(name='Standard', base_price=Decimal('100.00'), max_occupancy=2)
+        self.room = Room.objects.create(number='101', room_type=room_type)
+        Room.objects.create(number='102', room_type=room_type)
+        self.today = date.today()
+
+    def test_create_and_list_out_of_order_ranges(self):
+        """Test work orders are created through the API and reported per room"""
+        response = self.client.post('/api/maintenance/work-orders/', {
+            'room': self.room.id,
+            'title': 'Repaint',
+            'category': 'RENOVATION',
+            'start_date': self.today + timedelta(days=2),
+            'end_date': self.today + timedelta(days=5),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['nights'], 3)
+
+        response = self.client.get('/api/maintenance/work-orders/out_of_order/', {
+            'start_date': self.today,
+            'end_date': self.today + timedelta(days=4),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rooms_affected'], 1)
+        self.assertEqual(response.data['room_nights_out'], 2)
+        self.assertEqual(response.data['sellable_room_nights'], 6)
+
+    def test_rejects_empty_range(self):
+        """Test a work order must end after it starts"""
+        response = self.client.post('/api/maintenance/work-orders/', {
+            'room': self.room.id,
+            'title': 'Repaint',
+            'start_date': self.today,
+            'end_date': self.today,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
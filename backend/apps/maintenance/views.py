@@ -0,0 +1,115 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+
+from apps.rooms.models import Room
+from .intervals import OutOfOrderIndex
+from .models import WorkOrder
+from .serializers import WorkOrderSerializer, OutOfOrderQuerySerializer
+
+
+class WorkOrderViewSet(viewsets.ModelViewSet):
+    """ViewSet for managing maintenance work orders"""
+    queryset = WorkOrder.objects.select_related('room', 'reported_by__user', 'assigned_to__user')
+    serializer_class = WorkOrderSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'category', 'priority', 'out_of_order', 'room', 'room__floor', 'assigned_to']
+    search_fields = ['title', 'description', 'room__number']
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Start working on a work order"""
+        work_order = self.get_object()
+
+        if work_order.status != 'OPEN':
+            return Response({
+                'error': f'Cannot start work order with status: {work_order.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        work_order.start()
+
+        return Response({
+            'success': True,
+            'message': f'Work started on room {work_order.room.number}',
+            'work_order': WorkOrderSerializer(work_order).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Complete a work order and put the room back in service"""
+        work_order = self.get_object()
+
+        if not work_order.is_active:
+            return Response({
+                'error': f'Cannot complete work order with status: {work_order.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        work_order.complete(resolution=request.data.get('resolution'))
+
+        return Response({
+            'success': True,
+            'message': f'Room {work_order.room.number} is {work_order.room.get_status_display().lower()}',
+            'room_status': work_order.room.status,
+            'work_order': WorkOrderSerializer(work_order).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a work order and give its out-of-order nights back"""
+        work_order = self.get_object()
+
+        if not work_order.is_active:
+            return Response({
+                'error': f'Cannot cancel work order with status: {work_order.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        work_order.cancel()
+
+        return Response({
+            'success': True,
+            'message': f'Work order for room {work_order.room.number} cancelled',
+            'work_order': WorkOrderSerializer(work_order).data
+        })
+
+    @action(detail=False, methods=['get'])
+    def out_of_order(self, request):
+        """Get merged out-of-order ranges per room for a date window"""
+        serializer = OutOfOrderQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        start_date = data['start_date']
+        end_date = data['end_date']
+
+        rooms = Room.objects.filter(is_active=True)
+        if data.get('room_type'):
+            rooms = rooms.filter(room_type_id=data['room_type'])
+        rooms = dict(rooms.values_list('id', 'number'))
+
+        index = OutOfOrderIndex.load(start_date, end_date, room_ids=rooms.keys())
+        out_of_order = [
+            {
+                'room': room_id,
+                'room_number': number,
+                'nights_out': index.nights_out(room_id, start_date, end_date),
+                'ranges': [{'start_date': start, 'end_date': end} for start, end in index.ranges(room_id)]
+            }
+            for room_id, number in sorted(rooms.items(), key=lambda item: item[1])
+            if room_id in index
+        ]
+        total_room_nights = len(rooms) * (end_date - start_date).days
+        nights_out = sum(room['nights_out'] for room in out_of_order)
+
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'total_rooms': len(rooms),
+            'rooms_affected': len(out_of_order),
+            'room_nights_out': nights_out,
+            'sellable_room_nights': total_room_nights - nights_out,
+            'rooms': out_of_order
+        })
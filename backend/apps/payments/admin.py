@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.db.models import Sum, Count, Avg
 from django.urls import reverse
 from decimal import Decimal
-from .models import PaymentMethod, Bill, Payment
+from .models import PaymentMethod, Bill, BillCharge, Payment
 
 
 class PaymentInline(admin.TabularInline):
@@ -14,6 +14,13 @@ class PaymentInline(admin.TabularInline):
     ordering = ('-payment_date',)
 
 
+class BillChargeInline(admin.TabularInline):
+    model = BillCharge
+    extra = 0
+    fields = ('charge_type', 'description', 'quantity', 'unit_price', 'amount', 'created_at')
+    readonly_fields = ('created_at',)
+
+
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
     list_display = ('name', 'code', 'processing_fee_percentage', 'total_transactions', 'total_amount', 'avg_transaction', 'is_active', 'created_at')
@@ -126,7 +133,7 @@ class BillAdmin(admin.ModelAdmin):
         }),
     )
     
-    inlines = [PaymentInline]
+    inlines = [BillChargeInline, PaymentInline]
     actions = ['mark_paid', 'apply_discount', 'send_invoice']
     
     def get_queryset(self, request):
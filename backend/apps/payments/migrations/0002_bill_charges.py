@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillCharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('charge_type', models.CharField(choices=[('MINIBAR', 'Minibar'), ('DAMAGE', 'Damage'), ('LATE_CHECKOUT', 'Late Check-out'), ('OTHER', 'Other')], default='OTHER', max_length=20)),
+                ('description', models.CharField(max_length=200)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='charges', to='payments.bill')),
+            ],
+            options={
+                'verbose_name': 'Bill Charge',
+                'verbose_name_plural': 'Bill Charges',
+                'ordering': ['bill', 'created_at', 'id'],
+            },
+        ),
+    ]
@@ -163,3 +163,28 @@ class Payment(models.Model):
         prefix = 'PAY'
         suffix = ''.join(random.choices(string.digits, k=9))
         return f"{prefix}{suffix}"
+
+
+class BillCharge(models.Model):
+    CHARGE_TYPE_CHOICES = [
+        ('MINIBAR', 'Minibar'),
+        ('DAMAGE', 'Damage'),
+        ('LATE_CHECKOUT', 'Late Check-out'),
+        ('OTHER', 'Other'),
+    ]
+
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='charges')
+    charge_type = models.CharField(max_length=20, choices=CHARGE_TYPE_CHOICES, default='OTHER')
+    description = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['bill', 'created_at', 'id']
+        verbose_name = 'Bill Charge'
+        verbose_name_plural = 'Bill Charges'
+
+    def __str__(self):
+        return f"{self.bill.bill_number}: {self.description} x{self.quantity}"
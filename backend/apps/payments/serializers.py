@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import PaymentMethod, Bill, Payment
+from .models import PaymentMethod, Bill, BillCharge, Payment
 
 
 class PaymentMethodSerializer(serializers.ModelSerializer):
@@ -28,6 +28,18 @@ class PaymentMethodSerializer(serializers.ModelSerializer):
         return float(total) if total else 0.0
 
 
+class BillChargeSerializer(serializers.ModelSerializer):
+    charge_type_display = serializers.CharField(source='get_charge_type_display', read_only=True)
+
+    class Meta:
+        model = BillCharge
+        fields = [
+            'id', 'charge_type', 'charge_type_display', 'description', 'quantity', 'unit_price', 'amount',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
 class BillSerializer(serializers.ModelSerializer):
     reservation_number = serializers.CharField(source='reservation.reservation_number', read_only=True)
     guest_name = serializers.CharField(source='reservation.guest.full_name', read_only=True)
@@ -36,6 +48,7 @@ class BillSerializer(serializers.ModelSerializer):
     remaining_balance = serializers.SerializerMethodField()
     is_overdue = serializers.SerializerMethodField()
     tax_breakdown = serializers.SerializerMethodField()
+    charges = BillChargeSerializer(many=True, read_only=True)
     
     class Meta:
         model = Bill
@@ -44,7 +57,7 @@ class BillSerializer(serializers.ModelSerializer):
             'subtotal', 'tax_amount', 'service_charge', 'discount_amount',
             'total_amount', 'paid_amount', 'remaining_balance', 'status',
             'status_display', 'due_date', 'is_overdue', 'notes', 'created_at',
-            'updated_at', 'transactions', 'tax_breakdown'
+            'updated_at', 'charges', 'transactions', 'tax_breakdown'
         ]
         read_only_fields = ['bill_number', 'created_at', 'updated_at', 'paid_amount']
 
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RealtimeConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.realtime'
+
+    def ready(self):
+        from . import signals  # noqa: F401
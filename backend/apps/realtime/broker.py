@@ -0,0 +1,152 @@
+"""
+In-process publish/subscribe broker for the front-desk push stream.
+
+Model signals publish events from whatever thread saved the model; every
+subscriber owns a bounded ``asyncio.Queue`` on the event loop serving its
+connection. Delivery is grouped per event loop, so one event costs a single
+``call_soon_threadsafe`` per loop no matter how many clients are connected,
+and the Server-Sent Events payload is encoded once per event, not per client.
+
+Subscribers that fall behind lose their oldest events instead of growing
+memory without bound; clients can resume with ``Last-Event-ID`` from the
+recent history kept by the broker.
+
+Events are only shared inside one process. Stream connections must be
+served by the ASGI worker whose process handles the writes, or the broker
+has to be backed by a shared bus when running several workers.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Topics a client can subscribe to
+TOPICS = ['rooms', 'arrivals', 'checkins', 'checkouts', 'keys']
+
+
+class Event:
+    """One published event with its encoded Server-Sent Events frame"""
+    __slots__ = ('id', 'topic', 'data', 'floors', 'encoded')
+
+    def __init__(self, event_id, topic, data, floors):
+        self.id = event_id
+        self.topic = topic
+        self.data = data
+        self.floors = floors
+        payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+        self.encoded = f'id: {event_id}\nevent: {topic}\ndata: {payload}\n\n'.encode()
+
+    def matches(self, floors):
+        """Check the event concerns one of the given floors (None means all)"""
+        return floors is None or not self.floors.isdisjoint(floors)
+
+
+class Subscription:
+    """Queue of events for one connected client"""
+
+    def __init__(self, topics, floors, loop, max_queue):
+        self.topics = frozenset(topics)
+        self.floors = frozenset(floors) if floors else None
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def deliver(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Wait for the next event, or return None after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _deliver_all(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.deliver(event)
+
+
+class EventBroker:
+    """Fan out published events to the subscriptions of their topic"""
+
+    def __init__(self, max_queue=256, history=1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._by_topic = {topic: set() for topic in TOPICS}
+        self._history = deque(maxlen=history)
+        self._last_id = 0
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._by_topic.values()))
+
+    def subscribe(self, topics=None, floors=None):
+        """Register a subscription on the running event loop"""
+        topics = [topic for topic in (topics or TOPICS) if topic in self._by_topic]
+        subscription = Subscription(topics, floors, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            for topic in subscription.topics:
+                self._by_topic[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                self._by_topic[topic].discard(subscription)
+
+    def history_since(self, last_id, topics, floors=None):
+        """Get buffered events after ``last_id`` for a reconnecting client"""
+        with self._lock:
+            events = list(self._history)
+        floors = frozenset(floors) if floors else None
+        return [
+            event for event in events
+            if event.id > last_id and event.topic in topics and event.matches(floors)
+        ]
+
+    def publish(self, topic, data, floors=()):
+        """Publish an event to every subscriber of the topic and floors.
+
+        Safe to call from any thread. ``floors`` lists the floors the event
+        concerns; clients filtering by floor only receive matching events.
+        """
+        if topic not in self._by_topic:
+            raise ValueError(f'Unknown topic: {topic}')
+        floors = frozenset(floor for floor in floors if floor is not None)
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, topic, data, floors)
+            self._history.append(event)
+            subscriptions = list(self._by_topic[topic])
+
+        by_loop = {}
+        for subscription in subscriptions:
+            if event.matches(subscription.floors):
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        for loop, targets in by_loop.items():
+            if loop is running_loop:
+                _deliver_all(targets, event)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_deliver_all, targets, event)
+        return event
+
+
+broker = EventBroker()
+
+
+def publish(topic, data, floors=()):
+    """Publish on the process-wide broker"""
+    return broker.publish(topic, data, floors)
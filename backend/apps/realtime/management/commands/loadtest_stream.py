@@ -0,0 +1,81 @@
+import asyncio
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Open many concurrent clients on the real-time event stream of a running ASGI server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Stream URL, e.g. http://127.0.0.1:8000/api/stream/')
+        parser.add_argument('--token', required=True, help='API token used by every client')
+        parser.add_argument('--clients', type=int, default=2000)
+        parser.add_argument('--duration', type=int, default=30, help='Seconds to keep the clients connected')
+        parser.add_argument('--topics', default='', help='Comma separated topics, defaults to all')
+        parser.add_argument('--floors', default='', help='Comma separated floors; clients are spread across them')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only plain http:// stream URLs are supported')
+        floors = [floor for floor in options['floors'].split(',') if floor.strip()]
+        stats = asyncio.run(self.run(url, floors, options))
+
+        self.stdout.write(f"Clients connected: {stats['connected']} / {options['clients']}")
+        self.stdout.write(f"Connect time: {stats['connect_time']:.2f}s")
+        self.stdout.write(f"Events received: {stats['events']} ({stats['events'] / options['duration']:.0f}/s)")
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(f"Failed clients: {stats['failed']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('All clients stayed connected'))
+
+    async def run(self, url, floors, options):
+        stats = {'connected': 0, 'failed': 0, 'events': 0, 'connect_time': 0.0}
+        all_connected = asyncio.Event()
+        started = time.perf_counter()
+
+        async def client(index):
+            params = {'token': options['token']}
+            if options['topics']:
+                params['topics'] = options['topics']
+            if floors:
+                params['floors'] = floors[index % len(floors)]
+            path = f"{url.path or '/'}?{urlencode(params)}"
+            try:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                writer.write(
+                    f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: text/event-stream\r\n\r\n'.encode()
+                )
+                await writer.drain()
+                status_line = await reader.readline()
+                if b' 200 ' not in status_line:
+                    raise ConnectionError(status_line.decode(errors='replace').strip())
+            except (OSError, ConnectionError):
+                stats['failed'] += 1
+                return
+            stats['connected'] += 1
+            if stats['connected'] + stats['failed'] == options['clients']:
+                stats['connect_time'] = time.perf_counter() - started
+                all_connected.set()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        stats['failed'] += 1
+                        break
+                    if line.startswith(b'event:'):
+                        stats['events'] += 1
+            except asyncio.CancelledError:
+                writer.close()
+                raise
+
+        tasks = [asyncio.create_task(client(i)) for i in range(options['clients'])]
+        await asyncio.sleep(options['duration'])
+        if not all_connected.is_set():
+            stats['connect_time'] = time.perf_counter() - started
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return stats
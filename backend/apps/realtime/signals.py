@@ -0,0 +1,119 @@
+"""
+Model signal handlers publishing front-desk events to the push stream.
+
+Events are published after the surrounding transaction commits, so clients
+never see changes that were rolled back.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.checkin.models import CheckIn, CheckOut, RoomKey
+from apps.reservations.models import Reservation, ReservationRoom
+from apps.rooms.models import Room
+from .broker import publish
+
+
+def _touches(update_fields, field):
+    return update_fields is None or field in update_fields
+
+
+def _reservation_rooms(reservation_id):
+    return [
+        {'id': room_id, 'number': number, 'floor': floor}
+        for room_id, number, floor in ReservationRoom.objects.filter(
+            reservation_id=reservation_id
+        ).values_list('room_id', 'room__number', 'room__floor')
+    ]
+
+
+@receiver(post_save, sender=Room)
+def publish_room_status(sender, instance, created, update_fields, raw=False, **kwargs):
+    if raw or not _touches(update_fields, 'status'):
+        return
+    data = {
+        'room': instance.id,
+        'number': instance.number,
+        'floor': instance.floor,
+        'status': instance.status,
+        'created': created,
+    }
+    transaction.on_commit(lambda: publish('rooms', data, floors=[instance.floor]))
+
+
+@receiver(post_save, sender=Reservation)
+def publish_arrival(sender, instance, created, update_fields, raw=False, **kwargs):
+    if raw or not _touches(update_fields, 'status'):
+        return
+    if instance.check_in_date != timezone.now().date():
+        return
+
+    def send():
+        rooms = _reservation_rooms(instance.id)
+        publish('arrivals', {
+            'reservation': instance.id,
+            'reservation_number': instance.reservation_number,
+            'guest': instance.guest_id,
+            'status': instance.status,
+            'check_in_date': instance.check_in_date,
+            'check_out_date': instance.check_out_date,
+            'rooms': rooms,
+        }, floors=[room['floor'] for room in rooms])
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=CheckIn)
+def publish_check_in(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+
+    def send():
+        rooms = _reservation_rooms(instance.reservation_id)
+        publish('checkins', {
+            'check_in': instance.id,
+            'reservation': instance.reservation_id,
+            'time': instance.actual_check_in_time,
+            'rooms': rooms,
+        }, floors=[room['floor'] for room in rooms])
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=CheckOut)
+def publish_check_out(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+
+    def send():
+        reservation_id = CheckIn.objects.filter(pk=instance.check_in_id).values_list(
+            'reservation_id', flat=True
+        ).first()
+        rooms = _reservation_rooms(reservation_id)
+        publish('checkouts', {
+            'check_out': instance.id,
+            'check_in': instance.check_in_id,
+            'reservation': reservation_id,
+            'time': instance.actual_check_out_time,
+            'room_condition': instance.room_condition,
+            'rooms': rooms,
+        }, floors=[room['floor'] for room in rooms])
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=RoomKey)
+def publish_key_event(sender, instance, created, update_fields, raw=False, **kwargs):
+    if raw or not (created or _touches(update_fields, 'is_active')):
+        return
+    room = instance.room
+    data = {
+        'key': instance.id,
+        'check_in': instance.check_in_id,
+        'room': room.id,
+        'number': room.number,
+        'key_type': instance.key_type,
+        'action': 'issued' if created else ('activated' if instance.is_active else 'deactivated'),
+    }
+    transaction.on_commit(lambda: publish('keys', data, floors=[room.floor]))
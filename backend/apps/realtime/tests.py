@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from apps.rooms.models import RoomType, Room
+from .broker import EventBroker, broker
+
+
+class EventBrokerTest(TestCase):
+    def test_topic_and_floor_filtering(self):
+        """Test subscribers only receive their topics and floors"""
+        async def scenario():
+            events = EventBroker()
+            everything = events.subscribe()
+            floor_two = events.subscribe(['rooms'], floors=[2])
+            keys_only = events.subscribe(['keys'])
+
+            events.publish('rooms', {'number': '201'}, floors=[2])
+            events.publish('rooms', {'number': '301'}, floors=[3])
+            events.publish('keys', {'number': '301'}, floors=[3])
+
+            self.assertEqual([e.data['number'] for e in [everything.queue.get_nowait() for _ in range(3)]],
+                             ['201', '301', '301'])
+            self.assertEqual(floor_two.queue.qsize(), 1)
+            self.assertEqual(floor_two.queue.get_nowait().data['number'], '201')
+            self.assertEqual(keys_only.queue.qsize(), 1)
+
+            events.unsubscribe(everything)
+            events.publish('rooms', {'number': '202'}, floors=[2])
+            self.assertTrue(everything.queue.empty())
+            self.assertEqual(events.subscriber_count, 2)
+
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_drops_oldest_events(self):
+        """Test a full queue keeps the newest events"""
+        async def scenario():
+            events = EventBroker(max_queue=3)
+            subscription = events.subscribe(['rooms'])
+            for number in range(5):
+                events.publish('rooms', {'number': number})
+            self.assertEqual(subscription.dropped, 2)
+            self.assertEqual([subscription.queue.get_nowait().data['number'] for _ in range(3)], [2, 3, 4])
+
+        asyncio.run(scenario())
+
+    def test_history_replay_after_reconnect(self):
+        """Test events after Last-Event-ID can be replayed"""
+        events = EventBroker()
+        first = events.publish('rooms', {'number': '101'}, floors=[1])
+        events.publish('rooms', {'number': '201'}, floors=[2])
+        events.publish('keys', {'number': '102'}, floors=[1])
+        replay = events.history_since(first.id, {'rooms', 'keys'}, floors=[1])
+        self.assertEqual([e.data['number'] for e in replay], ['102'])
+
+    def test_fan_out_to_thousands_of_subscribers_from_another_thread(self):
+        """Test one process fans events out to 5,000 subscribers"""
+        clients = 5000
+        rounds = 20
+
+        async def scenario():
+            events = EventBroker()
+            subscriptions = [
+                events.subscribe(['rooms'], floors=None if i % 2 else [i % 10])
+                for i in range(clients)
+            ]
+            expected = {
+                id(sub): rounds if sub.floors is None else rounds // 10 * len(sub.floors)
+                for sub in subscriptions
+            }
+
+            def writer():
+                for i in range(rounds):
+                    events.publish('rooms', {'round': i}, floors=[i % 10])
+
+            started = time.perf_counter()
+            thread = threading.Thread(target=writer)
+            thread.start()
+            await asyncio.to_thread(thread.join)
+
+            async def drain(subscription):
+                received = 0
+                while received < expected[id(subscription)]:
+                    await subscription.get(timeout=5)
+                    received += 1
+                return received
+
+            received = await asyncio.gather(*(drain(sub) for sub in subscriptions))
+            return sum(received), time.perf_counter() - started, sum(expected.values())
+
+        delivered, elapsed, expected = asyncio.run(scenario())
+        self.assertEqual(delivered, expected)
+        self.assertLess(elapsed, 10)
+
+
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='frontdesk', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        room_type = RoomType.objects.create(name='Standard', base_price=Decimal('100.00'), max_occupancy=2)
+        self.room = Room.objects.create(number='201', room_type=room_type, floor=2)
+
+    async def open_stream(self, app, query, index=0):
+        """Start one stream request on the ASGI application"""
+        inbox = asyncio.Queue()
+        messages = asyncio.Queue()
+        await inbox.put({'type': 'http.request', 'body': b'', 'more_body': False})
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': '/api/stream/',
+            'raw_path': b'/api/stream/',
+            'root_path': '',
+            'query_string': query.encode(),
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 10000 + index),
+        }
+        task = asyncio.create_task(app(scope, inbox.get, messages.put))
+        return task, inbox, messages
+
+    async def next_body(self, messages):
+        while True:
+            message = await asyncio.wait_for(messages.get(), 60)
+            if message['type'] == 'http.response.body' and message.get('body'):
+                return message['body']
+
+    def test_requires_authentication(self):
+        """Test the stream rejects anonymous clients"""
+        response = self.client.get('/api/stream/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_rejects_unknown_topic(self):
+        """Test unknown topics are rejected"""
+        response = self.client.get('/api/stream/', {'token': self.token.key, 'topics': 'weather'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_dropped_response_leaves_no_subscription(self):
+        """Test a stream closed before it is sent does not stay subscribed"""
+        response = await self.async_client.get('/api/stream/', {'token': self.token.key})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_room_status_change_is_pushed(self):
+        """Test saving a room status publishes to subscribers after commit"""
+        subscription = broker.subscribe(['rooms'], floors=[2])
+
+        def update_status():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.room.status = 'OCCUPIED'
+                self.room.save(update_fields=['status', 'updated_at'])
+
+        try:
+            await sync_to_async(update_status)()
+            event = await subscription.get(timeout=5)
+        finally:
+            broker.unsubscribe(subscription)
+        self.assertEqual(event.topic, 'rooms')
+        self.assertEqual(event.data['number'], '201')
+        self.assertEqual(event.data['status'], 'OCCUPIED')
+
+    async def test_thousands_of_clients_on_one_process(self):
+        """Test 2,000 concurrent stream clients on one ASGI application all receive an event"""
+        clients = 2000
+        app = ASGIHandler()
+        # Keep the test transaction open across requests, as the test client does
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+        streams = [
+            await self.open_stream(app, f'token={self.token.key}&floors={1 + i % 2}', i)
+            for i in range(clients)
+        ]
+        # Every client gets the reconnect hint first
+        for _, _, messages in streams:
+            self.assertTrue((await self.next_body(messages)).startswith(b'retry:'))
+        self.assertGreaterEqual(broker.subscriber_count, clients)
+
+        started = time.perf_counter()
+        broker.publish('rooms', {'number': '201', 'status': 'OCCUPIED'}, floors=[2])
+        broker.publish('rooms', {'number': '101', 'status': 'OCCUPIED'}, floors=[1])
+        bodies = [await self.next_body(messages) for _, _, messages in streams]
+        elapsed = time.perf_counter() - started
+
+        for _, inbox, _ in streams:
+            await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(asyncio.gather(*(task for task, _, _ in streams), return_exceptions=True), 30)
+
+        for index, body in enumerate(bodies):
+            expected = b'"number":"101"' if index % 2 == 0 else b'"number":"201"'
+            self.assertIn(b'event: rooms', body)
+            self.assertIn(expected, body)
+        self.assertLess(elapsed, 10)
+        self.assertEqual(broker.subscriber_count, 0)
@@ -0,0 +1,78 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+
+from .broker import TOPICS, broker
+
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+# Milliseconds clients wait before reconnecting after a dropped stream
+RECONNECT_DELAY = 3000
+
+
+async def _authenticate(request):
+    """Authenticate by session or by a ``token`` query parameter.
+
+    Browser ``EventSource`` clients cannot send an Authorization header, so
+    the API token may be passed in the query string instead.
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    key = request.GET.get('token') or request.headers.get('Authorization', '').removeprefix('Token ').strip()
+    if not key:
+        return None
+    token = await Token.objects.select_related('user').filter(key=key).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def _parse_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+async def _event_stream(topics, floors, last_event_id):
+    # Subscribing once streaming starts means a response dropped before it
+    # is sent leaves no subscription behind
+    subscription = broker.subscribe(topics, floors)
+    try:
+        yield f'retry: {RECONNECT_DELAY}\n\n'.encode()
+        if last_event_id and last_event_id.isdigit():
+            for event in broker.history_since(int(last_event_id), subscription.topics, floors):
+                yield event.encoded
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            yield event.encoded if event is not None else b': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def event_stream(request):
+    """Server-Sent Events stream of room, arrival, check-in/out and key events.
+
+    Query parameters: ``topics`` (comma separated, defaults to all) and
+    ``floors`` (comma separated floor numbers, defaults to all floors).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    topics = _parse_list(request.GET.get('topics')) or TOPICS
+    unknown = [topic for topic in topics if topic not in TOPICS]
+    if unknown:
+        return JsonResponse({'error': f"Unknown topics: {', '.join(unknown)}", 'topics': TOPICS}, status=400)
+    try:
+        floors = [int(floor) for floor in _parse_list(request.GET.get('floors'))]
+    except ValueError:
+        return JsonResponse({'error': 'floors must be a comma separated list of numbers'}, status=400)
+
+    stream = _event_stream(topics, floors, request.headers.get('Last-Event-ID'))
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -401,6 +401,7 @@ class ReportsViewSet(viewsets.ViewSet):
         from apps.rooms.models import Room
         from apps.checkin.models import CheckIn
         from apps.employees.models import Employee, Attendance
+        from apps.inventory.forecasting import needs_reorder
         from apps.inventory.models import InventoryItem
         
         # Occupancy metrics
@@ -441,17 +442,14 @@ class ReportsViewSet(viewsets.ViewSet):
         }
         
         # Inventory alerts
-        low_stock_items = InventoryItem.objects.filter(
-            current_stock__lte=F('minimum_stock'),
-            is_active=True
-        )
+        low_stock_items = needs_reorder(InventoryItem.objects.filter(is_active=True))
         out_of_stock_items = InventoryItem.objects.filter(current_stock=0, is_active=True)
         
         inventory_alerts = [
             {
                 'type': 'LOW_STOCK',
                 'count': low_stock_items.count(),
-                'items': [{'name': item.name, 'current_stock': item.current_stock, 'minimum_stock': item.minimum_stock} for item in low_stock_items[:5]]
+                'items': [{'name': item.name, 'current_stock': item.current_stock, 'minimum_stock': item.minimum_stock, 'reorder_point': item.reorder_level()} for item in low_stock_items.select_related('forecast')[:5]]
             },
             {
                 'type': 'OUT_OF_STOCK',
@@ -493,6 +491,7 @@ class ReportsViewSet(viewsets.ViewSet):
         from apps.rooms.models import Room
         from apps.checkin.models import CheckIn
         from apps.payments.models import Bill
+        from apps.inventory.forecasting import needs_reorder
         from apps.inventory.models import InventoryItem
         
         # Calculate key metrics
@@ -519,11 +518,8 @@ class ReportsViewSet(viewsets.ViewSet):
         )['total'] or Decimal('0')
         
         # Inventory alerts
-        inventory_alerts = InventoryItem.objects.filter(
-            is_active=True
-        ).filter(
-            Q(current_stock__lte=F('minimum_stock')) | Q(current_stock=0)
-        ).count()
+        # Out of stock items are always at or below their reorder level
+        inventory_alerts = needs_reorder(InventoryItem.objects.filter(is_active=True)).count()
         
         # Room status breakdown
         room_status = Room.objects.filter(is_active=True).values('status').annotate(
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.db.models import Sum, Count
 from django.urls import reverse
 from datetime import date, timedelta
-from .models import Reservation, ReservationRoom
+from .models import Reservation, ReservationRoom, GroupBlock
 
 
 class ReservationRoomInline(admin.TabularInline):
@@ -30,7 +30,8 @@ class ReservationAdmin(admin.ModelAdmin):
             'fields': ('reservation_number', 'guest', 'status', 'booking_source')
         }),
         ('Stay Information', {
-            'fields': ('check_in_date', 'check_out_date', 'nights', 'adults', 'children')
+            'fields': ('check_in_date', 'check_out_date', 'nights', 'adults', 'children',
+                       'requested_room_type', 'rooms_requested')
         }),
         ('Summary', {
             'fields': ('total_rooms', 'total_amount'),
@@ -201,3 +202,43 @@ class ReservationRoomAdmin(admin.ModelAdmin):
         return obj.reservation.get_status_display()
     status.short_description = 'Reservation Status'
     status.admin_order_field = 'reservation__status'
+
+
+@admin.register(GroupBlock)
+class GroupBlockAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'room_type', 'start_date', 'end_date', 'cutoff_date', 'rooms_blocked', 'rooms_picked_up', 'rooms_remaining', 'status')
+    list_filter = ('status', 'room_type', 'start_date', 'cutoff_date')
+    search_fields = ('code', 'name', 'contact_guest__first_name', 'contact_guest__last_name')
+    readonly_fields = ('code', 'rooms_picked_up', 'rooms_released', 'rooms_remaining', 'created_at', 'updated_at')
+    date_hierarchy = 'start_date'
+    
+    fieldsets = (
+        ('Group Details', {
+            'fields': ('code', 'name', 'contact_guest', 'status')
+        }),
+        ('Allotment', {
+            'fields': ('room_type', 'start_date', 'end_date', 'cutoff_date', 'rate', 'rooms_blocked')
+        }),
+        ('Pick-up', {
+            'fields': ('rooms_picked_up', 'rooms_released', 'rooms_remaining'),
+        }),
+        ('Additional Information', {
+            'fields': ('notes', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    actions = ['release_blocks']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room_type', 'contact_guest')
+    
+    def rooms_remaining(self, obj):
+        return obj.rooms_remaining
+    rooms_remaining.short_description = 'Remaining'
+    
+    def release_blocks(self, request, queryset):
+        blocks = list(queryset.filter(status='ACTIVE'))
+        for block in blocks:
+            block.release()
+        self.message_user(request, f'{len(blocks)} group blocks released.')
+    release_blocks.short_description = 'Release unused rooms of selected blocks'
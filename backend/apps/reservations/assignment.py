@@ -0,0 +1,324 @@
+"""
+Automatic room assignment for upcoming arrivals.
+
+Reservations booked by room type (``requested_room_type``) that do not yet
+have all their rooms are given concrete rooms with a best-fit interval
+packing: every sellable room is split into free gaps between the stays it
+already holds, and each arrival, taken in check-in order, goes into the gap
+that leaves the fewest empty nights on either side. Tight fits keep long
+gaps open for long stays and avoid orphan nights that cannot be sold.
+
+Gaps are indexed per room type in sorted lists, so a search only looks at
+gaps that can still beat the best fit found so far instead of every room.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from apps.maintenance.intervals import out_of_order_ranges
+from apps.rooms.models import Room, RoomType
+from .availability import UNSELLABLE_ROOM_STATUSES
+from .models import Reservation, ReservationRoom
+
+
+# Reservation statuses that hold their assigned rooms while planning
+HOLDING_STATUSES = ['PENDING', 'CONFIRMED', 'CHECKED_IN']
+
+# Nights used to stand in for the open end of a room's calendar. Any finite
+# gap is always a tighter fit than an open one.
+OPEN_GAP_NIGHTS = 3650
+
+
+def floor_penalty(preference, floor, middle_floor):
+    """Return 0 when a floor satisfies a guest floor preference, else 1.
+
+    Preferences may be a floor number or ``'high'`` / ``'low'`` relative to
+    the middle floor of the hotel.
+    """
+    if preference in (None, ''):
+        return 0
+    if floor is None:
+        return 1
+    if isinstance(preference, str):
+        value = preference.strip().lower()
+        if value == 'high':
+            return 0 if floor >= middle_floor else 1
+        if value == 'low':
+            return 0 if floor <= middle_floor else 1
+        try:
+            preference = int(value)
+        except ValueError:
+            return 0
+    return 0 if floor == preference else 1
+
+
+class _RoomTypeCalendar:
+    """Free gaps of all rooms of one room type"""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+        # (start, end, room_id) for gaps with a known start
+        self.gaps = []
+        # (end, room_id) for gaps open towards the past but closed by a stay
+        self.head_gaps = []
+        # floor -> room ids (highest number first) with no stays at all
+        self.open_rooms = defaultdict(list)
+
+    def add_room(self, room, bookings):
+        if not bookings:
+            self.open_rooms[room['floor']].append(room['id'])
+            return
+        previous_end = self.low
+        for check_in, check_out in sorted(bookings):
+            if check_in > previous_end:
+                self._add_gap(previous_end, check_in, room['id'])
+            previous_end = max(previous_end, check_out)
+        self._add_gap(previous_end, self.high, room['id'])
+
+    def _add_gap(self, start, end, room_id):
+        if end <= start:
+            return
+        if start == self.low:
+            insort(self.head_gaps, (end, room_id))
+        else:
+            insort(self.gaps, (start, end, room_id))
+
+    def take(self, check_in, check_out, preference, floors, middle_floor):
+        """Pick and reserve the best-fitting room, or return None"""
+        best = None
+        best_cost = None
+
+        # Gaps with a known start, closest start first. Left waste only grows
+        # as we walk back, so stop once it alone exceeds the best cost.
+        index = bisect_right(self.gaps, (check_in, float('inf'), float('inf')))
+        dead = []
+        for i in range(index - 1, -1, -1):
+            start, end, room_id = self.gaps[i]
+            left = check_in - start
+            if best_cost is not None and left * 2 > best_cost:
+                break
+            if end <= check_in:
+                # Stays arrive in check-in order, so this gap can never be used
+                dead.append(i)
+                continue
+            if end < check_out:
+                continue
+            cost = (left + end - check_out) * 2 + floor_penalty(preference, floors[room_id], middle_floor)
+            if best_cost is None or cost < best_cost:
+                best, best_cost = ('gap', self.gaps[i]), cost
+        for i in dead:
+            del self.gaps[i]
+
+        if best is None:
+            # Gaps open to the past: the earliest end that fits is tightest
+            index = bisect_left(self.head_gaps, (check_out, -1))
+            for i in range(index, len(self.head_gaps)):
+                end, room_id = self.head_gaps[i]
+                if best is not None and end != best[1][0]:
+                    break
+                if best is None:
+                    best = ('head', self.head_gaps[i])
+                if floor_penalty(preference, floors[room_id], middle_floor) == 0:
+                    best = ('head', self.head_gaps[i])
+                    break
+
+        if best is None:
+            return self._take_open_room(check_in, check_out, preference, middle_floor)
+
+        kind, gap = best
+        if kind == 'gap':
+            start, end, room_id = gap
+            del self.gaps[bisect_left(self.gaps, gap)]
+            self._add_gap(start, check_in, room_id)
+        else:
+            end, room_id = gap
+            del self.head_gaps[bisect_left(self.head_gaps, gap)]
+            self._add_gap(self.low, check_in, room_id)
+        self._add_gap(check_out, end, room_id)
+        return room_id
+
+    def _take_open_room(self, check_in, check_out, preference, middle_floor):
+        available_floors = [floor for floor, rooms in self.open_rooms.items() if rooms]
+        if not available_floors:
+            return None
+        available_floors.sort(key=lambda floor: (floor is None, floor))
+        floor = next(
+            (f for f in available_floors if floor_penalty(preference, f, middle_floor) == 0),
+            available_floors[0]
+        )
+        room_id = self.open_rooms[floor].pop()
+        self._add_gap(self.low, check_in, room_id)
+        self._add_gap(check_out, self.high, room_id)
+        return room_id
+
+
+def plan_assignments(rooms, bookings, stays):
+    """Assign rooms to stays in memory.
+
+    ``rooms`` are dicts with ``id``, ``room_type_id``, ``floor`` and
+    ``number``; ``bookings`` are ``(room_id, check_in, check_out)`` tuples of
+    stays rooms already hold; ``stays`` are dicts with ``reservation_id``,
+    ``room_type_id``, ``check_in``, ``check_out``, ``count`` and optional
+    ``floor_preference``. Returns ``(assignments, unassigned)`` where
+    assignments are ``(reservation_id, room_id)`` pairs and unassigned are
+    ``(reservation_id, missing_rooms)`` pairs.
+    """
+    rooms = list(rooms)
+    stays = sorted(
+        stays,
+        key=lambda s: (s['check_in'], -(s['check_out'] - s['check_in']).days, s['reservation_id'])
+    )
+    if not rooms or not stays:
+        return [], [(stay['reservation_id'], stay['count']) for stay in stays]
+
+    booked = defaultdict(list)
+    for room_id, check_in, check_out in bookings:
+        booked[room_id].append((check_in.toordinal(), check_out.toordinal()))
+
+    window_start = min(stay['check_in'] for stay in stays).toordinal()
+    window_end = max(stay['check_out'] for stay in stays).toordinal()
+    low = window_start - OPEN_GAP_NIGHTS
+    high = window_end + OPEN_GAP_NIGHTS
+
+    floors = {room['id']: room['floor'] for room in rooms}
+    known_floors = sorted(f for f in set(floors.values()) if f is not None)
+    middle_floor = (known_floors[0] + known_floors[-1]) / 2 if known_floors else 0
+
+    calendars = {}
+    # Highest room number first so open rooms are popped lowest number first
+    for room in sorted(rooms, key=lambda r: r['number'], reverse=True):
+        calendar = calendars.get(room['room_type_id'])
+        if calendar is None:
+            calendar = calendars[room['room_type_id']] = _RoomTypeCalendar(low, high)
+        calendar.add_room(room, booked.get(room['id']))
+
+    assignments = []
+    unassigned = []
+    for stay in stays:
+        calendar = calendars.get(stay['room_type_id'])
+        check_in = stay['check_in'].toordinal()
+        check_out = stay['check_out'].toordinal()
+        missing = stay['count']
+        while calendar is not None and missing > 0:
+            room_id = calendar.take(
+                check_in, check_out, stay.get('floor_preference'), floors, middle_floor
+            )
+            if room_id is None:
+                break
+            assignments.append((stay['reservation_id'], room_id))
+            missing -= 1
+        if missing:
+            unassigned.append((stay['reservation_id'], missing))
+
+    return assignments, unassigned
+
+
+def auto_assign_rooms(start_date, end_date, dry_run=False):
+    """Assign rooms to reservations arriving between two dates (inclusive).
+
+    Only reservations with a ``requested_room_type`` and fewer rooms than
+    ``rooms_requested`` are considered. Rooms under maintenance or out of
+    order are never used, and rooms with a planned out-of-order range are
+    only used around it. Unless ``dry_run`` is set, the assignments are
+    written with one bulk insert and reservation totals are updated in bulk.
+    Group pick-ups keep the block rate they were priced at.
+    """
+    pending = list(
+        Reservation.objects.filter(
+            status__in=['PENDING', 'CONFIRMED'],
+            check_in_date__gte=start_date,
+            check_in_date__lte=end_date,
+            requested_room_type__isnull=False
+        ).annotate(
+            assigned_rooms=Count('rooms')
+        ).filter(
+            assigned_rooms__lt=F('rooms_requested')
+        ).values(
+            'id', 'reservation_number', 'requested_room_type_id', 'check_in_date',
+            'check_out_date', 'rooms_requested', 'assigned_rooms', 'total_amount',
+            'guest__pref_floor', 'group_block__rate'
+        )
+    )
+    if not pending:
+        return {'assigned': [], 'unassigned': []}
+
+    room_type_ids = {res['requested_room_type_id'] for res in pending}
+    rooms = list(
+        Room.objects.filter(
+            is_active=True,
+            room_type_id__in=room_type_ids
+        ).exclude(status__in=UNSELLABLE_ROOM_STATUSES).values('id', 'room_type_id', 'floor', 'number')
+    )
+    bookings = ReservationRoom.objects.filter(
+        room__in=[room['id'] for room in rooms],
+        reservation__status__in=HOLDING_STATUSES,
+        reservation__check_in_date__lte=max(res['check_out_date'] for res in pending),
+        reservation__check_out_date__gte=start_date
+    ).values_list('room_id', 'reservation__check_in_date', 'reservation__check_out_date')
+    # Out-of-order ranges occupy a room's calendar just like a stay
+    bookings = list(bookings) + list(out_of_order_ranges(
+        start_date,
+        max(res['check_out_date'] for res in pending),
+        room_ids=[room['id'] for room in rooms]
+    ))
+
+    stays = [
+        {
+            'reservation_id': res['id'],
+            'room_type_id': res['requested_room_type_id'],
+            'check_in': res['check_in_date'],
+            'check_out': res['check_out_date'],
+            'count': res['rooms_requested'] - res['assigned_rooms'],
+            'floor_preference': res['guest__pref_floor'],
+        }
+        for res in pending
+    ]
+    assignments, unassigned = plan_assignments(rooms, bookings, stays)
+
+    reservations = {res['id']: res for res in pending}
+    room_numbers = {room['id']: room['number'] for room in rooms}
+    result = {
+        'assigned': [
+            {
+                'reservation_id': reservation_id,
+                'reservation_number': reservations[reservation_id]['reservation_number'],
+                'room_id': room_id,
+                'room_number': room_numbers[room_id]
+            }
+            for reservation_id, room_id in assignments
+        ],
+        'unassigned': [
+            {
+                'reservation_id': reservation_id,
+                'reservation_number': reservations[reservation_id]['reservation_number'],
+                'missing_rooms': missing
+            }
+            for reservation_id, missing in unassigned
+        ]
+    }
+    if dry_run or not assignments:
+        return result
+
+    rates = dict(RoomType.objects.filter(id__in=room_type_ids).values_list('id', 'base_price'))
+    new_rooms = []
+    totals = {}
+    for reservation_id, room_id in assignments:
+        res = reservations[reservation_id]
+        # Group pick-ups were priced at the block rate when picked up
+        priced = res['group_block__rate'] is not None
+        rate = res['group_block__rate'] if priced else rates[res['requested_room_type_id']]
+        new_rooms.append(ReservationRoom(reservation_id=reservation_id, room_id=room_id, rate=rate))
+        if not priced:
+            nights = (res['check_out_date'] - res['check_in_date']).days
+            totals[reservation_id] = totals.get(reservation_id, res['total_amount']) + rate * nights
+
+    with transaction.atomic():
+        ReservationRoom.objects.bulk_create(new_rooms)
+        Reservation.objects.bulk_update(
+            [Reservation(id=reservation_id, total_amount=total) for reservation_id, total in totals.items()],
+            ['total_amount']
+        )
+    return result
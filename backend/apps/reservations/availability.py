@@ -0,0 +1,249 @@
+"""
+Bulk availability and pricing helpers for reservations.
+
+``AvailabilitySnapshot`` loads bookable rooms, room type rates, the
+bookings overlapping a date window, the rooms held back for group blocks
+and room-type reservations without a room yet, and the out-of-order ranges
+of maintenance work orders once, so that many date/room type alternatives
+can be answered in memory instead of running a set of queries per
+alternative.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.maintenance.intervals import OutOfOrderIndex
+from apps.rooms.models import Room, RoomType
+from .models import GroupBlock, Reservation, ReservationRoom
+
+
+# Reservation statuses that hold a room for their dates
+BLOCKING_STATUSES = ['CONFIRMED', 'CHECKED_IN']
+
+# Room statuses that can never be sold, whatever the dates
+UNSELLABLE_ROOM_STATUSES = ['MAINTENANCE', 'OUT_OF_ORDER']
+
+CENT = Decimal('0.01')
+
+
+def get_billing_rates():
+    """Return (tax_rate, service_charge_rate) as percentages.
+
+    Uses ``HOTEL_TAX_RATE`` / ``HOTEL_SERVICE_CHARGE_RATE`` from settings when
+    configured, otherwise the ``Bill`` model defaults.
+    """
+    from apps.payments.models import Bill
+
+    tax_rate = getattr(settings, 'HOTEL_TAX_RATE', None)
+    if tax_rate is None:
+        tax_rate = Bill._meta.get_field('tax_rate').default
+
+    service_charge_rate = getattr(settings, 'HOTEL_SERVICE_CHARGE_RATE', None)
+    if service_charge_rate is None:
+        service_charge_rate = Bill._meta.get_field('service_charge_rate').default
+
+    return Decimal(str(tax_rate)), Decimal(str(service_charge_rate))
+
+
+class AvailabilitySnapshot:
+    """Point-in-time view of sellable rooms and bookings for a date window"""
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+        self.room_types = {
+            room_type['id']: room_type
+            for room_type in RoomType.objects.filter(is_active=True).values(
+                'id', 'name', 'base_price', 'max_occupancy'
+            )
+        }
+
+        self.rooms_by_type = defaultdict(list)
+        rooms = Room.objects.filter(
+            is_active=True,
+            room_type_id__in=self.room_types.keys()
+        ).exclude(status__in=UNSELLABLE_ROOM_STATUSES).values_list('id', 'room_type_id')
+        for room_id, room_type_id in rooms:
+            self.rooms_by_type[room_type_id].append(room_id)
+
+        self.bookings = defaultdict(list)
+        booked = ReservationRoom.objects.filter(
+            reservation__status__in=BLOCKING_STATUSES,
+            reservation__check_in_date__lt=end_date,
+            reservation__check_out_date__gt=start_date
+        ).values_list('room_id', 'reservation__check_in_date', 'reservation__check_out_date')
+        for room_id, check_in, check_out in booked:
+            self.bookings[room_id].append((check_in, check_out))
+
+        self.out_of_order = OutOfOrderIndex.load(start_date, end_date)
+
+        # (check_in, check_out, rooms) held per room type without a concrete room
+        self.holds = defaultdict(list)
+        blocks = GroupBlock.objects.filter(
+            status='ACTIVE',
+            cutoff_date__gte=timezone.now().date(),
+            start_date__lt=end_date,
+            end_date__gt=start_date
+        ).values_list('room_type_id', 'start_date', 'end_date', 'rooms_blocked', 'rooms_picked_up', 'rooms_released')
+        for room_type_id, block_start, block_end, blocked, picked_up, released in blocks:
+            remaining = blocked - picked_up - released
+            if remaining > 0:
+                self.holds[room_type_id].append((block_start, block_end, remaining))
+
+        unassigned = Reservation.objects.filter(
+            status__in=BLOCKING_STATUSES,
+            requested_room_type__isnull=False,
+            check_in_date__lt=end_date,
+            check_out_date__gt=start_date
+        ).annotate(
+            assigned_rooms=Count('rooms')
+        ).filter(
+            assigned_rooms__lt=F('rooms_requested')
+        ).values_list('requested_room_type_id', 'check_in_date', 'check_out_date', 'rooms_requested', 'assigned_rooms')
+        for room_type_id, check_in, check_out, requested, assigned in unassigned:
+            self.holds[room_type_id].append((check_in, check_out, requested - assigned))
+
+    @classmethod
+    def for_ranges(cls, date_ranges):
+        """Build one snapshot covering every (check_in, check_out) pair"""
+        date_ranges = list(date_ranges)
+        start_date = min(check_in for check_in, _ in date_ranges)
+        end_date = max(check_out for _, check_out in date_ranges)
+        return cls(start_date, end_date)
+
+    def is_room_free(self, room_id, check_in, check_out):
+        """Check a room has no blocking booking or work order overlapping the dates"""
+        if self.out_of_order.overlaps(room_id, check_in, check_out):
+            return False
+        return not any(
+            booked_in < check_out and booked_out > check_in
+            for booked_in, booked_out in self.bookings.get(room_id, ())
+        )
+
+    def available_rooms(self, room_type_id, check_in, check_out):
+        """Get ids of rooms of a type that are free for the dates"""
+        return [
+            room_id for room_id in self.rooms_by_type.get(room_type_id, ())
+            if self.is_room_free(room_id, check_in, check_out)
+        ]
+
+    def held_rooms(self, room_type_id, check_in, check_out):
+        """Get the most rooms of a type held back on any night of the dates"""
+        holds = [
+            hold for hold in self.holds.get(room_type_id, ())
+            if hold[0] < check_out and hold[1] > check_in
+        ]
+        if not holds:
+            return 0
+        peak = 0
+        night = check_in
+        while night < check_out:
+            peak = max(peak, sum(rooms for start, end, rooms in holds if start <= night < end))
+            night += timedelta(days=1)
+        return peak
+
+    def rooms_for_sale(self, room_type_id, check_in, check_out):
+        """Count rooms of a type that can still be sold for the dates"""
+        free = len(self.available_rooms(room_type_id, check_in, check_out))
+        return max(0, free - self.held_rooms(room_type_id, check_in, check_out))
+
+    def rooms_to_offer(self, rooms, check_in, check_out):
+        """Keep the rooms free for the dates, less those of each type held back"""
+        for_sale = {}
+        offered = []
+        for room in rooms:
+            if not self.is_room_free(room.id, check_in, check_out):
+                continue
+            if room.room_type_id not in for_sale:
+                for_sale[room.room_type_id] = -self.held_rooms(room.room_type_id, check_in, check_out)
+            for_sale[room.room_type_id] += 1
+            if for_sale[room.room_type_id] > 0:
+                offered.append(room)
+        return offered
+
+    def quote(self, room_type_id, check_in, check_out, adults=1, children=0,
+              tax_rate=None, service_charge_rate=None):
+        """Price one alternative, including tax and service charge"""
+        if tax_rate is None or service_charge_rate is None:
+            default_tax_rate, default_service_charge_rate = get_billing_rates()
+            tax_rate = default_tax_rate if tax_rate is None else tax_rate
+            service_charge_rate = (
+                default_service_charge_rate if service_charge_rate is None else service_charge_rate
+            )
+
+        nights = (check_out - check_in).days
+        result = {
+            'room_type': room_type_id,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'nights': nights,
+            'adults': adults,
+            'children': children,
+        }
+
+        room_type = self.room_types.get(room_type_id)
+        if room_type is None:
+            result.update({'available': False, 'rooms_available': 0, 'error': 'Room type not found'})
+            return result
+
+        result['room_type_name'] = room_type['name']
+        if adults + children > room_type['max_occupancy']:
+            result.update({
+                'available': False,
+                'rooms_available': 0,
+                'error': f"Room type {room_type['name']} allows at most {room_type['max_occupancy']} guests"
+            })
+            return result
+
+        rate = room_type['base_price']
+        subtotal = rate * nights
+        tax_amount = (subtotal * tax_rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+        service_charge = (subtotal * service_charge_rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+        rooms_available = self.rooms_for_sale(room_type_id, check_in, check_out)
+
+        result.update({
+            'available': rooms_available > 0,
+            'rooms_available': rooms_available,
+            'rate': float(rate),
+            'subtotal': float(subtotal),
+            'tax_rate': float(tax_rate),
+            'tax_amount': float(tax_amount),
+            'service_charge_rate': float(service_charge_rate),
+            'service_charge': float(service_charge),
+            'total_amount': float(subtotal + tax_amount + service_charge),
+        })
+        return result
+
+
+def quote_alternatives(alternatives):
+    """Price a list of alternatives against a single availability snapshot.
+
+    Each alternative is a dict with ``room_type``, ``check_in_date``,
+    ``check_out_date`` and optionally ``adults`` and ``children``.
+    """
+    alternatives = list(alternatives)
+    if not alternatives:
+        return []
+
+    snapshot = AvailabilitySnapshot.for_ranges(
+        (alt['check_in_date'], alt['check_out_date']) for alt in alternatives
+    )
+    tax_rate, service_charge_rate = get_billing_rates()
+
+    return [
+        snapshot.quote(
+            alt['room_type'],
+            alt['check_in_date'],
+            alt['check_out_date'],
+            adults=alt.get('adults', 1),
+            children=alt.get('children', 0),
+            tax_rate=tax_rate,
+            service_charge_rate=service_charge_rate
+        )
+        for alt in alternatives
+    ]
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.models import GroupBlock
+
+
+class Command(BaseCommand):
+    help = 'Release rooms not picked up from group blocks past their cutoff date'
+
+    def handle(self, *args, **options):
+        released = GroupBlock.release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} group blocks past cutoff'))
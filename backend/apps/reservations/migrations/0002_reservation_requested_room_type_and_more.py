@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='requested_room_type',
+            field=models.ForeignKey(blank=True, help_text='Room type booked when rooms are assigned later', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requested_reservations', to='rooms.roomtype'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='rooms_requested',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
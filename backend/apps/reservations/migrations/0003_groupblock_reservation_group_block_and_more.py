@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0001_initial'),
+        ('reservations', '0002_reservation_requested_room_type_and_more'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('code', models.CharField(blank=True, max_length=20, unique=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('cutoff_date', models.DateField(help_text='Unused rooms are released after this date')),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rooms_blocked', models.PositiveIntegerField()),
+                ('rooms_picked_up', models.PositiveIntegerField(default=0)),
+                ('rooms_released', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('RELEASED', 'Released'), ('CANCELLED', 'Cancelled')], default='ACTIVE', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contact_guest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='group_blocks', to='guests.guest')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_blocks', to='rooms.roomtype')),
+            ],
+            options={
+                'verbose_name': 'Group Block',
+                'verbose_name_plural': 'Group Blocks',
+                'ordering': ['start_date', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='group_block',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservations.groupblock'),
+        ),
+        migrations.AddIndex(
+            model_name='groupblock',
+            index=models.Index(fields=['status', 'room_type', 'start_date', 'end_date'], name='reservation_status_4c04f1_idx'),
+        ),
+    ]
@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from datetime import date
+from django.utils import timezone
 from apps.guests.models import Guest
-from apps.rooms.models import Room
+from apps.guests.search import index_guests
+from apps.rooms.models import Room, RoomType
 
 
 class Reservation(models.Model):
@@ -30,6 +33,22 @@ class Reservation(models.Model):
     check_out_date = models.DateField()
     adults = models.PositiveIntegerField(default=1)
     children = models.PositiveIntegerField(default=0)
+    requested_room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='requested_reservations',
+        help_text='Room type booked when rooms are assigned later'
+    )
+    rooms_requested = models.PositiveIntegerField(default=1)
+    group_block = models.ForeignKey(
+        'GroupBlock',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
     special_requests = models.TextField(blank=True, null=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
@@ -137,3 +156,193 @@ class ReservationRoom(models.Model):
             
             if overlapping_reservations.exists():
                 raise ValidationError(f'Room {self.room.number} is not available for the selected dates')
+
+
+def _new_reservation_numbers(count):
+    """Generate ``count`` reservation numbers no reservation has yet"""
+    numbers = set()
+    while len(numbers) < count:
+        numbers.update(Reservation().generate_reservation_number() for _ in range(count - len(numbers)))
+        numbers -= set(Reservation.objects.filter(reservation_number__in=numbers).values_list(
+            'reservation_number', flat=True
+        ))
+    return list(numbers)
+
+
+class GroupBlock(models.Model):
+    """Allotment of rooms of one type held for a group over a date range"""
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('RELEASED', 'Released'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    name = models.CharField(max_length=200)
+    code = models.CharField(max_length=20, unique=True, blank=True)
+    contact_guest = models.ForeignKey(
+        Guest, on_delete=models.SET_NULL, null=True, blank=True, related_name='group_blocks'
+    )
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='group_blocks')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    cutoff_date = models.DateField(help_text='Unused rooms are released after this date')
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    rooms_blocked = models.PositiveIntegerField()
+    rooms_picked_up = models.PositiveIntegerField(default=0)
+    rooms_released = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_date', 'name']
+        verbose_name = 'Group Block'
+        verbose_name_plural = 'Group Blocks'
+        indexes = [
+            models.Index(fields=['status', 'room_type', 'start_date', 'end_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.rooms_blocked} x {self.room_type.name} ({self.start_date} to {self.end_date})"
+
+    def clean(self):
+        super().clean()
+        if self.start_date and self.end_date and self.end_date <= self.start_date:
+            raise ValidationError('End date must be after start date')
+        if self.cutoff_date and self.start_date and self.cutoff_date > self.start_date:
+            raise ValidationError('Cutoff date cannot be after the block start date')
+
+    def save(self, *args, **kwargs):
+        if not self.code:
+            self.code = self.generate_code()
+        super().save(*args, **kwargs)
+
+    def generate_code(self):
+        """Generate unique group block code"""
+        import random
+        import string
+        prefix = 'GRP'
+        suffix = ''.join(random.choices(string.digits, k=6))
+        return f"{prefix}{suffix}"
+
+    @property
+    def nights(self):
+        if self.start_date and self.end_date:
+            return (self.end_date - self.start_date).days
+        return 0
+
+    @property
+    def rooms_remaining(self):
+        """Rooms still held in the block and not yet picked up"""
+        return max(0, self.rooms_blocked - self.rooms_picked_up - self.rooms_released)
+
+    def reserve_pickup(self, count):
+        """Atomically take ``count`` rooms from the block.
+
+        Returns False without changing anything when the block is not active
+        or does not have enough rooms left.
+        """
+        updated = GroupBlock.objects.filter(
+            pk=self.pk,
+            status='ACTIVE',
+            rooms_blocked__gte=models.F('rooms_picked_up') + models.F('rooms_released') + count
+        ).update(
+            rooms_picked_up=models.F('rooms_picked_up') + count,
+            updated_at=timezone.now()
+        )
+        if updated:
+            self.refresh_from_db(fields=['rooms_picked_up', 'updated_at'])
+        return bool(updated)
+
+    def release(self):
+        """Release rooms not picked up back to general inventory"""
+        GroupBlock.objects.filter(pk=self.pk, status='ACTIVE').update(
+            status='RELEASED',
+            rooms_released=models.F('rooms_blocked') - models.F('rooms_picked_up'),
+            updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['status', 'rooms_released', 'updated_at'])
+
+    def pick_up(self, rooming_list):
+        """Create confirmed reservations for a rooming list in one batch.
+
+        Each row needs ``first_name``, ``last_name`` and ``email`` and may set
+        ``phone``, ``adults``, ``children``, ``special_requests`` and dates
+        inside the block. Guests are matched on email, ignoring case; unknown
+        guests are created. Rooms are taken from the block atomically and
+        concrete rooms are assigned later by the room assignment engine.
+        """
+        rows = list(rooming_list)
+        if not rows:
+            return []
+
+        stays = []
+        for row in rows:
+            check_in = row.get('check_in_date') or self.start_date
+            check_out = row.get('check_out_date') or self.end_date
+            if check_in < self.start_date or check_out > self.end_date or check_out <= check_in:
+                raise ValidationError(
+                    f"Dates for {row['email']} must fall between {self.start_date} and {self.end_date}"
+                )
+            stays.append((check_in, check_out))
+
+        with transaction.atomic():
+            if not self.reserve_pickup(len(rows)):
+                self.refresh_from_db(fields=['status', 'rooms_picked_up', 'rooms_released'])
+                raise ValidationError(
+                    f'Group block {self.code} has only {self.rooms_remaining} rooms left'
+                )
+
+            # Emails are matched regardless of case, so A@x.com finds a@x.com
+            guests = {
+                guest.email.lower(): guest
+                for guest in Guest.objects.annotate(email_lower=Lower('email')).filter(
+                    email_lower__in={row['email'].lower() for row in rows}
+                )
+            }
+            new_guests = []
+            for row in rows:
+                if row['email'].lower() not in guests:
+                    guest = Guest(
+                        first_name=row['first_name'],
+                        last_name=row['last_name'],
+                        email=row['email'],
+                        phone=row.get('phone') or None
+                    )
+                    guests[row['email'].lower()] = guest
+                    new_guests.append(guest)
+            Guest.objects.bulk_create(new_guests)
+            # bulk_create sends no post_save, so the new guests are indexed here
+            index_guests(new_guests)
+
+            reservations = []
+            for row, (check_in, check_out), number in zip(rows, stays, _new_reservation_numbers(len(rows))):
+                reservation = Reservation(
+                    reservation_number=number,
+                    guest=guests[row['email'].lower()],
+                    check_in_date=check_in,
+                    check_out_date=check_out,
+                    adults=row.get('adults', 1),
+                    children=row.get('children', 0),
+                    special_requests=row.get('special_requests') or None,
+                    total_amount=self.rate * (check_out - check_in).days,
+                    status='CONFIRMED',
+                    booking_source='DIRECT',
+                    requested_room_type_id=self.room_type_id,
+                    rooms_requested=1,
+                    group_block=self,
+                    notes=f'Group block {self.code}: {self.name}'
+                )
+                reservations.append(reservation)
+            return Reservation.objects.bulk_create(reservations)
+
+    @classmethod
+    def release_expired(cls, today=None):
+        """Release every active block whose cutoff date has passed"""
+        today = today or timezone.now().date()
+        return cls.objects.filter(status='ACTIVE', cutoff_date__lt=today).update(
+            status='RELEASED',
+            rooms_released=models.F('rooms_blocked') - models.F('rooms_picked_up'),
+            updated_at=timezone.now()
+        )
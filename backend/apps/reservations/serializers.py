@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Reservation, ReservationRoom
+import csv
+import io
+from .models import Reservation, ReservationRoom, GroupBlock
 from apps.guests.serializers import GuestSerializer
 from apps.rooms.serializers import RoomSerializer
 
@@ -45,7 +47,7 @@ class ReservationSerializer(serializers.ModelSerializer):
             'special_requests', 'total_amount', 'deposit_amount', 'status',
             'status_display', 'booking_source', 'booking_source_display',
             'notes', 'created_at', 'updated_at', 'rooms', 'total_rooms',
-            'can_cancel'
+            'can_cancel', 'requested_room_type', 'rooms_requested'
         ]
         read_only_fields = ['reservation_number', 'created_at', 'updated_at', 'nights', 'can_cancel']
 
@@ -83,6 +85,7 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
     room_assignments = serializers.ListField(
         child=serializers.DictField(),
         write_only=True,
+        required=False,
         help_text="List of room assignments with room_id, rate, discount_amount, extra_charges"
     )
     
@@ -90,7 +93,8 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = [
             'guest', 'check_in_date', 'check_out_date', 'adults', 'children',
-            'special_requests', 'booking_source', 'notes', 'room_assignments'
+            'special_requests', 'booking_source', 'notes', 'room_assignments',
+            'requested_room_type', 'rooms_requested'
         ]
 
     def validate(self, data):
@@ -98,14 +102,16 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         if data['check_out_date'] <= data['check_in_date']:
             raise serializers.ValidationError("Check-out date must be after check-in date")
         
-        if not data.get('room_assignments'):
-            raise serializers.ValidationError("At least one room assignment is required")
+        if not data.get('room_assignments') and not data.get('requested_room_type'):
+            raise serializers.ValidationError(
+                "At least one room assignment or a requested room type is required"
+            )
         
         return data
 
     def create(self, validated_data):
         """Create reservation with room assignments"""
-        room_assignments = validated_data.pop('room_assignments')
+        room_assignments = validated_data.pop('room_assignments', [])
         
         # Create reservation
         reservation = Reservation.objects.create(**validated_data)
@@ -166,4 +172,111 @@ class CheckAvailabilitySerializer(serializers.Serializer):
     def validate(self, data):
         if data['check_out_date'] <= data['check_in_date']:
             raise serializers.ValidationError("Check-out date must be after check-in date")
-        return data
\ No newline at end of file
+        return data
+
+class QuoteAlternativeSerializer(serializers.Serializer):
+    """Serializer for one priced alternative in a quote request"""
+    room_type = serializers.IntegerField(help_text="Room type ID")
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    adults = serializers.IntegerField(min_value=1, default=1)
+    children = serializers.IntegerField(min_value=0, default=0)
+
+    def validate(self, data):
+        if data['check_out_date'] <= data['check_in_date']:
+            raise serializers.ValidationError("Check-out date must be after check-in date")
+        return data
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    """Serializer for batch quote requests"""
+    alternatives = QuoteAlternativeSerializer(many=True, allow_empty=False)
+
+    def validate_alternatives(self, value):
+        if len(value) > 100:
+            raise serializers.ValidationError("At most 100 alternatives can be quoted at once")
+        return value
+
+
+
+class AutoAssignSerializer(serializers.Serializer):
+    """Serializer for automatic room assignment runs"""
+    start_date = serializers.DateField(required=False, help_text="First arrival date, defaults to today")
+    end_date = serializers.DateField(required=False, help_text="Last arrival date, defaults to start date")
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data.get('start_date') and data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must not be before start date")
+        return data
+
+
+class GroupBlockSerializer(serializers.ModelSerializer):
+    room_type_name = serializers.CharField(source='room_type.name', read_only=True)
+    contact_name = serializers.CharField(source='contact_guest.full_name', read_only=True)
+    nights = serializers.ReadOnlyField()
+    rooms_remaining = serializers.ReadOnlyField()
+
+    class Meta:
+        model = GroupBlock
+        fields = [
+            'id', 'name', 'code', 'contact_guest', 'contact_name', 'room_type',
+            'room_type_name', 'start_date', 'end_date', 'cutoff_date', 'nights', 'rate',
+            'rooms_blocked', 'rooms_picked_up', 'rooms_released', 'rooms_remaining',
+            'status', 'notes', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'code', 'rooms_picked_up', 'rooms_released', 'status', 'created_at', 'updated_at'
+        ]
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        cutoff_date = data.get('cutoff_date', getattr(self.instance, 'cutoff_date', None))
+        if start_date and end_date and end_date <= start_date:
+            raise serializers.ValidationError("End date must be after start date")
+        if cutoff_date and start_date and cutoff_date > start_date:
+            raise serializers.ValidationError("Cutoff date cannot be after the block start date")
+        return data
+
+
+class RoomingListEntrySerializer(serializers.Serializer):
+    """Serializer for one guest of a rooming list"""
+    first_name = serializers.CharField(max_length=100)
+    last_name = serializers.CharField(max_length=100)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    adults = serializers.IntegerField(min_value=1, default=1)
+    children = serializers.IntegerField(min_value=0, default=0)
+    check_in_date = serializers.DateField(required=False)
+    check_out_date = serializers.DateField(required=False)
+    special_requests = serializers.CharField(required=False, allow_blank=True)
+
+
+class GroupPickUpSerializer(serializers.Serializer):
+    """Serializer for rooming list pick-ups, as JSON rows or an uploaded CSV file"""
+    rooming_list = RoomingListEntrySerializer(many=True, required=False)
+    file = serializers.FileField(required=False, help_text="CSV with a header row using the rooming list field names")
+
+    def validate_file(self, value):
+        try:
+            content = value.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise serializers.ValidationError("Rooming list file must be UTF-8 encoded CSV")
+        rows = [
+            {key.strip(): (cell or '').strip() for key, cell in row.items() if key and (cell or '').strip()}
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+        entries = RoomingListEntrySerializer(data=rows, many=True)
+        entries.is_valid(raise_exception=True)
+        return entries.validated_data
+
+    def validate(self, data):
+        rows = data.get('rooming_list') or data.get('file')
+        if not rows:
+            raise serializers.ValidationError("Provide a non-empty rooming_list or a CSV file")
+        emails = [row['email'].lower() for row in rows]
+        if len(set(emails)) != len(emails):
+            raise serializers.ValidationError("Each guest can appear only once in a rooming list")
+        data['rows'] = rows
+        return data
@@ -1,10 +1,16 @@
+import random
 from django.test import TestCase
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from datetime import date, datetime, timedelta
+from rest_framework.test import APIClient
 from apps.guests.models import Guest
+from apps.guests.search import search_guests
 from apps.rooms.models import RoomType, Room
-from .models import Reservation, ReservationRoom
+from .models import Reservation, ReservationRoom, GroupBlock
+from .availability import quote_alternatives
+from .assignment import auto_assign_rooms, plan_assignments
 
 
 class ReservationModelTest(TestCase):
@@ -190,3 +196,341 @@ class ReservationRoomModelTest(TestCase):
             rate=Decimal('100.00')
         )
         self.assertEqual(res_room.total_amount, Decimal('200.00'))  # 2 nights * 100.00
+
+
+class QuoteAlternativesTest(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='john@example.com'
+        )
+        self.standard = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        self.suite = RoomType.objects.create(
+            name='Suite',
+            base_price=Decimal('250.00'),
+            max_occupancy=4
+        )
+        self.room = Room.objects.create(number='101', room_type=self.standard)
+        Room.objects.create(number='102', room_type=self.standard, status='MAINTENANCE')
+        Room.objects.create(number='301', room_type=self.suite)
+        self.check_in = date.today() + timedelta(days=5)
+        self.check_out = date.today() + timedelta(days=7)
+
+    def test_quote_includes_tax_and_service_charge(self):
+        """Test quote totals use bill default tax and service charge rates"""
+        quote = quote_alternatives([{
+            'room_type': self.standard.id,
+            'check_in_date': self.check_in,
+            'check_out_date': self.check_out,
+        }])[0]
+        self.assertTrue(quote['available'])
+        self.assertEqual(quote['rooms_available'], 1)  # Room 102 is under maintenance
+        self.assertEqual(quote['nights'], 2)
+        self.assertEqual(quote['subtotal'], 200.0)
+        self.assertEqual(quote['tax_amount'], 20.0)  # 10% default
+        self.assertEqual(quote['service_charge'], 10.0)  # 5% default
+        self.assertEqual(quote['total_amount'], 230.0)
+
+    def test_quote_excludes_overlapping_bookings(self):
+        """Test booked rooms are not counted for overlapping alternatives"""
+        reservation = Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=self.check_in,
+            check_out_date=self.check_out,
+            status='CONFIRMED'
+        )
+        ReservationRoom.objects.create(reservation=reservation, room=self.room, rate=Decimal('100.00'))
+
+        overlapping, later = quote_alternatives([
+            {'room_type': self.standard.id, 'check_in_date': self.check_in,
+             'check_out_date': self.check_out},
+            {'room_type': self.standard.id, 'check_in_date': self.check_out,
+             'check_out_date': self.check_out + timedelta(days=1)},
+        ])
+        self.assertFalse(overlapping['available'])
+        self.assertTrue(later['available'])
+
+    def test_quote_rejects_over_capacity(self):
+        """Test alternatives exceeding room type occupancy are unavailable"""
+        quote = quote_alternatives([{
+            'room_type': self.standard.id,
+            'check_in_date': self.check_in,
+            'check_out_date': self.check_out,
+            'adults': 2,
+            'children': 1,
+        }])[0]
+        self.assertFalse(quote['available'])
+        self.assertIn('error', quote)
+
+    def test_quote_uses_constant_queries(self):
+        """Test many alternatives are priced from one snapshot"""
+        alternatives = [
+            {'room_type': room_type.id, 'check_in_date': self.check_in + timedelta(days=offset),
+             'check_out_date': self.check_out + timedelta(days=offset)}
+            for room_type in (self.standard, self.suite)
+            for offset in range(6)
+        ]
+        with self.assertNumQueries(6):
+            quotes = quote_alternatives(alternatives)
+        self.assertEqual(len(quotes), 12)
+
+
+class RoomAssignmentTest(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='john@example.com',
+            preferences={'floor': 'high'}
+        )
+        self.room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        self.low_room = Room.objects.create(number='101', room_type=self.room_type, floor=1)
+        self.high_room = Room.objects.create(number='501', room_type=self.room_type, floor=5)
+        self.check_in = date.today() + timedelta(days=3)
+
+    def _pending(self, nights=2, rooms_requested=1, check_in=None):
+        check_in = check_in or self.check_in
+        return Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=nights),
+            requested_room_type=self.room_type,
+            rooms_requested=rooms_requested,
+            status='CONFIRMED'
+        )
+
+    def test_assigns_preferred_floor(self):
+        """Test floor preference breaks ties between equally good rooms"""
+        reservation = self._pending()
+        result = auto_assign_rooms(self.check_in, self.check_in)
+        self.assertEqual(len(result['assigned']), 1)
+        self.assertEqual(reservation.rooms.get().room, self.high_room)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.total_amount, Decimal('200.00'))
+
+    def test_prefers_room_that_leaves_no_gap(self):
+        """Test a stay is placed right after an existing departure"""
+        earlier = Reservation.objects.create(
+            guest=self.guest,
+            check_in_date=self.check_in - timedelta(days=2),
+            check_out_date=self.check_in,
+            status='CONFIRMED'
+        )
+        ReservationRoom.objects.create(reservation=earlier, room=self.low_room, rate=Decimal('100.00'))
+        reservation = self._pending()
+
+        auto_assign_rooms(self.check_in, self.check_in)
+        self.assertEqual(reservation.rooms.get().room, self.low_room)
+
+    def test_skips_rooms_under_maintenance(self):
+        """Test maintenance and out of order rooms are never assigned"""
+        self.high_room.status = 'MAINTENANCE'
+        self.high_room.save()
+        self.low_room.status = 'OUT_OF_ORDER'
+        self.low_room.save()
+        reservation = self._pending()
+
+        result = auto_assign_rooms(self.check_in, self.check_in)
+        self.assertEqual(result['unassigned'][0]['missing_rooms'], 1)
+        self.assertFalse(reservation.rooms.exists())
+
+    def test_dry_run_does_not_write(self):
+        """Test dry runs only return the plan"""
+        reservation = self._pending(rooms_requested=2)
+        result = auto_assign_rooms(self.check_in, self.check_in, dry_run=True)
+        self.assertEqual(len(result['assigned']), 2)
+        self.assertFalse(reservation.rooms.exists())
+
+    def test_plan_scales_to_thousands_of_rooms(self):
+        """Test the planner packs thousands of stays without double booking"""
+        rooms = [
+            {'id': i, 'room_type_id': i % 4, 'floor': i % 20, 'number': f'{i:05d}'}
+            for i in range(4000)
+        ]
+        stays = [
+            {'reservation_id': i, 'room_type_id': i % 4,
+             'check_in': self.check_in + timedelta(days=i % 14),
+             'check_out': self.check_in + timedelta(days=i % 14 + 1 + i % 5),
+             'count': 1, 'floor_preference': 'high' if i % 3 else None}
+            for i in range(6000)
+        ]
+        assignments, unassigned = plan_assignments(rooms, [], stays)
+        self.assertEqual(len(assignments), 6000)
+        self.assertEqual(unassigned, [])
+
+        stays_by_id = {stay['reservation_id']: stay for stay in stays}
+        nights_by_room = {}
+        for reservation_id, room_id in assignments:
+            stay = stays_by_id[reservation_id]
+            self.assertEqual(rooms[room_id]['room_type_id'], stay['room_type_id'])
+            nights = nights_by_room.setdefault(room_id, set())
+            for offset in range((stay['check_out'] - stay['check_in']).days):
+                night = stay['check_in'] + timedelta(days=offset)
+                self.assertNotIn(night, nights)
+                nights.add(night)
+
+
+class GroupBlockTest(TestCase):
+    def setUp(self):
+        self.room_type = RoomType.objects.create(
+            name='Standard',
+            base_price=Decimal('100.00'),
+            max_occupancy=2
+        )
+        for number in range(5):
+            Room.objects.create(number=f'{201 + number}', room_type=self.room_type)
+        self.start = date.today() + timedelta(days=10)
+        self.block = GroupBlock.objects.create(
+            name='Tech Conference',
+            room_type=self.room_type,
+            start_date=self.start,
+            end_date=self.start + timedelta(days=3),
+            cutoff_date=self.start - timedelta(days=2),
+            rate=Decimal('80.00'),
+            rooms_blocked=3
+        )
+
+    def rooming_list(self, count):
+        return [
+            {'first_name': f'Guest{i}', 'last_name': 'Group', 'email': f'guest{i}@example.com'}
+            for i in range(count)
+        ]
+
+    def quote(self):
+        return quote_alternatives([{
+            'room_type': self.room_type.id,
+            'check_in_date': self.start,
+            'check_out_date': self.start + timedelta(days=1),
+        }])[0]
+
+    def test_block_code_generation(self):
+        """Test group block codes are generated on save"""
+        self.assertTrue(self.block.code.startswith('GRP'))
+        self.assertEqual(self.block.rooms_remaining, 3)
+
+    def test_pick_up_creates_confirmed_reservations(self):
+        """Test a rooming list becomes confirmed room-type reservations"""
+        Guest.objects.create(first_name='Guest0', last_name='Group', email='guest0@example.com')
+        reservations = self.block.pick_up(self.rooming_list(2))
+
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(Guest.objects.count(), 2)
+        self.assertEqual(len({r.reservation_number for r in reservations}), 2)
+        for reservation in Reservation.objects.filter(group_block=self.block):
+            self.assertEqual(reservation.status, 'CONFIRMED')
+            self.assertEqual(reservation.requested_room_type, self.room_type)
+            self.assertEqual(reservation.total_amount, Decimal('240.00'))
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.rooms_picked_up, 2)
+        self.assertEqual(self.block.rooms_remaining, 1)
+
+    def test_picked_up_guests_are_searchable(self):
+        """Test guests created from a rooming list are added to the search index"""
+        rooming_list = self.rooming_list(1) + [
+            {'first_name': 'Nyoman', 'last_name': 'Sudarsana', 'email': 'nyoman@example.com'}
+        ]
+        self.block.pick_up(rooming_list)
+        self.assertEqual([guest.email for guest in search_guests('sudarsana')], ['nyoman@example.com'])
+        self.assertEqual([guest.email for guest in search_guests('Njoman')], ['nyoman@example.com'])
+
+    def test_auto_assign_keeps_block_rate(self):
+        """Test assigning rooms to picked-up reservations keeps the block price"""
+        self.block.pick_up(self.rooming_list(2))
+        result = auto_assign_rooms(self.start, self.start)
+        self.assertEqual(len(result['assigned']), 2)
+        for reservation in Reservation.objects.filter(group_block=self.block):
+            self.assertEqual(reservation.total_amount, Decimal('240.00'))
+            self.assertEqual([room.rate for room in reservation.rooms.all()], [Decimal('80.00')])
+
+    def test_pick_up_matches_emails_regardless_of_case(self):
+        """Test a rooming list email in other case finds the existing guest"""
+        guest = Guest.objects.create(first_name='Guest0', last_name='Group', email='guest0@example.com')
+        rooming_list = self.rooming_list(1)
+        rooming_list[0]['email'] = 'Guest0@Example.com'
+        reservation, = self.block.pick_up(rooming_list)
+        self.assertEqual(reservation.guest, guest)
+        self.assertEqual(Guest.objects.count(), 1)
+
+    def test_pick_up_skips_taken_reservation_numbers(self):
+        """Test generated reservation numbers already in use are not reused"""
+        random.seed(7)
+        taken = Reservation().generate_reservation_number()
+        Reservation.objects.create(
+            guest=Guest.objects.create(first_name='Sari', last_name='Dewi', email='sari@example.com'),
+            reservation_number=taken,
+            check_in_date=self.start,
+            check_out_date=self.start + timedelta(days=1)
+        )
+        random.seed(7)
+        reservation, = self.block.pick_up(self.rooming_list(1))
+        self.assertNotEqual(reservation.reservation_number, taken)
+
+    def test_pick_up_beyond_allotment_is_rejected(self):
+        """Test picking up more rooms than the block holds changes nothing"""
+        with self.assertRaises(ValidationError):
+            self.block.pick_up(self.rooming_list(4))
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.rooms_picked_up, 0)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(Guest.objects.exists())
+
+    def test_reserve_pickup_uses_current_counters(self):
+        """Test the pick-up counter is checked in the database, not on a stale instance"""
+        stale = GroupBlock.objects.get(pk=self.block.pk)
+        self.assertTrue(self.block.reserve_pickup(2))
+        self.assertFalse(stale.reserve_pickup(2))
+        self.assertTrue(stale.reserve_pickup(1))
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.rooms_picked_up, 3)
+
+    def test_availability_subtracts_block_and_pickups(self):
+        """Test held and picked-up rooms are not sold as general inventory"""
+        self.assertEqual(self.quote()['rooms_available'], 2)
+        self.block.pick_up(self.rooming_list(2))
+        self.assertEqual(self.quote()['rooms_available'], 2)
+
+    def test_check_availability_subtracts_block_and_pickups(self):
+        """Test both availability checks do not offer rooms held for the block"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='frontdesk', password='pass'))
+
+        def rooms_available():
+            counts = set()
+            for url in ('/api/reservations/check_availability/', '/api/rooms/check_availability/'):
+                response = client.post(url, {
+                    'check_in_date': self.start,
+                    'check_out_date': self.start + timedelta(days=1),
+                    'adults': 1
+                }, format='json')
+                self.assertEqual(response.status_code, 200)
+                counts.add(response.data['total_available'])
+            self.assertEqual(len(counts), 1)
+            return counts.pop()
+
+        self.assertEqual(rooms_available(), 2)
+        self.block.pick_up(self.rooming_list(2))
+        self.assertEqual(rooms_available(), 2)
+        # Assigned pick-ups hold their rooms instead of their room type
+        auto_assign_rooms(self.start, self.start)
+        self.assertEqual(rooms_available(), 2)
+
+    def test_release_expired_returns_rooms(self):
+        """Test blocks past cutoff release the rooms not picked up"""
+        self.block.reserve_pickup(1)
+        released = GroupBlock.release_expired(today=self.start)
+        self.assertEqual(released, 1)
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.status, 'RELEASED')
+        self.assertEqual(self.block.rooms_released, 2)
+        self.assertEqual(self.block.rooms_remaining, 0)
+        self.assertFalse(self.block.reserve_pickup(1))
+        self.assertEqual(self.quote()['rooms_available'], 5)
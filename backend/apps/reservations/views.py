@@ -3,24 +3,36 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta
 
-from .models import Reservation, ReservationRoom
+from django.core.exceptions import ValidationError
+
+from apps.guests.models import PROMOTED_PREFERENCES
+from apps.guests.preferences import GuestPreferenceFilter
+from apps.guests.search import GuestSearchFilter
+from .models import Reservation, ReservationRoom, GroupBlock
 from .serializers import (
     ReservationSerializer, ReservationListSerializer, ReservationCreateSerializer,
-    ReservationUpdateSerializer, ReservationRoomSerializer, CheckAvailabilitySerializer
+    ReservationUpdateSerializer, ReservationRoomSerializer, CheckAvailabilitySerializer,
+    QuoteRequestSerializer, AutoAssignSerializer, GroupBlockSerializer, GroupPickUpSerializer
 )
+from .availability import AvailabilitySnapshot, quote_alternatives
+from .assignment import auto_assign_rooms
 
 
 class ReservationViewSet(viewsets.ModelViewSet):
     """ViewSet for managing reservations"""
-    queryset = Reservation.objects.select_related('guest').prefetch_related('rooms__room__room_type')
+    queryset = Reservation.objects.select_related('guest__stats').prefetch_related('rooms__room__room_type')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, GuestSearchFilter, GuestPreferenceFilter]
     filterset_fields = ['status', 'booking_source', 'guest', 'check_in_date', 'check_out_date']
     search_fields = ['reservation_number', 'guest__first_name', 'guest__last_name', 'guest__email']
+    guest_search_field = 'guest'
+    guest_preference_path = 'guest'
+    search_exact_fields = ['reservation_number']
     ordering_fields = ['check_in_date', 'check_out_date', 'created_at', 'total_amount']
     ordering = ['-created_at']
 
@@ -62,18 +74,14 @@ class ReservationViewSet(viewsets.ModelViewSet):
         total_guests = adults + children
         available_rooms = available_rooms.filter(room_type__max_occupancy__gte=total_guests)
         
-        # Check for conflicting reservations
-        conflicting_reservations = Reservation.objects.filter(
-            status__in=['CONFIRMED', 'CHECKED_IN'],
-            check_in_date__lt=check_out,
-            check_out_date__gt=check_in
-        ).values_list('rooms__room', flat=True)
-        
-        available_rooms = available_rooms.exclude(id__in=conflicting_reservations)
+        # Leave out rooms booked or out of order on any night of the stay, and
+        # the rooms of each type held for group blocks and for reservations
+        # without a room yet
+        rooms = AvailabilitySnapshot(check_in, check_out).rooms_to_offer(available_rooms, check_in, check_out)
         
         # Prepare response
         from apps.rooms.serializers import RoomListSerializer
-        room_serializer = RoomListSerializer(available_rooms, many=True)
+        room_serializer = RoomListSerializer(rooms, many=True)
         
         return Response({
             'check_in_date': check_in,
@@ -85,6 +93,21 @@ class ReservationViewSet(viewsets.ModelViewSet):
             'total_available': len(room_serializer.data)
         })
 
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """Price several room type/date alternatives in one call"""
+        serializer = QuoteRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        quotes = quote_alternatives(serializer.validated_data['alternatives'])
+        
+        return Response({
+            'total_alternatives': len(quotes),
+            'total_available': len([q for q in quotes if q['available']]),
+            'quotes': quotes
+        })
+
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         """Confirm a reservation"""
@@ -171,14 +194,23 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 'error': f'Cannot check out reservation with status: {reservation.get_status_display()}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        reservation.status = 'CHECKED_OUT'
-        reservation.actual_check_out = timezone.now()
-        reservation.save(update_fields=['status', 'actual_check_out', 'updated_at'])
+        from apps.inventory.minibar import MinibarError, post_minibar_charges
         
-        # Update room status to available
-        for reservation_room in reservation.rooms.all():
-            reservation_room.room.status = 'AVAILABLE'
-            reservation_room.room.save(update_fields=['status', 'updated_at'])
+        try:
+            with transaction.atomic():
+                # Charge what was taken from the rooms' minibars
+                post_minibar_charges([reservation.id], performed_by=request.user.get_username())
+                
+                reservation.status = 'CHECKED_OUT'
+                reservation.actual_check_out = timezone.now()
+                reservation.save(update_fields=['status', 'actual_check_out', 'updated_at'])
+                
+                # Update room status to available
+                for reservation_room in reservation.rooms.all():
+                    reservation_room.room.status = 'AVAILABLE'
+                    reservation_room.room.save(update_fields=['status', 'updated_at'])
+        except MinibarError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': True,
@@ -202,6 +234,71 @@ class ReservationViewSet(viewsets.ModelViewSet):
             'reservations': serializer.data
         })
 
+    @action(detail=False, methods=['get'])
+    def vip_prep_list(self, request):
+        """Get arriving VIP guests with their room preferences for preparation"""
+        date_param = request.query_params.get('date')
+        if date_param:
+            try:
+                target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+            except ValueError:
+                return Response({
+                    'error': 'Invalid date format. Use YYYY-MM-DD'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            target_date = timezone.now().date()
+        
+        # Preferences come from the promoted guest columns, and pref_<key>
+        # parameters narrow the list through GuestPreferenceFilter
+        columns = {key: f'guest__{column}' for key, column in PROMOTED_PREFERENCES.items()}
+        arrivals = self.filter_queryset(self.get_queryset()).filter(
+            check_in_date=target_date,
+            status__in=['PENDING', 'CONFIRMED'],
+            guest__is_vip=True
+        ).order_by('guest__last_name', 'guest__first_name').values(
+            'id', 'reservation_number', 'guest_id', 'guest__first_name', 'guest__last_name',
+            'special_requests', *columns.values()
+        )
+        
+        return Response({
+            'date': target_date,
+            'total_arrivals': len(arrivals),
+            'arrivals': [
+                {
+                    'reservation_id': row['id'],
+                    'reservation_number': row['reservation_number'],
+                    'guest_id': row['guest_id'],
+                    'guest_name': f"{row['guest__first_name']} {row['guest__last_name']}",
+                    'special_requests': row['special_requests'],
+                    'preferences': {key: row[column] for key, column in columns.items()}
+                }
+                for row in arrivals
+            ]
+        })
+
+    @action(detail=False, methods=['post'])
+    def auto_assign(self, request):
+        """Assign concrete rooms to upcoming arrivals booked by room type"""
+        serializer = AutoAssignSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        start_date = data.get('start_date') or timezone.now().date()
+        end_date = data.get('end_date') or start_date
+        
+        result = auto_assign_rooms(start_date, end_date, dry_run=data['dry_run'])
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'dry_run': data['dry_run'],
+            'total_assigned': len(result['assigned']),
+            'total_unassigned': sum(item['missing_rooms'] for item in result['unassigned']),
+            'assigned': result['assigned'],
+            'unassigned': result['unassigned']
+        })
+
     @action(detail=False, methods=['get'])
     def today_departures(self, request):
         """Get today's departing guests"""
@@ -407,3 +504,77 @@ class ReservationRoomViewSet(viewsets.ModelViewSet):
             'message': f'Rate updated for room {reservation_room.room.number}',
             'room_assignment': ReservationRoomSerializer(reservation_room).data
         })
+
+
+class GroupBlockViewSet(viewsets.ModelViewSet):
+    """ViewSet for managing group blocks and allotments"""
+    queryset = GroupBlock.objects.select_related('room_type', 'contact_guest')
+    serializer_class = GroupBlockSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'room_type', 'contact_guest', 'start_date', 'cutoff_date']
+    search_fields = ['name', 'code']
+    ordering = ['start_date', 'name']
+
+    @action(detail=True, methods=['post'])
+    def pick_up(self, request, pk=None):
+        """Create reservations for a rooming list from the block"""
+        block = self.get_object()
+        
+        if block.status != 'ACTIVE':
+            return Response({
+                'error': f'Cannot pick up rooms from block with status: {block.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = GroupPickUpSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            reservations = block.pick_up(serializer.validated_data['rows'])
+        except ValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f'{len(reservations)} rooms picked up from block {block.code}',
+            'reservations': [
+                {
+                    'id': reservation.id,
+                    'reservation_number': reservation.reservation_number,
+                    'guest': reservation.guest_id,
+                    'check_in_date': reservation.check_in_date,
+                    'check_out_date': reservation.check_out_date,
+                    'total_amount': float(reservation.total_amount)
+                }
+                for reservation in reservations
+            ],
+            'block': GroupBlockSerializer(block).data
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Release rooms not picked up back to general inventory"""
+        block = self.get_object()
+        
+        if block.status != 'ACTIVE':
+            return Response({
+                'error': f'Cannot release block with status: {block.get_status_display()}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        block.release()
+        
+        return Response({
+            'success': True,
+            'message': f'{block.rooms_released} rooms released from block {block.code}',
+            'block': GroupBlockSerializer(block).data
+        })
+
+    @action(detail=False, methods=['post'])
+    def release_expired(self, request):
+        """Release every active block past its cutoff date"""
+        released = GroupBlock.release_expired()
+        
+        return Response({
+            'success': True,
+            'released_blocks': released
+        })
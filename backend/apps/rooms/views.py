@@ -6,6 +6,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 from datetime import date
 
+from apps.reservations.availability import AvailabilitySnapshot
 from .models import RoomType, Room
 from .serializers import (
     RoomTypeSerializer, RoomSerializer, RoomListSerializer, 
@@ -111,10 +112,12 @@ class RoomViewSet(viewsets.ModelViewSet):
         total_guests = adults + children
         available_rooms = available_rooms.filter(room_type__max_occupancy__gte=total_guests)
         
-        # TODO: Add logic to check for conflicting reservations
-        # This would require checking the reservations table for overlapping dates
+        # Leave out rooms booked or out of order on any night of the stay, and
+        # the rooms of each type held for group blocks and for reservations
+        # without a room yet
+        rooms = AvailabilitySnapshot(check_in, check_out).rooms_to_offer(available_rooms, check_in, check_out)
         
-        serializer = RoomListSerializer(available_rooms, many=True)
+        serializer = RoomListSerializer(rooms, many=True)
         
         response_data = {
             'check_in_date': check_in,
@@ -3,6 +3,11 @@ ASGI config for kapulaga project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The real-time event stream (``/api/stream/``) holds connections open and
+must be served through this entry point by an ASGI server, e.g.
+``uvicorn kapulaga.asgi:application``; under WSGI every open stream would
+tie up a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -14,3 +19,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kapulaga.settings')
 
 application = get_asgi_application()
+
+# Warm the room key index used by lock controllers before the first request
+from django.db import DatabaseError  # noqa: E402
+from apps.checkin.keyindex import key_index  # noqa: E402
+
+try:
+    key_index.warm()
+except DatabaseError:
+    # Database not migrated yet; the index loads on first lookup instead
+    pass
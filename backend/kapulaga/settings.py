@@ -50,6 +50,9 @@ INSTALLED_APPS = [
     'apps.employees',
     'apps.payments',
     'apps.reports',
+    'apps.realtime',
+    'apps.housekeeping',
+    'apps.maintenance',
 ]
 
 MIDDLEWARE = [
@@ -135,6 +138,59 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Hotel billing configuration
+# Tax and service charge rates (percent) used when quoting stays. When left as
+# None the defaults of the ``Bill`` model are used.
+HOTEL_TAX_RATE = None
+HOTEL_SERVICE_CHARGE_RATE = None
+
+# Shared secret door-lock and elevator controllers send in the
+# X-Controller-Token header to /api/locks/validate/. Key validation is
+# disabled while it is unset.
+LOCK_CONTROLLER_TOKEN = None
+
+# Seconds before the in-memory room key index is reloaded from the database,
+# bounding how long changes made by other processes take to apply
+ROOM_KEY_INDEX_TTL = 30
+
+# Seconds the front-desk occupancy board stays cached. It is also dropped
+# whenever a room, stay or key changes in this process.
+OCCUPANCY_BOARD_CACHE_TTL = 60
+
+# Standard check-in time ("HH:MM"); housekeeping tasks are due by then for
+# rooms with an arrival that day
+HOTEL_CHECK_IN_TIME = '14:00'
+
+# Department whose active employees receive housekeeping tasks
+HOUSEKEEPING_DEPARTMENT = 'Housekeeping'
+
+# Loyalty points earned per night of a checked-out stay, and days before
+# unused earned points expire
+LOYALTY_POINTS_PER_NIGHT = 10
+LOYALTY_POINTS_EXPIRY_DAYS = 730
+
+# How stock taken out of inventory is costed: 'FIFO' uses the cost of the
+# oldest stock received, 'AVERAGE' the moving weighted average unit cost
+INVENTORY_COSTING_METHOD = 'AVERAGE'
+
+# Stock demand forecasting: days of movement history used, weight of the
+# latest day in the exponential smoothing (0-1), standard deviations of
+# demand held as safety stock (1.65 covers about 95% of lead times), and
+# days of demand a reorder covers beyond the reorder point
+INVENTORY_FORECAST_HISTORY_DAYS = 90
+INVENTORY_FORECAST_SMOOTHING = 0.3
+INVENTORY_SERVICE_LEVEL_Z = 1.65
+INVENTORY_REORDER_COVER_DAYS = 14
+
+# Seconds before the in-memory barcode and SKU scan index is reloaded from
+# the database, bounding how long item changes made by other processes take
+# to reach /api/inventory/scan/
+INVENTORY_SCAN_INDEX_TTL = 300
+
+# Days ahead /api/inventory/lots/expiring/ looks for lots about to expire
+# when no ?days= is given
+INVENTORY_EXPIRY_WARNING_DAYS = 7
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kapulaga.settings')
 
 application = get_wsgi_application()
+
+# Warm the room key index used by lock controllers before the first request
+from django.db import DatabaseError  # noqa: E402
+from apps.checkin.keyindex import key_index  # noqa: E402
+
+try:
+    key_index.warm()
+except DatabaseError:
+    # Database not migrated yet; the index loads on first lookup instead
+    pass